@@ -0,0 +1,24 @@
+"""Added TimeLogs resource_id, start, end index
+
+Revision ID: 8f0b941f30a0
+Revises: c1a2d7e5b4f3
+Create Date: 2026-10-17 09:12:47.521000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8f0b941f30a0'
+down_revision = 'c1a2d7e5b4f3'
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index(
+        'ix_TimeLogs_resource_id_start_end', 'TimeLogs',
+        ['resource_id', 'start', 'end'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_TimeLogs_resource_id_start_end', table_name='TimeLogs')
@@ -0,0 +1,29 @@
+"""Added Projects schedule_seconds and total_logged_seconds columns
+
+Revision ID: b3e6c1f4a7d2
+Revises: 8f0b941f30a0
+Create Date: 2026-10-17 11:38:04.275000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b3e6c1f4a7d2'
+down_revision = '8f0b941f30a0'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    # the values are left NULL, they are computed when they are first needed
+    with op.batch_alter_table('Projects', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('schedule_seconds', sa.Integer(), nullable=True))
+        batch_op.add_column(
+            sa.Column('total_logged_seconds', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('Projects', schema=None) as batch_op:
+        batch_op.drop_column('total_logged_seconds')
+        batch_op.drop_column('schedule_seconds')
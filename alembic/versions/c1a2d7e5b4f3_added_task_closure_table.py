@@ -0,0 +1,60 @@
+"""Added Task_Closure table
+
+Revision ID: c1a2d7e5b4f3
+Revises: f8d596555d3a
+Create Date: 2026-10-16 23:48:31.217000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c1a2d7e5b4f3'
+down_revision = 'f8d596555d3a'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    task_closure = op.create_table(
+        'Task_Closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['Tasks.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['Tasks.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index(
+        op.f('ix_Task_Closure_descendant_id'), 'Task_Closure',
+        ['descendant_id'], unique=False
+    )
+
+    # fill the table with the current hierarchy
+    connection = op.get_bind()
+    parent_ids = dict(
+        connection.execute('SELECT id, parent_id FROM "Tasks"').fetchall()
+    )
+    rows = []
+    for task_id in parent_ids:
+        depth = 0
+        ancestor_id = task_id
+        while ancestor_id is not None:
+            rows.append({
+                'ancestor_id': ancestor_id,
+                'descendant_id': task_id,
+                'depth': depth
+            })
+            depth += 1
+            ancestor_id = parent_ids.get(ancestor_id)
+
+    if rows:
+        op.bulk_insert(task_closure, rows)
+
+
+def downgrade():
+    op.drop_index(
+        op.f('ix_Task_Closure_descendant_id'), table_name='Task_Closure'
+    )
+    op.drop_table('Task_Closure')
@@ -0,0 +1,50 @@
+"""Added Version_Counters table
+
+Revision ID: d4a8e2f7c9b1
+Revises: b3e6c1f4a7d2
+Create Date: 2026-10-17 14:05:51.638000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8e2f7c9b1'
+down_revision = 'b3e6c1f4a7d2'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'Version_Counters',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('take_name', sa.String(length=256), nullable=False),
+        sa.Column('next_number', sa.Integer(), nullable=False),
+        sa.Column('latest_published_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['task_id'], ['Tasks.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['latest_published_id'], ['Versions.id'],
+                                ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('task_id', 'take_name')
+    )
+
+    # fill the table with the current versions
+    op.execute(
+        'INSERT INTO "Version_Counters" '
+        '(task_id, take_name, next_number, latest_published_id) '
+        'SELECT v.task_id, v.take_name, MAX(v.version_number) + 1, '
+        '(SELECT p.id FROM "Versions" AS p '
+        'WHERE p.task_id = v.task_id AND p.take_name = v.take_name '
+        'AND p.is_published = %(true)s '
+        'ORDER BY p.version_number DESC LIMIT 1) '
+        'FROM "Versions" AS v '
+        'WHERE v.task_id IS NOT NULL '
+        'GROUP BY v.task_id, v.take_name' % {
+            'true': 'true' if op.get_bind().dialect.name == 'postgresql'
+            else '1'
+        }
+    )
+
+
+def downgrade():
+    op.drop_table('Version_Counters')
@@ -0,0 +1,49 @@
+"""Added Ticket_Counters table and Ticket_Number_Seq sequence
+
+Revision ID: e5b9c3a1f8d6
+Revises: d4a8e2f7c9b1
+Create Date: 2026-10-17 15:21:09.412000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9c3a1f8d6'
+down_revision = 'd4a8e2f7c9b1'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    ticket_counters = op.create_table(
+        'Ticket_Counters',
+        sa.Column('project_id', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column('next_number', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('project_id')
+    )
+
+    connection = op.get_bind()
+    next_number = connection.execute(
+        'SELECT COALESCE(MAX(number), 0) + 1 FROM "Tickets"'
+    ).scalar()
+
+    # the studio wide counter, the per project counters are created when
+    # they are first needed
+    op.bulk_insert(
+        ticket_counters, [{'project_id': 0, 'next_number': next_number}]
+    )
+
+    if connection.dialect.name == 'postgresql':
+        op.execute(
+            sa.schema.CreateSequence(
+                sa.Sequence('Ticket_Number_Seq', start=next_number)
+            )
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.DropSequence(sa.Sequence('Ticket_Number_Seq')))
+
+    op.drop_table('Ticket_Counters')
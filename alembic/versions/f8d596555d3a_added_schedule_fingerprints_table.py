@@ -0,0 +1,31 @@
+"""Added Schedule_Fingerprints table
+
+Revision ID: f8d596555d3a
+Revises: 0063f547dc2e
+Create Date: 2026-10-16 23:05:12.482000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'f8d596555d3a'
+down_revision = '0063f547dc2e'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'Schedule_Fingerprints',
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('component', sa.String(), nullable=True),
+        sa.Column('fingerprint', sa.String(length=40), nullable=False),
+        sa.Column('date_updated', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['Projects.id'],
+                                onupdate='CASCADE', ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('project_id')
+    )
+
+
+def downgrade():
+    op.drop_table('Schedule_Fingerprints')
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+"""Benchmarks for Stalker.
+
+Generates a synthetic studio with a seeded :class:`.StudioGenerator` and
+measures the time of the scenarios in :mod:`stalker.benchmarks.scenarios`.
+The results are written as JSON so they can be compared between releases::
+
+  python -m stalker.benchmarks --projects 4 --depth 4 -o results.json
+
+Or from Python::
+
+  from stalker.benchmarks import benchmark
+  results = benchmark(projects=4, depth=4, repeat=3)
+"""
+
+from stalker.benchmarks.generator import StudioGenerator
+from stalker.benchmarks.runner import run_scenarios, benchmark, main
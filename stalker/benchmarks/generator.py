@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import datetime
+import random
+import time
+
+from stalker.log import logging_level
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging_level)
+
+
+class StudioGenerator(object):
+    """Generates a synthetic studio in the current database.
+
+    The generated data is fully defined by the given arguments, the same seed
+    and sizes will always generate the same studio, so the benchmark results
+    of different Stalker versions can be compared::
+
+      from stalker import db
+      from stalker.benchmarks import StudioGenerator
+
+      db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+      db.init()
+
+      generator = StudioGenerator(seed=1, projects=2, depth=3, children=5)
+      generator.generate()
+
+      print(len(generator.tasks))  # 310
+
+    The tasks of each project are created as a tree of ``depth`` levels where
+    each task has ``children`` child tasks. Each leaf task has one resource
+    and depends to ``dependency_density`` times of the previous leaf tasks of
+    the same project on average. The leaf tasks without any dependency have
+    ``time_logs`` TimeLogs before the :attr:`.Studio.now` and every leaf task
+    has ``versions`` Versions.
+
+    :param int seed: The seed of the random number generator, the default is
+      0.
+
+    :param int projects: The number of projects, the default is 1.
+
+    :param int depth: The depth of the task trees, the default is 3.
+
+    :param int children: The number of children of each task and the number
+      of root tasks of each project, the default is 4.
+
+    :param int users: The number of users, the default is 10.
+
+    :param float dependency_density: The average number of dependencies of
+      each leaf task, the default is 0.5.
+
+    :param int time_logs: The number of TimeLogs per leaf task without any
+      dependency, the default is 2.
+
+    :param int versions: The number of Versions per leaf task, the default is
+      1.
+
+    :param datetime.datetime now: The :attr:`.Studio.now` value of the
+      generated studio, the default is 2016-01-04 (a Monday) so the generated
+      data doesn't change with the current date.
+    """
+
+    def __init__(self,
+                 seed=0,
+                 projects=1,
+                 depth=3,
+                 children=4,
+                 users=10,
+                 dependency_density=0.5,
+                 time_logs=2,
+                 versions=1,
+                 now=None):
+        self.seed = seed
+        self.num_of_projects = projects
+        self.depth = depth
+        self.num_of_children = children
+        self.num_of_users = users
+        self.dependency_density = dependency_density
+        self.num_of_time_logs = time_logs
+        self.num_of_versions = versions
+        if now is None:
+            now = datetime.datetime(2016, 1, 4)
+        self.now = now
+
+        self.random = random.Random(seed)
+
+        self.studio = None
+        self.users = []
+        self.projects = []
+        self.tasks = []
+        self.leaf_tasks = []
+        self.time_logs = []
+        self.versions = []
+
+        # the end of the last TimeLog of each user
+        self._time_log_cursors = {}
+
+    @property
+    def parameters(self):
+        """returns the generator parameters as a dictionary
+        """
+        return {
+            'seed': self.seed,
+            'projects': self.num_of_projects,
+            'depth': self.depth,
+            'children': self.num_of_children,
+            'users': self.num_of_users,
+            'dependency_density': self.dependency_density,
+            'time_logs': self.num_of_time_logs,
+            'versions': self.num_of_versions,
+            'now': self.now.strftime('%Y-%m-%d %H:%M')
+        }
+
+    @property
+    def counts(self):
+        """returns the number of generated entities as a dictionary
+        """
+        return {
+            'users': len(self.users),
+            'projects': len(self.projects),
+            'tasks': len(self.tasks),
+            'leaf_tasks': len(self.leaf_tasks),
+            'time_logs': len(self.time_logs),
+            'versions': len(self.versions)
+        }
+
+    def generate(self):
+        """generates and commits the studio data
+        """
+        from stalker import db
+
+        start = time.time()
+        self.random.seed(self.seed)
+        self._generate_studio()
+        self._generate_users()
+        db.DBSession.commit()
+
+        # every user starts logging from 60 days before now
+        self._time_log_cursors = dict(
+            (user, self.now - datetime.timedelta(days=60))
+            for user in self.users
+        )
+
+        for i in range(self.num_of_projects):
+            project = self._generate_project(i)
+            leaf_tasks = self._generate_tasks(project)
+            db.DBSession.commit()
+
+            self._generate_dependencies(leaf_tasks)
+            db.DBSession.commit()
+
+            self._generate_time_logs(leaf_tasks)
+            self._generate_versions(leaf_tasks)
+            db.DBSession.commit()
+
+        end = time.time()
+        logger.debug('generating the studio took: %s seconds' % (end - start))
+
+    def _generate_studio(self):
+        """generates the studio
+        """
+        from stalker import db, Studio
+
+        self.studio = Studio(
+            name='Benchmark Studio',
+            now=self.now,
+        )
+        self.studio.start = self.now - datetime.timedelta(days=30)
+        self.studio.end = self.now + datetime.timedelta(days=3 * 365)
+        db.DBSession.add(self.studio)
+
+    def _generate_users(self):
+        """generates the users
+        """
+        from stalker import db, User
+
+        for i in range(self.num_of_users):
+            user = User(
+                name='User %s' % i,
+                login='user%s' % i,
+                email='user%s@benchmark.com' % i,
+                password='1234',
+                efficiency=self.random.choice([0.5, 1.0, 1.0, 1.0, 1.5])
+            )
+            db.DBSession.add(user)
+            self.users.append(user)
+
+    def _generate_project(self, index):
+        """generates a project with the given index
+        """
+        from stalker import db, Project, Repository, Status, StatusList
+
+        project_status_list = StatusList.query\
+            .filter_by(target_entity_type='Project').first()
+        if project_status_list is None:
+            project_status_list = StatusList(
+                name='Project Statuses',
+                statuses=[
+                    Status.query.filter_by(code='WIP').first(),
+                    Status.query.filter_by(code='CMPL').first(),
+                ],
+                target_entity_type='Project'
+            )
+
+        repository = Repository(
+            name='Benchmark Repository %s' % index,
+            linux_path='/mnt/benchmark/%s' % index,
+            windows_path='B:/%s' % index,
+            osx_path='/Volumes/benchmark/%s' % index
+        )
+
+        project = Project(
+            name='Benchmark Project %s' % index,
+            code='BP%s' % index,
+            repositories=[repository],
+            status_list=project_status_list
+        )
+        db.DBSession.add(project)
+        self.projects.append(project)
+        return project
+
+    def _generate_tasks(self, project):
+        """generates the task tree of the given project and returns the leaf
+        tasks
+        """
+        from stalker import db, Task
+
+        leaf_tasks = []
+        parents = [None]
+        for level in range(self.depth):
+            is_leaf_level = level == self.depth - 1
+            new_parents = []
+            for parent in parents:
+                for i in range(self.num_of_children):
+                    kwargs = {
+                        'name': 'Task %s' % i,
+                        'project': project,
+                        'parent': parent,
+                    }
+                    if is_leaf_level:
+                        kwargs.update({
+                            'resources': [self.random.choice(self.users)],
+                            'schedule_timing':
+                                self.random.randint(1, 10),
+                            'schedule_unit':
+                                self.random.choice(['h', 'h', 'd']),
+                            'priority': self.random.choice([500, 500, 800]),
+                        })
+                    task = Task(**kwargs)
+                    db.DBSession.add(task)
+                    self.tasks.append(task)
+                    new_parents.append(task)
+                    if is_leaf_level:
+                        leaf_tasks.append(task)
+            parents = new_parents
+
+        self.leaf_tasks.extend(leaf_tasks)
+        return leaf_tasks
+
+    def _generate_dependencies(self, leaf_tasks):
+        """generates the dependencies between the given leaf tasks, a task
+        only depends to the tasks before it so there are no cycles
+        """
+        for i, task in enumerate(leaf_tasks[1:], 1):
+            num_of_dependencies = int(self.dependency_density)
+            if self.random.random() < self.dependency_density % 1:
+                num_of_dependencies += 1
+            num_of_dependencies = min(num_of_dependencies, i)
+            if num_of_dependencies:
+                task.depends = self.random.sample(
+                    leaf_tasks[:i], num_of_dependencies
+                )
+
+    def _generate_time_logs(self, leaf_tasks):
+        """generates the time logs of the leaf tasks without any dependency,
+        the time logs of a user are not overlapping
+        """
+        from stalker import db, TimeLog
+
+        for task in leaf_tasks:
+            if task.depends:
+                continue
+            resource = task.resources[0]
+            for i in range(self.num_of_time_logs):
+                start = self._time_log_cursors[resource]
+                end = start + datetime.timedelta(
+                    hours=self.random.randint(1, 3)
+                )
+                if end > self.now:
+                    break
+                self._time_log_cursors[resource] = end + datetime.timedelta(hours=1)
+                time_log = TimeLog(
+                    task=task,
+                    resource=resource,
+                    start=start,
+                    end=end
+                )
+                db.DBSession.add(time_log)
+                self.time_logs.append(time_log)
+
+    def _generate_versions(self, leaf_tasks):
+        """generates the versions of the leaf tasks
+        """
+        from stalker import db, Version
+
+        for task in leaf_tasks:
+            for i in range(self.num_of_versions):
+                version = Version(task=task)
+                db.DBSession.add(version)
+                self.versions.append(version)
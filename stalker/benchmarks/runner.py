@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import datetime
+import json
+import platform
+import sys
+import time
+
+from stalker.benchmarks.generator import StudioGenerator
+from stalker.benchmarks.scenarios import scenarios
+
+
+def run_scenarios(generator, names=None, repeat=1):
+    """runs the scenarios with the given generator and returns the results as
+    a dictionary of scenario name to timing info
+
+    :param generator: A :class:`.StudioGenerator` instance that has already
+      generated its data.
+    :param list names: The names of the scenarios to run, all the scenarios
+      are run if it is skipped.
+    :param int repeat: The number of times to run each scenario.
+    """
+    from stalker import db
+
+    if names:
+        all_names = [name for name, _ in scenarios]
+        for name in names:
+            if name not in all_names:
+                raise ValueError(
+                    'There is no benchmark scenario called "%s", please use '
+                    'one of %s' % (name, all_names)
+                )
+
+    results = {}
+    for name, scenario in scenarios:
+        if names and name not in names:
+            continue
+
+        times = []
+        for i in range(repeat):
+            try:
+                times.append(scenario(generator))
+            finally:
+                db.DBSession.rollback()
+
+        results[name] = {
+            'times': times,
+            'min': min(times),
+            'max': max(times),
+            'mean': sum(times) / len(times)
+        }
+    return results
+
+
+def benchmark(settings=None, names=None, repeat=1, **kwargs):
+    """sets up the database, generates a studio and runs the scenarios.
+
+    Returns a dictionary holding the results together with the environment
+    info and the generator parameters, which can directly be dumped as JSON.
+
+    The database should be empty, use the default in memory SQLite database
+    or a dedicated PostgreSQL database.
+
+    :param dict settings: The database settings that is passed to
+      :func:`stalker.db.setup`, the default is an in memory SQLite database.
+    :param list names: The names of the scenarios to run, all the scenarios
+      are run if it is skipped.
+    :param int repeat: The number of times to run each scenario.
+    :param kwargs: The :class:`.StudioGenerator` arguments.
+    """
+    import sqlalchemy
+    import stalker
+    from stalker import db
+
+    if settings is None:
+        settings = {'sqlalchemy.url': 'sqlite:///:memory:'}
+
+    db.setup(settings)
+    db.init()
+
+    generator = StudioGenerator(**kwargs)
+    start = time.time()
+    generator.generate()
+    generation_time = time.time() - start
+
+    results = run_scenarios(generator, names=names, repeat=repeat)
+
+    return {
+        'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'stalker_version': stalker.__version__,
+        'python_version': platform.python_version(),
+        'sqlalchemy_version': sqlalchemy.__version__,
+        'dialect': db.DBSession.connection().engine.dialect.name,
+        'parameters': generator.parameters,
+        'counts': generator.counts,
+        'generation_time': generation_time,
+        'repeat': repeat,
+        'scenarios': results
+    }
+
+
+def main(argv=None):
+    """the command line interface of the benchmarks::
+
+      python -m stalker.benchmarks --projects 4 --depth 4 -o results.json
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m stalker.benchmarks',
+        description='Generates a synthetic studio and benchmarks Stalker.'
+    )
+    parser.add_argument(
+        '--url', default='sqlite:///:memory:',
+        help='the database url, should be an empty database '
+             '(default: %(default)s)'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--projects', type=int, default=1)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--children', type=int, default=4)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--dependency-density', type=float, default=0.5)
+    parser.add_argument('--time-logs', type=int, default=2)
+    parser.add_argument('--versions', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument(
+        '--scenario', action='append', dest='scenarios',
+        choices=[name for name, _ in scenarios],
+        help='the scenario to run, can be used multiple times '
+             '(default: all scenarios)'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        help='the path of the JSON file to write the results to '
+             '(default: stdout)'
+    )
+    args = parser.parse_args(argv)
+
+    results = benchmark(
+        settings={'sqlalchemy.url': args.url},
+        names=args.scenarios,
+        repeat=args.repeat,
+        seed=args.seed,
+        projects=args.projects,
+        depth=args.depth,
+        children=args.children,
+        users=args.users,
+        dependency_density=args.dependency_density,
+        time_logs=args.time_logs,
+        versions=args.versions
+    )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+
+    return results
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+"""The benchmark scenarios.
+
+Each scenario is a function that accepts a :class:`.StudioGenerator`
+instance (which has already generated its data) and returns the measured
+time in seconds. Only the operation that is benchmarked is measured, the
+preparation is not. The changes done by a scenario are rolled back after it
+is run, so the scenarios can be run in any order and repeatedly.
+"""
+
+import datetime
+import random
+import time
+
+
+def tjp_file_content(generator):
+    """measures TaskJugglerScheduler._create_tjp_file_content()
+    """
+    from stalker import TaskJugglerScheduler
+
+    scheduler = TaskJugglerScheduler(
+        studio=generator.studio,
+        compute_resources=True
+    )
+    start = time.time()
+    scheduler._create_tjp_file_content()
+    return time.time() - start
+
+
+def parse_csv_file(generator):
+    """measures TaskJugglerScheduler._parse_csv_file() with a csv file
+    similar to the one that TaskJuggler generates
+    """
+    from sqlalchemy import select
+    from stalker import db, Task, TaskJugglerScheduler
+    from stalker.models.task import Task_Resources
+
+    connection = db.DBSession.connection()
+    tasks_table = Task.__table__
+    resources = {}
+    for task_id, resource_id in connection.execute(
+            select([Task_Resources.c.task_id, Task_Resources.c.resource_id])):
+        resources.setdefault(task_id, []).append(resource_id)
+
+    rand = random.Random(generator.seed)
+    date_format = '%Y-%m-%d-%H:%M'
+    now = generator.now
+
+    def dates():
+        task_start = now + datetime.timedelta(hours=rand.randint(0, 2000))
+        task_end = task_start + datetime.timedelta(hours=rand.randint(1, 80))
+        return task_start.strftime(date_format), \
+            task_end.strftime(date_format)
+
+    scheduler = TaskJugglerScheduler(
+        studio=generator.studio,
+        compute_resources=True
+    )
+    scheduler._create_tjp_file()
+    try:
+        with open(scheduler.csv_file_full_path, 'w') as f:
+            f.write('"Id";"Start";"End";"Resources"\n')
+            for project in generator.projects:
+                f.write('Project_%s;%s;%s;\n' % ((project.id,) + dates()))
+            for task_id, project_id in connection.execute(
+                    select([tasks_table.c.id, tasks_table.c.project_id])):
+                f.write('Project_%s.Task_%s;%s;%s;%s\n' % (
+                    (project_id, task_id) + dates() + (
+                        ', '.join(
+                            'User (User_%s)' % resource_id
+                            for resource_id in resources.get(task_id, [])
+                        ),
+                    )
+                ))
+
+        start = time.time()
+        scheduler._parse_csv_file()
+        return time.time() - start
+    finally:
+        scheduler._clean_up()
+
+
+def list_scheduler(generator):
+    """measures ListScheduler.schedule()
+    """
+    from stalker import ListScheduler
+
+    scheduler = ListScheduler(
+        studio=generator.studio,
+        compute_resources=True
+    )
+    start = time.time()
+    scheduler.schedule()
+    return time.time() - start
+
+
+def status_cascade(generator):
+    """measures the status propagation of completing all the leaf tasks that
+    are in progress or ready to start
+    """
+    from stalker import db, Status, Task
+    from stalker.models.task import StatusPropagator
+
+    cmpl = Status.query.filter_by(code='CMPL').first()
+    tasks = [
+        task for task in Task.query
+        .join(Status, Task.status)
+        .filter(Status.code.in_(['RTS', 'WIP']))
+        .all()
+        if task.is_leaf
+    ]
+
+    start = time.time()
+    with db.DBSession.no_autoflush:
+        for task in tasks:
+            task.status = cmpl
+        StatusPropagator(tasks).propagate()
+    db.DBSession.flush()
+    return time.time() - start
+
+
+def version_creation(generator):
+    """measures creating a new Version for every leaf task
+    """
+    from stalker import db, Task, Version
+
+    tasks = [task for task in Task.query.all() if task.is_leaf]
+
+    start = time.time()
+    for task in tasks:
+        db.DBSession.add(Version(task=task))
+    db.DBSession.flush()
+    return time.time() - start
+
+
+def percent_complete(generator):
+    """measures the Project.percent_complete roll ups with an empty session
+    """
+    from stalker import db, Project
+
+    db.DBSession.expire_all()
+    projects = Project.query.all()
+
+    start = time.time()
+    for project in projects:
+        project.percent_complete
+    return time.time() - start
+
+
+#: the list of (name, scenario) tuples in the order they are run
+scenarios = [
+    ('tjp_file_content', tjp_file_content),
+    ('parse_csv_file', parse_csv_file),
+    ('list_scheduler', list_scheduler),
+    ('status_cascade', status_cascade),
+    ('version_creation', version_creation),
+    ('percent_complete', percent_complete),
+]
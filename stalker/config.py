@@ -56,6 +56,9 @@ class Config(object):
 
         repo_env_var_template='REPO%(id)s',
 
+        # create the repository environment variables in os.environ
+        export_repo_env_vars=False,
+
         #
         # Tells Stalker to create an admin by default
         #
@@ -82,6 +85,9 @@ class Config(object):
         # Tickets
         ticket_label="Ticket",
 
+        # restart the ticket numbers from 1 for every project
+        ticket_numbers_per_project=False,
+
         # define the available actions per Status
         ticket_status_names=[
             'New', 'Accepted', 'Assigned', 'Reopened', 'Closed'
@@ -468,6 +474,16 @@ taskreport breakdown "{{csv_file_name}}"{
         thumbnail_size=[320, 180],
     )
 
+    #: The names of the config values that the working time is computed from.
+    working_time_keys = [
+        'daily_working_hours', 'weekly_working_days', 'yearly_working_days'
+    ]
+
+    #: Increased every time one of the working_time_keys is set, so the
+    #: :class:`stalker.models.mixins.TimeUnitTable` can tell if it needs to
+    #: be rebuilt without checking each value.
+    working_time_version = 0
+
     def __init__(self):
         self.config_values = Config.default_config_values.copy()
         self.user_config = {}
@@ -530,6 +546,13 @@ taskreport breakdown "{{csv_file_name}}"{
     def __getattr__(self, name):
         return self.config_values[name]
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self.working_time_keys:
+            object.__setattr__(
+                self, 'working_time_version', self.working_time_version + 1
+            )
+
     def __getitem__(self, name):
         return getattr(self, name)
 
@@ -34,7 +34,7 @@ from stalker.log import logging_level
 logger = logging.getLogger(__name__)
 logger.setLevel(logging_level)
 
-alembic_version = '0063f547dc2e'
+alembic_version = 'e5b9c3a1f8d6'
 
 
 def setup(settings=None):
@@ -78,7 +78,8 @@ def setup(settings=None):
     update_defaults_with_studio()
 
     # create repo env variables
-    create_repo_vars()
+    if defaults.export_repo_env_vars:
+        create_repo_vars()
 
 
 def update_defaults_with_studio():
@@ -175,15 +176,15 @@ def init():
 
 def create_repo_vars():
     """creates environment variables for all of the repositories in the current
-    database
+    database.
+
+    Stalker expands the repository environment variables with the
+    :data:`stalker.models.repository.repository_path_resolver`, so they are
+    only needed in ``os.environ`` for other tools and sub processes. It is
+    called by :func:`.setup` if ``defaults.export_repo_env_vars`` is True.
     """
-    # get all the repositories
-    import os
-    from stalker import defaults, Repository
-    all_repos = Repository.query.all()
-    for repo in all_repos:
-        os.environ[defaults.repo_env_var_template % {'id': repo.id}] = \
-            repo.path
+    from stalker.models.repository import repository_path_resolver
+    repository_path_resolver.export()
 
 
 def get_alembic_version():
@@ -16,7 +16,10 @@
 # You should have received a copy of the Lesser GNU General Public License
 # along with Stalker.  If not, see <http://www.gnu.org/licenses/>
 import calendar
+import collections
 import datetime
+import itertools
+
 from stalker.exceptions import CircularDependencyError
 
 
@@ -41,8 +44,12 @@ def walk_hierarchy(entity, attr, method=0):
     """Walks the entity hierarchy over the given attribute and yields the
     entity.
 
-    It doesn't check for cycle, so if the attribute is not acyclic then this
-    function will not find an exit point.
+    Each entity is yielded only once, so it is safe to walk a graph with
+    cycles or a graph where an entity can be reached from more than one path.
+
+    For the persistent entities the attribute values of the entities waiting
+    to be visited are loaded together with one query per class instead of
+    one lazy load per entity.
 
     The default mode is Depth First Search (DFS), to walk with Breadth First
     Search (BFS) set the direction to 1.
@@ -52,18 +59,159 @@ def walk_hierarchy(entity, attr, method=0):
     :param method: 0:Depth first or 1:Breadth First
     :return:
     """
-    entity_to_visit = [entity]
-    if not method:  # DFS
-        while len(entity_to_visit):
-            current_entity = entity_to_visit.pop(0)
-            for child in reversed(getattr(current_entity, attr)):
-                entity_to_visit.insert(0, child)
-            yield current_entity
-    else:  # BFS
-        while len(entity_to_visit):
-            current_entity = entity_to_visit.pop(0)
-            entity_to_visit.extend(getattr(current_entity, attr))
-            yield current_entity
+    visited = {}
+    entity_to_visit = collections.deque([entity])
+    while entity_to_visit:
+        if not method:  # DFS
+            current_entity = entity_to_visit.pop()
+        else:  # BFS
+            current_entity = entity_to_visit.popleft()
+
+        if id(current_entity) in visited:
+            continue
+        # keep a reference, so the id is not reused by another object
+        visited[id(current_entity)] = current_entity
+
+        if not _is_loaded(current_entity, attr):
+            # the entities to be visited next are at the end of the stack in
+            # DFS and at the start of the queue in BFS
+            if not method:
+                pending = reversed(entity_to_visit)
+            else:
+                pending = iter(entity_to_visit)
+            _prefetch(
+                [current_entity] +
+                list(itertools.islice(pending, PREFETCH_CHUNK_SIZE - 1)),
+                attr
+            )
+
+        children = [
+            child for child in getattr(current_entity, attr)
+            if id(child) not in visited
+        ]
+        if not method:
+            entity_to_visit.extend(reversed(children))
+        else:
+            entity_to_visit.extend(children)
+        yield current_entity
+
+
+#: the maximum number of entities that are loaded with one query while
+#: walking a hierarchy
+PREFETCH_CHUNK_SIZE = 500
+
+# the (query class, loaded attribute name, loader option) of each class and
+# attribute pair, or None if the attribute can not be prefetched
+_prefetch_loaders = {}
+
+
+def _get_prefetch_loader(class_, attr):
+    """Returns the (query class, loaded attribute name, loader option) tuple
+    to prefetch the given attribute of the given mapped class, or None if the
+    attribute is not a relationship or an association proxy over a
+    relationship.
+    """
+    key = (class_, attr)
+    if key in _prefetch_loaders:
+        return _prefetch_loaders[key]
+
+    from sqlalchemy import inspect
+    from sqlalchemy.ext.associationproxy import AssociationProxy
+    from sqlalchemy.orm import joinedload
+
+    loader = None
+    mapper = inspect(class_)
+    descriptor = mapper.all_orm_descriptors.get(attr)
+    value_attr = None
+    if attr in mapper.relationships:
+        loaded_attr = attr
+    elif isinstance(descriptor, AssociationProxy) \
+            and descriptor.target_collection in mapper.relationships:
+        loaded_attr = descriptor.target_collection
+        value_attr = descriptor.value_attr
+    else:
+        loaded_attr = None
+
+    if loaded_attr is not None:
+        # query the class that defines the relationship, so the entities of
+        # different derived classes are loaded together
+        while mapper.inherits is not None \
+                and loaded_attr in mapper.inherits.relationships:
+            mapper = mapper.inherits
+
+        option = joinedload(getattr(mapper.class_, loaded_attr))
+        target_mapper = mapper.relationships[loaded_attr].mapper
+        if value_attr in target_mapper.relationships:
+            option = option.joinedload(
+                getattr(target_mapper.class_, value_attr)
+            )
+        loader = (mapper, loaded_attr, option)
+
+    _prefetch_loaders[key] = loader
+    return loader
+
+
+def _is_loaded(entity, attr):
+    """Returns False if the given attribute of the given entity can be
+    prefetched and it is not loaded yet.
+    """
+    from sqlalchemy import inspect
+    state = inspect(entity, raiseerr=False)
+    if state is None or not state.persistent:
+        return True
+    loader = _get_prefetch_loader(entity.__class__, attr)
+    return loader is None or loader[1] in state.dict
+
+
+def _prefetch(entities, attr, limit=None):
+    """Loads the given attribute of the given entities, that are persistent
+    and do not have the attribute loaded yet, with one query per session and
+    class. Then continues with the loaded values level by level until the
+    given number of entities are processed, so the walk will not need to
+    query the database again for them.
+
+    :param list entities: The entities to load the attribute of.
+    :param str attr: The attribute name.
+    :param int limit: The maximum number of entities to process, the default
+      is :data:`PREFETCH_CHUNK_SIZE`.
+    """
+    from sqlalchemy import inspect
+
+    if limit is None:
+        limit = PREFETCH_CHUNK_SIZE
+
+    seen = set()
+    level = entities
+    while level and limit > 0:
+        level = [e for e in level if id(e) not in seen][:limit]
+        seen.update(id(e) for e in level)
+        limit -= len(level)
+
+        groups = collections.OrderedDict()
+        for entity in level:
+            if _is_loaded(entity, attr):
+                continue
+            state = inspect(entity)
+            mapper, loaded_attr, option = \
+                _get_prefetch_loader(entity.__class__, attr)
+            groups.setdefault(
+                (state.session, mapper, loaded_attr), (option, [])
+            )[1].append(state.identity[0])
+
+        for (session, mapper, loaded_attr), (option, ids) in groups.items():
+            if len(ids) < 2:
+                # a lazy load is cheaper
+                continue
+            primary_key = mapper.primary_key[0]
+            with session.no_autoflush:
+                session.query(mapper).filter(primary_key.in_(ids))\
+                    .options(option).all()
+
+        next_level = []
+        for entity in level:
+            if _is_loaded(entity, attr):
+                next_level.extend(getattr(entity, attr))
+        level = next_level
 
 
 def check_circular_dependency(entity, other_entity, attr_name):
@@ -72,18 +220,26 @@ def check_circular_dependency(entity, other_entity, attr_name):
     """
     for e in walk_hierarchy(entity, attr_name):
         if e is other_entity:
-            raise CircularDependencyError(
-                '%(entity_name)s (%(entity_class)s) and '
-                '%(other_entity_name)s (%(other_entity_class)s) creates a '
-                'circular dependency in their "%(attr_name)s" attribute' %
-                {
-                    'entity_name': entity,
-                    'entity_class': entity.__class__.__name__,
-                    'other_entity_name': other_entity,
-                    'other_entity_class': other_entity.__class__.__name__,
-                    'attr_name': attr_name
-                }
-            )
+            raise circular_dependency_error(entity, other_entity, attr_name)
+
+
+def circular_dependency_error(entity, other_entity, attr_name):
+    """Returns a CircularDependencyError instance with a message telling that
+    the entity and other_entity creates a circular dependency in their
+    attr_name attribute
+    """
+    return CircularDependencyError(
+        '%(entity_name)s (%(entity_class)s) and '
+        '%(other_entity_name)s (%(other_entity_class)s) creates a '
+        'circular dependency in their "%(attr_name)s" attribute' %
+        {
+            'entity_name': entity,
+            'entity_class': entity.__class__.__name__,
+            'other_entity_name': other_entity,
+            'other_entity_class': other_entity.__class__.__name__,
+            'attr_name': attr_name
+        }
+    )
 
 
 def utc_to_local(utc_dt):
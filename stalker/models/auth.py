@@ -23,9 +23,9 @@ import base64
 import datetime
 
 from sqlalchemy import (Table, Column, Integer, ForeignKey, String, DateTime,
-                        Enum, Float)
+                        Enum, Float, event)
 from sqlalchemy.ext.associationproxy import association_proxy
-from sqlalchemy.orm import relationship, synonym, validates
+from sqlalchemy.orm import relationship, synonym, validates, Session
 from sqlalchemy.schema import UniqueConstraint
 
 from stalker import defaults
@@ -216,6 +216,20 @@ class Permission(Base):
             and other.class_name == self.class_name
 
 
+def invalidate_acls(*args):
+    """invalidates the cached ACLs whenever a Permission is inserted,
+    updated or deleted or a session is rolled back
+    """
+    ACLMixin.invalidate_acls()
+
+
+for event_name in ['after_insert', 'after_update', 'after_delete']:
+    event.listen(Permission, event_name, invalidate_acls)
+
+# the rolled back changes of the collections are not reported
+event.listen(Session, 'after_soft_rollback', invalidate_acls)
+
+
 class Group(Entity, ACLMixin):
     """Creates groups for users to be used in authorization system.
 
@@ -261,10 +275,15 @@ class Group(Entity, ACLMixin):
         self.users = users
         self.permissions = permissions
 
-    @validates('users')
-    def _validate_users(self, key, user):
+    @validates('users', include_removes=True)
+    def _validate_users(self, key, user, is_remove):
         """validates the given user instance
         """
+        # the effective permissions of the users are changed
+        self.invalidate_acls()
+        if is_remove:
+            return user
+
         if not isinstance(user, User):
             raise TypeError(
                 '%s.users attribute must all be stalker.models.auth.User '
@@ -731,10 +750,56 @@ class User(Entity, ACLMixin):
         return self.password == \
             base64.b64encode(bytes(raw_password.encode('utf-8')))
 
-    @validates("groups")
-    def _validate_groups(self, key, group):
+    @property
+    def effective_permissions(self):
+        """The (action, class_name) pairs that this user is allowed to.
+
+        It is the union of the :class:`.Permission`\ s of this user and of
+        the groups of this user, an action is not allowed if there is any
+        ``Deny`` permission for it. The value is cached and rebuilt only
+        after the permissions are changed (see
+        :meth:`.ACLMixin.invalidate_acls`).
+
+        :return: frozenset
+        """
+        cache = self.__dict__.get('_effective_permissions_cache')
+        if cache is None or cache[0] != ACLMixin.__acl_version__:
+            version = ACLMixin.__acl_version__
+            allowed = set()
+            denied = set()
+            permissions = list(self.permissions)
+            for group in self.groups:
+                permissions.extend(group.permissions)
+            for permission in permissions:
+                key = (permission.action, permission.class_name)
+                if permission.access == 'Allow':
+                    allowed.add(key)
+                else:
+                    denied.add(key)
+            cache = (version, frozenset(allowed - denied))
+            self._effective_permissions_cache = cache
+        return cache[1]
+
+    def can(self, action, class_name):
+        """Returns True if this user is allowed to do the given action on the
+        given class by the permissions of this user or the groups of this
+        user.
+
+        :param str action: The action, one of the ``defaults.actions``.
+        :param str class_name: The name of the class.
+        :return: bool
+        """
+        return (action, class_name) in self.effective_permissions
+
+    @validates("groups", include_removes=True)
+    def _validate_groups(self, key, group, is_remove):
         """check the given group
         """
+        # the effective permissions of this user are changed
+        self.invalidate_acls()
+        if is_remove:
+            return group
+
         if not isinstance(group, Group):
             raise TypeError(
                 "Any group in %s.groups should be an instance of"
@@ -259,23 +259,19 @@ class StatusMixin(object):
     def _validate_status_list(self, key, status_list):
         """validates the given status_list_in value
         """
-        from stalker.models.status import StatusList
+        from stalker.models.status import StatusList, status_registry
 
         if status_list is None:
             # check if there is a db setup and try to get the appropriate
             # StatusList from the database
-
-            # disable autoflush to prevent premature class initialization
-            with DBSession.no_autoflush:
-                try:
-                    # try to get a StatusList with the target_entity_type is
-                    # matching the class name
-                    status_list = StatusList.query\
-                        .filter_by(target_entity_type=self.__class__.__name__)\
-                        .first()
-                except UnboundExecutionError:
-                    # it is not mapped just skip it
-                    pass
+            try:
+                # try to get a StatusList with the target_entity_type is
+                # matching the class name
+                status_list = \
+                    status_registry.get_status_list(self.__class__.__name__)
+            except UnboundExecutionError:
+                # it is not mapped just skip it
+                pass
 
         # if it is still None
         if status_list is None:
@@ -369,6 +365,57 @@ class StatusMixin(object):
         return status
 
 
+# the ordinal of 1970-01-01, the times are rounded relative to it
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# time rounding functions by their timing resolution
+__time_rounders__ = {}
+
+
+def get_time_rounder(timing_resolution):
+    """returns a function that rounds a datetime.datetime instance to the
+    given timing resolution.
+
+    The functions are created once per timing resolution and they only use
+    integer arithmetic on the date ordinals instead of creating intermediate
+    datetime and timedelta instances.
+
+    :param timing_resolution: A datetime.timedelta instance.
+    """
+    try:
+        return __time_rounders__[timing_resolution]
+    except KeyError:
+        pass
+
+    trs = timing_resolution.days * 86400 + timing_resolution.seconds
+    double_trs = 2 * trs
+    # the rounding offsets are always smaller than the timing resolution, so
+    # the timedelta instances are reused
+    offsets = {}
+    timedelta = datetime.timedelta
+
+    def round_time(dt):
+        """rounds the given datetime to the nearest multiple of the timing
+        resolution since the epoch, microseconds are ignored
+        """
+        seconds = (dt.toordinal() - EPOCH_ORDINAL) * 86400 + \
+            dt.hour * 3600 + dt.minute * 60 + dt.second
+        # round half up
+        offset = (2 * seconds + trs) // double_trs * trs - seconds
+        if dt.microsecond:
+            dt = dt.replace(microsecond=0)
+        if not offset:
+            return dt
+        try:
+            delta = offsets[offset]
+        except KeyError:
+            delta = offsets[offset] = timedelta(seconds=offset)
+        return dt + delta
+
+    __time_rounders__[timing_resolution] = round_time
+    return round_time
+
+
 class DateRangeMixin(object):
     """Adds date range info to the mixed in class.
 
@@ -618,12 +665,14 @@ class DateRangeMixin(object):
             #     end = start
 
         # round the dates to the timing_resolution
-        rounded_start = self.round_time(start)
-        rounded_end = self.round_time(end)
+        timing_resolution = defaults.timing_resolution
+        round_time = get_time_rounder(timing_resolution)
+        rounded_start = round_time(start)
+        rounded_end = round_time(end)
         rounded_duration = rounded_end - rounded_start
 
-        if rounded_duration < defaults.timing_resolution:
-            rounded_duration = defaults.timing_resolution
+        if rounded_duration < timing_resolution:
+            rounded_duration = timing_resolution
             rounded_end = rounded_start + rounded_duration
 
         return rounded_start, rounded_end, rounded_duration
@@ -660,18 +709,19 @@ class DateRangeMixin(object):
 
         _`Stackoverflow` : http://stackoverflow.com/a/10854034/1431079
         """
-        # to be compatible with python 2.6 use the following instead of
-        # total_seconds()
-        timing_resolution = defaults.timing_resolution
-        trs = timing_resolution.days * 86400 + timing_resolution.seconds
-
-        # convert to seconds
-        epoch = datetime.datetime(1970, 1, 1)
-        diff = dt - epoch
-        diff_in_seconds = diff.days * 86400 + diff.seconds
-        return epoch + datetime.timedelta(
-            seconds=(diff_in_seconds + trs * 0.5) // trs * trs
-        )
+        return get_time_rounder(defaults.timing_resolution)(dt)
+
+    @classmethod
+    def round_times(cls, dts):
+        """Rounds all of the given datetime objects to the
+        defaults.timing_resolution, see :meth:`.round_time`. Useful for
+        importers.
+
+        :param dts: An iterable of datetime.datetime objects.
+        :returns list: The rounded datetime objects in the same order.
+        """
+        round_time = get_time_rounder(defaults.timing_resolution)
+        return [round_time(dt) for dt in dts]
 
     @property
     def total_seconds(self):
@@ -823,8 +873,25 @@ class ACLMixin(object):
     The ACLMixin adds an attribute called ``permissions`` and a
     property called ``__acl__`` to be able to pass the permission data to
     Pyramid framework.
+
+    The ``__acl__`` list is cached per instance. All the cached ACLs (and the
+    cached :attr:`.User.effective_permissions`) are invalidated together
+    whenever the ``permissions`` of an instance, :attr:`.Group.users`,
+    :attr:`.User.groups` or a :class:`.Permission` is changed through the
+    ORM. Call :meth:`.invalidate_acls` if they are altered by other means
+    (like raw SQL queries or from another process).
     """
 
+    # the version of the cached ACLs, see invalidate_acls()
+    __acl_version__ = 0
+
+    @classmethod
+    def invalidate_acls(cls):
+        """invalidates the cached ACLs and effective permissions of all the
+        instances
+        """
+        ACLMixin.__acl_version__ += 1
+
     @declared_attr
     def permissions(cls):
         # get the secondary table
@@ -833,10 +900,14 @@ class ACLMixin(object):
         )
         return relationship('Permission', secondary=secondary_table)
 
-    @validates('permissions')
-    def _validate_permissions(self, key, permission):
+    @validates('permissions', include_removes=True)
+    def _validate_permissions(self, key, permission, is_remove):
         """validates the given permission value
         """
+        self.invalidate_acls()
+        if is_remove:
+            return permission
+
         from stalker.models.auth import Permission
         if not isinstance(permission, Permission):
             raise TypeError(
@@ -863,11 +934,23 @@ class ACLMixin(object):
 
         For the last example user eoyilmaz can grant access to views requiring
         'Add_Project' permission.
+
+        The returned list is cached, do not modify it.
         """
-        return [(perm.access,
-                 '%s:%s' % (self.__class__.__name__, self.name),
-                 perm.action + '_' + perm.class_name)
-                for perm in self.permissions]
+        principal = '%s:%s' % (self.__class__.__name__, self.name)
+        cache = self.__dict__.get('_acl_cache')
+        if cache is None or cache[0] != ACLMixin.__acl_version__ \
+           or cache[1] != principal:
+            cache = (
+                ACLMixin.__acl_version__,
+                principal,
+                [(perm.access,
+                  principal,
+                  perm.action + '_' + perm.class_name)
+                 for perm in self.permissions]
+            )
+            self._acl_cache = cache
+        return cache[2]
 
 
 class CodeMixin(object):
@@ -956,6 +1039,158 @@ class WorkingHoursMixin(object):
         return wh
 
 
+class TimeUnitTable(object):
+    """Holds the seconds of each timing unit in work time and in calendar
+    time.
+
+    The work time values are computed from ``defaults.daily_working_hours``,
+    ``defaults.weekly_working_days`` and ``defaults.yearly_working_days``.
+    Instead of computing them in every :meth:`.ScheduleMixin.to_seconds`
+    call, they are computed once and only recomputed when one of these
+    defaults is set (which is what :meth:`.Studio.update_defaults` does).
+    The :attr:`.version` is increased every time the tables are rebuilt with
+    different working hours.
+
+    Use the ``time_unit_table`` instance in this module instead of creating
+    new ones::
+
+      >>> from stalker.models.mixins import time_unit_table
+      >>> time_unit_table.to_seconds(2, 'd', 'effort')
+      64800
+      >>> time_unit_table.to_seconds_many([1, 2], ['h', 'd'], ['effort'] * 2)
+      [3600, 64800]
+    """
+
+    # the units ordered from the biggest to the smallest
+    units = ['y', 'm', 'w', 'd', 'h', 'min']
+
+    calendar_seconds = {
+        'min': 60,
+        'h': 3600,
+        'd': 86400,
+        'w': 604800,
+        'm': 2419200,
+        'y': 31536000
+    }
+
+    # the schedule models those are using work time
+    work_time_models = ['effort', 'length']
+
+    def __init__(self):
+        self.version = 0
+        self.working_hours = None
+        self.work_time_seconds = None
+        self.seconds_by_model = None
+        self._units_by_time = None
+        self._defaults_version = None
+
+    def update(self):
+        """rebuilds the tables if the working time defaults are changed since
+        the last update
+
+        :returns bool: True if the tables are rebuilt.
+        """
+        self._defaults_version = defaults.working_time_version
+        working_hours = (
+            defaults.daily_working_hours,
+            defaults.weekly_working_days,
+            int(defaults.yearly_working_days)
+        )
+        if working_hours == self.working_hours:
+            return False
+
+        daily_working_hours, weekly_working_days, yearly_working_days = \
+            working_hours
+        day_wt = daily_working_hours * 3600
+        week_wt = weekly_working_days * day_wt
+        self.work_time_seconds = {
+            'min': 60,
+            'h': 3600,
+            'd': day_wt,
+            'w': week_wt,
+            'm': 4 * week_wt,
+            'y': yearly_working_days * day_wt
+        }
+
+        self.seconds_by_model = dict(
+            (model, self.work_time_seconds)
+            for model in self.work_time_models
+        )
+
+        # the units from the biggest to the smallest for the
+        # least_meaningful_time_unit(), only years, months, weeks and days
+        # are depending on the working time
+        self._units_by_time = {}
+        for as_work_time, lut in [(True, self.work_time_seconds),
+                                  (False, self.calendar_seconds)]:
+            self._units_by_time[as_work_time] = [
+                (lut[unit], unit) for unit in self.units[:4]
+            ] + [(3600, 'h')]
+
+        self.working_hours = working_hours
+        self.version += 1
+        logger.debug(
+            'rebuilt the time unit table, version: %s' % self.version
+        )
+        return True
+
+    def lut(self, model):
+        """returns the unit to seconds dictionary of the given schedule model
+
+        :param str model: The schedule model, 'effort' and 'length' are
+          using work time, the others are using calendar time.
+        """
+        if self._defaults_version != defaults.working_time_version:
+            self.update()
+        return self.seconds_by_model.get(model, self.calendar_seconds)
+
+    def to_seconds(self, timing, unit, model):
+        """converts the given schedule values to seconds, see
+        :meth:`.ScheduleMixin.to_seconds`
+        """
+        if not unit:
+            return None
+        return timing * self.lut(model)[unit]
+
+    def to_seconds_many(self, timings, units, models):
+        """converts many schedule values to seconds at once.
+
+        :param timings: A list of schedule timings.
+        :param units: A list of schedule units, in the same order with the
+          timings.
+        :param models: A list of schedule models, in the same order with the
+          timings.
+        :returns list: The seconds of each timing, None for the timings
+          without a unit.
+        """
+        # make sure the tables are up to date before caching them
+        self.lut(None)
+        calendar_seconds = self.calendar_seconds
+        get_lut = self.seconds_by_model.get
+        return [
+            timing * get_lut(model, calendar_seconds)[unit] if unit else None
+            for timing, unit, model in zip(timings, units, models)
+        ]
+
+    def least_meaningful_time_unit(self, seconds, as_work_time=True):
+        """returns the least meaningful timing unit that corresponds to the
+        given seconds, see :meth:`.ScheduleMixin.least_meaningful_time_unit`
+        """
+        if self._defaults_version != defaults.working_time_version:
+            self.update()
+
+        for unit_seconds, unit in self._units_by_time[bool(as_work_time)]:
+            if seconds % unit_seconds == 0:
+                return seconds // unit_seconds, unit
+
+        # at this point we understand that it has a residual of less then one
+        # minute so return in minutes
+        return seconds // 60, 'min'
+
+
+time_unit_table = TimeUnitTable()
+
+
 class ScheduleMixin(object):
     """Adds schedule info to the mixed in class.
 
@@ -1230,46 +1465,9 @@ class ScheduleMixin(object):
         :returns int, string: Returns one integer and one string, showing the
           timing value and the unit.
         """
-        minutes = 60
-        hour = 3600
-        day = 86400
-        week = 604800
-        month = 2419200
-        year = 31536000
-
-        day_wt = defaults.daily_working_hours * 3600
-        week_wt = defaults.weekly_working_days * day_wt
-        month_wt = 4 * week_wt
-        year_wt = int(defaults.yearly_working_days) * day_wt
-
-        if as_work_time:
-            logger.debug('calculating in work time')
-            if seconds % year_wt == 0:
-                return seconds // year_wt, 'y'
-            elif seconds % month_wt == 0:
-                return seconds // month_wt, 'm'
-            elif seconds % week_wt == 0:
-                return seconds // week_wt, 'w'
-            elif seconds % day_wt == 0:
-                return seconds // day_wt, 'd'
-        else:
-            logger.debug('calculating in calendar time')
-            if seconds % year == 0:
-                return seconds // year, 'y'
-            elif seconds % month == 0:
-                return seconds // month, 'm'
-            elif seconds % week == 0:
-                return seconds // week, 'w'
-            elif seconds % day == 0:
-                return seconds // day, 'd'
-
-        # in either case
-        if seconds % hour == 0:
-            return seconds // hour, 'h'
-
-        # at this point we understand that it has a residual of less then one
-        # minute so return in minutes
-        return seconds // minutes, 'min'
+        return time_unit_table.least_meaningful_time_unit(
+            seconds, as_work_time
+        )
 
     @classmethod
     def to_seconds(cls, timing, unit, model):
@@ -1280,34 +1478,14 @@ class ScheduleMixin(object):
         the schedule_time and schedule_unit values are considered as calendar
         time.
         """
-        if not unit:
-            return None
-
-        lut = {
-            'min': 60,
-            'h': 3600,
-            'd': 86400,
-            'w': 604800,
-            'm': 2419200,
-            'y': 31536000
-        }
+        return time_unit_table.to_seconds(timing, unit, model)
 
-        if model in ['effort', 'length']:
-            day_wt = defaults.daily_working_hours * 3600
-            week_wt = defaults.weekly_working_days * day_wt
-            month_wt = 4 * week_wt
-            year_wt = int(defaults.yearly_working_days) * day_wt
-
-            lut = {
-                'min': 60,
-                'h': 3600,
-                'd': day_wt,
-                'w': week_wt,
-                'm': month_wt,
-                'y': year_wt
-            }
-
-        return timing * lut[unit]
+    @classmethod
+    def to_seconds_many(cls, timings, units, models):
+        """converts many schedule values to seconds at once, see
+        :meth:`.TimeUnitTable.to_seconds_many`
+        """
+        return time_unit_table.to_seconds_many(timings, units, models)
 
     @property
     def schedule_seconds(self):
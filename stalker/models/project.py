@@ -292,6 +292,18 @@ class Project(Entity, ReferenceMixin, StatusMixin, DateRangeMixin, CodeMixin):
         cascade="all, delete-orphan"
     )
 
+    _schedule_seconds = Column(
+        "schedule_seconds",
+        Integer, nullable=True,
+        doc='cache column for schedule_seconds'
+    )
+
+    _total_logged_seconds = Column(
+        "total_logged_seconds",
+        Integer, nullable=True,
+        doc='cache column for total_logged_seconds'
+    )
+
     def __init__(self,
                  name=None,
                  code=None,
@@ -464,35 +476,90 @@ class Project(Entity, ReferenceMixin, StatusMixin, DateRangeMixin, CodeMixin):
         """
         return self.active
 
+    def update_schedule_info(self):
+        """updates the cached total_logged_seconds and schedule_seconds values
+        of this project.
+
+        The values are computed with the :class:`.ProgressRollup` by using
+        grouped SQL queries over the leaf tasks of this project and their
+        TimeLogs. Then they are kept up to date after every flush that
+        changes the TimeLogs or the Tasks of this project, so the values are
+        only computed if they are not computed before.
+
+        The session is never flushed here. The values of a project that is
+        not persisted yet, or while the session has pending changes on this
+        project, its Tasks or TimeLogs, are gathered from its root tasks.
+        """
+        from sqlalchemy import inspect
+        from stalker.models.task import ProgressRollup
+
+        state = inspect(self)
+        session = state.session
+        if session is None or (not state.has_identity and not state.pending):
+            self._update_schedule_info_from_root_tasks()
+            return
+
+        if self._has_pending_changes(session):
+            with session.no_autoflush:
+                self._update_schedule_info_from_root_tasks()
+            return
+
+        if self._total_logged_seconds is None or \
+           self._schedule_seconds is None:
+            ProgressRollup(session).update_projects([self.id])
+
+    def _has_pending_changes(self, session):
+        """returns True if this project or any Task or TimeLog in the given
+        session has changes that are not flushed yet
+
+        :param session: The session of this project
+        """
+        from stalker.models.task import Task, TimeLog
+
+        if self in session.new or self in session.dirty:
+            return True
+
+        for instances in (session.new, session.dirty, session.deleted):
+            for instance in instances:
+                if isinstance(instance, (Task, TimeLog)):
+                    return True
+        return False
+
+    def _update_schedule_info_from_root_tasks(self):
+        """updates the cached total_logged_seconds and schedule_seconds values
+        of this project by summing the values of its root tasks
+        """
+        total_logged_seconds = 0
+        schedule_seconds = 0
+        for task in self.tasks:
+            if task.parent is None:
+                if task.total_logged_seconds is None or \
+                   task.schedule_seconds is None:
+                    task.update_schedule_info()
+                total_logged_seconds += task.total_logged_seconds or 0
+                schedule_seconds += task.schedule_seconds or 0
+        self._total_logged_seconds = total_logged_seconds
+        self._schedule_seconds = schedule_seconds
+
     @property
     def total_logged_seconds(self):
         """returns an integer representing the total TimeLog seconds recorded
         in child tasks.
         """
-        total_logged_seconds = 0
-        for task in self.root_tasks:
-            if task.total_logged_seconds is None:
-                task.update_schedule_info()
-            total_logged_seconds += task.total_logged_seconds
-
-        logger.debug('project.total_logged_seconds: %s' % total_logged_seconds)
-
-        return total_logged_seconds
+        self.update_schedule_info()
+        logger.debug(
+            'project.total_logged_seconds: %s' % self._total_logged_seconds
+        )
+        return self._total_logged_seconds
 
     @property
     def schedule_seconds(self):
         """returns an integer showing the total amount of schedule timing of
         the in child tasks in seconds
         """
-        schedule_seconds = 0
-        for task in self.root_tasks:
-            if task.schedule_seconds is None:
-                task.update_schedule_info()
-            schedule_seconds += task.schedule_seconds
-
-        logger.debug('project.schedule_seconds: %s' % schedule_seconds)
-
-        return schedule_seconds
+        self.update_schedule_info()
+        logger.debug('project.schedule_seconds: %s' % self._schedule_seconds)
+        return self._schedule_seconds
 
     @property
     def percent_complete(self):
@@ -18,6 +18,7 @@
 
 import os
 import platform
+import re
 from sqlalchemy import event, Column, Integer, ForeignKey, String
 from sqlalchemy.orm import validates
 from stalker import defaults
@@ -110,10 +111,7 @@ class Repository(Entity):
 
         linux_path = linux_path.replace("\\", "/")
 
-        if self.id is not None and platform.system() == "Linux":
-            # update the environment variable
-            os.environ[defaults.repo_env_var_template % {'id': self.id}] = \
-                linux_path
+        self._update_cached_paths("Linux", linux_path)
 
         return linux_path
 
@@ -132,10 +130,7 @@ class Repository(Entity):
 
         osx_path = osx_path.replace("\\", "/")
 
-        if self.id is not None and platform.system() == "Darwin":
-            # update the environment variable
-            os.environ[defaults.repo_env_var_template % {'id': self.id}] = \
-                osx_path
+        self._update_cached_paths("Darwin", osx_path)
 
         return osx_path
 
@@ -157,13 +152,27 @@ class Repository(Entity):
         if not windows_path.endswith('/'):
             windows_path += '/'
 
-        if self.id is not None and platform.system() == "Windows":
-            # update the environment variable
-            os.environ[defaults.repo_env_var_template % {'id': self.id}] = \
-                windows_path
+        self._update_cached_paths("Windows", windows_path)
 
         return windows_path
 
+    def _update_cached_paths(self, platform_system, path):
+        """invalidates the cached repository paths after a path of this
+        repository is changed and updates the environment variable if the
+        ``defaults.export_repo_env_vars`` is True
+
+        :param str platform_system: The platform of the changed path.
+        :param str path: The new path.
+        """
+        if self.id is None:
+            return
+
+        invalidate_repository_paths(None, None, self)
+        if defaults.export_repo_env_vars \
+           and platform.system() == platform_system:
+            # update the environment variable
+            os.environ[self.env_var] = path
+
     @property
     def path(self):
         """Returns the path for the current os
@@ -219,8 +228,8 @@ class Repository(Entity):
 
         # expand all variables
         path = os.path.normpath(
-            os.path.expandvars(
-                os.path.expanduser(path)
+            repository_path_resolver.expand(
+                os.path.expanduser(path), self
             )
         ).replace('\\', '/')
 
@@ -278,23 +287,47 @@ class Repository(Entity):
     def find_repo(cls, path):
         """returns the repository from the given path
 
+        The repository is found with the :data:`.repository_path_index`. If
+        the path is in more than one repository the repository with the
+        longest matching path is returned.
+
         :param str path: path in a repository
         :return: stalker.models.repository.Repository
         """
         # path could be using environment variables so expand them
-        path = os.path.expandvars(path)
-
-        # first find the repository
-        repos = Repository.query.all()
-        found_repo = None
-        for repo in repos:
-            if path.startswith(repo.path) \
-               or path.startswith(repo.windows_path) \
-               or path.startswith(repo.linux_path) \
-               or path.startswith(repo.osx_path):
-                found_repo = repo
-                break
-        return found_repo
+        path = repository_path_resolver.expand(path)
+
+        repo_id = repository_path_index.find_id(path)
+        if repo_id is None:
+            return None
+        return Repository.query.get(repo_id)
+
+    @classmethod
+    def find_repos(cls, paths):
+        """returns the repositories of the given paths, use it instead of
+        calling :meth:`.find_repo` for each path
+
+        :param paths: A list of paths.
+        :return: A list of :class:`.Repository` instances (or None for the
+          paths those are not in any repository) in the same order with the
+          given paths.
+        """
+        repo_ids = [
+            repository_path_index.find_id(
+                repository_path_resolver.expand(path)
+            )
+            for path in paths
+        ]
+
+        unique_ids = set(repo_ids)
+        unique_ids.discard(None)
+        repos = {}
+        if unique_ids:
+            repos = dict(
+                (repo.id, repo) for repo in
+                Repository.query.filter(Repository.id.in_(unique_ids)).all()
+            )
+        return [repos.get(repo_id) for repo_id in repo_ids]
 
     @classmethod
     def to_os_independent_path(cls, path):
@@ -333,10 +366,266 @@ class Repository(Entity):
         return super(Repository, self).__hash__()
 
 
+class RepositoryPathIndex(object):
+    """A session aware prefix index of the :class:`.Repository` paths.
+
+    :meth:`.Repository.find_repo` and :meth:`.Repository.find_repos` need to
+    check the given path against the ``linux_path``, ``windows_path`` and
+    ``osx_path`` of all the repositories. Instead of querying all the
+    repositories and comparing each of their paths for every lookup, the
+    index loads the paths with one query and stores them in a tree of path
+    components, so a path is resolved by walking its own components::
+
+      >>> from stalker.models.repository import repository_path_index
+      >>> repo_id = repository_path_index.find_id('/mnt/T/Projects/a.ma')
+
+    The tree is stored in the ``info`` dictionary of the current
+    :class:`sqlalchemy.orm.Session`. It is invalidated for all the sessions
+    whenever a Repository is inserted, updated or deleted through the ORM.
+    Call :meth:`.invalidate` if the repositories are altered by other means
+    (like raw SQL queries or from another process).
+    """
+
+    __info_key__ = 'stalker.repository_path_index'
+
+    def __init__(self):
+        self.version = 0
+
+    def invalidate(self):
+        """invalidates the index in all the sessions
+        """
+        self.version += 1
+
+    def _tree(self):
+        """returns the path tree of the current session, builds it if it is
+        not built yet or it is invalidated
+        """
+        from stalker.db.session import DBSession
+        session = DBSession()
+        cache = session.info.get(self.__info_key__)
+        if cache is None or cache['version'] != self.version:
+            cache = {
+                'version': self.version,
+                'tree': self._build(session)
+            }
+            session.info[self.__info_key__] = cache
+        return cache['tree']
+
+    @classmethod
+    def _build(cls, session):
+        """builds the path tree from the repositories in the database.
+
+        Every node is a dictionary of path component to child node, the id of
+        the repository whose path ends at that node is stored with the None
+        key. The repository paths always end with a "/", so the last
+        (empty) component is not stored.
+        """
+        tree = {}
+        rows = session.query(
+            Repository.id,
+            Repository.windows_path,
+            Repository.linux_path,
+            Repository.osx_path
+        ).order_by(Repository.id)
+        for row in rows:
+            repo_id = row[0]
+            for repo_path in row[1:]:
+                if not repo_path:
+                    continue
+                node = tree
+                for part in repo_path.split('/')[:-1]:
+                    node = node.setdefault(part, {})
+                # keep the first repository with the same path
+                node.setdefault(None, repo_id)
+        return tree
+
+    def find_id(self, path):
+        """returns the id of the repository of the given path
+
+        :param str path: A path with forward slashes, the environment
+          variables should already be expanded.
+        :return: The id of the repository with the longest matching path or
+          None.
+        """
+        node = self._tree()
+        repo_id = None
+        # the last component can not be the end of a repository path, as the
+        # repository paths end with a "/"
+        for part in path.split('/')[:-1]:
+            node = node.get(part)
+            if node is None:
+                break
+            repo_id = node.get(None, repo_id)
+        return repo_id
+
+
+# use this instance
+repository_path_index = RepositoryPathIndex()
+
+
+class RepositoryPathResolver(object):
+    """Expands the repository environment variables (``$REPO<id>`` by
+    default, see ``defaults.repo_env_var_template``) in paths without
+    needing them in ``os.environ``.
+
+    The paths of all the repositories are loaded with one query and stored in
+    the ``info`` dictionary of the current :class:`sqlalchemy.orm.Session`,
+    so every thread using its own session has its own copy::
+
+      >>> from stalker.models.repository import repository_path_resolver
+      >>> path = repository_path_resolver.expand('$REPO1/Project/a.ma')
+
+    The paths are invalidated for all the sessions whenever a Repository is
+    inserted, updated or deleted through the ORM. Call :meth:`.invalidate`
+    if the repositories are altered by other means (like raw SQL queries or
+    from another process).
+
+    The environment variables are only created if
+    ``defaults.export_repo_env_vars`` is True or :meth:`.export` is called
+    explicitly (for example to pass them to a sub process).
+    """
+
+    __info_key__ = 'stalker.repository_path_resolver'
+
+    def __init__(self):
+        self.version = 0
+        self._patterns = {}
+
+    def invalidate(self):
+        """invalidates the cached paths in all the sessions
+        """
+        self.version += 1
+
+    def _paths(self):
+        """returns the id to (linux_path, windows_path, osx_path) dictionary
+        of the current session, an empty dictionary if there is no database
+        """
+        from sqlalchemy.exc import UnboundExecutionError
+        from stalker.db.session import DBSession
+        session = DBSession()
+        cache = session.info.get(self.__info_key__)
+        if cache is None or cache['version'] != self.version:
+            version = self.version
+            try:
+                rows = session.query(
+                    Repository.id,
+                    Repository.linux_path,
+                    Repository.windows_path,
+                    Repository.osx_path
+                ).all()
+            except UnboundExecutionError:
+                return {}
+            cache = {
+                'version': version,
+                'paths': dict((row[0], tuple(row[1:])) for row in rows)
+            }
+            session.info[self.__info_key__] = cache
+        return cache['paths']
+
+    @classmethod
+    def _native_path(cls, paths):
+        """returns the path for the current os from the given
+        (linux_path, windows_path, osx_path) tuple
+        """
+        platform_system = platform.system()
+        if platform_system == "Linux":
+            return paths[0]
+        elif platform_system == "Windows":
+            return paths[1]
+        elif platform_system == "Darwin":
+            return paths[2]
+
+    def _pattern(self):
+        """returns the compiled regular expression which matches the
+        repository environment variables, the repository id is in the first
+        or the second group
+        """
+        template = defaults.repo_env_var_template
+        pattern = self._patterns.get(template)
+        if pattern is None:
+            prefix, suffix = template.split('%(id)s')
+            name = '%s([0-9]+)%s' % (re.escape(prefix), re.escape(suffix))
+            pattern = re.compile(
+                r'\$(?:\{%s\}|%s(?![0-9A-Za-z_]))' % (name, name)
+            )
+            self._patterns[template] = pattern
+        return pattern
+
+    def get_path(self, repo_id):
+        """returns the path of the repository with the given id for the
+        current os
+
+        :param int repo_id: The id of the repository.
+        :return: str or None
+        """
+        paths = self._paths().get(repo_id)
+        if paths is None:
+            return None
+        return self._native_path(paths)
+
+    def expand(self, path, repository=None):
+        """expands the repository environment variables in the given path
+        with the paths of the repositories, the other environment variables
+        (and the repository environment variables of the unknown
+        repositories) are expanded with ``os.path.expandvars``.
+
+        :param str path: The path to expand.
+        :param repository: A :class:`.Repository` whose path is used for its
+          own environment variable without looking it up, to expand the paths
+          of repositories those are not in the database yet.
+        :return: str
+        """
+        if '$' not in path:
+            return path
+
+        def replace(match):
+            repo_id = int(match.group(1) or match.group(2))
+            if repository is not None and repository.id == repo_id:
+                repo_path = repository.path
+            else:
+                repo_path = self.get_path(repo_id)
+            if repo_path is None:
+                return match.group(0)
+            return repo_path
+
+        return os.path.expandvars(self._pattern().sub(replace, path))
+
+    def export(self):
+        """creates or updates the environment variables of all the
+        repositories in the database
+        """
+        for repo_id, paths in self._paths().items():
+            repo_path = self._native_path(paths)
+            if repo_path is not None:
+                os.environ[
+                    defaults.repo_env_var_template % {'id': repo_id}
+                ] = repo_path
+
+
+# use this instance
+repository_path_resolver = RepositoryPathResolver()
+
+
+def invalidate_repository_paths(mapper, connection, target):
+    """invalidates the repository_path_index and the
+    repository_path_resolver whenever a Repository is inserted, updated or
+    deleted
+    """
+    repository_path_index.invalidate()
+    repository_path_resolver.invalidate()
+
+
+for event_name in ['after_insert', 'after_update', 'after_delete']:
+    event.listen(Repository, event_name, invalidate_repository_paths)
+
+
 @event.listens_for(Repository, 'after_insert')
 def receive_after_insert(mapper, connection, repo):
-    """listen for the 'after_insert' event
+    """listen for the 'after_insert' event, creates the environment variable
+    of the repository if the ``defaults.export_repo_env_vars`` is True
     """
+    if not defaults.export_repo_env_vars:
+        return
     logger.debug('auto creating env var for Repository with id: %s' % repo.id)
     os.environ[defaults.repo_env_var_template % {'id': repo.id}] = repo.path
 
@@ -27,10 +27,9 @@ from sqlalchemy.orm import relationship, validates, synonym
 from stalker.db import Base
 from stalker.db.session import DBSession
 from stalker.log import logging_level
-from stalker.models import walk_hierarchy
 from stalker.models.entity import Entity, SimpleEntity
 from stalker.models.link import Link
-from stalker.models.status import Status
+from stalker.models.status import status_registry
 from stalker.models.mixins import ScheduleMixin, StatusMixin, ProjectMixin
 
 logger = logging.getLogger(__name__)
@@ -134,8 +133,7 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
         self.reviewer = reviewer
 
         # set the status to NEW
-        with DBSession.no_autoflush:
-            new = Status.query.filter_by(code='NEW').first()
+        new = status_registry.get_status('NEW')
         self.status = new
 
         # set the review_number
@@ -223,7 +221,7 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
 
         # set self status to RREV
         with DBSession.no_autoflush:
-            rrev = Status.query.filter_by(code='RREV').first()
+            rrev = status_registry.get_status('RREV')
 
             # set self status to RREV
             self.status = rrev
@@ -236,7 +234,7 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
         """
         # set self status to APP
         with DBSession.no_autoflush:
-            app = Status.query.filter_by(code='APP').first()
+            app = status_registry.get_status('APP')
             self.status = app
 
         # call finalize review_set
@@ -245,9 +243,7 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
     def finalize_review_set(self):
         """finalizes the current review set Review decisions
         """
-        with DBSession.no_autoflush:
-            hrev = Status.query.filter_by(code='HREV').first()
-            cmpl = Status.query.filter_by(code='CMPL').first()
+        hrev, cmpl = status_registry.get_statuses('HREV', 'CMPL')
 
         # check if all the reviews are finalized
         if self.is_finalized():
@@ -283,28 +279,19 @@ class Review(SimpleEntity, ScheduleMixin, StatusMixin):
                 self.task.schedule_timing = timing
                 self.task.schedule_unit = unit
 
-            # update task parent statuses
-            self.task.update_parent_statuses()
-
-            from stalker import TaskDependency
-            # update dependent task statuses
-
-            for dep in walk_hierarchy(self.task, 'dependent_of', method=1):
+            # update task parent and dependent task statuses
+            from stalker.models.task import StatusPropagator
+            propagator = StatusPropagator([self.task])
+            for dep in propagator.propagate():
                 logger.debug('current TaskDependency object: %s' % dep)
-                dep.update_status_with_dependent_statuses()
                 if dep.status.code in ['HREV', 'PREV', 'DREV', 'OH', 'STOP']:
                     # for tasks that are still be able to continue to work,
                     # change the dependency_target to "onstart" to allow
                     # the two of the tasks to work together and still let the
                     # TJ to be able to schedule the tasks correctly
-                    tdeps = TaskDependency.query\
-                        .filter_by(depends_to=dep).all()
-                    for tdep in tdeps:
+                    for tdep in dep.task_dependent_of:
                         tdep.dependency_target = 'onstart'
 
-                # also update the status of parents of dependencies
-                dep.update_parent_statuses()
-
         else:
             logger.debug('not all reviews are finalized yet!')
 
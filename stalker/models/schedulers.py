@@ -17,14 +17,19 @@
 # along with Stalker.  If not, see <http://www.gnu.org/licenses/>
 
 import os
+import copy
 import subprocess
 import tempfile
 import datetime
 import time
 import csv
+import math
+
+from sqlalchemy import Table, Column, Integer, ForeignKey, String, DateTime
 
 import stalker
 from stalker import defaults
+from stalker.db.declarative import Base
 from stalker.log import logging_level
 
 import logging
@@ -41,6 +46,7 @@ class SchedulerBase(object):
     def __init__(self, studio=None):
         self._studio = None
         self.studio = studio
+        self._projects = []
 
     def _validate_studio(self, studio_in):
         """validates the given studio_in value
@@ -73,6 +79,192 @@ class SchedulerBase(object):
         """
         raise NotImplementedError
 
+    def cancel(self):
+        """cancels the running schedule, should be implemented in the
+        derivatives that support cancelling
+        """
+        raise NotImplementedError
+
+    def copy(self):
+        """returns a copy of this scheduler with the same settings, so
+        a separate schedule can be run with it without changing this
+        scheduler (see :class:`.SchedulingJob`). The state of a running
+        schedule is not copied.
+        """
+        scheduler = copy.copy(self)
+        scheduler._projects = list(self._projects)
+        return scheduler
+
+    def _validate_projects(self, projects):
+        """validates the given projects value
+        """
+        if projects is None:
+            projects = []
+
+        msg = '%(class)s.projects should be a list of ' \
+            'stalker.models.project.Project instances, not ' \
+            '%(projects_class)s'
+
+        if not isinstance(projects, list):
+            raise TypeError(
+                msg % {
+                    'class': self.__class__.__name__,
+                    'projects_class': projects.__class__.__name__
+                }
+            )
+
+        from stalker import Project
+        for item in projects:
+            if not isinstance(item, Project):
+                raise TypeError(
+                    msg % {
+                        'class': self.__class__.__name__,
+                        'projects_class': item.__class__.__name__
+                    }
+                )
+
+        return projects
+
+    @property
+    def projects(self):
+        """getter for the _project attribute
+        """
+        return self._projects
+
+    @projects.setter
+    def projects(self, projects):
+        """setter for the _project attribute
+        """
+        self._projects = self._validate_projects(projects)
+
+    def _get_project_ids(self, connection):
+        """returns the ids of the projects to be scheduled, which are the ids
+        of the :attr:`.projects` or the ids of the active projects (the
+        :attr:`.Studio.active_projects`) if :attr:`.projects` is empty
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        """
+        if self.projects:
+            return [project.id for project in self.projects]
+
+        from sqlalchemy import select
+        from stalker import Project
+        projects_table = Project.__table__
+        return [
+            r[0] for r in connection.execute(
+                select([projects_table.c.id])
+                .where(projects_table.c.active == True)
+                .order_by(projects_table.c.id)
+            )
+        ]
+
+    @classmethod
+    def _update_schedule_results(cls, connection, dates,
+                                 computed_resources=None):
+        """updates the Tasks and Projects with the given scheduling results
+        and returns the number of updated rows.
+
+        Only the Tasks and Projects whose dates are changed are updated, and
+        only the computed resources of the Tasks whose computed resources are
+        changed are replaced.
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param dict dates: A dictionary with "Task" and "Project" keys, each
+          holding a dictionary of entity id to a (start, end) tuple.
+        :param dict computed_resources: A dictionary of task id to a set of
+          computed resource ids. Skip it to not to update the computed
+          resources.
+        """
+        from sqlalchemy import bindparam, select
+        from stalker import Task, Project
+        from stalker.models.task import Task_Computed_Resources
+
+        num_of_updated_rows = 0
+        for entity_type, table in [('Task', Task.__table__),
+                                   ('Project', Project.__table__)]:
+            entity_data = dict(
+                (entity_id, {
+                    'b_id': entity_id,
+                    'start': start,
+                    'end': end,
+                    'computed_start': start,
+                    'computed_end': end
+                })
+                for entity_id, (start, end)
+                in dates.get(entity_type, {}).items()
+            )
+            if not entity_data:
+                continue
+
+            # skip the rows those are not changed
+            for r in connection.execute(
+                    select([
+                        table.c.id,
+                        table.c.start,
+                        table.c.end,
+                        table.c.computed_start,
+                        table.c.computed_end
+                    ]).where(table.c.id.in_(list(entity_data.keys())))):
+                data = entity_data[r[0]]
+                if tuple(r[1:]) == (data['start'], data['end'],
+                                    data['computed_start'],
+                                    data['computed_end']):
+                    del entity_data[r[0]]
+
+            if not entity_data:
+                continue
+
+            update_statement = table.update()\
+                .where(table.c.id == bindparam('b_id'))\
+                .values(
+                    start=bindparam('start'),
+                    end=bindparam('end'),
+                    computed_start=bindparam('computed_start'),
+                    computed_end=bindparam('computed_end')
+                )
+            connection.execute(update_statement, list(entity_data.values()))
+            num_of_updated_rows += len(entity_data)
+
+        # update computed resources data of the changed tasks
+        if computed_resources:
+            task_ids = list(computed_resources.keys())
+            current_resources = dict((task_id, set()) for task_id in task_ids)
+            for task_id, resource_id in connection.execute(
+                    select([
+                        Task_Computed_Resources.c.task_id,
+                        Task_Computed_Resources.c.resource_id
+                    ]).where(
+                        Task_Computed_Resources.c.task_id.in_(task_ids)
+                    )):
+                current_resources[task_id].add(resource_id)
+
+            changed_task_ids = [
+                task_id for task_id in task_ids
+                if computed_resources[task_id] != current_resources[task_id]
+            ]
+
+            if changed_task_ids:
+                connection.execute(
+                    Task_Computed_Resources.delete().where(
+                        Task_Computed_Resources.c.task_id.in_(
+                            changed_task_ids
+                        )
+                    )
+                )
+
+                insert_data = [
+                    {'task_id': task_id, 'resource_id': resource_id}
+                    for task_id in changed_task_ids
+                    for resource_id in sorted(computed_resources[task_id])
+                ]
+                if insert_data:
+                    connection.execute(
+                        Task_Computed_Resources.insert(),
+                        insert_data
+                    )
+
+        return num_of_updated_rows
+
 
 class TaskJugglerScheduler(SchedulerBase):
     """This is the main scheduler for Stalker right now.
@@ -168,16 +360,48 @@ class TaskJugglerScheduler(SchedulerBase):
       is False.
     :param int parsing_method: Choose between SQL (0) or Pure Python (1)
       parsing. The default is SQL.
+    :param bool keep_tjp_content: The tjp file content is streamed to the tjp
+      file and it is not kept in the memory. Set it to True to store the
+      content in the :attr:`.tjp_content` attribute for debugging purposes.
+      The default is False.
+    :param bool incremental: When set to True only the projects those have
+      changed since the last incremental schedule will be passed to
+      TaskJuggler. A fingerprint of the task timings, dependencies,
+      allocations, bookings and vacations is stored per project in the
+      ``Schedule_Fingerprints`` table. Projects sharing resources (or having
+      dependencies to each other) are always scheduled together, so if one
+      of them is changed all the projects in the same component are
+      rescheduled. The default is False.
+    :param int max_workers: The maximum number of tj3 processes to run in
+      parallel. When it is bigger than 1 the projects are split in to
+      components of projects those are not sharing any resources (through
+      :attr:`.Task.resources`, :attr:`.Task.alternative_resources` or
+      :class:`.TimeLog`\ s) or depending to each other, and each component is
+      scheduled with a separate tj3 process. The default is 1, which
+      schedules all the projects with one tj3 process.
+    :param int chunk_size: The number of csv lines those are parsed and
+      updated in the database at once while reading back the TaskJuggler
+      results. The default is 500.
+
+    The :attr:`.stderr_callback` attribute can be set to a callable which will
+    be called with each line that tj3 writes to stderr while scheduling, which
+    is useful to show the progress of the schedule. A running schedule can be
+    cancelled from another thread by calling :meth:`.cancel`.
     """
 
     def __init__(self,
                  studio=None,
                  compute_resources=False,
                  parsing_method=0,
-                 projects=None):
+                 projects=None,
+                 keep_tjp_content=False,
+                 incremental=False,
+                 max_workers=1,
+                 chunk_size=500):
         super(TaskJugglerScheduler, self).__init__(studio)
 
         self.tjp_content = ''
+        self.keep_tjp_content = keep_tjp_content
 
         self.temp_file_full_path = None
         self.temp_file_path = None
@@ -191,44 +415,248 @@ class TaskJugglerScheduler(SchedulerBase):
 
         self.compute_resources = compute_resources
         self.parsing_method = parsing_method
+        self.incremental = incremental
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+        self.stderr_callback = None
+        self._processes = []
+        self._is_cancelled = False
+        self._is_running = False
 
         self._projects = []
         self.projects = projects
 
-    def _create_tjp_file(self):
+    def _create_tjp_file(self, temp_file_full_path=None):
         """creates the tjp file
+
+        :param str temp_file_full_path: The temp file path to derive the tjp
+          and csv file paths from. A new temp file path is created if it is
+          skipped.
         """
-        self.temp_file_full_path = tempfile.mktemp(prefix='Stalker_')
+        if temp_file_full_path is None:
+            temp_file_full_path = tempfile.mktemp(prefix='Stalker_')
+        self.temp_file_full_path = temp_file_full_path
         self.temp_file_path = os.path.dirname(self.temp_file_full_path)
         self.temp_file_name = os.path.basename(self.temp_file_full_path)
         self.tjp_file_full_path = self.temp_file_full_path + ".tjp"
         self.csv_file_full_path = self.temp_file_full_path + ".csv"
 
     def _create_tjp_file_content(self):
-        """creates the tjp file content
+        """creates the tjp file content and stores it in the
+        :attr:`.tjp_content` attribute.
+
+        This is only useful for debugging purposes, :meth:`.schedule` streams
+        the content directly to the tjp file without holding it in the memory
+        (see :meth:`._fill_tjp_file`).
+        """
+        self.tjp_content = ''.join(self._generate_tjp_file_content())
+
+    def _generate_tjp_file_content(self, project_ids=None):
+        """a generator that yields the tjp file content piece by piece
+
+        :param list project_ids: The ids of the projects to export, defaults
+          to the ids of the :attr:`.projects` or all the projects if
+          :attr:`.projects` is empty.
         """
         from jinja2 import Template
 
         start = time.time()
 
-        # use new way of doing it, it will just work with PostgreSQL
-        import json
+        template = Template(defaults.tjp_main_template2)
+
+        # render the main template around a placeholder and replace the
+        # placeholder with the task lines while writing
+        tasks_placeholder = '<stalker_tasks_buffer>'
+
+        for chunk in template.generate({
+            'stalker': stalker,
+            'studio': self.studio,
+            'csv_file_name': self.temp_file_name,
+            'csv_file_full_path': self.temp_file_full_path,
+            'compute_resources': self.compute_resources,
+            'tasks_buffer': tasks_placeholder
+        }):
+            if tasks_placeholder in chunk:
+                head, tail = chunk.split(tasks_placeholder, 1)
+                yield head
+                for i, line in enumerate(
+                        self._generate_tjp_tasks(project_ids)):
+                    if i > 0:
+                        yield '\n'
+                    yield line
+                yield tail
+            else:
+                yield chunk
+
+        end = time.time()
+        logger.debug(
+            'rendering the whole tjp file took : %s seconds' % (end - start)
+        )
+
+    def _generate_tjp_tasks(self, project_ids=None):
+        """a generator that yields the tjp lines of the projects and their
+        tasks
+
+        The data is retrieved with a fixed number of queries per project. A
+        recursive query is used for PostgreSQL and a couple of flat queries
+        for the other dialects (see :meth:`._query_tasks`).
+
+        :param list project_ids: The ids of the projects to export, defaults
+          to the ids returned by :meth:`._get_project_ids`.
+        """
         from stalker import db
 
-        conn = db.DBSession.connection()
-        engine = conn.engine
+        # use a server side cursor if possible
+        connection = db.DBSession.connection()\
+            .execution_options(stream_results=True)
 
-        if engine.dialect.name == 'postgresql':
-            template = Template(defaults.tjp_main_template2)
+        if connection.engine.dialect.name == 'postgresql':
+            query_tasks = self._query_tasks_postgresql
+        else:
+            query_tasks = self._query_tasks
 
-            if not self.projects:
-                project_ids = db.DBSession.connection().execute(
-                    'select id, code from "Projects"'
-                ).fetchall()
-            else:
-                project_ids = [[project.id] for project in self.projects]
+        if project_ids is None:
+            project_ids = self._get_project_ids(connection)
 
-            sql_query = """select
+        num_of_records = 0
+
+        # run it per project
+        for p_id in project_ids:
+
+            # start by adding the project first
+            yield 'task Project_%s "Project_%s" {' % (p_id, p_id)
+
+            # now start jumping around
+            previous_level = 0
+            for task_id, priority, schedule_timing, schedule_unit, \
+                    schedule_model, allocation_strategy, \
+                    persistent_allocation, schedule_constraint, \
+                    task_start, task_end, depth, resource_ids, \
+                    alternative_resource_ids, time_logs, dependencies, \
+                    is_leaf in query_tasks(connection, p_id):
+                depth += 1
+                tab = '  ' * depth
+
+                # close the previous level if necessary
+                for i in range(previous_level - depth + 1):
+                    i_tab = '  ' * (previous_level - i)
+                    yield '%s}' % i_tab
+
+                yield (
+                    """%(tab)stask Task_%(id)s "Task_%(id)s" {""" % {
+                        'tab': tab,
+                        'id': task_id
+                    }
+                )
+
+                # append priority if it is different then 500
+                if priority != 500:
+                    yield '%s  priority %s' % (tab, priority)
+
+                # append dependency information
+                if dependencies:
+                    yield '%s  depends %s' % (
+                        tab,
+                        ', '.join([
+                            '%s {%s%s}' % (
+                                dep_full_path, dependency_target,
+                                ' gap%s %s%s' % (
+                                    gap_model, gap_timing, gap_unit
+                                ) if gap_timing else ''
+                            )
+                            for dep_full_path, dependency_target,
+                            gap_timing, gap_unit, gap_model
+                            in dependencies
+                        ])
+                    )
+
+                # append schedule constraint, model and timing information
+                # if this is a leaf task and has resources
+                if is_leaf and resource_ids:
+                    if schedule_constraint in [1, 3]:
+                        yield '%s  start %s' % (
+                            tab, task_start.strftime('%Y-%m-%d-%H:%M')
+                        )
+                    if schedule_constraint in [2, 3]:
+                        yield '%s  end %s' % (
+                            tab, task_end.strftime('%Y-%m-%d-%H:%M')
+                        )
+
+                    yield (
+                        '%s  %s %s%s' % (
+                            tab, schedule_model, schedule_timing,
+                            schedule_unit
+                        )
+                    )
+
+                    resource_buffer = ['%s  allocate ' % tab]
+                    for i, resource_id in enumerate(resource_ids):
+                        if i > 0:
+                            resource_buffer.append(', ')
+                        resource_buffer.append('User_%s' % resource_id)
+
+                        # now go through alternatives
+                        if alternative_resource_ids:
+                            resource_buffer.append(' { alternative ')
+                            for j, alt_resource_id in \
+                                    enumerate(alternative_resource_ids):
+                                if j > 0:
+                                    resource_buffer.append(', ')
+                                resource_buffer.append(
+                                    'User_%s' % alt_resource_id)
+
+                            # set the allocation strategy
+                            resource_buffer.append(
+                                ' select %s' % allocation_strategy)
+
+                            # is is persistent
+                            if persistent_allocation:
+                                resource_buffer.append(' persistent')
+                            resource_buffer.append(' }')
+
+                    yield ''.join(resource_buffer)
+
+                    # append any time log information
+                    for user_id, t_start, t_end in time_logs:
+                        yield (
+                            '%s  booking %s %s - %s { overtime 2 }' % (
+                                tab, user_id, t_start, t_end
+                            )
+                        )
+
+                previous_level = depth
+                num_of_records += 1
+
+            # and close the brackets per project
+            depth = 0  # current depth is 0 (Project)
+            # previous_level is the last task
+            for i in range(previous_level - depth + 1):
+                i_tab = '  ' * (previous_level - i)
+                yield '%s}' % i_tab
+
+        logger.debug(
+            'total number of records: %s' % num_of_records
+        )
+
+    @classmethod
+    def _query_tasks_postgresql(cls, connection, project_id):
+        """a generator that yields the scheduling data of the tasks of the
+        given project in depth first order by using one recursive query.
+
+        Each item is a tuple of the task id, priority, schedule_timing,
+        schedule_unit, schedule_model, allocation_strategy,
+        persistent_allocation, schedule_constraint, start, end, depth,
+        resource ids, alternative resource ids, time logs as (resource tjp id,
+        start, end) tuples, dependencies as (dependency tjp path, dependency
+        target, gap_timing, gap_unit, gap_model) tuples and is_leaf.
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param int project_id: The project id
+        """
+        import json
+
+        sql_query = """select
     "Tasks".id,
     tasks.path,
     coalesce("Tasks".parent_id, "Tasks".project_id) as parent_id,
@@ -241,6 +669,9 @@ class TaskJugglerScheduler(SchedulerBase):
     "Tasks".allocation_strategy,
     "Tasks".persistent_allocation,
     tasks.depth,
+    "Tasks".schedule_constraint,
+    "Tasks".start,
+    "Tasks".end,
     task_resources.resource_ids,
     task_alternative_resources.resource_ids as alternative_resource_ids,
     time_logs.time_log_array,
@@ -287,7 +718,7 @@ join (
 left outer join (
     select
         task_id,
-        array_agg(resource_id) as resource_ids
+        array_agg(resource_id order by resource_id) as resource_ids
     from "Task_Resources"
     group by task_id
 ) as task_resources on "Tasks".id = task_resources.task_id
@@ -296,7 +727,7 @@ left outer join (
 left outer join (
     select
         task_id,
-        array_agg(resource_id) as resource_ids
+        array_agg(resource_id order by resource_id) as resource_ids
     from "Task_Alternative_Resources"
     group by task_id
 ) as task_alternative_resources on "Tasks".id = task_alternative_resources.task_id
@@ -305,7 +736,7 @@ left outer join (
 left outer join (
     select
         "TimeLogs".task_id,
-        array_agg(('User_' || "TimeLogs".resource_id, to_char("TimeLogs".start, 'YYYY-MM-DD-HH24:MI:00'), to_char("TimeLogs".end, 'YYYY-MM-DD-HH24:MI:00'))) as time_log_array
+        array_agg(('User_' || "TimeLogs".resource_id, to_char("TimeLogs".start, 'YYYY-MM-DD-HH24:MI:00'), to_char("TimeLogs".end, 'YYYY-MM-DD-HH24:MI:00')) order by "TimeLogs".start) as time_log_array
     from "TimeLogs"
     group by task_id
 ) as time_logs on "Tasks".id = time_logs.task_id
@@ -314,7 +745,7 @@ left outer join (
 left outer join (
     select
         task_id,
-        array_agg((tasks.alt_path, dependency_target, gap_timing, gap_unit, gap_model)) dependency_info
+        array_agg((tasks.alt_path, dependency_target, gap_timing, gap_unit, gap_model) order by depends_to_id) dependency_info
     from "Task_Dependencies"
     join (
         with recursive recursive_task(id, parent_id, alt_path) as (
@@ -344,203 +775,281 @@ left outer join (
 --order by "Tasks".id
 order by path_as_text"""
 
-            result_buffer = []
-            num_of_records = 0
-
-            # run it per project
-            for pr in project_ids:
-                p_id = pr[0]
-                #p_code = pr[1]
-
-                sql_query_pp = sql_query % {'id': p_id}
-                result = db.DBSession.connection().execute(sql_query_pp)
-
-                # start by adding the project first
-                result_buffer.append('task Project_%s "Project_%s" {' % (p_id, p_id))
-
-                # now start jumping around
-                previous_level = 0
-                for r in result.fetchall():
-                    # start by appending task tjp id first
-                    task_id = r[0]
-                    # path = r[1]
-                    # parent_id = r[2]
-                    # entity_type = r[3]
-                    #name = r[4]
-                    priority = r[5]
-                    schedule_timing = r[6]
-                    schedule_unit = r[7]
-                    schedule_model = r[8]
-                    allocation_strategy = r[9]
-                    persistent_allocation = r[10]
-                    depth = r[11] + 1
-                    resource_ids = r[12]
-                    alternative_resource_ids = r[13]
-                    time_log_array = r[14]
-                    dependency_info = r[15]
-                    is_leaf = r[16]
-
-                    tab = '  ' * depth
-
-                    # close the previous level if necessary
-                    for i in range(previous_level - depth + 1):
-                        i_tab = '  ' * (previous_level - i)
-                        result_buffer.append('%s}' % i_tab)
-
-                    result_buffer.append(
-                        """%(tab)stask Task_%(id)s "Task_%(id)s" {""" % {
-                            'tab': tab,
-                            'id': task_id
-                        }
+        result = connection.execute(sql_query % {'id': project_id})
+        for r in result:
+            dependency_info = r[18]
+            dependencies = []
+            if dependency_info:
+                json_data = json.loads(
+                    dependency_info.replace('{', '[')
+                    .replace('}', ']')
+                    .replace('(', '')
+                    .replace(')', '')
+                )  # it is an array of string
+
+                for dep in json_data:
+                    dep_full_ids, \
+                        dependency_target, \
+                        gap_timing, \
+                        gap_unit, \
+                        gap_model = dep.split(',')
+
+                    dep_full_path = '.'.join(
+                        map(lambda x: 'Task_%s' % x,
+                            dep_full_ids.split('-'))
                     )
+                    # fix for Project id
+                    dep_full_path = 'Project_%s' % dep_full_path[5:]
+                    dependencies.append((
+                        dep_full_path,
+                        dependency_target,
+                        float(gap_timing) if gap_timing else None,
+                        gap_unit or None,
+                        gap_model or None
+                    ))
+
+            time_log_array = r[17]
+            time_logs = []
+            if time_log_array:
+                json_data = json.loads(
+                    time_log_array.replace('{', '[')
+                    .replace('}', ']')
+                    .replace('(', '')
+                    .replace(')', '')
+                )  # it is an array of string
+                time_logs = [tlog.split(',') for tlog in json_data]
+
+            yield (
+                r[0],  # id
+                r[5],  # priority
+                r[6],  # schedule_timing
+                r[7],  # schedule_unit
+                r[8],  # schedule_model
+                r[9],  # allocation_strategy
+                r[10],  # persistent_allocation
+                r[12],  # schedule_constraint
+                r[13],  # start
+                r[14],  # end
+                r[11],  # depth
+                r[15],  # resource_ids
+                r[16],  # alternative_resource_ids
+                time_logs,
+                dependencies,
+                r[19]  # is_leaf
+            )
 
-                    # append priority if it is different then 500
-                    if priority != 500:
-                        result_buffer.append(
-                            '%s  priority %s' % (tab, priority))
-
-                    # append dependency information
-                    if dependency_info:
-                        dep_buffer = ['%s  depends ' % tab]
-
-                        json_data = json.loads(
-                            dependency_info.replace('{', '[')
-                            .replace('}', ']')
-                            .replace('(', '')
-                            .replace(')', '')
-                        )  # it is an array of string
-
-                        for i, dep in enumerate(json_data):
-                            if i > 0:
-                                dep_buffer.append(', ')
-
-                            dep_full_ids, \
-                                dependency_target, \
-                                gap_timing, \
-                                gap_unit, \
-                                gap_model = dep.split(',')
-
-                            dep_full_path = '.'.join(
-                                map(lambda x: 'Task_%s' % x,
-                                    dep_full_ids.split('-'))
-                            )
-                            # fix for Project id
-                            dep_full_path = 'Project_%s' % dep_full_path[5:]
-
-                            dep_string = '%s {%s}' % (
-                                dep_full_path, dependency_target)
-
-                            dep_buffer.append(dep_string)
+    @classmethod
+    def _query_tasks(cls, connection, project_id):
+        """a generator that yields the scheduling data of the tasks of the
+        given project in depth first order by using a fixed number of flat
+        queries that every dialect supports, the hierarchy is build in Python.
 
-                        result_buffer.append(''.join(dep_buffer))
+        The yielded data is the same with :meth:`._query_tasks_postgresql`.
 
-                    # append schedule model and timing information
-                    # if this is a leaf task and has resources
-                    if is_leaf and resource_ids:
-                        result_buffer.append(
-                            '%s  %s %s%s' % (
-                                tab, schedule_model, schedule_timing,
-                                schedule_unit
-                            )
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param int project_id: The project id
+        """
+        from sqlalchemy import select
+        from stalker.models.task import (Task, TaskDependency, TimeLog,
+                                         Task_Resources,
+                                         Task_Alternative_Resources)
+
+        tasks_table = Task.__table__
+        dependencies_table = TaskDependency.__table__
+        time_logs_table = TimeLog.__table__
+        project_tasks = tasks_table.c.project_id == project_id
+
+        # tasks
+        tasks = {}
+        children = {}
+        for r in connection.execute(
+                select([
+                    tasks_table.c.id,
+                    tasks_table.c.parent_id,
+                    tasks_table.c.priority,
+                    tasks_table.c.schedule_timing,
+                    tasks_table.c.schedule_unit,
+                    tasks_table.c.schedule_model,
+                    tasks_table.c.allocation_strategy,
+                    tasks_table.c.persistent_allocation,
+                    tasks_table.c.schedule_constraint,
+                    tasks_table.c.start,
+                    tasks_table.c.end,
+                ]).where(project_tasks)):
+            tasks[r[0]] = r
+            children.setdefault(r[1], []).append(r[0])
+
+        def task_related_ids(table, column):
+            """returns a dictionary of task id to the given column values
+            """
+            related_ids = {}
+            for task_id, value in connection.execute(
+                    select([table.c.task_id, column])
+                    .select_from(
+                        table.join(
+                            tasks_table, table.c.task_id == tasks_table.c.id
                         )
+                    )
+                    .where(project_tasks)
+                    .order_by(table.c.task_id, column)):
+                related_ids.setdefault(task_id, []).append(value)
+            return related_ids
+
+        # resources
+        resource_ids = task_related_ids(
+            Task_Resources, Task_Resources.c.resource_id
+        )
 
-                        resource_buffer = ['%s  allocate ' % tab]
-                        for i, resource_id in enumerate(resource_ids):
-                            if i > 0:
-                                resource_buffer.append(', ')
-                            resource_buffer.append('User_%s' % resource_id)
-
-                            # now go through alternatives
-                            if alternative_resource_ids:
-                                resource_buffer.append(' { alternative ')
-                                for j, alt_resource_id in \
-                                        enumerate(alternative_resource_ids):
-                                    if j > 0:
-                                        resource_buffer.append(', ')
-                                    resource_buffer.append(
-                                        'User_%s' % alt_resource_id)
-
-                                # set the allocation strategy
-                                resource_buffer.append(
-                                    ' select %s' % allocation_strategy)
-
-                                # is is persistent
-                                if persistent_allocation:
-                                    resource_buffer.append(' persistent')
-                                resource_buffer.append(' }')
-
-                        result_buffer.append(''.join(resource_buffer))
-
-                        # append any time log information
-                        if time_log_array:
-                            json_data = json.loads(
-                                time_log_array.replace('{', '[')
-                                .replace('}', ']')
-                                .replace('(', '')
-                                .replace(')', '')
-                            )  # it is an array of string
-
-                            for tlog in json_data:
-                                user_id, t_start, t_end = tlog.split(',')
-                                result_buffer.append(
-                                    '%s  booking %s %s - %s { overtime 2 }' % (
-                                        tab, user_id, t_start, t_end
-                                    )
-                                )
-
-                    previous_level = depth
-                    num_of_records += 1
-
-                # and close the brackets per project
-                depth = 0  # current depth is 0 (Project)
-                # previous_level is the last task
-                for i in range(previous_level - depth + 1):
-                    i_tab = '  ' * (previous_level - i)
-                    result_buffer.append('%s}' % i_tab)
-
-            tasks_buffer = '\n'.join(result_buffer)
-
-            self.tjp_content = template.render({
-                'stalker': stalker,
-                'studio': self.studio,
-                'csv_file_name': self.temp_file_name,
-                'csv_file_full_path': self.temp_file_full_path,
-                'compute_resources': self.compute_resources,
-                'tasks_buffer': tasks_buffer
-            })
+        # alternative resources
+        alternative_resource_ids = task_related_ids(
+            Task_Alternative_Resources,
+            Task_Alternative_Resources.c.resource_id
+        )
 
-            logger.debug(
-                'total number of records: %s' % num_of_records
+        # time logs
+        time_logs = {}
+        for task_id, resource_id, t_start, t_end in connection.execute(
+                select([
+                    time_logs_table.c.task_id,
+                    time_logs_table.c.resource_id,
+                    time_logs_table.c.start,
+                    time_logs_table.c.end
+                ])
+                .select_from(
+                    time_logs_table.join(
+                        tasks_table,
+                        time_logs_table.c.task_id == tasks_table.c.id
+                    )
+                )
+                .where(project_tasks)
+                .order_by(time_logs_table.c.task_id,
+                          time_logs_table.c.start)):
+            time_logs.setdefault(task_id, []).append((
+                'User_%s' % resource_id,
+                t_start.strftime('%Y-%m-%d-%H:%M:00'),
+                t_end.strftime('%Y-%m-%d-%H:%M:00')
+            ))
+
+        # dependencies
+        dependencies = {}
+        for task_id, depends_to_id, dependency_target, gap_timing, gap_unit, \
+                gap_model in connection.execute(
+                select([
+                    dependencies_table.c.task_id,
+                    dependencies_table.c.depends_to_id,
+                    dependencies_table.c.dependency_target,
+                    dependencies_table.c.gap_timing,
+                    dependencies_table.c.gap_unit,
+                    dependencies_table.c.gap_model
+                ])
+                .select_from(
+                    dependencies_table.join(
+                        tasks_table,
+                        dependencies_table.c.task_id == tasks_table.c.id
+                    )
+                )
+                .where(project_tasks)
+                .order_by(dependencies_table.c.task_id,
+                          dependencies_table.c.depends_to_id)):
+            dependencies.setdefault(task_id, []).append(
+                (depends_to_id, dependency_target, gap_timing, gap_unit,
+                 gap_model)
             )
 
-        else:
-            # fallback to the previous implementation
-            template = Template(defaults.tjp_main_template)
-
-            if self.projects:
-                projects = self.projects
-            else:
-                projects = self.studio.active_projects
+        # the dependent tasks may be in other projects, retrieve the parents
+        # of them level by level to be able to generate their tjp paths
+        parents = dict((task_id, r[1]) for task_id, r in tasks.items())
+        project_ids = {}
+        missing_ids = set(
+            depends_to_id
+            for task_dependencies in dependencies.values()
+            for depends_to_id in
+            [dependency[0] for dependency in task_dependencies]
+        ).difference(parents)
+        while missing_ids:
+            missing_ids = list(missing_ids)
+            for i in range(0, len(missing_ids), 500):
+                for task_id, parent_id, task_project_id in connection.execute(
+                        select([
+                            tasks_table.c.id,
+                            tasks_table.c.parent_id,
+                            tasks_table.c.project_id
+                        ]).where(
+                            tasks_table.c.id.in_(missing_ids[i:i + 500])
+                        )):
+                    parents[task_id] = parent_id
+                    project_ids[task_id] = task_project_id
+            missing_ids = set(
+                parents[task_id] for task_id in missing_ids
+                if parents.get(task_id) is not None
+            ).difference(parents)
+
+        def tjp_path(task_id):
+            """returns the tjp path of the given task
+            """
+            path = []
+            while task_id is not None:
+                path.insert(0, 'Task_%s' % task_id)
+                root_id = task_id
+                task_id = parents.get(task_id)
+            path.insert(0, 'Project_%s' % project_ids.get(root_id, project_id))
+            return '.'.join(path)
+
+        # walk the hierarchy in the same order with the PostgreSQL query
+        def sort_key(task_id):
+            return str(task_id)
+
+        tasks_to_visit = [
+            (task_id, 0)
+            for task_id in sorted(children.get(None, []), key=sort_key,
+                                  reverse=True)
+        ]
+        while tasks_to_visit:
+            task_id, depth = tasks_to_visit.pop()
+            r = tasks[task_id]
+            task_children = children.get(task_id, [])
+            for child_id in sorted(task_children, key=sort_key, reverse=True):
+                tasks_to_visit.append((child_id, depth + 1))
+
+            yield (
+                task_id,
+                r[2],  # priority
+                r[3],  # schedule_timing
+                r[4],  # schedule_unit
+                r[5],  # schedule_model
+                r[6],  # allocation_strategy
+                r[7],  # persistent_allocation
+                r[8],  # schedule_constraint
+                r[9],  # start
+                r[10],  # end
+                depth,
+                resource_ids.get(task_id),
+                alternative_resource_ids.get(task_id),
+                time_logs.get(task_id, []),
+                [(tjp_path(depends_to_id), dependency_target, gap_timing,
+                  gap_unit, gap_model)
+                 for depends_to_id, dependency_target, gap_timing, gap_unit,
+                 gap_model in dependencies.get(task_id, [])],
+                not task_children  # is_leaf
+            )
 
-            self.tjp_content = template.render({
-                'stalker': stalker,
-                'studio': self.studio,
-                'projects': projects,
-                'csv_file_name': self.temp_file_name,
-                'csv_file_full_path': self.temp_file_full_path,
-                'compute_resources': self.compute_resources
-            })
+    def _fill_tjp_file(self, project_ids=None):
+        """streams the tjp file content to the tjp file without holding the
+        whole content in the memory, the written content is also stored in the
+        :attr:`.tjp_content` attribute if ``keep_tjp_content`` is True
 
-        end = time.time()
-        logger.debug(
-            'rendering the whole tjp file took : %s seconds' % (end - start)
-        )
-
-    def _fill_tjp_file(self):
-        """fills the tjp file with content
+        :param list project_ids: The ids of the projects to export, see
+          :meth:`._generate_tjp_file_content`.
         """
+        content = []
         with open(self.tjp_file_full_path, 'w+') as self.tjp_file:
-            self.tjp_file.write(self.tjp_content)
+            for chunk in self._generate_tjp_file_content(project_ids):
+                self.tjp_file.write(chunk)
+                if self.keep_tjp_content:
+                    content.append(chunk)
+
+        if self.keep_tjp_content:
+            self.tjp_content = ''.join(content)
 
     def _delete_tjp_file(self):
         """deletes the temp tjp file
@@ -567,6 +1076,12 @@ order by path_as_text"""
     def _parse_csv_file(self):
         """parses back the csv file and fills the tasks with computes_start and
         computed_end values
+
+        The csv file is read line by line and the database is updated in
+        chunks of :attr:`.chunk_size` lines. Only the Tasks and Projects whose
+        dates are changed are updated, and if :attr:`.compute_resources` is
+        True only the computed resources of the Tasks whose computed
+        resources are changed are updated.
         """
         parsing_start = time.time()
 
@@ -576,106 +1091,420 @@ order by path_as_text"""
                          'returning without updating db!')
             return
 
-        from stalker import db, Task, Project
-        from stalker.models.task import Task_Computed_Resources
+        from stalker import db
+        connection = db.DBSession.connection()
+
+        # the same dates are repeated a lot, so cache them
+        dates = {}
 
-        entity_ids = []
-        update_data = []
-        update_user_data = []
+        def parse_date(date_str):
+            try:
+                return dates[date_str]
+            except KeyError:
+                date = datetime.datetime.strptime(date_str, "%Y-%m-%d-%H:%M")
+                dates[date_str] = date
+                return date
 
+        num_of_updated_rows = 0
         with open(self.csv_file_full_path, 'r') as self.csv_file:
             csv_content = csv.reader(self.csv_file, delimiter=';')
 
-            lines = [line for line in csv_content]
-            lines.pop(0)
+            # skip the header
+            next(csv_content, None)
+
+            lines = []
+            for line in csv_content:
+                lines.append(line)
+                if len(lines) >= self.chunk_size:
+                    num_of_updated_rows += \
+                        self._update_csv_chunk(connection, lines, parse_date)
+                    lines = []
+
+            if lines:
+                num_of_updated_rows += \
+                    self._update_csv_chunk(connection, lines, parse_date)
+
+        logger.debug('number of changed rows: %s' % num_of_updated_rows)
+
+        parsing_end = time.time()
+        logger.debug(
+            'completed parsing csv file in (SQL): %s seconds' %
+            (parsing_end - parsing_start)
+        )
+
+    def _update_csv_chunk(self, connection, lines, parse_date):
+        """updates the Tasks and Projects with the given lines of the csv file
+        and returns the number of updated rows.
+
+        The lines with ids starting with ``Project_`` are Projects and the
+        others are Tasks (ex. ``Project_12.Task_34``).
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param list lines: A list of csv lines
+        :param parse_date: A callable which converts the date strings in the
+          csv file to datetime.datetime instances
+        """
+        dates = {'Task': {}, 'Project': {}}
+        computed_resources = {}
 
         for data in lines:
             id_line = data[0]
 
             entity_id = int(id_line.split('.')[-1].split('_')[-1])
+            if not entity_id:
+                continue
+
+            entity_type = 'Task' if '.' in id_line else 'Project'
+            dates[entity_type][entity_id] = \
+                (parse_date(data[1]), parse_date(data[2]))
+
+            # computed_resources
+            if self.compute_resources and entity_type == 'Task':
+                computed_resources[entity_id] = set(
+                    int(x.split('_')[-1].split(')')[0])
+                    for x in data[3].split(',')
+                ) if data[3] != '' else set()
+
+        return self._update_schedule_results(
+            connection, dates, computed_resources
+        )
 
-            if entity_id:
-                entity_ids.append(entity_id)
-                start_date = datetime.datetime.strptime(
-                    data[1], "%Y-%m-%d-%H:%M"
-                )
-                end_date = datetime.datetime.strptime(
-                    data[2],
-                    "%Y-%m-%d-%H:%M"
-                )
+    @classmethod
+    def _find_components(cls, project_ids, links):
+        """groups the given project ids in to connected components
 
-                # computed_resources
-                if self.compute_resources:
-                    if data[3] != '':
-                        resources_data = map(
-                            lambda x: x.split('_')[-1].split(')')[0],
-                            data[3].split(',')
+        :param list project_ids: A list of project ids
+        :param links: An iterable of (project_id, key) pairs. Projects having
+          the same key (ex. a resource or another project they depend to) are
+          placed in to the same component.
+        :return: A list of sorted lists of project ids
+        """
+        parents = dict((('Project', p_id), ('Project', p_id))
+                       for p_id in project_ids)
+
+        def find(node):
+            root = node
+            while parents[root] != root:
+                root = parents[root]
+            # compress the path
+            while parents[node] != root:
+                parents[node], node = root, parents[node]
+            return root
+
+        for p_id, key in links:
+            node = ('Project', p_id)
+            if node not in parents:
+                continue
+            parents.setdefault(key, key)
+            root1 = find(node)
+            root2 = find(key)
+            if root1 != root2:
+                parents[root2] = root1
+
+        components = {}
+        for p_id in project_ids:
+            components.setdefault(find(('Project', p_id)), []).append(p_id)
+
+        return sorted(sorted(component) for component in components.values())
+
+    @classmethod
+    def _get_components(cls, connection, project_ids):
+        """groups the given projects in to components where the projects
+        sharing resources (through Task_Resources, Task_Alternative_Resources
+        or TimeLogs) or depending to each other are in the same component.
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param list project_ids: A list of project ids
+        :return: A list of sorted lists of project ids
+        """
+        from sqlalchemy import select
+        from stalker.models.task import (Task, TaskDependency, TimeLog,
+                                         Task_Resources,
+                                         Task_Alternative_Resources)
+
+        tasks_table = Task.__table__
+        dependencies_table = TaskDependency.__table__
+        project_tasks = tasks_table.c.project_id.in_(project_ids)
+
+        links = []
+        for table in [Task_Resources,
+                      Task_Alternative_Resources,
+                      TimeLog.__table__]:
+            for p_id, resource_id in connection.execute(
+                    select([tasks_table.c.project_id, table.c.resource_id])
+                    .distinct()
+                    .select_from(
+                        table.join(
+                            tasks_table, table.c.task_id == tasks_table.c.id
                         )
-                        for rid in resources_data:
-                            update_user_data.append({
-                                'task_id': entity_id,
-                                'resource_id': rid
-                            })
+                    )
+                    .where(project_tasks)):
+                links.append((p_id, ('User', resource_id)))
+
+        depends_to_tasks = tasks_table.alias()
+        for p_id, depends_to_project_id in connection.execute(
+                select([
+                    tasks_table.c.project_id,
+                    depends_to_tasks.c.project_id
+                ])
+                .distinct()
+                .select_from(
+                    dependencies_table.join(
+                        tasks_table,
+                        dependencies_table.c.task_id == tasks_table.c.id
+                    ).join(
+                        depends_to_tasks,
+                        dependencies_table.c.depends_to_id ==
+                        depends_to_tasks.c.id
+                    )
+                )
+                .where(project_tasks)):
+            links.append((p_id, ('Project', depends_to_project_id)))
 
-                update_data.append({
-                    'b_id': entity_id,
-                    'start': start_date,
-                    'end': end_date,
-                    'computed_start': start_date,
-                    'computed_end': end_date
-                })
+        return cls._find_components(project_ids, links)
 
-        from sqlalchemy import bindparam
+    def _compute_fingerprints(self, connection, project_ids):
+        """computes a fingerprint for each of the given projects by using the
+        data that effects the scheduling of the project, which are the task
+        timings, schedule constraints, dependencies, allocations, bookings,
+        vacations, the studio working hours and :attr:`.Studio.now`, and the
+        :attr:`.compute_resources` value.
 
-        # update date values
-        update_statement = Task.__table__.update()\
-            .where(Task.__table__.c.id == bindparam('b_id'))\
-            .values(
-                start=bindparam('start'),
-                end=bindparam('end'),
-                computed_start=bindparam('computed_start'),
-                computed_end=bindparam('computed_end')
-            )
-        db.DBSession.connection().execute(
-            update_statement,
-            update_data
-        )
+        It also groups the projects in to components (see
+        :meth:`._get_components`).
+
+        The data of all the projects is retrieved with a fixed number of
+        queries.
 
-        # update project dates
-        update_project_statement = Project.__table__.update()\
-            .where(Project.__table__.c.id == bindparam('b_id'))\
-            .values(
-                start=bindparam('start'),
-                end=bindparam('end'),
-                computed_start=bindparam('computed_start'),
-                computed_end=bindparam('computed_end')
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param list project_ids: A list of project ids
+        :return: A tuple of a dictionary of project id to fingerprint and the
+          list of components (see :meth:`._find_components`).
+        """
+        import hashlib
+        from sqlalchemy import select
+        from stalker import User, Vacation
+        from stalker.models.task import (Task, TaskDependency, TimeLog,
+                                         Task_Resources,
+                                         Task_Alternative_Resources)
+
+        tasks_table = Task.__table__
+        dependencies_table = TaskDependency.__table__
+        time_logs_table = TimeLog.__table__
+        project_tasks = tasks_table.c.project_id.in_(project_ids)
+
+        data = dict((p_id, []) for p_id in project_ids)
+        project_users = dict((p_id, set()) for p_id in project_ids)
+        task_projects = {}
+
+        # tasks
+        for r in connection.execute(
+                select([
+                    tasks_table.c.project_id,
+                    tasks_table.c.id,
+                    tasks_table.c.parent_id,
+                    tasks_table.c.priority,
+                    tasks_table.c.schedule_timing,
+                    tasks_table.c.schedule_unit,
+                    tasks_table.c.schedule_model,
+                    tasks_table.c.allocation_strategy,
+                    tasks_table.c.persistent_allocation,
+                    tasks_table.c.schedule_constraint,
+                    tasks_table.c.start,
+                    tasks_table.c.end,
+                ]).where(project_tasks).order_by(tasks_table.c.id)):
+            task_projects[r[1]] = r[0]
+            # the start and end values are updated by the scheduler, they
+            # only effect the schedule if the task is constrained with them
+            schedule_constraint = r[9]
+            data[r[0]].append(
+                ('Task',) + tuple(r[1:10]) + (
+                    r[10] if schedule_constraint in [1, 3] else None,
+                    r[11] if schedule_constraint in [2, 3] else None
+                )
             )
-        db.DBSession.connection().execute(
-            update_project_statement,
-            update_data
+
+        # resources, alternative resources and time logs
+        time_log_columns = [
+            time_logs_table.c.start,
+            time_logs_table.c.end
+        ]
+        for name, table, columns in [
+                ('Resource', Task_Resources, []),
+                ('AlternativeResource', Task_Alternative_Resources, []),
+                ('TimeLog', time_logs_table, time_log_columns)]:
+            for r in connection.execute(
+                    select([table.c.task_id, table.c.resource_id] + columns)
+                    .select_from(
+                        table.join(
+                            tasks_table, table.c.task_id == tasks_table.c.id
+                        )
+                    )
+                    .where(project_tasks)
+                    .order_by(table.c.task_id, table.c.resource_id,
+                              *columns)):
+                p_id = task_projects[r[0]]
+                data[p_id].append((name,) + tuple(r))
+                project_users[p_id].add(r[1])
+
+        # dependencies
+        for r in connection.execute(
+                select([
+                    dependencies_table.c.task_id,
+                    dependencies_table.c.depends_to_id,
+                    dependencies_table.c.dependency_target,
+                    dependencies_table.c.gap_timing,
+                    dependencies_table.c.gap_unit,
+                    dependencies_table.c.gap_model
+                ])
+                .select_from(
+                    dependencies_table.join(
+                        tasks_table,
+                        dependencies_table.c.task_id == tasks_table.c.id
+                    )
+                )
+                .where(project_tasks)
+                .order_by(dependencies_table.c.task_id,
+                          dependencies_table.c.depends_to_id)):
+            data[task_projects[r[0]]].append(('TaskDependency',) + tuple(r))
+
+        # resource efficiencies and vacations
+        efficiencies = dict(
+            connection.execute(
+                select([User.__table__.c.id, User.__table__.c.efficiency])
+            ).fetchall()
         )
 
-        # update computed resources data
-        # first delete everything
-        if self.compute_resources:
-            delete_resources_statement = Task_Computed_Resources.delete()
+        vacations_table = Vacation.__table__
+        studio_vacations = []
+        user_vacations = {}
+        for user_id, v_start, v_end in connection.execute(
+                select([
+                    vacations_table.c.user_id,
+                    vacations_table.c.start,
+                    vacations_table.c.end
+                ]).order_by(vacations_table.c.start, vacations_table.c.end)):
+            if user_id is None:
+                studio_vacations.append(('Vacation', v_start, v_end))
+            else:
+                user_vacations.setdefault(user_id, []).append(
+                    ('Vacation', user_id, v_start, v_end)
+                )
 
-            update_resources_statement = Task_Computed_Resources.insert()\
-                .values(
-                    task_id=bindparam('task_id'),
-                    resource_id=bindparam('resource_id')
+        studio_data = []
+        if self.studio:
+            studio_data = [
+                ('Studio',
+                 self.studio.start,
+                 self.studio.end,
+                 self.studio.now,
+                 self.studio.timing_resolution,
+                 self.studio.daily_working_hours,
+                 self.studio.working_hours.to_tjp)
+            ]
+
+        studio_data.append(('ComputeResources', self.compute_resources))
+
+        fingerprints = {}
+        for p_id in project_ids:
+            project_data = studio_data + studio_vacations + data[p_id]
+            for user_id in sorted(project_users[p_id]):
+                project_data.append(
+                    ('User', user_id, efficiencies.get(user_id))
                 )
+                project_data.extend(user_vacations.get(user_id, []))
+
+            fingerprints[p_id] = hashlib.sha1(
+                repr(project_data).encode('utf-8')
+            ).hexdigest()
+
+        return fingerprints, self._get_components(connection, project_ids)
+
+    def _get_changed_project_ids(self, connection):
+        """returns the ids of the projects that needs to be rescheduled.
+
+        A project needs to be rescheduled if its fingerprint or the component
+        that it is in is changed since the last incremental schedule, and if
+        it needs to be rescheduled then all the projects in the same component
+        are rescheduled.
 
-            db.DBSession.connection().execute(delete_resources_statement)
-            db.DBSession.connection().execute(
-                update_resources_statement,
-                update_user_data
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :return: A tuple of the list of project ids to be rescheduled and a
+          dictionary of project id to (component, fingerprint) pairs of the
+          changed projects which should be stored with
+          :meth:`._store_fingerprints` after a successful schedule.
+        """
+        from sqlalchemy import select
+
+        project_ids = self._get_project_ids(connection)
+        if not project_ids:
+            return [], {}
+
+        fingerprints, components = \
+            self._compute_fingerprints(connection, project_ids)
+
+        table = Schedule_Fingerprints
+        stored_fingerprints = dict(
+            (r[0], (r[1], r[2]))
+            for r in connection.execute(
+                select([
+                    table.c.project_id,
+                    table.c.component,
+                    table.c.fingerprint
+                ]).where(table.c.project_id.in_(project_ids))
             )
+        )
+
+        changed_project_ids = []
+        new_fingerprints = {}
+        for component in components:
+            component_key = ','.join(map(str, component))
+            if any(stored_fingerprints.get(p_id) !=
+                   (component_key, fingerprints[p_id])
+                   for p_id in component):
+                changed_project_ids.extend(component)
+                for p_id in component:
+                    new_fingerprints[p_id] = \
+                        (component_key, fingerprints[p_id])
 
-        parsing_end = time.time()
         logger.debug(
-            'completed parsing csv file in (SQL): %s seconds' %
-            (parsing_end - parsing_start)
+            'changed projects: %s of %s' %
+            (len(changed_project_ids), len(project_ids))
+        )
+        return changed_project_ids, new_fingerprints
+
+    @classmethod
+    def _store_fingerprints(cls, connection, fingerprints):
+        """stores the given fingerprints in the ``Schedule_Fingerprints``
+        table
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param dict fingerprints: A dictionary of project id to
+          (component, fingerprint) pairs as returned by
+          :meth:`._get_changed_project_ids`
+        """
+        if not fingerprints:
+            return
+
+        table = Schedule_Fingerprints
+        date_updated = datetime.datetime.now()
+        connection.execute(
+            table.delete().where(
+                table.c.project_id.in_(list(fingerprints.keys()))
+            )
+        )
+        connection.execute(
+            table.insert(),
+            [
+                {
+                    'project_id': p_id,
+                    'component': component,
+                    'fingerprint': fingerprint,
+                    'date_updated': date_updated
+                }
+                for p_id, (component, fingerprint)
+                in sorted(fingerprints.items())
+            ]
         )
 
     def schedule(self):
@@ -691,23 +1520,139 @@ order by path_as_text"""
                 (self.__class__.__name__, self.studio.__class__.__name__)
             )
 
-        # create a tjp file
-        self._create_tjp_file()
+        from stalker import db
+        connection = db.DBSession.connection()
+
+        self._processes = []
+        self._is_cancelled = False
+        self._is_running = True
+        try:
+            # find the changed projects
+            project_ids = None
+            fingerprints = None
+            if self.incremental:
+                project_ids, fingerprints = \
+                    self._get_changed_project_ids(connection)
+                if not project_ids:
+                    logger.debug('no changed projects, skipping scheduling')
+                    return ''
+
+            # split the projects in to independent components
+            components = []
+            if self.max_workers > 1:
+                if project_ids is None:
+                    project_ids = self._get_project_ids(connection)
+                components = self._get_components(connection, project_ids)
+
+            if not components:
+                components = [project_ids]
+
+            # create a tjp file per component and fill it with data
+            temp_files = []
+            tjp_contents = []
+            for component in components:
+                self._create_tjp_file()
+                self._fill_tjp_file(component)
+                logger.debug(
+                    'tjp_file_full_path: %s' % self.tjp_file_full_path
+                )
+                temp_files.append(self.temp_file_full_path)
+                tjp_contents.append(self.tjp_content)
+
+            if self.keep_tjp_content:
+                self.tjp_content = '\n'.join(tjp_contents)
+
+            # pass them to tj3
+            if len(temp_files) > 1:
+                from multiprocessing.pool import ThreadPool
+                pool = ThreadPool(min(self.max_workers, len(temp_files)))
+                try:
+                    results = pool.map(self._run_tj3, temp_files)
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                results = [self._run_tj3(temp_files[0])]
+
+            if self._is_cancelled:
+                for temp_file_full_path in temp_files:
+                    self._create_tjp_file(temp_file_full_path)
+                    self._clean_up()
+                raise RuntimeError('Scheduling is cancelled')
+
+            for returncode, stderr_buffer in results:
+                logger.debug('tj3 return code: %s' % returncode)
+                if returncode:
+                    # there is an error
+                    raise RuntimeError(stderr_buffer)
+
+            # read back the csv files
+            for temp_file_full_path in temp_files:
+                self._create_tjp_file(temp_file_full_path)
+                self._parse_csv_file()
+
+                # remove the tjp file
+                self._clean_up()
+
+            # store the fingerprints of the scheduled projects
+            if fingerprints:
+                self._store_fingerprints(connection, fingerprints)
+
+            return '\n'.join(
+                stderr_buffer for returncode, stderr_buffer in results
+            )
+        finally:
+            self._is_running = False
+            self._is_cancelled = False
+
+    def copy(self):
+        """returns a copy of this scheduler with the same settings
+        """
+        scheduler = super(TaskJugglerScheduler, self).copy()
+        scheduler.tjp_content = ''
+        scheduler.temp_file_full_path = None
+        scheduler.temp_file_path = None
+        scheduler.temp_file_name = None
+        scheduler.tjp_file_full_path = None
+        scheduler.tjp_file = None
+        scheduler.csv_file_full_path = None
+        scheduler.csv_file = None
+        scheduler._processes = []
+        scheduler._is_cancelled = False
+        scheduler._is_running = False
+        return scheduler
+
+    def cancel(self):
+        """cancels the running schedule by terminating the running tj3
+        processes. :meth:`.schedule` will raise a RuntimeError without
+        updating the database when it is cancelled. Nothing is done if there
+        is no running schedule.
+        """
+        if not self._is_running:
+            return
 
-        # create tjp file content
-        self._create_tjp_file_content()
+        self._is_cancelled = True
+        for process in self._processes:
+            if process.poll() is None:
+                logger.debug('terminating tj3 process: %s' % process.pid)
+                process.terminate()
 
-        # fill it with data
-        self._fill_tjp_file()
+    def _run_tj3(self, temp_file_full_path):
+        """runs tj3 for the tjp file of the given temp file path and returns
+        the return code and the stderr output of it.
 
-        logger.debug('tjp_file_full_path: %s' % self.tjp_file_full_path)
+        :param str temp_file_full_path: The temp file path that the tjp file
+          is created for (see :meth:`._create_tjp_file`).
+        :return: A tuple of the return code and the stderr output.
+        """
+        tjp_file_full_path = temp_file_full_path + '.tjp'
+        temp_file_path = os.path.dirname(temp_file_full_path)
 
-        # pass it to tj3
         if os.name == 'nt':
             command = '%s %s -o %s' % (
                 defaults.tj_command,
-                self.tjp_file_full_path,
-                self.temp_file_path,
+                tjp_file_full_path,
+                temp_file_path,
             )
             logger.debug('tj3 using fallback mode for Windows!')
             logger.debug('tj3 command: %s' % command)
@@ -716,11 +1661,14 @@ order by path_as_text"""
         else:
             process = subprocess.Popen(
                 [defaults.tj_command,
-                 self.tjp_file_full_path,
+                 tjp_file_full_path,
                  '-o',
-                 self.temp_file_path],
+                 temp_file_path],
                 stderr=subprocess.PIPE
             )
+            self._processes.append(process)
+            if self._is_cancelled:
+                process.terminate()
 
             # loop until process finishes and capture stderr output
             stderr_buffer = []
@@ -731,67 +1679,793 @@ order by path_as_text"""
                     break
 
                 if stderr != b'':
-                    stderr = stderr.strip()
+                    stderr = stderr.strip().decode('utf-8', 'replace')
                     stderr_buffer.append(stderr)
-                    logger.debug(stderr.strip())
+                    logger.debug(stderr)
+                    if self.stderr_callback:
+                        self.stderr_callback(stderr)
 
             # flatten the buffer
             stderr_buffer = '\n'.join(stderr_buffer)
 
             returncode = process.returncode
 
-        if returncode:
-            # there is an error
-            raise RuntimeError(stderr_buffer)
+        return returncode, stderr_buffer
 
-        # read back the csv file
-        self._parse_csv_file()
 
-        logger.debug('tj3 return code: %s' % returncode)
+class ListScheduler(SchedulerBase):
+    """A pure Python resource leveling scheduler.
 
-        # remove the tjp file
-        self._clean_up()
+    ListScheduler doesn't need TaskJuggler or any other external tool, so it
+    can be used where tj3 is not available or to quickly create "what-if"
+    schedules.
 
-        return stderr_buffer
+    It is a list scheduler. The leaf tasks are scheduled one by one as soon as
+    all the tasks they depend on are scheduled, the tasks with higher
+    priorities are scheduled first. Each task is placed as soon as possible
+    after the :attr:`.Studio.now`, the tasks it depends on (honoring the
+    "onend" and "onstart" dependency targets and the gaps of the
+    :class:`.TaskDependency` instances, including the dependencies of the
+    parent tasks) and its start date if it has a start constraint.
 
-    def _validate_projects(self, projects):
-        """validates the given projects value
-        """
-        if projects is None:
-            projects = []
+    Time is divided in to slots of :attr:`.Studio.timing_resolution` and
+    every resource has its own free time calendar which is built from the
+    Studio working hours, the Studio and User vacations and the already
+    entered TimeLogs.
 
-        msg = '%(class)s.projects should be a list of ' \
-            'stalker.models.project.Project instances, not ' \
-            '%(projects_class)s'
+      * "effort" tasks are worked by all of their resources in parallel, each
+        booked slot contributes the timing resolution times the resource
+        efficiency to the effort. The TimeLogs of the task are counted
+        towards the effort.
 
-        if not isinstance(projects, list):
+      * "length" tasks last the given working time and "duration" tasks last
+        the given calendar time, the resources are booked in the free working
+        slots in between.
+
+    If a resource of a task is not available for a slot, one of the
+    alternative resources is picked by using the
+    :attr:`.Task.allocation_strategy` of the task (the "random" strategy is
+    handled as "order"). The picked resource is used for the rest of the task
+    if the allocation is persistent.
+
+    The results are stored in the same way with the
+    :class:`.TaskJugglerScheduler`, the computed_start and computed_end values
+    of the Tasks and Projects and the computed_resources of the Tasks (if
+    ``compute_resources`` is True) are updated.
+
+    ListScheduler is not a drop in replacement for TaskJuggler. The end
+    constraints (as late as possible scheduling) are not supported and the
+    results may differ for complex allocation scenarios.
+
+    :param studio: A :class:`.Studio` instance.
+
+    :param bool compute_resources: When set to True it will also consider
+      the :attr:`.Task.alternative_resources` attribute and will fill the
+      :attr:`.Task.computed_resources` attribute for each Task. The default
+      value is False.
+
+    :param list projects: A list of :class:`.Project` instances to be
+      scheduled, all the projects are scheduled if it is skipped.
+
+    :param int chunk_size: The maximum number of Tasks that are updated in
+      the database at once. The default is 500.
+    """
+
+    def __init__(self,
+                 studio=None,
+                 compute_resources=False,
+                 projects=None,
+                 chunk_size=500):
+        super(ListScheduler, self).__init__(studio)
+        self.compute_resources = compute_resources
+        self.chunk_size = chunk_size
+        self.projects = projects
+        self._is_cancelled = False
+        self._is_running = False
+
+        # calendar data, filled by _create_calendar()
+        self._origin = None
+        self._resolution = None
+        self._weekly_slots = []
+        self._studio_vacations = set()
+
+    def schedule(self):
+        """Does the scheduling.
+        """
+        # check the studio attribute
+        from stalker import Studio
+
+        if not isinstance(self.studio, Studio):
             raise TypeError(
-                msg % {
-                    'class': self.__class__.__name__,
-                    'projects_class': projects.__class__.__name__
-                }
+                '%s.studio should be an instance of '
+                'stalker.models.studio.Studio, not %s' %
+                (self.__class__.__name__, self.studio.__class__.__name__)
             )
 
-        from stalker import Project
-        for item in projects:
-            if not isinstance(item, Project):
-                raise TypeError(
-                    msg % {
-                        'class': self.__class__.__name__,
-                        'projects_class': item.__class__.__name__
-                    }
+        start = time.time()
+
+        from stalker import db
+        connection = db.DBSession.connection()
+
+        self._is_cancelled = False
+        self._is_running = True
+        try:
+            project_ids = self._get_project_ids(connection)
+
+            self._create_calendar(connection)
+            efficiencies, busy_slots = self._load_resources(connection)
+            tasks, children = self._load_tasks(connection, project_ids)
+
+            results = self._schedule_tasks(
+                connection, tasks, children, efficiencies, busy_slots
+            )
+            self._store_results(connection, tasks, children, results)
+        finally:
+            self._is_running = False
+            self._is_cancelled = False
+
+        end = time.time()
+        logger.debug('scheduling took: %s seconds' % (end - start))
+        return ''
+
+    def cancel(self):
+        """cancels the running schedule, the :meth:`.schedule` call raises a
+        RuntimeError. Nothing is done if there is no running schedule.
+        """
+        if self._is_running:
+            self._is_cancelled = True
+
+    def copy(self):
+        """returns a copy of this scheduler with the same settings
+        """
+        scheduler = super(ListScheduler, self).copy()
+        scheduler._is_cancelled = False
+        scheduler._is_running = False
+        scheduler._origin = None
+        scheduler._resolution = None
+        scheduler._weekly_slots = []
+        scheduler._studio_vacations = set()
+        return scheduler
+
+    def _create_calendar(self, connection):
+        """creates the studio working time calendar
+
+        The slots are counted from the beginning of the week of the
+        :attr:`.Studio.now`. A slot is a working slot if it is completely in
+        the Studio working hours and it is not in a Studio vacation.
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        """
+        from sqlalchemy import select
+        from stalker.models.studio import Vacation
+
+        now = self.studio.now
+        resolution = self.studio.timing_resolution
+        self._resolution = resolution.days * 86400 + resolution.seconds
+        self._origin = datetime.datetime.combine(
+            (now - datetime.timedelta(days=now.weekday())).date(),
+            datetime.time()
+        )
+
+        self._weekly_slots = []
+        working_hours = self.studio.working_hours
+        for slot in range(7 * 86400 // self._resolution):
+            day, seconds = divmod(slot * self._resolution, 86400)
+            slot_start = seconds / 60.0
+            slot_end = slot_start + self._resolution / 60.0
+            self._weekly_slots.append(
+                any(wh_start <= slot_start and slot_end <= wh_end
+                    for wh_start, wh_end in working_hours[day])
+            )
+
+        if not any(self._weekly_slots):
+            raise RuntimeError(
+                'There are no working hours defined for the %s, can not '
+                'schedule the tasks' % self.studio.name
+            )
+
+        vacations_table = Vacation.__table__
+        self._studio_vacations = set()
+        for v_start, v_end in connection.execute(
+                select([vacations_table.c.start, vacations_table.c.end])
+                .where(vacations_table.c.user_id == None)
+                .where(vacations_table.c.end > now)):
+            self._studio_vacations.update(self._slot_range(v_start, v_end))
+
+    def _to_slot(self, date, ceil=False):
+        """returns the slot index of the given date
+
+        :param datetime.datetime date: The date
+        :param bool ceil: Round up to the next slot if the date is not at the
+          beginning of a slot.
+        """
+        delta = date - self._origin
+        slot, remainder = divmod(
+            delta.days * 86400 + delta.seconds, self._resolution
+        )
+        if ceil and remainder:
+            slot += 1
+        return slot
+
+    def _to_date(self, slot):
+        """returns the start date of the given slot
+        """
+        return self._origin + \
+            datetime.timedelta(seconds=slot * self._resolution)
+
+    def _slot_range(self, start, end):
+        """returns the slots covered by the given date range, the slots
+        before the Studio.now are skipped
+        """
+        return range(
+            max(self._to_slot(start), self._to_slot(self.studio.now)),
+            self._to_slot(end, ceil=True)
+        )
+
+    def _to_slot_count(self, timing, unit, model):
+        """returns the number of slots of the given schedule values
+        """
+        from stalker.models.mixins import ScheduleMixin
+        seconds = ScheduleMixin.to_seconds(timing, unit, model) or 0
+        return int(math.ceil(seconds / float(self._resolution)))
+
+    def _is_working_slot(self, slot):
+        """returns True if the given slot is a working slot
+        """
+        return self._weekly_slots[slot % len(self._weekly_slots)] and \
+            slot not in self._studio_vacations
+
+    def _skip_working_slots(self, slot, count):
+        """returns the slot after the given count of working slots starting
+        from the given slot
+        """
+        while count > 0:
+            if self._is_working_slot(slot):
+                count -= 1
+            slot += 1
+        return slot
+
+    def _load_resources(self, connection):
+        """returns the efficiency and the busy slots of the users, the busy
+        slots are the User vacations and TimeLogs after the Studio.now
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        """
+        from sqlalchemy import select
+        from stalker import User, TimeLog
+        from stalker.models.studio import Vacation
+
+        users_table = User.__table__
+        vacations_table = Vacation.__table__
+        time_logs_table = TimeLog.__table__
+        now = self.studio.now
+
+        efficiencies = {}
+        busy_slots = {}
+        for user_id, efficiency in connection.execute(
+                select([users_table.c.id, users_table.c.efficiency])):
+            efficiencies[user_id] = 1.0 if efficiency is None else efficiency
+            busy_slots[user_id] = set()
+
+        for table, user_column in [
+                (vacations_table, vacations_table.c.user_id),
+                (time_logs_table, time_logs_table.c.resource_id)]:
+            for user_id, r_start, r_end in connection.execute(
+                    select([user_column, table.c.start, table.c.end])
+                    .where(user_column != None)
+                    .where(table.c.end > now)):
+                busy_slots[user_id].update(self._slot_range(r_start, r_end))
+
+        return efficiencies, busy_slots
+
+    def _load_tasks(self, connection, project_ids):
+        """returns the scheduling data of the tasks of the given projects as a
+        dictionary of task id to task data and a dictionary of parent task id
+        to child task ids, the root tasks are stored with None key.
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param list project_ids: A list of project ids
+        """
+        from sqlalchemy import select
+        from stalker.models.task import (Task, TaskDependency, TimeLog,
+                                         Task_Resources,
+                                         Task_Alternative_Resources)
+
+        tasks_table = Task.__table__
+        dependencies_table = TaskDependency.__table__
+        time_logs_table = TimeLog.__table__
+        project_tasks = tasks_table.c.project_id.in_(project_ids)
+
+        tasks = {}
+        children = {}
+        if not project_ids:
+            return tasks, children
+
+        for r in connection.execute(
+                select([
+                    tasks_table.c.id,
+                    tasks_table.c.parent_id,
+                    tasks_table.c.project_id,
+                    tasks_table.c.priority,
+                    tasks_table.c.schedule_timing,
+                    tasks_table.c.schedule_unit,
+                    tasks_table.c.schedule_model,
+                    tasks_table.c.schedule_constraint,
+                    tasks_table.c.start,
+                    tasks_table.c.is_milestone,
+                    tasks_table.c.allocation_strategy,
+                    tasks_table.c.persistent_allocation,
+                ]).where(project_tasks).order_by(tasks_table.c.id)):
+            tasks[r[0]] = {
+                'id': r[0],
+                'parent_id': r[1],
+                'project_id': r[2],
+                'priority': r[3],
+                'schedule_timing': r[4],
+                'schedule_unit': r[5],
+                'schedule_model': r[6],
+                'schedule_constraint': r[7],
+                'start': r[8],
+                'is_milestone': r[9],
+                'allocation_strategy': r[10],
+                'persistent_allocation': r[11],
+                'resources': [],
+                'alternative_resources': [],
+                'time_logs': [],
+                'dependencies': [],
+            }
+            children.setdefault(r[1], []).append(r[0])
+
+        def join_tasks(table):
+            return table.join(
+                tasks_table, table.c.task_id == tasks_table.c.id
+            )
+
+        for table, key in [
+                (Task_Resources, 'resources'),
+                (Task_Alternative_Resources, 'alternative_resources')]:
+            for task_id, resource_id in connection.execute(
+                    select([table.c.task_id, table.c.resource_id])
+                    .select_from(join_tasks(table))
+                    .where(project_tasks)
+                    .order_by(table.c.task_id, table.c.resource_id)):
+                tasks[task_id][key].append(resource_id)
+
+        for task_id, resource_id, t_start, t_end in connection.execute(
+                select([
+                    time_logs_table.c.task_id,
+                    time_logs_table.c.resource_id,
+                    time_logs_table.c.start,
+                    time_logs_table.c.end
+                ])
+                .select_from(join_tasks(time_logs_table))
+                .where(project_tasks)):
+            tasks[task_id]['time_logs'].append((resource_id, t_start, t_end))
+
+        for task_id, depends_to_id, dependency_target, gap_timing, \
+                gap_unit, gap_model in connection.execute(
+                    select([
+                        dependencies_table.c.task_id,
+                        dependencies_table.c.depends_to_id,
+                        dependencies_table.c.dependency_target,
+                        dependencies_table.c.gap_timing,
+                        dependencies_table.c.gap_unit,
+                        dependencies_table.c.gap_model
+                    ])
+                    .select_from(join_tasks(dependencies_table))
+                    .where(project_tasks)
+                    .order_by(dependencies_table.c.task_id,
+                              dependencies_table.c.depends_to_id)):
+            tasks[task_id]['dependencies'].append((
+                depends_to_id,
+                dependency_target,
+                gap_timing,
+                gap_unit,
+                gap_model
+            ))
+
+        return tasks, children
+
+    def _load_external_dates(self, connection, task_ids):
+        """returns the (start, end) slots of the given tasks which are not
+        going to be scheduled, the computed dates are used if the tasks are
+        already scheduled
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param list task_ids: A list of task ids
+        """
+        from sqlalchemy import select
+        from stalker import Task
+
+        tasks_table = Task.__table__
+        dates = {}
+        task_ids = list(task_ids)
+        for i in range(0, len(task_ids), self.chunk_size):
+            for task_id, computed_start, computed_end, start, end in \
+                    connection.execute(
+                        select([
+                            tasks_table.c.id,
+                            tasks_table.c.computed_start,
+                            tasks_table.c.computed_end,
+                            tasks_table.c.start,
+                            tasks_table.c.end
+                        ]).where(
+                            tasks_table.c.id.in_(
+                                task_ids[i:i + self.chunk_size]
+                            )
+                        )):
+                dates[task_id] = (
+                    self._to_slot(computed_start or start),
+                    self._to_slot(computed_end or end, ceil=True)
                 )
+        return dates
+
+    def _schedule_tasks(self, connection, tasks, children, efficiencies,
+                        busy_slots):
+        """schedules the leaf tasks and returns a dictionary of task id to a
+        (start slot, end slot, resource ids) tuple
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param dict tasks: The task data returned by :meth:`._load_tasks`
+        :param dict children: The children data returned by
+          :meth:`._load_tasks`
+        :param dict efficiencies: The user efficiencies returned by
+          :meth:`._load_resources`
+        :param dict busy_slots: The busy slots of the users returned by
+          :meth:`._load_resources`
+        """
+        import heapq
+
+        leaves_cache = {}
+
+        def leaves(task_id):
+            """returns the leaf tasks under the given task
+            """
+            try:
+                return leaves_cache[task_id]
+            except KeyError:
+                pass
+            if task_id in children:
+                result = [
+                    leaf_id
+                    for child_id in children[task_id]
+                    for leaf_id in leaves(child_id)
+                ]
+            else:
+                result = [task_id]
+            leaves_cache[task_id] = result
+            return result
+
+        # collect the dependencies of the leaf tasks including the
+        # dependencies of their parents
+        leaf_ids = [
+            task_id for task_id in sorted(tasks) if task_id not in children
+        ]
+        dependencies = {}
+        external_ids = set()
+        for leaf_id in leaf_ids:
+            leaf_dependencies = []
+            task_id = leaf_id
+            while task_id is not None:
+                for dependency in tasks[task_id]['dependencies']:
+                    leaf_dependencies.append(dependency)
+                    if dependency[0] not in tasks:
+                        external_ids.add(dependency[0])
+                task_id = tasks[task_id]['parent_id']
+            dependencies[leaf_id] = leaf_dependencies
+
+        results = self._load_external_dates(connection, external_ids)
+
+        waiting = {}
+        dependents = {}
+        for leaf_id in leaf_ids:
+            waiting[leaf_id] = 0
+            for dependency in dependencies[leaf_id]:
+                if dependency[0] in external_ids:
+                    continue
+                for depends_to_id in leaves(dependency[0]):
+                    dependents.setdefault(depends_to_id, []).append(leaf_id)
+                    waiting[leaf_id] += 1
+
+        now_slot = self._to_slot(self.studio.now, ceil=True)
+
+        def earliest_start(leaf_id):
+            """returns the earliest start slot of the given leaf task
+            """
+            task = tasks[leaf_id]
+            slot = now_slot
+            if task['schedule_constraint'] in (1, 3) and task['start']:
+                slot = max(slot, self._to_slot(task['start']))
+
+            for depends_to_id, dependency_target, gap_timing, gap_unit, \
+                    gap_model in dependencies[leaf_id]:
+                if depends_to_id in external_ids:
+                    dates = [results[depends_to_id]] \
+                        if depends_to_id in results else []
+                else:
+                    dates = [results[i] for i in leaves(depends_to_id)]
+                if not dates:
+                    continue
+
+                if dependency_target == 'onstart':
+                    dependency_slot = min(date[0] for date in dates)
+                else:
+                    dependency_slot = max(date[1] for date in dates)
+
+                gap = self._to_slot_count(gap_timing, gap_unit, gap_model)
+                if gap_model == 'duration':
+                    dependency_slot += gap
+                else:
+                    dependency_slot = \
+                        self._skip_working_slots(dependency_slot, gap)
+                slot = max(slot, dependency_slot)
+            return slot
+
+        ready = [
+            (-tasks[leaf_id]['priority'], earliest_start(leaf_id), leaf_id)
+            for leaf_id in leaf_ids if not waiting[leaf_id]
+        ]
+        heapq.heapify(ready)
+
+        load = dict((user_id, 0) for user_id in efficiencies)
+        num_of_scheduled_tasks = 0
+        while ready:
+            if self._is_cancelled:
+                raise RuntimeError('Scheduling is cancelled')
+
+            _, start_slot, leaf_id = heapq.heappop(ready)
+            results[leaf_id] = self._book(
+                tasks[leaf_id], start_slot, efficiencies, busy_slots, load
+            )
+            num_of_scheduled_tasks += 1
+
+            for dependent_id in dependents.get(leaf_id, []):
+                waiting[dependent_id] -= 1
+                if not waiting[dependent_id]:
+                    heapq.heappush(ready, (
+                        -tasks[dependent_id]['priority'],
+                        earliest_start(dependent_id),
+                        dependent_id
+                    ))
+
+        if num_of_scheduled_tasks != len(leaf_ids):
+            raise RuntimeError(
+                'Can not schedule the tasks, there is a circular dependency '
+                'between the tasks with ids: %s' %
+                sorted(leaf_id for leaf_id in leaf_ids if waiting[leaf_id])
+            )
 
-        return projects
+        for task_id in external_ids:
+            del results[task_id]
 
-    @property
-    def projects(self):
-        """getter for the _project attribute
+        return results
+
+    def _book(self, task, start_slot, efficiencies, busy_slots, load):
+        """books the resources of the given task starting from the given slot
+        and returns a (start slot, end slot, resource ids) tuple
+
+        :param dict task: The task data
+        :param int start_slot: The earliest start slot of the task
+        :param dict efficiencies: The user efficiencies
+        :param dict busy_slots: The busy slots of the users, updated in place
+        :param dict load: The number of booked slots of the users, updated in
+          place
         """
-        return self._projects
+        resource_ids = set()
+        if task['is_milestone']:
+            return start_slot, start_slot, resource_ids
+
+        # the existing TimeLogs
+        booked_seconds = 0
+        booked_start = None
+        booked_end = None
+        for resource_id, t_start, t_end in task['time_logs']:
+            delta = t_end - t_start
+            booked_seconds += delta.days * 86400 + delta.seconds
+            resource_ids.add(resource_id)
+            t_start = self._to_slot(t_start)
+            t_end = self._to_slot(t_end, ceil=True)
+            booked_start = t_start if booked_start is None \
+                else min(booked_start, t_start)
+            booked_end = t_end if booked_end is None \
+                else max(booked_end, t_end)
+
+        # every resource can be replaced with one of the alternatives
+        groups = [
+            [resource_id] + [
+                alt_id for alt_id in task['alternative_resources']
+                if alt_id != resource_id
+            ]
+            for resource_id in task['resources']
+        ]
+        persistent = [None] * len(groups)
+        strategy = task['allocation_strategy']
+
+        def book_slot(slot):
+            """books the free resources of the task in the given slot, returns
+            the booked effort as seconds
+            """
+            effort = 0
+            used = set()
+            for i, group in enumerate(groups):
+                candidates = [
+                    resource_id
+                    for resource_id in (
+                        group if persistent[i] is None else [persistent[i]]
+                    )
+                    if resource_id not in used
+                    and efficiencies.get(resource_id)
+                    and slot not in busy_slots[resource_id]
+                ]
+                if not candidates:
+                    continue
+
+                if strategy in ('minallocated', 'minloaded'):
+                    resource_id = min(candidates, key=lambda x: load[x])
+                elif strategy == 'maxloaded':
+                    resource_id = max(candidates, key=lambda x: load[x])
+                else:
+                    resource_id = candidates[0]
+
+                if task['persistent_allocation']:
+                    persistent[i] = resource_id
+                used.add(resource_id)
+                busy_slots[resource_id].add(slot)
+                load[resource_id] += 1
+                resource_ids.add(resource_id)
+                effort += self._resolution * efficiencies[resource_id]
+            return effort
+
+        first_slot = None
+        slot = start_slot
+        if task['schedule_model'] == 'effort' and groups:
+            if not any(efficiencies.get(resource_id)
+                       for group in groups for resource_id in group):
+                raise RuntimeError(
+                    'Can not schedule the Task with id %s, none of its '
+                    'resources has a positive efficiency' % task['id']
+                )
 
-    @projects.setter
-    def projects(self, projects):
-        """setter for the _project attribute
+            from stalker.models.mixins import ScheduleMixin
+            remaining_seconds = ScheduleMixin.to_seconds(
+                task['schedule_timing'], task['schedule_unit'], 'effort'
+            ) - booked_seconds
+            end_slot = start_slot
+            while remaining_seconds > 0:
+                if self._is_working_slot(slot):
+                    effort = book_slot(slot)
+                    if effort:
+                        remaining_seconds -= effort
+                        if first_slot is None:
+                            first_slot = slot
+                        end_slot = slot + 1
+                slot += 1
+        else:
+            if task['schedule_model'] == 'duration':
+                end_slot = start_slot + self._to_slot_count(
+                    task['schedule_timing'], task['schedule_unit'],
+                    'duration'
+                )
+            else:
+                end_slot = self._skip_working_slots(
+                    start_slot,
+                    self._to_slot_count(
+                        task['schedule_timing'], task['schedule_unit'],
+                        'length'
+                    )
+                )
+
+            for slot in range(start_slot, end_slot):
+                if self._is_working_slot(slot):
+                    if first_slot is None:
+                        first_slot = slot
+                    book_slot(slot)
+
+            # duration tasks are in calendar time
+            if task['schedule_model'] == 'duration':
+                first_slot = start_slot
+
+        if first_slot is None:
+            # nothing is booked
+            first_slot = start_slot
+            if booked_start is not None:
+                end_slot = booked_end
+
+        if booked_start is not None:
+            first_slot = min(first_slot, booked_start)
+            end_slot = max(end_slot, booked_end)
+
+        return first_slot, end_slot, resource_ids
+
+    def _store_results(self, connection, tasks, children, results):
+        """stores the computed dates of the leaf tasks, their parents and the
+        projects and the computed resources if :attr:`.compute_resources` is
+        True
+
+        :param connection: A :class:`sqlalchemy.engine.Connection` instance
+        :param dict tasks: The task data returned by :meth:`._load_tasks`
+        :param dict children: The children data returned by
+          :meth:`._load_tasks`
+        :param dict results: The results returned by
+          :meth:`._schedule_tasks`
         """
-        self._projects = self._validate_projects(projects)
+        # update the parents, children first
+        project_results = {}
+        for task_id in sorted(tasks, key=lambda x: -self._depth(tasks, x)):
+            if task_id not in results:
+                continue
+            start_slot, end_slot, resource_ids = results[task_id]
+            task = tasks[task_id]
+            if task['parent_id'] is None:
+                parent_id, container = task['project_id'], project_results
+            else:
+                parent_id, container = task['parent_id'], results
+
+            if parent_id not in container:
+                container[parent_id] = (start_slot, end_slot, set())
+            else:
+                p_start, p_end, p_resource_ids = container[parent_id]
+                container[parent_id] = (
+                    min(p_start, start_slot),
+                    max(p_end, end_slot),
+                    p_resource_ids
+                )
+            container[parent_id][2].update(resource_ids)
+
+        task_ids = sorted(results)
+        num_of_updated_rows = 0
+        for i in range(0, len(task_ids), self.chunk_size):
+            chunk_ids = task_ids[i:i + self.chunk_size]
+            dates = {
+                'Task': dict(
+                    (task_id, (self._to_date(results[task_id][0]),
+                               self._to_date(results[task_id][1])))
+                    for task_id in chunk_ids
+                )
+            }
+            computed_resources = None
+            if self.compute_resources:
+                computed_resources = dict(
+                    (task_id, results[task_id][2]) for task_id in chunk_ids
+                )
+            num_of_updated_rows += self._update_schedule_results(
+                connection, dates, computed_resources
+            )
+
+        num_of_updated_rows += self._update_schedule_results(
+            connection,
+            {
+                'Project': dict(
+                    (project_id, (self._to_date(start_slot),
+                                  self._to_date(end_slot)))
+                    for project_id, (start_slot, end_slot, _)
+                    in project_results.items()
+                )
+            }
+        )
+        logger.debug('number of changed rows: %s' % num_of_updated_rows)
+
+    @classmethod
+    def _depth(cls, tasks, task_id):
+        """returns the depth of the given task
+        """
+        depth = 0
+        parent_id = tasks[task_id]['parent_id']
+        while parent_id is not None:
+            depth += 1
+            parent_id = tasks[parent_id]['parent_id']
+        return depth
+
+
+# SCHEDULE_FINGERPRINTS
+Schedule_Fingerprints = Table(
+    'Schedule_Fingerprints', Base.metadata,
+    Column(
+        'project_id', Integer,
+        ForeignKey('Projects.id', onupdate='CASCADE', ondelete='CASCADE'),
+        primary_key=True
+    ),
+    Column('component', String),
+    Column('fingerprint', String(40), nullable=False),
+    Column('date_updated', DateTime)
+)
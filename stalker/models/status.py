@@ -16,8 +16,8 @@
 # You should have received a copy of the Lesser GNU General Public License
 # along with Stalker.  If not, see <http://www.gnu.org/licenses/>
 
-from sqlalchemy import Table, Column, Integer, ForeignKey
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy import Table, Column, Integer, ForeignKey, event
+from sqlalchemy.orm import relationship, validates, object_session
 
 from stalker.db.session import DBSession
 from stalker.db.declarative import Base
@@ -263,3 +263,139 @@ StatusList_Statuses = Table(
         primary_key=True
     )
 )
+
+
+class StatusRegistry(object):
+    """A session aware cache for :class:`.Status` and :class:`.StatusList`
+    instances.
+
+    The status workflow of :class:`.Task`, :class:`.TimeLog` and
+    :class:`.Review` needs the same handful of :class:`.Status` instances over
+    and over again. Instead of querying them one by one on every call the
+    registry loads all the Statuses (and all the StatusLists) of the current
+    session with one query and serves the lookups from memory::
+
+      >>> from stalker.models.status import status_registry
+      >>> wfd, rts = status_registry.get_statuses('WFD', 'RTS')
+      >>> task_statuses = status_registry.get_status_list('Task')
+
+    The cached data is stored in the ``info`` dictionary of the current
+    :class:`sqlalchemy.orm.Session`, so every session will get its own
+    instances. The cache is invalidated for all the sessions whenever a Status
+    or StatusList instance is inserted, updated or deleted through the ORM.
+    Call :meth:`.invalidate` if the data is altered by other means (like raw
+    SQL queries or from another process).
+    """
+
+    __info_key__ = 'stalker.status_registry'
+
+    def __init__(self):
+        self.version = 0
+
+    def invalidate(self):
+        """invalidates the cached data in all the sessions
+        """
+        self.version += 1
+
+    def _cache(self):
+        """returns the current session and the cache dictionary of it
+        """
+        session = DBSession()
+        cache = session.info.get(self.__info_key__)
+        if cache is None or cache['version'] != self.version:
+            cache = {
+                'version': self.version,
+                'statuses': None,
+                'status_lists': None
+            }
+            session.info[self.__info_key__] = cache
+        return session, cache
+
+    @classmethod
+    def _is_stale(cls, session, items):
+        """returns True if any of the given cached items are not in the given
+        session anymore (the session is closed or rolled back)
+        """
+        for item in items:
+            if item is not None and object_session(item) is not session:
+                return True
+        return False
+
+    def _statuses(self):
+        """returns the code to Status dictionary of the current session
+        """
+        session, cache = self._cache()
+        statuses = cache['statuses']
+        if statuses is None or self._is_stale(session, statuses.values()):
+            statuses = {}
+            with DBSession.no_autoflush:
+                for status in Status.query.order_by(Status.id).all():
+                    # keep the first one as Query.first() does
+                    if status.code not in statuses:
+                        statuses[status.code] = status
+            cache['statuses'] = statuses
+        return statuses
+
+    def _status_lists(self):
+        """returns the target_entity_type to StatusList dictionary of the
+        current session
+        """
+        session, cache = self._cache()
+        status_lists = cache['status_lists']
+        if status_lists is None or \
+           self._is_stale(session, status_lists.values()):
+            status_lists = {}
+            with DBSession.no_autoflush:
+                for status_list in \
+                        StatusList.query.order_by(StatusList.id).all():
+                    status_lists.setdefault(
+                        status_list.target_entity_type, status_list
+                    )
+            cache['status_lists'] = status_lists
+        return status_lists
+
+    def get_status(self, code):
+        """returns the :class:`.Status` with the given code or None if there
+        is no such Status in the database
+
+        :param str code: The code of the desired Status
+        :return: :class:`.Status`
+        """
+        return self._statuses().get(code)
+
+    def get_statuses(self, *codes):
+        """returns a list of :class:`.Status` instances in the same order with
+        the given codes, None is used for unknown codes
+
+        :param codes: The codes of the Statuses
+        :return: list
+        """
+        statuses = self._statuses()
+        return [statuses.get(code) for code in codes]
+
+    def get_status_list(self, target_entity_type):
+        """returns the :class:`.StatusList` for the given target_entity_type or
+        None if there is no such StatusList in the database
+
+        :param target_entity_type: A class or a class name
+        :return: :class:`.StatusList`
+        """
+        if isinstance(target_entity_type, type):
+            target_entity_type = target_entity_type.__name__
+        return self._status_lists().get(target_entity_type)
+
+
+# use this instance
+status_registry = StatusRegistry()
+
+
+def invalidate_status_registry(mapper, connection, target):
+    """invalidates the status_registry whenever a Status or StatusList is
+    changed
+    """
+    status_registry.invalidate()
+
+
+for class_ in [Status, StatusList]:
+    for event_name in ['after_insert', 'after_update', 'after_delete']:
+        event.listen(class_, event_name, invalidate_status_registry)
@@ -16,7 +16,7 @@
 # You should have received a copy of the Lesser GNU General Public License
 # along with Stalker.  If not, see <http://www.gnu.org/licenses/>
 
-from sqlalchemy import Table, Column, Integer, ForeignKey, Text
+from sqlalchemy import Table, Column, Integer, ForeignKey, Text, event
 from sqlalchemy.orm import relationship, validates
 
 from stalker.db.declarative import Base
@@ -154,6 +154,28 @@ class Structure(Entity):
         """
         return super(Structure, self).__hash__()
 
+    def get_template(self, target_entity_type):
+        """returns the first :class:`.FilenameTemplate` in the
+        :attr:`.templates` with the given ``target_entity_type`` or None.
+
+        The templates are indexed by their ``target_entity_type`` on the first
+        call and the index is reused until the :attr:`.templates` are changed
+        or reloaded.
+
+        :param str target_entity_type: The class name that the template is
+          targeting, like "Task", "Asset" or "Version".
+        """
+        templates = self.templates
+        index = getattr(self, '_template_index', None)
+        if index is None or index[0] is not templates:
+            templates_by_type = {}
+            for template in templates:
+                templates_by_type.setdefault(
+                    template.target_entity_type, template
+                )
+            index = self._template_index = (templates, templates_by_type)
+        return index[1].get(target_entity_type)
+
     @validates("custom_template")
     def _validate_custom_template(self, key, custom_template_in):
         """validates the given custom_template value
@@ -196,3 +218,16 @@ Structure_FilenameTemplates = Table(
     Column("filenametemplate_id", Integer, ForeignKey("FilenameTemplates.id"),
            primary_key=True)
 )
+
+
+@event.listens_for(Structure.templates, 'append')
+@event.listens_for(Structure.templates, 'remove')
+def reset_template_index(structure, template, initiator):
+    """Resets the template index of the Structure when a template is added
+    to or removed from its templates.
+
+    :param structure: The Structure instance
+    :param template: The FilenameTemplate instance, not used
+    :param initiator: not used
+    """
+    structure._template_index = None
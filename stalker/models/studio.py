@@ -18,6 +18,7 @@
 
 import copy
 import logging
+import threading
 import time
 import datetime
 from math import ceil
@@ -28,7 +29,8 @@ from sqlalchemy.orm import validates, relationship, synonym, reconstructor
 
 from stalker import db, defaults, log
 from stalker.models.entity import SimpleEntity, Entity
-from stalker.models.mixins import DateRangeMixin, WorkingHoursMixin
+from stalker.models.mixins import (DateRangeMixin, WorkingHoursMixin,
+                                   time_unit_table)
 from stalker.models.schedulers import SchedulerBase
 
 logger = logging.getLogger(__name__)
@@ -60,6 +62,13 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
 
       studio.schedule() # schedules all the active projects at once
 
+      # or schedule them in the background
+      job = studio.schedule_async()
+      job.status()      # 'pending', 'running', 'completed', 'failed' or
+                        # 'cancelled'
+      job.wait(timeout=10)
+      job.cancel()
+
     **Working Hours**
 
     In Stalker, Studio class also manages the working hours of the studio.
@@ -265,6 +274,9 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
             'timing_resolution': defaults.timing_resolution,
         })
 
+        # rebuild the work time unit table if the working hours are changed
+        time_unit_table.update()
+
     @reconstructor
     def __init_on_load__(self):
         """update defaults on load
@@ -397,16 +409,7 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
         :param scheduled_by: A User instance who is doing the scheduling.
         """
         # check the scheduler first
-        if self.scheduler is None or \
-                not isinstance(self.scheduler, SchedulerBase):
-            raise RuntimeError(
-                'There is no scheduler for this %(class)s, please assign a '
-                'scheduler to the %(class)s.scheduler attribute, before '
-                'calling %(class)s.schedule()' %
-                {
-                    'class': self.__class__.__name__
-                }
-            )
+        self._check_scheduler()
 
         with db.DBSession.no_autoflush:
             self.scheduling_started_at = datetime.datetime.now()
@@ -446,6 +449,39 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
         logger.debug('scheduling took %s seconds' % (end - start))
         return result
 
+    def schedule_async(self, scheduled_by=None):
+        """Schedules all the active projects in the studio in a background
+        thread and returns a :class:`.SchedulingJob` instance that can be used
+        to follow or cancel the schedule.
+
+        The schedule runs in a separate database session, so the Studio and
+        all the data to be scheduled should be committed before calling this
+        method. The results are committed by the background thread and the
+        scheduler output is collected in the :attr:`.SchedulingJob.messages`
+        attribute line by line.
+
+        :param scheduled_by: A User instance who is doing the scheduling.
+        :return: :class:`.SchedulingJob`
+        """
+        self._check_scheduler()
+        job = SchedulingJob(self, scheduled_by=scheduled_by)
+        job.start()
+        return job
+
+    def _check_scheduler(self):
+        """checks if there is a scheduler
+        """
+        if self.scheduler is None or \
+                not isinstance(self.scheduler, SchedulerBase):
+            raise RuntimeError(
+                'There is no scheduler for this %(class)s, please assign a '
+                'scheduler to the %(class)s.scheduler attribute, before '
+                'calling %(class)s.schedule()' %
+                {
+                    'class': self.__class__.__name__
+                }
+            )
+
     @property
     def weekly_working_hours(self):
         """returns the WorkingHours.weekly_working_hours
@@ -520,6 +556,170 @@ class Studio(Entity, DateRangeMixin, WorkingHoursMixin):
         return timing_resolution
 
 
+class SchedulingJob(object):
+    """Runs :meth:`.Studio.schedule` in a background thread.
+
+    SchedulingJob instances are created by :meth:`.Studio.schedule_async`, so
+    there is no need to create them directly::
+
+      job = studio.schedule_async(scheduled_by=user)
+
+      job.status()          # returns 'running'
+      job.messages          # the progress lines of the scheduler
+      job.wait(timeout=60)  # waits the schedule to finish and returns the
+                            # status
+      job.cancel()          # cancels the schedule
+
+    The schedule is done in its own database session (``DBSession`` is thread
+    local) which is committed when the schedule is completed and rolled back
+    when it fails or is cancelled. The :attr:`.Studio.is_scheduling`
+    attribute is set to True when the schedule is started.
+
+    :param studio: The :class:`.Studio` instance to be scheduled. A copy of
+      its scheduler (see :meth:`.SchedulerBase.copy`) is used for the
+      schedule, so the :attr:`.Studio.scheduler` is not changed by the job.
+    :param scheduled_by: A :class:`.User` instance who is doing the
+      scheduling.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, studio, scheduled_by=None):
+        self.studio_id = studio.id
+        self.scheduled_by_id = scheduled_by.id if scheduled_by else None
+        # use a copy of the scheduler per job, so the job can set the
+        # projects, the stderr_callback and the studio of its own scheduler
+        self.scheduler = studio.scheduler.copy()
+        self.now = studio.now
+
+        # the projects should be retrieved in the job session
+        self.project_ids = [
+            project.id
+            for project in getattr(self.scheduler, 'projects', None) or []
+        ]
+
+        self.messages = []
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+        self._status = self.PENDING
+        self._is_cancel_requested = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='SchedulingJob-%s' % self.studio_id
+        )
+        self._thread.daemon = True
+
+    def start(self):
+        """starts the job
+        """
+        self._thread.start()
+
+    def status(self):
+        """returns the status of the job, which is one of 'pending',
+        'running', 'completed', 'failed' or 'cancelled'
+        """
+        return self._status
+
+    def wait(self, timeout=None):
+        """waits the job to finish and returns the status of the job
+
+        :param float timeout: The timeout in seconds, the default is None
+          which waits until the job is finished.
+        """
+        self._thread.join(timeout)
+        return self.status()
+
+    def cancel(self):
+        """cancels the job, returns True if the job is cancelled or False if
+        it has already finished
+        """
+        with self._lock:
+            if self._status not in [self.PENDING, self.RUNNING]:
+                return False
+            self._is_cancel_requested = True
+
+        try:
+            self.scheduler.cancel()
+        except NotImplementedError:
+            logger.debug(
+                '%s does not support cancelling, the results will be '
+                'discarded' % self.scheduler.__class__.__name__
+            )
+        return True
+
+    def _run(self):
+        """runs the schedule in the thread local database session
+        """
+        from stalker import Project, User
+
+        with self._lock:
+            if self._is_cancel_requested:
+                self._status = self.CANCELLED
+                return
+            self._status = self.RUNNING
+
+        self.started_at = datetime.datetime.now()
+        studio = None
+        try:
+            studio = Studio.query.get(self.studio_id)
+            studio.now = self.now
+            scheduled_by = None
+            if self.scheduled_by_id:
+                scheduled_by = User.query.get(self.scheduled_by_id)
+
+            if self.project_ids:
+                self.scheduler.projects = Project.query\
+                    .filter(Project.id.in_(self.project_ids)).all()
+
+            if hasattr(self.scheduler, 'stderr_callback'):
+                self.scheduler.stderr_callback = self.messages.append
+
+            studio.scheduler = self.scheduler
+            studio.is_scheduling = True
+            studio.is_scheduling_by = scheduled_by
+            db.DBSession.commit()
+
+            self.result = studio.schedule(scheduled_by=scheduled_by)
+            if self._is_cancel_requested:
+                raise RuntimeError('Scheduling is cancelled')
+            db.DBSession.commit()
+            self._status = self.COMPLETED
+        except Exception as e:
+            logger.debug('scheduling failed: %s' % e)
+            self.error = e
+            db.DBSession.rollback()
+            self._store_error(e)
+            if self._is_cancel_requested:
+                self._status = self.CANCELLED
+            else:
+                self._status = self.FAILED
+        finally:
+            self.finished_at = datetime.datetime.now()
+            db.DBSession.remove()
+
+    def _store_error(self, error):
+        """stores the given error as the last schedule message of the studio
+        """
+        try:
+            studio = Studio.query.get(self.studio_id)
+            if studio:
+                studio.is_scheduling = False
+                studio.is_scheduling_by = None
+                studio.last_schedule_message = str(error)
+                db.DBSession.commit()
+        except Exception as e:
+            logger.debug('could not store the schedule error: %s' % e)
+            db.DBSession.rollback()
+
+
 class WorkingHours(object):
     """A helper class to manage Studio working hours.
 
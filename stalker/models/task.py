@@ -16,15 +16,17 @@
 # You should have received a copy of the Lesser GNU General Public License
 # along with Stalker.  If not, see <http://www.gnu.org/licenses/>
 
+import collections
 import datetime
 import logging
 import os
 
 from sqlalchemy import (Table, Column, Integer, ForeignKey, Boolean, Enum,
-                        DateTime, Float, event)
+                        DateTime, Float, Index, event)
 from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.associationproxy import association_proxy
-from sqlalchemy.orm import relationship, validates, synonym, reconstructor
+from sqlalchemy.orm import (relationship, validates, synonym, reconstructor,
+                            object_session, Session)
 
 from stalker import defaults
 from stalker.db.session import DBSession
@@ -34,7 +36,7 @@ from stalker.models.entity import Entity
 from stalker.models.auth import User
 from stalker.models.mixins import (DateRangeMixin, StatusMixin, ReferenceMixin,
                                    ScheduleMixin, DAGMixin)
-from stalker.models.status import Status
+from stalker.models.status import status_registry
 from stalker.exceptions import (OverBookedError, CircularDependencyError,
                                 StatusError, DependencyViolationError)
 from stalker.log import logging_level
@@ -49,6 +51,75 @@ CONSTRAIN_START = 1
 CONSTRAIN_END = 2
 CONSTRAIN_BOTH = 3
 
+# Task Status Workflow statuses as bits
+#
+#   +--------- WFD
+#   |+-------- RTS
+#   ||+------- WIP
+#   |||+------ PREV
+#   ||||+----- HREV
+#   |||||+---- DREV
+#   ||||||+--- OH
+#   |||||||+-- STOP
+#   ||||||||+- CMPL
+#   |||||||||
+# 0b000000000
+BINARY_STATUS_CODES = {
+    'WFD':  256,
+    'RTS':  128,
+    'WIP':  64,
+    'PREV': 32,
+    'HREV': 16,
+    'DREV': 8,
+    'OH':   4,
+    'STOP': 2,
+    'CMPL': 1
+}
+
+#
+# I know that the following list seems cryptic but the it shows the
+# final status index in parent_statuses_lut[] list in
+# Task.update_status_with_children_statuses().
+#
+# So by using the cumulative statuses of children we got an index from
+# the following table, and use the found element (integer) as the index
+# for the parent_statuses_lut[] list, and we find the desired status
+#
+# We are doing it in this way for a couple of reasons:
+#
+#   1. We shouldn't hold the statuses in the following list,
+#   2. Using a dictionary is another alternative, where the keys are
+#      the cumulative binary status codes, but at the end the result of
+#      this cumulative thing is a number between 0-511 so no need to
+#      use a dictionary with integer keys
+#
+CHILDREN_TO_PARENT_STATUSES_LUT = [
+    0, 3, 3, 3, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 1, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 0, 2, 0, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
+    2, 2, 2, 2, 2, 2
+]
+
 
 class TimeLog(Entity, DateRangeMixin):
     """Holds information about the uninterrupted time spent on a specific
@@ -85,6 +156,11 @@ class TimeLog(Entity, DateRangeMixin):
     """
     __auto_name__ = True
     __tablename__ = "TimeLogs"
+    __table_args__ = (
+        Index('ix_TimeLogs_resource_id_start_end', 'resource_id', 'start',
+              'end'),
+        {"extend_existing": True}
+    )
     __mapper_args__ = {"polymorphic_identity": "TimeLog"}
 
     time_log_id = Column("id", Integer, ForeignKey("Entities.id"),
@@ -152,15 +228,11 @@ class TimeLog(Entity, DateRangeMixin):
         # check status
         logger.debug('checking task status!')
         with DBSession.no_autoflush:
-            WFD = Status.query.filter_by(code='WFD').first()
-            RTS = Status.query.filter_by(code='RTS').first()
-            WIP = Status.query.filter_by(code='WIP').first()
-            PREV = Status.query.filter_by(code='PREV').first()
-            HREV = Status.query.filter_by(code='HREV').first()
-            DREV = Status.query.filter_by(code='DREV').first()
-            OH = Status.query.filter_by(code='OH').first()
-            STOP = Status.query.filter_by(code='STOP').first()
-            CMPL = Status.query.filter_by(code='CMPL').first()
+            WFD, RTS, WIP, PREV, HREV, DREV, OH, STOP, CMPL = \
+                status_registry.get_statuses(
+                    'WFD', 'RTS', 'WIP', 'PREV', 'HREV', 'DREV', 'OH',
+                    'STOP', 'CMPL'
+                )
 
             if task.status in [WFD, OH, STOP, CMPL]:
                 raise StatusError(
@@ -229,25 +301,384 @@ class TimeLog(Entity, DateRangeMixin):
 
         # check for overbooking
         with DBSession.no_autoflush:
-            # TODO: use other logging levels not just DEBUG
-            # logger.debug('resource.time_logs: %s' % resource.time_logs)
+            time_log = self._find_overlapping_time_log(resource)
+
+        if time_log is not None:
+            raise OverBookedError(
+                "The resource %s is overly booked with %s and %s" %
+                (resource, self, time_log),
+            )
+        return resource
+
+    def _find_overlapping_time_log(self, resource):
+        """Returns a TimeLog of the given resource that is overlapping with
+        this TimeLog or None if there is none.
+
+        The flushed TimeLogs of the resource are checked with a range query
+        on the ``(resource_id, start, end)`` index of the TimeLogs table
+        without loading the ``time_logs`` collection of the resource, and only
+        the TimeLogs that are not flushed yet or changed in the session are
+        checked in memory.
+        """
+        if self.start is None or self.end is None:
+            return None
+
+        def overlaps(time_log):
+            return time_log is not self \
+                and time_log.start is not None and time_log.end is not None \
+                and time_log.start < self.end and time_log.end > self.start
+
+        from sqlalchemy import inspect
+        resource_state = inspect(resource)
+        if not resource_state.has_identity:
+            # the resource is not in the database yet, so all of its TimeLogs
+            # are in memory
             for time_log in resource.time_logs:
-                # logger.debug('time_log       : %s' % time_log)
-                # logger.debug('time_log.start : %s' % time_log.start)
-                # logger.debug('time_log.end   : %s' % time_log.end)
-                # logger.debug('self.start     : %s' % self.start)
-                # logger.debug('self.end       : %s' % self.end)
-
-                if time_log != self:
-                    if time_log.start == self.start or \
-                       time_log.end == self.end or \
-                       time_log.start < self.end < time_log.end or \
-                       time_log.start < self.start < time_log.end:
-                        raise OverBookedError(
-                            "The resource %s is overly booked with %s and %s" %
-                            (resource, self, time_log),
+                if overlaps(time_log):
+                    return time_log
+            return None
+
+        session = resource_state.session or DBSession
+
+        # the TimeLogs that are not flushed yet or changed in the session
+        excluded_ids = []
+        if self.id is not None:
+            excluded_ids.append(self.id)
+
+        in_memory = []
+        for time_log in list(session.new) + list(session.dirty):
+            if isinstance(time_log, TimeLog):
+                if time_log.id is not None:
+                    excluded_ids.append(time_log.id)
+                if time_log.resource is resource:
+                    in_memory.append(time_log)
+
+        for time_log in session.deleted:
+            if isinstance(time_log, TimeLog) and time_log.id is not None:
+                excluded_ids.append(time_log.id)
+
+        # TimeLogs that are appended to an already loaded collection but not
+        # added to the session
+        if 'time_logs' in resource_state.dict:
+            in_memory.extend(
+                time_log for time_log in resource.time_logs
+                if not inspect(time_log).has_identity
+            )
+
+        for time_log in in_memory:
+            if overlaps(time_log):
+                return time_log
+
+        table = TimeLog.__table__
+        query = session.query(TimeLog).autoflush(False)\
+            .filter(table.c.resource_id == resource.id)\
+            .filter(table.c.start < self.end)\
+            .filter(table.c.end > self.start)
+        if excluded_ids:
+            query = query.filter(~table.c.id.in_(excluded_ids))
+
+        return query.first()
+
+    @classmethod
+    def bulk_import(cls, rows, chunk_size=500):
+        """Creates many TimeLogs at once and returns the created TimeLogs in
+        the given order.
+
+        Creating TimeLogs one by one checks the overbooking of the resource by
+        iterating over all of the TimeLogs of the resource and updates the
+        status and the ``total_logged_seconds`` of the task and all of its
+        parents for every single TimeLog. This method instead:
+
+        * checks the task statuses and dependencies once per task,
+        * queries the existing TimeLogs of the resources in the date range of
+          the given rows with one query per chunk of resources and checks the
+          overlaps of the existing and new TimeLogs of each resource by
+          sorting them by their start dates (so overlapping TimeLogs in the
+          imported rows are also detected),
+        * inserts the TimeLogs with one ``executemany`` call per table,
+        * updates the status of each task and the ``total_logged_seconds`` and
+          the statuses of the parent tasks once.
+
+        Nothing is inserted if any of the rows is not valid::
+
+          >>> time_logs = TimeLog.bulk_import([
+          ...     {'task': task1, 'resource': user1,
+          ...      'start': datetime.datetime(2016, 4, 18, 10, 0),
+          ...      'end': datetime.datetime(2016, 4, 18, 13, 0)},
+          ...     {'task': task2, 'resource': user1,
+          ...      'start': datetime.datetime(2016, 4, 18, 14, 0),
+          ...      'end': datetime.datetime(2016, 4, 18, 18, 0)},
+          ... ])
+
+        :param rows: A list of dictionaries with ``task``, ``resource``,
+          ``start``, ``end`` keys and the optional ``duration``, ``name``,
+          ``description`` and ``created_by`` keys.
+        :param int chunk_size: The max number of rows in one executemany call
+          or ids in one IN clause.
+        :return: list of :class:`.TimeLog` instances
+        """
+        from sqlalchemy import select
+        from sqlalchemy.orm import selectinload
+        import stalker
+        from stalker.models.entity import Entity
+
+        # an uninitialized TimeLog instance which is only used to run the
+        # TimeLog validators on the given values
+        v = cls.__new__(cls)
+
+        rows = list(rows)
+        if not rows:
+            return []
+
+        # validate the values
+        values = []
+        for row in rows:
+            task = row.get('task')
+            if not isinstance(task, Task):
+                raise TypeError(
+                    "%s.task should be an instance of "
+                    "stalker.models.task.Task not %s" %
+                    (cls.__name__, task.__class__.__name__)
+                )
+
+            resource = row.get('resource')
+            if resource is None:
+                raise TypeError("%s.resource can not be None" % cls.__name__)
+
+            if not isinstance(resource, User):
+                raise TypeError(
+                    "%s.resource should be a stalker.models.auth.User "
+                    "instance not %s" %
+                    (cls.__name__, resource.__class__.__name__)
+                )
+
+            start, end, duration = v._validate_dates(
+                row.get('start'), row.get('end'), row.get('duration')
+            )
+            values.append({
+                'task': task,
+                'resource': resource,
+                'start': start,
+                'end': end,
+                'duration': duration,
+                'name': v._validate_name('name', row.get('name')),
+                'description':
+                    v._validate_description('description',
+                                            row.get('description')),
+                'created_by':
+                    v._validate_created_by('created_by',
+                                           row.get('created_by'))
+            })
+
+        # flush the pending changes, so the existing TimeLogs are all in the
+        # database
+        DBSession.flush()
+        connection = DBSession.connection()
+
+        tasks = []
+        task_starts = {}
+        for value in values:
+            task = value['task']
+            if id(task) not in task_starts:
+                tasks.append(task)
+                task_starts[id(task)] = value['start']
+            else:
+                task_starts[id(task)] = \
+                    min(task_starts[id(task)], value['start'])
+
+        # check the tasks
+        WFD, RTS, WIP, HREV, OH, STOP, CMPL = \
+            status_registry.get_statuses(
+                'WFD', 'RTS', 'WIP', 'HREV', 'OH', 'STOP', 'CMPL'
+            )
+        with DBSession.no_autoflush:
+            StatusPropagator._load(
+                tasks,
+                ['children', 'task_depends_to'],
+                selectinload(Task.children),
+                selectinload(Task.task_depends_to)
+                .joinedload(TaskDependency.depends_to)
+            )
+            for task in tasks:
+                if task.is_container:
+                    raise ValueError(
+                        '%(task)s (id: %(id)s) is a container task, and it is '
+                        'not allowed to create TimeLogs for a container '
+                        'task' % {
+                            'task': task.name,
+                            'id': task.id
+                        }
+                    )
+
+                if task.status in [WFD, OH, STOP, CMPL]:
+                    raise StatusError(
+                        '%(task)s is a %(status)s task, and it is not allowed '
+                        'to create TimeLogs for a %(status)s task, please '
+                        'supply a RTS, WIP, HREV or DREV task!' % {
+                            'task': task.name,
+                            'status': task.status.code
+                        }
+                    )
+
+                # the earliest TimeLog is checked against the dependencies
+                start = task_starts[id(task)]
+                for task_dependency in task.task_depends_to:
+                    dep_task = task_dependency.depends_to
+                    violation_date = None
+                    if task_dependency.dependency_target == 'onend':
+                        if start < dep_task.end:
+                            violation_date = dep_task.end
+                    elif task_dependency.dependency_target == 'onstart':
+                        if start < dep_task.start:
+                            violation_date = dep_task.start
+
+                    if violation_date is not None:
+                        raise DependencyViolationError(
+                            'It is not possible to create a TimeLog before '
+                            '%s, which violates the dependency relation of '
+                            '"%s" to "%s"' % (
+                                violation_date,
+                                task.name,
+                                dep_task.name,
+                            )
                         )
-        return resource
+
+        # check overbooking
+        intervals = collections.defaultdict(list)
+        resources = {}
+        for value in values:
+            resource = value['resource']
+            resources[resource.id] = resource
+            intervals[resource.id].append(
+                (value['start'], value['end'], value)
+            )
+
+        table = cls.__table__
+        resource_ids = sorted(resources)
+        for chunk_ids in __chunks__(resource_ids, chunk_size):
+            min_start = min(
+                start for id_ in chunk_ids for start, _, _ in intervals[id_]
+            )
+            max_end = max(
+                end for id_ in chunk_ids for _, end, _ in intervals[id_]
+            )
+            for resource_id, time_log_id, start, end in connection.execute(
+                    select([table.c.resource_id, table.c.id,
+                            table.c.start, table.c.end])
+                    .where(table.c.resource_id.in_(chunk_ids))
+                    .where(table.c.start < max_end)
+                    .where(table.c.end > min_start)):
+                intervals[resource_id].append((start, end, time_log_id))
+
+        def describe(interval):
+            """returns a string representation of the given interval"""
+            start, end, value = interval
+            if isinstance(value, dict):
+                return '<new TimeLog of %s (%s - %s)>' % \
+                    (value['task'].name, start, end)
+            return '<TimeLog (id: %s) (%s - %s)>' % (value, start, end)
+
+        for resource_id in resource_ids:
+            resource_intervals = sorted(
+                intervals[resource_id], key=lambda x: (x[0], x[1])
+            )
+            latest = resource_intervals[0]
+            for interval in resource_intervals[1:]:
+                if interval[0] < latest[1]:
+                    raise OverBookedError(
+                        "The resource %s is overly booked with %s and %s" %
+                        (resources[resource_id], describe(latest),
+                         describe(interval))
+                    )
+                if interval[1] > latest[1]:
+                    latest = interval
+
+        # insert
+        now = datetime.datetime.now()
+        ids = __insert_simple_entities__(connection, [
+            {
+                'entity_type': 'TimeLog',
+                'name': value['name'],
+                'description': value['description'],
+                'created_by_id':
+                    value['created_by'].id if value['created_by'] else None,
+                'updated_by_id':
+                    value['created_by'].id if value['created_by'] else None,
+                'date_created': now,
+                'date_updated': now,
+                'generic_text': '',
+                'html_style': '',
+                'html_class': '',
+                'stalker_version': stalker.__version__
+            }
+            for value in values
+        ], chunk_size)
+        for chunk in __chunks__([{'id': id_} for id_ in ids], chunk_size):
+            connection.execute(Entity.__table__.insert(), chunk)
+        for chunk in __chunks__([
+                {
+                    'id': id_,
+                    'task_id': value['task'].id,
+                    'resource_id': value['resource'].id,
+                    'start': value['start'],
+                    'end': value['end'],
+                    'duration': value['duration']
+                }
+                for id_, value in zip(ids, values)], chunk_size):
+            connection.execute(table.insert(), chunk)
+
+        # update the tasks and their parents once
+        logged_seconds = collections.defaultdict(int)
+        for value in values:
+            duration = value['end'] - value['start']
+            logged_seconds[value['task'].id] += \
+                duration.days * 86400 + duration.seconds
+
+        ancestor_seconds = collections.defaultdict(int)
+        for chunk_ids in __chunks__(sorted(logged_seconds), chunk_size):
+            for ancestor_id, descendant_id in connection.execute(
+                    select([Task_Closure.c.ancestor_id,
+                            Task_Closure.c.descendant_id])
+                    .where(Task_Closure.c.descendant_id.in_(chunk_ids))
+                    .where(Task_Closure.c.depth > 0)):
+                ancestor_seconds[ancestor_id] += logged_seconds[descendant_id]
+
+        with DBSession.no_autoflush:
+            parents = []
+            for chunk_ids in __chunks__(sorted(ancestor_seconds), chunk_size):
+                parents.extend(
+                    Task.query.filter(Task.id.in_(chunk_ids)).all()
+                )
+            for parent in parents:
+                if parent._total_logged_seconds is not None:
+                    parent._total_logged_seconds += ancestor_seconds[parent.id]
+
+            for task in tasks:
+                DBSession.expire(task, ['time_logs'])
+                if task.status in [RTS, HREV]:
+                    task.status = WIP
+            for resource in resources.values():
+                DBSession.expire(resource, ['time_logs'])
+
+            StatusPropagator(
+                [task.parent for task in tasks if task.parent is not None]
+            ).propagate()
+        DBSession.flush()
+
+        # the TimeLogs are inserted without the session, so update the
+        # projects
+        ProgressRollup(DBSession).update_projects(
+            set(task.project_id for task in tasks)
+        )
+
+        # load the created TimeLogs
+        time_logs_by_id = {}
+        with DBSession.no_autoflush:
+            for chunk in __chunks__(ids, chunk_size):
+                for time_log in \
+                        cls.query.filter(cls.time_log_id.in_(chunk)).all():
+                    time_logs_by_id[time_log.id] = time_log
+        return [time_logs_by_id[id_] for id_ in ids]
 
     def __eq__(self, other):
         """equality of TimeLog instances
@@ -1124,8 +1555,7 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         self.is_milestone = is_milestone
 
         # update the status
-        with DBSession.no_autoflush:
-            wfd = Status.query.filter_by(code='WFD').first()
+        wfd = status_registry.get_status('WFD')
         self.status = wfd
 
         if depends is None:
@@ -1191,6 +1621,42 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         """
         return super(Task, self).__hash__()
 
+    @classmethod
+    def bulk_create(cls, specs, project=None, created_by=None):
+        """Creates many tasks at once with a :class:`.TaskBatch` and returns
+        the created tasks in the given order::
+
+          >>> shot_task = {'name': 'SH010', 'parent': shots_task}
+          >>> tasks = Task.bulk_create([
+          ...     shot_task,
+          ...     {'name': 'Anim', 'parent': shot_task, 'resources': [user1]},
+          ...     {'name': 'Comp', 'parent': shot_task, 'resources': [user2]},
+          ... ], project=project)
+
+        :param specs: A list of dictionaries holding the arguments of each
+          task, see :meth:`.TaskBatch.add` for the supported arguments. The
+          ``parent`` can be an existing :class:`.Task` or one of the
+          dictionaries that comes before it in the list.
+        :param project: The default :class:`.Project` of the tasks.
+        :param created_by: The default :class:`.User` who creates the tasks.
+        :return: list of :class:`.Task` instances
+        """
+        if cls is not Task:
+            raise NotImplementedError(
+                '%s.bulk_create() is not implemented, only plain Tasks can be '
+                'created in bulk' % cls.__name__
+            )
+
+        batch = TaskBatch(project=project, created_by=created_by)
+        handles = {}
+        for spec in specs:
+            kwargs = dict(spec)
+            parent = kwargs.get('parent')
+            if isinstance(parent, dict):
+                kwargs['parent'] = handles.get(id(parent), parent)
+            handles[id(spec)] = batch.add(**kwargs)
+        return batch.create()
+
     @validates("time_logs")
     def _validate_time_logs(self, key, time_log):
         """validates the given time_logs value
@@ -1239,15 +1705,11 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
 
         # check the status of the current task
         with DBSession.no_autoflush:
-            wfd = Status.query.filter_by(code='WFD').first()
-            rts = Status.query.filter_by(code='RTS').first()
-            wip = Status.query.filter_by(code='WIP').first()
-            prev = Status.query.filter_by(code='PREV').first()
-            hrev = Status.query.filter_by(code='HREV').first()
-            drev = Status.query.filter_by(code='DREV').first()
-            oh = Status.query.filter_by(code='OH').first()
-            stop = Status.query.filter_by(code='STOP').first()
-            cmpl = Status.query.filter_by(code='CMPL').first()
+            wfd, rts, wip, prev, hrev, drev, oh, stop, cmpl = \
+                status_registry.get_statuses(
+                    'WFD', 'RTS', 'WIP', 'PREV', 'HREV', 'DREV', 'OH',
+                    'STOP', 'CMPL'
+                )
 
             if self.status in [wip, prev, hrev, drev, oh, stop, cmpl]:
                 raise StatusError(
@@ -1274,20 +1736,24 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
 
         # check for the circular dependency
         with DBSession.no_autoflush:
-            check_circular_dependency(depends, self, 'depends')
-            check_circular_dependency(depends, self, 'children')
-
-        # check for circular dependency toward the parent, non of the parents
-        # should be depending to the given depends_to_task
-        with DBSession.no_autoflush:
-            parent = self.parent
-            while parent:
-                if parent in depends.depends:
-                    raise CircularDependencyError(
-                        'One of the parents of %s is depending to %s' %
-                        (self, depends)
-                    )
-                parent = parent.parent
+            if self._dependency_graph_is_flushed(
+                    depends, ignore_own_dependencies=True):
+                # do all the checks with one query
+                self._check_circular_dependency_in_db(depends)
+            else:
+                check_circular_dependency(depends, self, 'depends')
+                check_circular_dependency(depends, self, 'children')
+
+                # check for circular dependency toward the parent, non of the
+                # parents should be depending to the given depends_to_task
+                parent = self.parent
+                while parent:
+                    if parent in depends.depends:
+                        raise CircularDependencyError(
+                            'One of the parents of %s is depending to %s' %
+                            (self, depends)
+                        )
+                    parent = parent.parent
 
         # update status with the new dependency
         # update towards more constrained situation
@@ -1404,10 +1870,13 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
                     (self.__class__.__name__, parent.__class__.__name__)
                 )
 
-            #with DBSession.no_autoflush:
             # check for cycle
-            check_circular_dependency(self, parent, 'children')
-            check_circular_dependency(self, parent, 'depends')
+            if self._dependency_graph_is_flushed(parent):
+                with DBSession.no_autoflush:
+                    self._check_parent_circular_dependency_in_db(parent)
+            else:
+                check_circular_dependency(self, parent, 'children')
+                check_circular_dependency(self, parent, 'depends')
 
         old_parent = self.parent
         new_parent = parent
@@ -1812,12 +2281,11 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
     def tjp_abs_id(self):
         """returns the calculated absolute id of this task
         """
-        if self.parent:
-            abs_id = self.parent.tjp_abs_id
-        else:
-            abs_id = self.project.tjp_id
-
-        return '%s.%s' % (abs_id, self.tjp_id)
+        return '.'.join(
+            [self.project.tjp_id] +
+            [parent.tjp_id for parent in self.parents] +
+            [self.tjp_id]
+        )
 
     @property
     def to_tjp(self):
@@ -1834,12 +2302,264 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         be useless when Stalker has its own implementation of a proper Gantt
         Chart. Write now it is used by the jQueryGantt.
         """
-        i = 0
-        current = self
-        while current:
-            i += 1
-            current = current.parent
-        return i
+        return self.depth + 1
+
+    @property
+    def depth(self):
+        """Returns the number of parents of this task, it is 0 for root tasks.
+
+        The already loaded parents are counted in memory and the rest is
+        counted with a single query over the ``Task_Closure`` table.
+        """
+        loaded_parents, task = self._loaded_parents()
+        depth = len(loaded_parents)
+        if task is not None:
+            from sqlalchemy import func, select
+            depth += object_session(self).connection().execute(
+                select([func.max(Task_Closure.c.depth)])
+                .where(Task_Closure.c.descendant_id == task.id)
+            ).scalar() or 0
+        return depth
+
+    @property
+    def parents(self):
+        """Returns all of the parents of this task starting from the root.
+
+        The already loaded parents are used as they are and the rest is
+        retrieved with a single query over the ``Task_Closure`` table, so
+        building the parent list of a deeply nested task doesn't need one
+        query per level.
+        """
+        return self.ancestors()
+
+    def ancestors(self):
+        """Returns all of the parents of this task starting from the root, it
+        is the same with :attr:`.parents`.
+        """
+        parents, task = self._loaded_parents()
+        if task is not None:
+            from sqlalchemy import inspect
+            from sqlalchemy.orm.attributes import set_committed_value
+            with object_session(self).no_autoflush:
+                queried_parents = task.ancestors_query()\
+                    .order_by(Task_Closure.c.depth).all()
+            # also fill the parent attributes so the next walk will not need
+            # a query
+            for child, parent in zip([task] + queried_parents,
+                                     queried_parents):
+                if 'parent' not in inspect(child).dict:
+                    set_committed_value(child, 'parent', parent)
+            parents.extend(queried_parents)
+        parents.reverse()
+        return parents
+
+    def ancestors_query(self):
+        """Returns a query of all the parents of this task that is using the
+        ``Task_Closure`` table. The task should be flushed to the database.
+        """
+        return object_session(self).query(Task)\
+            .join(Task_Closure, Task_Closure.c.ancestor_id == Task.id)\
+            .filter(Task_Closure.c.descendant_id == self.id)\
+            .filter(Task_Closure.c.depth > 0)
+
+    def descendants(self):
+        """Returns all of the children and grand children of this task in
+        breadth first order.
+
+        A single query over the ``Task_Closure`` table is used if the
+        hierarchy is flushed to the database, otherwise the hierarchy is
+        walked in memory.
+        """
+        if not self._hierarchy_index_is_usable():
+            return list(self.walk_hierarchy(method=1))[1:]
+
+        with object_session(self).no_autoflush:
+            return self.descendants_query()\
+                .order_by(Task_Closure.c.depth, Task.id).all()
+
+    def descendants_query(self):
+        """Returns a query of all the children and grand children of this task
+        that is using the ``Task_Closure`` table, so it can be further
+        filtered to query a whole sub tree at once::
+
+          wip_tasks = task.descendants_query()\\
+              .filter(Task.status == status_wip).all()
+
+        The task should be flushed to the database.
+        """
+        return object_session(self).query(Task)\
+            .join(Task_Closure, Task_Closure.c.descendant_id == Task.id)\
+            .filter(Task_Closure.c.ancestor_id == self.id)\
+            .filter(Task_Closure.c.depth > 0)
+
+    def _loaded_parents(self):
+        """Walks up the parents of this task as long as they are loaded.
+
+        Returns the list of the walked parents starting from the direct parent
+        and the last walked task if its parent is not loaded and can be queried
+        from the ``Task_Closure`` table, or None if all the parents are walked.
+        """
+        from sqlalchemy import inspect
+        from sqlalchemy.orm.attributes import set_committed_value
+        parents = []
+        task = self
+        is_usable = None
+        while True:
+            if 'parent' not in inspect(task).dict:
+                if task.parent_id is None:
+                    # do not let the lazy loader query for a None parent
+                    set_committed_value(task, 'parent', None)
+                    return parents, None
+                if is_usable is None:
+                    is_usable = task._hierarchy_index_is_usable()
+                if is_usable:
+                    return parents, task
+            task = task.parent
+            if task is None:
+                return parents, None
+            parents.append(task)
+
+    def _hierarchy_index_is_usable(self):
+        """Returns True if the ``Task_Closure`` table is up to date for this
+        task, that is the task is flushed and there are no unflushed parent
+        changes in its session.
+
+        The parent changes are tracked with the ``parent`` and ``parent_id``
+        set events, so the session is not scanned.
+        """
+        session = object_session(self)
+        if session is None or self.id is None:
+            return False
+        return not __parents_are_changed__(session)
+
+    def _dependency_graph_is_flushed(self, task, ignore_own_dependencies=False):
+        """Returns True if the dependencies and the hierarchy of the tasks in
+        the session of this task are flushed to the database, so the circular
+        dependency checks between this task and the given task can be done
+        with SQL.
+
+        :param task: The other :class:`.Task` instance.
+        :param bool ignore_own_dependencies: Ignore the unflushed dependency
+          changes of this task, they do not change the result of the checks
+          done in :meth:`._check_circular_dependency_in_db`.
+        """
+        from sqlalchemy import inspect
+
+        session = object_session(self)
+        if session is None or object_session(task) is not session \
+           or self.id is None or task.id is None \
+           or not self._hierarchy_index_is_usable():
+            return False
+
+        for obj in session.new:
+            if isinstance(obj, TaskDependency) and obj.task is not None \
+               and not (ignore_own_dependencies and obj.task is self):
+                return False
+
+        for obj in session.deleted:
+            if isinstance(obj, TaskDependency):
+                return False
+
+        for obj in session.dirty:
+            if isinstance(obj, TaskDependency):
+                return False
+            if isinstance(obj, Task) \
+               and not (ignore_own_dependencies and obj is self) \
+               and inspect(obj).attrs.task_depends_to.history.has_changes():
+                return False
+
+        return True
+
+    @classmethod
+    def _reachable_dependencies(cls, task_id):
+        """Returns a recursive CTE of the ids of the given task and all the
+        tasks that it is depending on directly or indirectly.
+
+        :param int task_id: The id of the task.
+        """
+        from sqlalchemy import select
+        tasks = Task.__table__
+        task_dependencies = TaskDependency.__table__
+
+        reachable = select([tasks.c.id])\
+            .where(tasks.c.id == task_id)\
+            .cte('reachable_dependencies', recursive=True)
+        # UNION (not UNION ALL) to stop on cycles
+        return reachable.union(
+            select([task_dependencies.c.depends_to_id])
+            .where(task_dependencies.c.task_id == reachable.c.id)
+        )
+
+    def _check_circular_dependency_in_db(self, depends):
+        """Does the circular dependency checks of adding the given task as a
+        dependency of this task with a single query.
+
+        :param depends: The :class:`.Task` instance that this task will depend
+          on.
+        """
+        from sqlalchemy import select, exists
+        from stalker.models import circular_dependency_error
+        task_dependencies = TaskDependency.__table__
+        reachable = self._reachable_dependencies(depends.id)
+
+        depends_cycle, children_cycle, parent_cycle = \
+            object_session(self).connection().execute(
+                select([
+                    # this task is one of the dependencies of depends
+                    exists().where(reachable.c.id == self.id),
+                    # this task is one of the children of depends
+                    exists()
+                    .where(Task_Closure.c.ancestor_id == depends.id)
+                    .where(Task_Closure.c.descendant_id == self.id),
+                    # depends is depending on one of the parents of this task
+                    exists()
+                    .where(task_dependencies.c.task_id == depends.id)
+                    .where(
+                        task_dependencies.c.depends_to_id.in_(
+                            select([Task_Closure.c.ancestor_id])
+                            .where(Task_Closure.c.descendant_id == self.id)
+                            .where(Task_Closure.c.depth > 0)
+                        )
+                    )
+                ])
+            ).first()
+
+        if depends_cycle:
+            raise circular_dependency_error(depends, self, 'depends')
+        if children_cycle:
+            raise circular_dependency_error(depends, self, 'children')
+        if parent_cycle:
+            raise CircularDependencyError(
+                'One of the parents of %s is depending to %s' %
+                (self, depends)
+            )
+
+    def _check_parent_circular_dependency_in_db(self, parent):
+        """Does the circular dependency checks of setting the parent of this
+        task to the given task with a single query.
+
+        :param parent: The new parent :class:`.Task` instance.
+        """
+        from sqlalchemy import select, exists
+        from stalker.models import circular_dependency_error
+        reachable = self._reachable_dependencies(self.id)
+
+        children_cycle, depends_cycle = \
+            object_session(self).connection().execute(
+                select([
+                    # the parent is this task or one of its children
+                    exists()
+                    .where(Task_Closure.c.ancestor_id == self.id)
+                    .where(Task_Closure.c.descendant_id == parent.id),
+                    # this task is depending on the parent
+                    exists().where(reachable.c.id == parent.id),
+                ])
+            ).first()
+
+        if children_cycle:
+            raise circular_dependency_error(self, parent, 'children')
+        if depends_cycle:
+            raise circular_dependency_error(self, parent, 'depends')
 
     @property
     def is_scheduled(self):
@@ -2064,8 +2784,8 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         """returns the open tickets referencing this task in their links
         attribute
         """
-        from stalker import Ticket, Status
-        status_closed = Status.query.filter(Status.name == 'Closed').first()
+        from stalker import Ticket
+        status_closed = status_registry.get_status('CLS')
         return Ticket.query\
             .filter(Ticket.links.contains(self))\
             .filter(Ticket.status != status_closed).all()
@@ -2113,9 +2833,7 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         Only applicable to leaf tasks.
         """
         # check task status
-        with DBSession.no_autoflush:
-            wip = Status.query.filter_by(code='WIP').first()
-            prev = Status.query.filter_by(code='PREV').first()
+        wip, prev = status_registry.get_statuses('WIP', 'PREV')
 
         if self.status != wip:
             raise StatusError(
@@ -2167,9 +2885,7 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         :type reviewer: class:`.User`
         """
         # check status
-        with DBSession.no_autoflush:
-            prev = Status.query.filter_by(code='PREV').first()
-            cmpl = Status.query.filter_by(code='CMPL').first()
+        prev, cmpl = status_registry.get_statuses('PREV', 'CMPL')
 
         if self.status not in [prev, cmpl]:
             raise StatusError(
@@ -2220,10 +2936,7 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         raise a ValueError.
         """
         # check if status is WIP
-        with DBSession.no_autoflush:
-            wip = Status.query.filter_by(code='WIP').first()
-            drev = Status.query.filter_by(code='DREV').first()
-            oh = Status.query.filter_by(code='OH').first()
+        wip, drev, oh = status_registry.get_statuses('WIP', 'DREV', 'OH')
 
         if self.status not in [wip, drev, oh]:
             raise StatusError(
@@ -2262,10 +2975,7 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         """
 
         # check the status
-        with DBSession.no_autoflush:
-            wip = Status.query.filter_by(code='WIP').first()
-            drev = Status.query.filter_by(code='DREV').first()
-            stop = Status.query.filter_by(code='STOP').first()
+        wip, drev, stop = status_registry.get_statuses('WIP', 'DREV', 'STOP')
 
         if self.status not in [wip, drev, stop]:
             raise StatusError(
@@ -2284,12 +2994,8 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         self.schedule_timing, self.schedule_unit = \
             self.least_meaningful_time_unit(self.total_logged_seconds)
 
-        # update parent statuses
-        self.update_parent_statuses()
-
-        # update dependent task statuses
-        for dep in self.dependent_of:
-            dep.update_status_with_dependent_statuses()
+        # update parent and direct dependent task statuses
+        StatusPropagator([self], cascade_dependents=False).propagate()
 
     def resume(self):
         """Resumes the execution of this task by setting its status to RTS or
@@ -2298,10 +3004,7 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         applicable to Tasks with status OH.
         """
         # check status
-        with DBSession.no_autoflush:
-            wip = Status.query.filter_by(code='WIP').first()
-            oh = Status.query.filter_by(code='OH').first()
-            stop = Status.query.filter_by(code='STOP').first()
+        wip, oh, stop = status_registry.get_statuses('WIP', 'OH', 'STOP')
 
         if self.status not in [oh, stop]:
             raise StatusError(
@@ -2361,26 +3064,24 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
 
         return review_set
 
-    def update_status_with_dependent_statuses(self, removing=None):
+    def update_status_with_dependent_statuses(self, removing=None,
+                                              update_parents=True):
         """updates the status by looking at the dependent tasks
 
         :param removing: The item that is been removing right now, used for the
           remove event to overcome the update issue.
+        :param bool update_parents: Also update the parent statuses. Set it to
+          False if the parents are going to be updated later on (like in
+          :class:`.StatusPropagator`). The default is True.
         """
         if self.is_container:
             # do nothing, its status will be decided by its children
             return
 
-        with DBSession.no_autoflush:
-            wfd = Status.query.filter_by(code='WFD').first()
-            rts = Status.query.filter_by(code='RTS').first()
-            wip = Status.query.filter_by(code='WIP').first()
-            # prev = Status.query.filter_by(code='PREV').first()
-            hrev = Status.query.filter_by(code='HREV').first()
-            drev = Status.query.filter_by(code='DREV').first()
-            # oh = Status.query.filter_by(code='OH').first()
-            # stop = Status.query.filter_by(code='STOP').first()
-            cmpl = Status.query.filter_by(code='CMPL').first()
+        wfd, rts, wip, hrev, drev, cmpl = \
+            status_registry.get_statuses(
+                'WFD', 'RTS', 'WIP', 'HREV', 'DREV', 'CMPL'
+            )
 
         if removing:
             self._previously_removed_dependent_tasks.append(removing)
@@ -2409,30 +3110,6 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
                     self.status = rts
             return
 
-        #   +--------- WFD
-        #   |+-------- RTS
-        #   ||+------- WIP
-        #   |||+------ PREV
-        #   ||||+----- HREV
-        #   |||||+---- DREV
-        #   ||||||+--- OH
-        #   |||||||+-- STOP
-        #   ||||||||+- CMPL
-        #   |||||||||
-        # 0b000000000
-
-        binary_status_codes = {
-            'WFD':  256,
-            'RTS':  128,
-            'WIP':  64,
-            'PREV': 32,
-            'HREV': 16,
-            'DREV': 8,
-            'OH':   4,
-            'STOP': 2,
-            'CMPL': 1
-        }
-
         # Keep this part for future reference
         # if self.id:
         #     # use pure sql
@@ -2453,7 +3130,7 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         #     # convert to a binary value
         #     binary_status = reduce(
         #         lambda x, y: x+y,
-        #         map(lambda x: binary_status_codes[x[0]], result.fetchall()),
+        #         map(lambda x: BINARY_STATUS_CODES[x[0]], result.fetchall()),
         #         0
         #     )
         #
@@ -2472,7 +3149,7 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
             # consider every status only once
             if dep.status not in dep_statuses:
                 dep_statuses.append(dep.status)
-                binary_status += binary_status_codes[dep.status.code]
+                binary_status += BINARY_STATUS_CODES[dep.status.code]
 
         logger.debug('status of the task: %s' % self.status.code)
         logger.debug('binary status for dependency statuses: %s' %
@@ -2513,7 +3190,8 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         self.status = status
 
         # also update parent statuses
-        self.update_parent_statuses()
+        if update_parents:
+            self.update_parent_statuses()
 
         # # also update dependent tasks
         # for dep in dep_list:
@@ -2528,8 +3206,12 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
             if self.parent:
                 self.parent.update_status_with_children_statuses()
 
-    def update_status_with_children_statuses(self):
+    def update_status_with_children_statuses(self, update_parents=True):
         """updates the task status according to its children statuses
+
+        :param bool update_parents: Also update the parent statuses. Set it to
+          False if the parents are going to be updated later on (like in
+          :class:`.StatusPropagator`). The default is True.
         """
         logger.debug(
             'setting statuses with child statuses for: %s' % self.name
@@ -2540,38 +3222,11 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
             logger.debug('not a container returning!')
             return
 
-        with DBSession.no_autoflush:
-            wfd = Status.query.filter(Status.code == 'WFD').first()
-            rts = Status.query.filter(Status.code == 'RTS').first()
-            wip = Status.query.filter(Status.code == 'WIP').first()
-            cmpl = Status.query.filter(Status.code == 'CMPL').first()
+        wfd, rts, wip, cmpl = \
+            status_registry.get_statuses('WFD', 'RTS', 'WIP', 'CMPL')
 
         parent_statuses_lut = [wfd, rts, wip, cmpl]
 
-        #   +--------- WFD
-        #   |+-------- RTS
-        #   ||+------- WIP
-        #   |||+------ PREV
-        #   ||||+----- HREV
-        #   |||||+---- DREV
-        #   ||||||+--- OH
-        #   |||||||+-- STOP
-        #   ||||||||+- CMPL
-        #   |||||||||
-        # 0b000000000
-
-        binary_status_codes = {
-            'WFD':  256,
-            'RTS':  128,
-            'WIP':  64,
-            'PREV': 32,
-            'HREV': 16,
-            'DREV': 8,
-            'OH':   4,
-            'STOP': 2,
-            'CMPL': 1
-        }
-
         # use Python
         logger.debug('using pure Python to query children statuses')
         binary_status = 0
@@ -2580,52 +3235,9 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
             # consider every status only once
             if child.status not in children_statuses:
                 children_statuses.append(child.status)
-                binary_status += binary_status_codes[child.status.code]
-
-        #
-        # I know that the following list seems cryptic but the it shows the
-        # final status index in parent_statuses_lut[] list.
-        #
-        # So by using the cumulative statuses of children we got an index from
-        # the following table, and use the found element (integer) as the index
-        # for the parent_statuses_lut[] list, and we find the desired status
-        #
-        # We are doing it in this way for a couple of reasons:
-        #
-        #   1. We shouldn't hold the statuses in the following list,
-        #   2. Using a dictionary is another alternative, where the keys are
-        #      the cumulative binary status codes, but at the end the result of
-        #      this cumulative thing is a number between 0-511 so no need to
-        #      use a dictionary with integer keys
-        #
-        children_to_parent_statuses_lut = [
-            0, 3, 3, 3, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 1, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 0, 2, 0, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2,
-            2, 2, 2, 2, 2, 2
-        ]
+                binary_status += BINARY_STATUS_CODES[child.status.code]
 
-        status_index = children_to_parent_statuses_lut[binary_status]
+        status_index = CHILDREN_TO_PARENT_STATUSES_LUT[binary_status]
         status = parent_statuses_lut[status_index]
 
         logger.debug('binary statuses value : %s' % binary_status)
@@ -2638,7 +3250,8 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         #     dep.update_status_with_dependent_statuses()
 
         # go to parents
-        self.update_parent_statuses()
+        if update_parents:
+            self.update_parent_statuses()
 
     def _review_number_getter(self):
         """returns the revision number value
@@ -2693,15 +3306,9 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
         # get a suitable FilenameTemplate
         structure = self.project.structure
 
-        from stalker import FilenameTemplate
-
         task_template = None
         if structure:
-            for template in structure.templates:
-                assert isinstance(template, FilenameTemplate)
-                if template.target_entity_type == self.entity_type:
-                    task_template = template
-                    break
+            task_template = structure.get_template(self.entity_type)
 
         if not task_template:
             raise RuntimeError(
@@ -2716,20 +3323,17 @@ class Task(Entity, StatusMixin, DateRangeMixin, ReferenceMixin, ScheduleMixin,
                 }
             )
 
-        import jinja2
-
         return os.path.normpath(
-            jinja2.Template(task_template.path).render(**kwargs)
+            task_template.render_path(**kwargs)
         ).replace('\\', '/')
 
     @property
     def absolute_path(self):
         """the absolute_path attribute
         """
+        from stalker.models.repository import repository_path_resolver
         return os.path.normpath(
-            os.path.expandvars(
-                self.path
-            )
+            repository_path_resolver.expand(self.path)
         ).replace('\\', '/')
 
 
@@ -2900,6 +3504,1098 @@ class TaskDependency(Base, ScheduleMixin):
         return temp.render(template_variables)
 
 
+class StatusPropagator(object):
+    """Propagates the status changes of :class:`.Task`\ s to their parents and
+    dependent tasks in one pass.
+
+    The :meth:`.Task.update_parent_statuses` and
+    :meth:`.Task.update_status_with_dependent_statuses` methods are updating
+    the related tasks one by one and recursively, so a parent or a dependent
+    task can be evaluated many times and each evaluation lazily loads its
+    children or dependencies. The StatusPropagator instead collects all the
+    tasks that are affected by the given (dirty) tasks, which are all the
+    parents and the dependent tasks (recursively), loads the related data of
+    each hierarchy level with one query and evaluates each affected task only
+    once in topological order, so a task is evaluated after all of its
+    children and dependencies are evaluated::
+
+      >>> from stalker.models.task import StatusPropagator
+      >>> task.status = cmpl
+      >>> propagator = StatusPropagator([task])
+      >>> updated_tasks = propagator.propagate()
+
+    Container tasks are evaluated by their children statuses (with
+    :meth:`.Task.update_status_with_children_statuses`) and leaf tasks by
+    their dependency statuses (with
+    :meth:`.Task.update_status_with_dependent_statuses`).
+
+    All the statuses are updated with autoflush disabled, so the changes are
+    sent to the database with the next flush all together.
+
+    :param tasks: A list of :class:`.Task` instances that their statuses are
+      changed.
+
+    :param bool cascade_dependents: If False only the direct dependent tasks
+      of the given tasks are evaluated (along with their parents), the
+      dependent tasks of those dependent tasks or of the parents are not.
+      Default is True.
+    """
+
+    # the max number of ids in one IN clause
+    chunk_size = 500
+
+    def __init__(self, tasks=None, cascade_dependents=True):
+        self.cascade_dependents = cascade_dependents
+        self.tasks = []
+        if tasks is None:
+            tasks = []
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        """adds the given task to the dirty tasks list
+
+        :param task: A :class:`.Task` instance
+        """
+        if not isinstance(task, Task):
+            raise TypeError(
+                '%s.tasks should only contain stalker.models.task.Task '
+                'instances, not %s' %
+                (self.__class__.__name__, task.__class__.__name__)
+            )
+
+        if not any(t is task for t in self.tasks):
+            self.tasks.append(task)
+
+    @classmethod
+    def _load(cls, tasks, attr_names, *options):
+        """loads the given relationships of the given tasks with the given
+        loader options, only the persisted tasks that have unloaded
+        attributes are queried
+
+        :param tasks: A list of :class:`.Task` instances
+        :param attr_names: The attribute names that should be loaded
+        :param options: The loader options
+        """
+        from sqlalchemy import inspect
+        task_ids = []
+        for task in tasks:
+            state = inspect(task)
+            if state.persistent and state.unloaded.intersection(attr_names):
+                task_ids.append(task.id)
+
+        with DBSession.no_autoflush:
+            for i in range(0, len(task_ids), cls.chunk_size):
+                Task.query\
+                    .filter(Task.id.in_(task_ids[i:i + cls.chunk_size]))\
+                    .options(*options)\
+                    .all()
+
+    def _successors(self, task, is_dirty=False):
+        """returns the tasks that needs to be updated after the given task
+
+        :param task: A :class:`.Task` instance
+        :param bool is_dirty: True if the task is one of the dirty tasks
+        """
+        successors = []
+        if self.cascade_dependents or is_dirty:
+            successors.extend(task.dependent_of)
+        if task.parent:
+            successors.append(task.parent)
+        return successors
+
+    def affected_tasks(self):
+        """returns the dirty tasks along with all the tasks that are affected
+        by them in topological order
+
+        :return: list of :class:`.Task` instances
+        """
+        from sqlalchemy.orm import selectinload
+
+        # collect the affected tasks level by level
+        successors = {}
+        tasks = []
+        visited = set()
+        dirty = set()
+        frontier = []
+        for task in self.tasks:
+            visited.add(id(task))
+            dirty.add(id(task))
+            tasks.append(task)
+            frontier.append(task)
+
+        with DBSession.no_autoflush:
+            while frontier:
+                self._load(
+                    frontier,
+                    ['task_dependent_of', 'parent'],
+                    selectinload(Task.task_dependent_of)
+                    .joinedload(TaskDependency.task),
+                    selectinload(Task.parent)
+                )
+                next_frontier = []
+                for task in frontier:
+                    task_successors = \
+                        self._successors(task, id(task) in dirty)
+                    successors[id(task)] = task_successors
+                    for successor in task_successors:
+                        if id(successor) not in visited:
+                            visited.add(id(successor))
+                            tasks.append(successor)
+                            next_frontier.append(successor)
+                frontier = next_frontier
+
+        # sort them topologically
+        in_degrees = dict((id(task), 0) for task in tasks)
+        for task in tasks:
+            for successor in successors[id(task)]:
+                in_degrees[id(successor)] += 1
+
+        queue = collections.deque(
+            [task for task in tasks if not in_degrees[id(task)]]
+        )
+        sorted_tasks = []
+        while queue:
+            task = queue.popleft()
+            sorted_tasks.append(task)
+            for successor in successors[id(task)]:
+                in_degrees[id(successor)] -= 1
+                if not in_degrees[id(successor)]:
+                    queue.append(successor)
+
+        if len(sorted_tasks) != len(tasks):
+            raise CircularDependencyError(
+                'There is a circular dependency in the parents or the '
+                'dependent tasks of %s' %
+                ', '.join([task.name for task in self.tasks])
+            )
+
+        return sorted_tasks
+
+    def propagate(self):
+        """updates the statuses of the dirty tasks and all the tasks that are
+        affected by them
+
+        :return: list of :class:`.Task` instances that are evaluated in the
+          evaluation order
+        """
+        from sqlalchemy.orm import selectinload
+
+        tasks = self.affected_tasks()
+
+        with DBSession.no_autoflush:
+            # load the children and the dependencies of all the tasks
+            self._load(
+                tasks,
+                ['children', 'task_depends_to'],
+                selectinload(Task.children),
+                selectinload(Task.task_depends_to)
+                .joinedload(TaskDependency.depends_to)
+            )
+
+            for task in tasks:
+                if task.is_container:
+                    task.update_status_with_children_statuses(
+                        update_parents=False
+                    )
+                else:
+                    task.update_status_with_dependent_statuses(
+                        update_parents=False
+                    )
+
+        return tasks
+
+
+class TaskBatch(object):
+    """Creates many :class:`.Task`\ s with a handful of queries.
+
+    Creating a Task instance runs the validators of all of its attributes and
+    updates the ``schedule_seconds``, ``total_logged_seconds``, start and end
+    values and the status of all of its parents one by one. Creating
+    thousands of tasks (like setting up the tasks of all the shots of a show)
+    this way is very slow. The TaskBatch instead validates the given values
+    while they are added, inserts the tasks with one ``executemany`` call per
+    table and updates each of the existing parent tasks only once::
+
+      >>> from stalker.models.task import TaskBatch
+      >>> batch = TaskBatch(project=project)
+      >>> for shot_name in ['SH010', 'SH020', 'SH030']:
+      ...     shot_task = batch.add(name=shot_name, parent=shots_task)
+      ...     for department in ['Anim', 'Lighting', 'Comp']:
+      ...         batch.add(
+      ...             name=department,
+      ...             parent=shot_task,
+      ...             resources=[user1],
+      ...             schedule_timing=2,
+      ...             schedule_unit='d'
+      ...         )
+      >>> tasks = batch.create()
+
+    It can also be used as a context manager, the tasks are created when the
+    ``with`` block exits without an error and are stored in the
+    :attr:`.tasks` attribute::
+
+      >>> with TaskBatch(project=project) as batch:
+      ...     batch.add(name='Modeling', parent=asset_task)
+      >>> batch.tasks
+
+    :meth:`.Task.bulk_create` is a shortcut to create a batch from a list of
+    dictionaries.
+
+    The :meth:`.add` method returns a handle of the task that is going to be
+    created, which can be used as the parent of the tasks that are added
+    later on. The parent can also be an existing :class:`.Task`.
+
+    The new tasks are plain :class:`.Task` instances without any
+    dependencies, so they are created with the ``RTS`` status. Because they
+    don't have any children or dependencies other than the ones created in the
+    same batch, they can not create a circular dependency and the cycle
+    checks are skipped. The existing parent tasks are updated as if the tasks
+    were created one by one, the ``schedule_seconds``,
+    ``total_logged_seconds``, start and end values of them and their parents
+    are updated and their statuses are updated with the
+    :class:`.StatusPropagator`.
+
+    The tasks are inserted with the connection of the current session, so
+    they are committed or rolled back along with the session.
+
+    :param project: The default :class:`.Project` of the tasks, the tasks
+      with a parent are always created in the project of their parent.
+    :param created_by: The default :class:`.User` who creates the tasks.
+    """
+
+    #: the arguments that are accepted by :meth:`.add`
+    arguments = [
+        'name', 'description', 'type', 'project', 'parent', 'created_by',
+        'resources', 'alternative_resources', 'watchers', 'responsible',
+        'start', 'end', 'schedule_timing', 'schedule_unit', 'schedule_model',
+        'schedule_constraint', 'bid_timing', 'bid_unit', 'is_milestone',
+        'priority', 'allocation_strategy', 'persistent_allocation'
+    ]
+
+    # the max number of rows in one executemany call or ids in one IN clause
+    chunk_size = 500
+
+    def __init__(self, project=None, created_by=None):
+        self.project = project
+        self.created_by = created_by
+        self.specs = []
+        self.tasks = []
+
+        # the index of each spec in the specs list by their id
+        self._indices = {}
+
+        # an uninitialized Task instance which is only used to run the Task
+        # validators on the given values, it is never added to a session
+        self._validator = Task.__new__(Task)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.create()
+
+    def add(self, **kwargs):
+        """validates the given task arguments and adds them to the batch.
+
+        Accepts the same arguments with :class:`.Task` except ``depends``,
+        ``good`` and the ``status`` related arguments (see :attr:`arguments`).
+        The ``parent`` can be an existing :class:`.Task` or a handle that is
+        returned by an earlier call.
+
+        :returns: A handle of the task which can be used as the parent of the
+          tasks that are added later.
+        """
+        unknown_arguments = sorted(set(kwargs) - set(self.arguments))
+        if unknown_arguments:
+            raise TypeError(
+                '%s.add() got unexpected arguments: %s' %
+                (self.__class__.__name__, ', '.join(unknown_arguments))
+            )
+
+        spec = self._validate_spec(kwargs)
+        self._indices[id(spec)] = len(self.specs)
+        self.specs.append(spec)
+        return spec
+
+    def _validate_spec(self, kwargs):
+        """validates the given task arguments with the Task validators and
+        returns a dictionary of the validated values
+        """
+        from stalker.models.project import Project
+
+        v = self._validator
+        get = kwargs.get
+
+        parent = get('parent')
+        if parent is not None and not isinstance(parent, Task) \
+           and id(parent) not in self._indices:
+            raise TypeError(
+                '%s.parent should be an instance of stalker.models.task.Task '
+                'or a task added to this %s before, not %s' %
+                (self.__class__.__name__, self.__class__.__name__,
+                 parent.__class__.__name__)
+            )
+
+        project = get('project', self.project)
+        if project is not None and not isinstance(project, Project):
+            raise TypeError(
+                'Task.project should be an instance of '
+                'stalker.models.project.Project, not %s' %
+                project.__class__.__name__
+            )
+
+        created_by = v._validate_created_by(
+            'created_by', get('created_by', self.created_by)
+        )
+
+        # schedule values, the Task validators of schedule_timing and
+        # schedule_unit are also rescheduling the task so use the ScheduleMixin
+        # ones
+        schedule_timing = get('schedule_timing', 1.0)
+        schedule_unit = get('schedule_unit', 'h')
+        if schedule_timing is None:
+            schedule_timing = v.__default_schedule_timing__
+            schedule_unit = v.__default_schedule_unit__
+        schedule_timing = ScheduleMixin._validate_schedule_timing(
+            v, 'schedule_timing', schedule_timing
+        )
+        schedule_unit = ScheduleMixin._validate_schedule_unit(
+            v, 'schedule_unit', schedule_unit
+        )
+        schedule_model = v._validate_schedule_model(
+            'schedule_model', get('schedule_model')
+        )
+        schedule_constraint = v._validate_schedule_constraint(
+            'schedule_constraint', get('schedule_constraint', 0)
+        )
+
+        bid_timing = get('bid_timing')
+        if bid_timing is None:
+            bid_timing = schedule_timing
+        bid_unit = get('bid_unit')
+        if bid_unit is None:
+            bid_unit = schedule_unit
+
+        # the validator of is_milestone is also clearing the resources, which
+        # can not be done on the validator instance
+        is_milestone = get('is_milestone', False)
+        if is_milestone is not True:
+            is_milestone = v._validate_is_milestone(
+                'is_milestone', is_milestone
+            )
+
+        resources = []
+        if not is_milestone:
+            resources = [
+                v._validate_resources('resources', resource)
+                for resource in get('resources') or []
+            ]
+
+        # the dates are calculated as Task._reschedule() does
+        start, end, duration = \
+            v._validate_dates(get('start'), get('end'), None)
+        unit = defaults.datetime_units_to_timedelta_kwargs[schedule_unit]
+        calculated_duration = datetime.timedelta(
+            **{unit['name']: schedule_timing * unit['multiplier']}
+        )
+        if schedule_constraint == CONSTRAIN_END:
+            start, end, duration = \
+                v._validate_dates(None, end, calculated_duration)
+        elif schedule_constraint == CONSTRAIN_BOTH:
+            start, end, duration = v._validate_dates(start, end, None)
+        else:
+            start, end, duration = \
+                v._validate_dates(start, None, calculated_duration)
+
+        return {
+            'name': v._validate_name('name', get('name')),
+            'description':
+                v._validate_description('description', get('description')),
+            'type': v._validate_type('type', get('type')),
+            'project': project,
+            'parent': parent,
+            'created_by': created_by,
+            'resources': resources,
+            'alternative_resources': [
+                v._validate_alternative_resources(
+                    'alternative_resources', resource
+                )
+                for resource in get('alternative_resources') or []
+            ],
+            'watchers': [
+                v._validate_watchers('watchers', watcher)
+                for watcher in get('watchers') or []
+            ],
+            'responsible': [
+                v._validate_responsible('responsible', responsible)
+                for responsible in get('responsible') or []
+            ],
+            'start': start,
+            'end': end,
+            'duration': duration,
+            'schedule_timing': schedule_timing,
+            'schedule_unit': schedule_unit,
+            'schedule_model': schedule_model,
+            'schedule_constraint': schedule_constraint,
+            'bid_timing': v._validate_bid_timing('bid_timing', bid_timing),
+            'bid_unit': v._validate_bid_unit('bid_unit', bid_unit),
+            'is_milestone': is_milestone,
+            'priority': v._validate_priority(
+                'priority', get('priority', defaults.task_priority)
+            ),
+            'allocation_strategy': v._validate_allocation_strategy(
+                'allocation_strategy',
+                get('allocation_strategy', defaults.allocation_strategy[0])
+            ),
+            'persistent_allocation': v._validate_persistent_allocation(
+                'persistent_allocation', get('persistent_allocation', True)
+            )
+        }
+
+    def _resolve_projects(self, specs):
+        """sets the project of the given specs to the project of their parent
+        """
+        import warnings
+
+        for spec in specs:
+            parent = spec['parent']
+            if parent is None:
+                project = spec['project']
+            elif isinstance(parent, Task):
+                with DBSession.no_autoflush:
+                    project = parent.project
+            else:
+                project = parent['project']
+
+            if project is None:
+                raise TypeError(
+                    'Task.project should be an instance of '
+                    'stalker.models.project.Project, not NoneType. Or please '
+                    'supply a stalker.models.task.Task with the parent '
+                    'argument, so Stalker can use the project of the supplied '
+                    'parent task'
+                )
+
+            if spec['project'] is not None and spec['project'] != project:
+                warnings.warn(
+                    'The supplied parent and the project is not matching in '
+                    '%s, Stalker will use the parent project (%s) as the '
+                    'parent of this Task' % (spec['name'], project),
+                    RuntimeWarning
+                )
+            spec['project'] = project
+
+    def _rollup_new_containers(self, specs):
+        """computes the schedule_seconds of the new tasks at once, and
+        updates the schedule_seconds and the dates of the new tasks that
+        are parents of other new tasks. Returns the rolled up values of the
+        direct children of each existing parent task as a dictionary of
+        id(parent) to [schedule_seconds, start, end] lists.
+        """
+        schedule_seconds = Task.to_seconds_many(
+            [spec['schedule_timing'] for spec in specs],
+            [spec['schedule_unit'] for spec in specs],
+            [spec['schedule_model'] for spec in specs]
+        )
+        for spec, seconds in zip(specs, schedule_seconds):
+            spec['schedule_seconds'] = seconds
+
+        rollups = {}
+        existing_rollups = {}
+        # the children are always added after their parents
+        for spec in reversed(specs):
+            rollup = rollups.get(id(spec))
+            if rollup is not None:
+                # it is a container
+                spec['schedule_seconds'], spec['start'], spec['end'] = rollup
+                spec['duration'] = spec['end'] - spec['start']
+                spec['resources'] = []
+
+            parent = spec['parent']
+            if parent is None:
+                continue
+            if isinstance(parent, Task):
+                parent_rollup = existing_rollups.get(id(parent))
+                if parent_rollup is None:
+                    parent_rollup = existing_rollups[id(parent)] = \
+                        [0, datetime.datetime.max, datetime.datetime.min]
+            else:
+                parent_rollup = rollups.get(id(parent))
+                if parent_rollup is None:
+                    parent_rollup = rollups[id(parent)] = \
+                        [0, datetime.datetime.max, datetime.datetime.min]
+            parent_rollup[0] += spec['schedule_seconds']
+            parent_rollup[1] = min(parent_rollup[1], spec['start'])
+            parent_rollup[2] = max(parent_rollup[2], spec['end'])
+        return existing_rollups
+
+    def create(self):
+        """creates the tasks that are added to the batch, updates their
+        existing parents and returns the created :class:`.Task` instances in
+        the order they are added.
+        """
+        from sqlalchemy import select
+        from sqlalchemy.orm import selectinload
+        import stalker
+        from stalker.models.entity import Entity
+
+        specs = self.specs
+        if not specs:
+            return []
+        self.specs = []
+        self._indices = {}
+
+        status_list = status_registry.get_status_list('Task')
+        if status_list is None:
+            raise TypeError(
+                "Task instances can not be initialized without a "
+                "stalker.models.status.StatusList instance, please pass a "
+                "suitable StatusList (StatusList.target_entity_type=Task) "
+                "with the 'status_list' argument"
+            )
+        rts = status_registry.get_status('RTS')
+
+        # add the related entities to the session as the relationship
+        # cascades would do and flush them, so all of them have ids and the
+        # hierarchy index of the existing parents is up to date
+        related_entities = set()
+        for spec in specs:
+            for key in ['project', 'parent', 'type', 'created_by']:
+                entity = spec[key]
+                if entity is not None and not isinstance(entity, dict):
+                    related_entities.add(entity)
+            for key in ['resources', 'alternative_resources', 'watchers',
+                        'responsible']:
+                related_entities.update(spec[key])
+        for entity in related_entities:
+            if object_session(entity) is None:
+                DBSession.add(entity)
+        DBSession.flush()
+
+        self._resolve_projects(specs)
+        existing_rollups = self._rollup_new_containers(specs)
+
+        connection = DBSession.connection()
+
+        # the current values of the existing parents and their parents have
+        # to be read before the new tasks are inserted
+        existing_parents = []
+        for spec in specs:
+            parent = spec['parent']
+            if isinstance(parent, Task) and \
+               not any(p is parent for p in existing_parents):
+                existing_parents.append(parent)
+
+        existing_parent_ids = [parent.id for parent in existing_parents]
+        closures = {}
+        for ids in __chunks__(existing_parent_ids, self.chunk_size):
+            for ancestor_id, descendant_id, depth in connection.execute(
+                    select([Task_Closure.c.ancestor_id,
+                            Task_Closure.c.descendant_id,
+                            Task_Closure.c.depth])
+                    .where(Task_Closure.c.descendant_id.in_(ids))):
+                closures.setdefault(descendant_id, []).append(
+                    (ancestor_id, depth)
+                )
+
+        ancestor_ids = set(
+            ancestor_id
+            for rows in closures.values()
+            for ancestor_id, depth in rows
+            if depth > 0
+        ) - set(existing_parent_ids)
+        ancestors = []
+        with DBSession.no_autoflush:
+            for ids in __chunks__(sorted(ancestor_ids), self.chunk_size):
+                ancestors.extend(Task.query.filter(Task.id.in_(ids)).all())
+            StatusPropagator._load(
+                existing_parents,
+                ['children', 'time_logs'],
+                selectinload(Task.children),
+                selectinload(Task.time_logs)
+            )
+
+            was_leaf = dict(
+                (parent.id, parent.is_leaf) for parent in existing_parents
+            )
+            current_values = dict(
+                (task.id, (task.schedule_seconds or 0,
+                           task.total_logged_seconds or 0))
+                for task in existing_parents + ancestors
+            )
+
+        # insert the new tasks
+        now = datetime.datetime.now()
+        ids = __insert_simple_entities__(connection, [
+            {
+                'entity_type': 'Task',
+                'name': spec['name'],
+                'description': spec['description'],
+                'created_by_id':
+                    spec['created_by'].id if spec['created_by'] else None,
+                'updated_by_id':
+                    spec['created_by'].id if spec['created_by'] else None,
+                'date_created': now,
+                'date_updated': now,
+                'type_id': spec['type'].id if spec['type'] else None,
+                'generic_text': '',
+                'html_style': '',
+                'html_class': '',
+                'stalker_version': stalker.__version__
+            }
+            for spec in specs
+        ], self.chunk_size)
+        spec_ids = dict((id(spec), id_) for spec, id_ in zip(specs, ids))
+
+        entity_rows = []
+        task_rows = []
+        secondary_rows = collections.defaultdict(list)
+        closure_rows = []
+        for spec, task_id in zip(specs, ids):
+            parent = spec['parent']
+            if parent is None:
+                parent_id = None
+                parent_closure = []
+            else:
+                if isinstance(parent, Task):
+                    parent_id = parent.id
+                else:
+                    parent_id = spec_ids[id(parent)]
+                parent_closure = closures[parent_id]
+            closures[task_id] = [(task_id, 0)] + [
+                (ancestor_id, depth + 1)
+                for ancestor_id, depth in parent_closure
+            ]
+
+            entity_rows.append({'id': task_id})
+            task_rows.append({
+                'id': task_id,
+                'project_id': spec['project'].id,
+                'parent_id': parent_id,
+                'is_milestone': spec['is_milestone'],
+                'allocation_strategy': spec['allocation_strategy'],
+                'persistent_allocation': spec['persistent_allocation'],
+                'priority': spec['priority'],
+                'bid_timing': spec['bid_timing'],
+                'bid_unit': spec['bid_unit'],
+                'schedule_seconds': spec['schedule_seconds'],
+                'total_logged_seconds': 0,
+                'review_number': 0,
+                'status_id': rts.id,
+                'status_list_id': status_list.id,
+                'start': spec['start'],
+                'end': spec['end'],
+                'duration': spec['duration'],
+                'schedule_timing': spec['schedule_timing'],
+                'schedule_unit': spec['schedule_unit'],
+                'schedule_model': spec['schedule_model'],
+                'schedule_constraint': spec['schedule_constraint']
+            })
+            for resource in spec['resources']:
+                secondary_rows[Task_Resources].append(
+                    {'task_id': task_id, 'resource_id': resource.id}
+                )
+                secondary_rows[Task_Computed_Resources].append(
+                    {'task_id': task_id, 'resource_id': resource.id}
+                )
+            for resource in spec['alternative_resources']:
+                secondary_rows[Task_Alternative_Resources].append(
+                    {'task_id': task_id, 'resource_id': resource.id}
+                )
+            for watcher in spec['watchers']:
+                secondary_rows[Task_Watchers].append(
+                    {'task_id': task_id, 'watcher_id': watcher.id}
+                )
+            for responsible in spec['responsible']:
+                secondary_rows[Task_Responsible].append(
+                    {'task_id': task_id, 'responsible_id': responsible.id}
+                )
+            closure_rows.extend(
+                {'ancestor_id': ancestor_id,
+                 'descendant_id': task_id,
+                 'depth': depth}
+                for ancestor_id, depth in closures[task_id]
+            )
+
+        inserts = [
+            (Entity.__table__, entity_rows),
+            (Task.__table__, task_rows),
+        ]
+        inserts.extend(secondary_rows.items())
+        inserts.append((Task_Closure, closure_rows))
+        for table, rows in inserts:
+            for chunk in __chunks__(rows, self.chunk_size):
+                connection.execute(table.insert(), chunk)
+
+        # update the existing parents and their parents once
+        deltas = collections.defaultdict(lambda: [0, 0])
+        date_ranges = {}
+        with DBSession.no_autoflush:
+            for parent in existing_parents:
+                schedule_seconds, start, end = existing_rollups[id(parent)]
+                old_schedule_seconds, old_total_logged_seconds = \
+                    current_values[parent.id]
+                if was_leaf[parent.id]:
+                    # it was a leaf but now a parent, the children are the
+                    # only source of the schedule info and the dates
+                    parent.resources = []
+                    parent._schedule_seconds = schedule_seconds
+                    parent._total_logged_seconds = 0
+                    parent._start = start
+                    parent._end = end
+                    delta = (schedule_seconds - old_schedule_seconds,
+                             -old_total_logged_seconds)
+                else:
+                    parent._schedule_seconds = \
+                        old_schedule_seconds + schedule_seconds
+                    parent._total_logged_seconds = old_total_logged_seconds
+                    parent._start = min(parent._start, start)
+                    parent._end = max(parent._end, end)
+                    delta = (schedule_seconds, 0)
+                parent._duration = parent._end - parent._start
+
+                for ancestor_id, depth in closures[parent.id]:
+                    if depth == 0:
+                        continue
+                    deltas[ancestor_id][0] += delta[0]
+                    deltas[ancestor_id][1] += delta[1]
+                    date_range = date_ranges.get(ancestor_id)
+                    if date_range is None:
+                        date_ranges[ancestor_id] = (start, end)
+                    else:
+                        date_ranges[ancestor_id] = (
+                            min(date_range[0], start),
+                            max(date_range[1], end)
+                        )
+
+            for task in existing_parents + ancestors:
+                if task.id not in deltas:
+                    continue
+                old_schedule_seconds, old_total_logged_seconds = \
+                    current_values[task.id]
+                schedule_delta, total_logged_delta = deltas[task.id]
+                if task.id in was_leaf:
+                    # an existing parent, already holding its own children
+                    task._schedule_seconds += schedule_delta
+                    task._total_logged_seconds += total_logged_delta
+                else:
+                    task._schedule_seconds = \
+                        old_schedule_seconds + schedule_delta
+                    task._total_logged_seconds = \
+                        old_total_logged_seconds + total_logged_delta
+                start, end = date_ranges[task.id]
+                task._start = min(task._start, start)
+                task._end = max(task._end, end)
+                task._duration = task._end - task._start
+
+            # let the existing parents see their new children and update
+            # their statuses
+            for parent in existing_parents:
+                DBSession.expire(parent, ['children'])
+            if existing_parents:
+                StatusPropagator(existing_parents).propagate()
+        DBSession.flush()
+
+        # the tasks are inserted without the session, so update the projects
+        ProgressRollup(DBSession).update_projects(
+            set(spec['project'].id for spec in specs)
+        )
+
+        # load the created tasks
+        tasks_by_id = {}
+        with DBSession.no_autoflush:
+            for chunk in __chunks__(ids, self.chunk_size):
+                for task in Task.query.filter(Task.id.in_(chunk)).all():
+                    tasks_by_id[task.id] = task
+        tasks = [tasks_by_id[task_id] for task_id in ids]
+        self.tasks.extend(tasks)
+        return tasks
+
+
+class ProgressRollup(object):
+    """Computes the ``schedule_seconds`` and ``total_logged_seconds`` values
+    of :class:`.Task`\ s and :class:`.Project`\ s with grouped SQL queries.
+
+    The :meth:`.Task.update_schedule_info` method and the
+    :attr:`.Project.total_logged_seconds` and
+    :attr:`.Project.schedule_seconds` attributes were walking the task
+    hierarchy and lazily loading the children and the TimeLogs of every task.
+    The ProgressRollup instead sums the schedule seconds and the TimeLog
+    durations of the leaf tasks with one grouped query per value, over the
+    ``Task_Closure`` table for the tasks and over the ``project_id`` column
+    for the projects, and stores the results in the ``schedule_seconds`` and
+    ``total_logged_seconds`` cache columns of the ``Tasks`` and ``Projects``
+    tables::
+
+      >>> from stalker.models.task import ProgressRollup
+      >>> projects = Project.query.all()
+      >>> ProgressRollup().refresh(projects=projects)
+      >>> [project.percent_complete for project in projects]
+
+    Passing ``tasks`` only refreshes the given tasks, all of their parents and
+    their projects, so it can be used to refresh the values incrementally
+    after the TimeLogs of a couple of tasks are changed::
+
+      >>> ProgressRollup().refresh(tasks=[time_log.task])
+
+    The project columns are also refreshed automatically after every flush
+    that creates, updates or deletes TimeLogs or Tasks.
+
+    The values of the instances that are already loaded in the session are
+    updated without marking them as dirty.
+
+    :param session: The session to use, defaults to DBSession.
+    """
+
+    # the max number of rows in one executemany call or ids in one IN clause
+    chunk_size = 500
+
+    def __init__(self, session=None):
+        if session is None:
+            session = DBSession
+        self.session = session
+
+    def refresh(self, projects=None, tasks=None):
+        """flushes the session and refreshes the cached values of all the
+        tasks of the given projects and the given tasks along with their
+        parents and projects
+
+        :param projects: A list of :class:`.Project` instances.
+        :param tasks: A list of :class:`.Task` instances.
+        """
+        from sqlalchemy import select
+
+        self.session.flush()
+        connection = self.session.connection()
+        table = Task.__table__
+
+        project_ids = set(project.id for project in projects or [])
+        task_ids = set()
+        for chunk_ids in __chunks__(sorted(project_ids), self.chunk_size):
+            task_ids.update(
+                row[0] for row in connection.execute(
+                    select([table.c.id])
+                    .where(table.c.project_id.in_(chunk_ids))
+                )
+            )
+
+        changed_task_ids = sorted(set(task.id for task in tasks or []))
+        for chunk_ids in __chunks__(changed_task_ids, self.chunk_size):
+            for task_id, project_id in connection.execute(
+                    select([Task_Closure.c.ancestor_id, table.c.project_id])
+                    .select_from(
+                        Task_Closure.join(
+                            table, table.c.id == Task_Closure.c.descendant_id
+                        )
+                    )
+                    .where(Task_Closure.c.descendant_id.in_(chunk_ids))):
+                task_ids.add(task_id)
+                project_ids.add(project_id)
+
+        self.update_tasks(task_ids)
+        self.update_projects(project_ids)
+
+    def update_tasks(self, task_ids):
+        """computes and stores the cached values of the tasks with the given
+        ids without flushing the session
+
+        :param task_ids: A list of :class:`.Task` ids.
+        """
+        from sqlalchemy import func, select
+
+        connection = self.session.connection()
+        table = Task.__table__
+        time_logs = TimeLog.__table__
+        closure = Task_Closure
+        leaves = closure.join(table, table.c.id == closure.c.descendant_id)
+
+        values = dict((task_id, [0, 0]) for task_id in task_ids)
+        for chunk_ids in __chunks__(sorted(values), self.chunk_size):
+            for task_id, seconds in connection.execute(
+                    select([closure.c.ancestor_id,
+                            func.sum(self._schedule_seconds(table))])
+                    .select_from(leaves)
+                    .where(closure.c.ancestor_id.in_(chunk_ids))
+                    .where(self._is_leaf(table))
+                    .group_by(closure.c.ancestor_id)):
+                values[task_id][0] = int(seconds or 0)
+
+            for task_id, seconds in self._sum_logged_seconds(
+                    connection,
+                    closure.c.ancestor_id,
+                    leaves.join(
+                        time_logs,
+                        time_logs.c.task_id == closure.c.descendant_id
+                    ),
+                    closure.c.ancestor_id.in_(chunk_ids),
+                    self._is_leaf(table)):
+                values[task_id][1] = seconds
+
+        self._store(Task, values)
+
+    def update_projects(self, project_ids):
+        """computes and stores the cached values of the projects with the
+        given ids without flushing the session
+
+        :param project_ids: A list of :class:`.Project` ids.
+        """
+        from sqlalchemy import func, select
+
+        connection = self.session.connection()
+        table = Task.__table__
+        time_logs = TimeLog.__table__
+
+        values = dict(
+            (project_id, [0, 0]) for project_id in project_ids
+            if project_id is not None
+        )
+        for chunk_ids in __chunks__(sorted(values), self.chunk_size):
+            for project_id, seconds in connection.execute(
+                    select([table.c.project_id,
+                            func.sum(self._schedule_seconds(table))])
+                    .where(table.c.project_id.in_(chunk_ids))
+                    .where(self._is_leaf(table))
+                    .group_by(table.c.project_id)):
+                values[project_id][0] = int(seconds or 0)
+
+            for project_id, seconds in self._sum_logged_seconds(
+                    connection,
+                    table.c.project_id,
+                    table.join(time_logs, time_logs.c.task_id == table.c.id),
+                    table.c.project_id.in_(chunk_ids),
+                    self._is_leaf(table)):
+                values[project_id][1] = seconds
+
+        from stalker.models.project import Project
+        self._store(Project, values)
+
+    @classmethod
+    def _is_leaf(cls, table):
+        """returns the condition of a task having no children
+
+        :param table: The Tasks table
+        """
+        from sqlalchemy import exists
+        children = table.alias('children')
+        return ~exists().where(children.c.parent_id == table.c.id)
+
+    @classmethod
+    def _schedule_seconds(cls, table):
+        """returns the SQL expression of :meth:`.ScheduleMixin.to_seconds`
+
+        :param table: The Tasks table
+        """
+        from sqlalchemy import and_, case
+        whens = []
+        for model in defaults.task_schedule_models:
+            for unit in defaults.datetime_units:
+                whens.append((
+                    and_(table.c.schedule_model == model,
+                         table.c.schedule_unit == unit),
+                    table.c.schedule_timing * Task.to_seconds(1, unit, model)
+                ))
+        return case(whens, else_=0)
+
+    @classmethod
+    def _logged_seconds(cls, connection, table):
+        """returns the SQL expression of :attr:`.TimeLog.total_seconds` or
+        None if the dialect of the given connection is not supported
+
+        :param connection: The connection of the current session
+        :param table: The TimeLogs table
+        """
+        from sqlalchemy import extract, func
+        dialect_name = connection.dialect.name
+        if dialect_name == 'postgresql':
+            return extract('epoch', table.c.end - table.c.start)
+        elif dialect_name == 'sqlite':
+            return func.round(
+                (func.julianday(table.c.end) -
+                 func.julianday(table.c.start)) * 86400
+            )
+
+    @classmethod
+    def _sum_logged_seconds(cls, connection, key, from_, *criteria):
+        """yields the total :attr:`.TimeLog.total_seconds` of the TimeLogs
+        grouped by the given key as (key, seconds) tuples.
+
+        The sums are computed in the database for the dialects that
+        :meth:`._logged_seconds` supports, and from the start and end values
+        of the TimeLogs for the others.
+
+        :param connection: The connection of the current session
+        :param key: The column to group the TimeLogs by
+        :param from_: The selectable that includes the TimeLogs table
+        :param criteria: The where clauses of the query
+        """
+        from sqlalchemy import and_, func, select
+        time_logs = TimeLog.__table__
+        seconds = cls._logged_seconds(connection, time_logs)
+        if seconds is not None:
+            for key_value, total in connection.execute(
+                    select([key, func.sum(seconds)])
+                    .select_from(from_)
+                    .where(and_(*criteria))
+                    .group_by(key)):
+                yield key_value, int(total or 0)
+            return
+
+        totals = {}
+        for key_value, start, end in connection.execute(
+                select([key, time_logs.c.start, time_logs.c.end])
+                .select_from(from_)
+                .where(and_(*criteria))):
+            duration = end - start
+            totals[key_value] = totals.get(key_value, 0) + \
+                duration.days * 86400 + duration.seconds
+        for key_value, total in totals.items():
+            yield key_value, total
+
+    def _store(self, class_, values):
+        """stores the given values in the cache columns of the given class
+        and updates the instances in the session
+
+        :param class_: :class:`.Task` or :class:`.Project`
+        :param values: A dictionary of [schedule_seconds,
+          total_logged_seconds] lists by their ids
+        """
+        from sqlalchemy import bindparam
+        from sqlalchemy.orm.attributes import set_committed_value
+        from sqlalchemy.orm.util import identity_key
+
+        if not values:
+            return
+
+        table = class_.__table__
+        update = table.update()\
+            .where(table.c.id == bindparam('_id'))\
+            .values(schedule_seconds=bindparam('_schedule_seconds'),
+                    total_logged_seconds=bindparam('_total_logged_seconds'))
+        rows = [
+            {'_id': id_,
+             '_schedule_seconds': schedule_seconds,
+             '_total_logged_seconds': total_logged_seconds}
+            for id_, (schedule_seconds, total_logged_seconds)
+            in sorted(values.items())
+        ]
+        connection = self.session.connection()
+        for chunk in __chunks__(rows, self.chunk_size):
+            connection.execute(update, chunk)
+
+        identity_map = self.session.identity_map
+        for id_, (schedule_seconds, total_logged_seconds) in values.items():
+            instance = identity_map.get(identity_key(class_, id_))
+            if instance is not None:
+                set_committed_value(
+                    instance, '_schedule_seconds', schedule_seconds
+                )
+                set_committed_value(
+                    instance, '_total_logged_seconds', total_logged_seconds
+                )
+
+
 # TASK_RESOURCES
 Task_Resources = Table(
     "Task_Resources", Base.metadata,
@@ -2935,6 +4631,20 @@ Task_Responsible = Table(
     Column("responsible_id", Integer, ForeignKey("Users.id"), primary_key=True)
 )
 
+# TASK_CLOSURE
+# holds a row for every task and every parent of it with the distance
+# between them, so the whole parents or children of a task can be queried at
+# once
+Task_Closure = Table(
+    "Task_Closure", Base.metadata,
+    Column("ancestor_id", Integer,
+           ForeignKey("Tasks.id", ondelete='CASCADE'), primary_key=True),
+    Column("descendant_id", Integer,
+           ForeignKey("Tasks.id", ondelete='CASCADE'), primary_key=True,
+           index=True),
+    Column("depth", Integer, nullable=False)
+)
+
 # *****************************************************************************
 # Register Events
 # *****************************************************************************
@@ -3126,3 +4836,328 @@ def removed_a_dependency(task, task_dependent, initiator):
     task.update_status_with_dependent_statuses(
         removing=task_dependent.depends_to
     )
+
+
+# *****************************************************************************
+# Task.parent updates the Task_Closure table
+# *****************************************************************************
+def __parent_is_changed__(task):
+    """Returns True if the parent of the given task is changed but not flushed
+    yet
+
+    :param task: A :class:`.Task` instance
+    """
+    from sqlalchemy import inspect
+    attrs = inspect(task).attrs
+    return attrs.parent.history.has_changes() or \
+        attrs.parent_id.history.has_changes()
+
+
+# the session.info key that is set to True when the parent of a task in the
+# session is changed and cleared when the session is flushed
+__parents_changed_key__ = 'stalker.task_parents_changed'
+
+
+def __parents_are_changed__(session):
+    """Returns True if the parent of a Task in the given session is changed
+    since the last flush, that is the ``Task_Closure`` table may not be up to
+    date
+
+    :param session: A :class:`sqlalchemy.orm.Session` instance
+    """
+    return session.info.get(__parents_changed_key__, False)
+
+
+@event.listens_for(Task.parent, 'set', propagate=True)
+@event.listens_for(Task.parent_id, 'set', propagate=True)
+def mark_parents_changed(task, value, old_value, initiator):
+    """Marks the session of the task as having unflushed parent changes
+
+    :param task: The task that its parent is changed
+    :param value: not used
+    :param old_value: not used
+    :param initiator: not used
+    """
+    session = object_session(task)
+    if session is not None:
+        session.info[__parents_changed_key__] = True
+
+
+@event.listens_for(Session, 'after_attach')
+def mark_attached_task_parents_changed(session, instance):
+    """Marks the session as having unflushed parent changes if a task that
+    its parent is changed outside of a session is attached to it
+
+    :param session: The session that the instance is attached to
+    :param instance: The attached instance
+    """
+    if isinstance(instance, Task) and __parent_is_changed__(instance):
+        session.info[__parents_changed_key__] = True
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def clear_parents_changed(session, previous_transaction):
+    """Clears the unflushed parent changes mark of the rolled back session
+
+    :param session: The rolled back session
+    :param previous_transaction: not used
+    """
+    session.info.pop(__parents_changed_key__, None)
+
+
+def __chunks__(items, size=500):
+    """Yields the given list in chunks of the given size, to keep the IN
+    clauses in a reasonable size
+    """
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def __insert_simple_entities__(connection, rows, chunk_size=500):
+    """Inserts the given SimpleEntities rows and returns the generated ids in
+    the same order.
+
+    The ids are reserved with one query and the rows are inserted with
+    executemany in PostgreSQL. The other dialects can not return the ids of
+    an executemany call, so the rows are inserted one by one with a
+    compiled statement.
+
+    :param connection: The connection of the current session
+    :param rows: A list of dictionaries holding the column values
+    :param int chunk_size: The max number of rows in one executemany call
+    """
+    from sqlalchemy import select, func
+    from stalker.models.entity import SimpleEntity
+
+    table = SimpleEntity.__table__
+    if connection.dialect.name == 'postgresql':
+        ids = [
+            row[0] for row in connection.execute(
+                select([
+                    func.nextval(
+                        func.pg_get_serial_sequence('"%s"' % table.name, 'id')
+                    )
+                ]).select_from(func.generate_series(1, len(rows)))
+            )
+        ]
+        for row, id_ in zip(rows, ids):
+            row['id'] = id_
+        for chunk in __chunks__(rows, chunk_size):
+            connection.execute(table.insert(), chunk)
+    else:
+        connection = connection.execution_options(compiled_cache={})
+        insert = table.insert()
+        ids = [
+            connection.execute(insert, row).inserted_primary_key[0]
+            for row in rows
+        ]
+    return ids
+
+
+@event.listens_for(Session, 'after_flush')
+def update_task_closure(session, flush_context):
+    """Updates the Task_Closure table for the created, moved and deleted
+    tasks.
+
+    The ``parent`` relation is using ``post_update`` so the parent_id values
+    are written at the very end of the flush, that's why the table is updated
+    after the flush where the session still shows the flushed changes.
+
+    :param session: The flushed session
+    :param flush_context: not used
+    """
+    from sqlalchemy import select, or_
+
+    new_tasks = [obj for obj in session.new if isinstance(obj, Task)]
+    moved_tasks = []
+    if session.info.pop(__parents_changed_key__, False):
+        moved_tasks = [
+            obj for obj in session.dirty
+            if isinstance(obj, Task) and __parent_is_changed__(obj)
+        ]
+    deleted_task_ids = [
+        obj.id for obj in session.deleted
+        if isinstance(obj, Task) and obj.id is not None
+    ]
+    if not new_tasks and not moved_tasks and not deleted_task_ids:
+        return
+
+    table = Task_Closure
+    connection = session.connection()
+
+    # deleted tasks
+    for ids in __chunks__(deleted_task_ids):
+        connection.execute(
+            table.delete().where(
+                or_(table.c.ancestor_id.in_(ids),
+                    table.c.descendant_id.in_(ids))
+            )
+        )
+
+    # new tasks
+    # the closure rows of a task are the rows of its parent plus itself
+    closure = {}
+    new_task_set = set(new_tasks)
+    parent_ids = list(set(
+        task.parent.id for task in new_tasks
+        if task.parent is not None and task.parent not in new_task_set
+    ))
+    for ids in __chunks__(parent_ids):
+        for ancestor_id, descendant_id, depth in connection.execute(
+                select([table.c.ancestor_id, table.c.descendant_id,
+                        table.c.depth])
+                .where(table.c.descendant_id.in_(ids))):
+            closure.setdefault(descendant_id, []).append(
+                (ancestor_id, depth)
+            )
+
+    def get_closure(t):
+        """returns the closure rows of the given task"""
+        # walk up until a task with known closure rows
+        tasks_to_resolve = []
+        while t is not None and t.id not in closure:
+            tasks_to_resolve.append(t)
+            t = t.parent
+        for t in reversed(tasks_to_resolve):
+            rows = [(t.id, 0)]
+            if t.parent is not None:
+                rows.extend(
+                    (ancestor_id, depth + 1)
+                    for ancestor_id, depth in closure[t.parent.id]
+                )
+            closure[t.id] = rows
+
+    rows = []
+    for task in new_tasks:
+        get_closure(task)
+        rows.extend(
+            {'ancestor_id': ancestor_id,
+             'descendant_id': task.id,
+             'depth': depth}
+            for ancestor_id, depth in closure[task.id]
+        )
+    if rows:
+        connection.execute(table.insert(), rows)
+
+    # moved tasks
+    # the rows between the old parents and the sub tree of the task are
+    # replaced with the rows between the new parents and the sub tree
+    for task in moved_tasks:
+        sub_tree = connection.execute(
+            select([table.c.descendant_id, table.c.depth])
+            .where(table.c.ancestor_id == task.id)
+        ).fetchall()
+        if not sub_tree:
+            sub_tree = [(task.id, 0)]
+            connection.execute(
+                table.insert(),
+                [{'ancestor_id': task.id, 'descendant_id': task.id,
+                  'depth': 0}]
+            )
+        sub_tree_ids = [descendant_id for descendant_id, _ in sub_tree]
+
+        old_parent_ids = [
+            row[0] for row in connection.execute(
+                select([table.c.ancestor_id])
+                .where(table.c.descendant_id == task.id)
+                .where(table.c.depth > 0)
+            )
+        ]
+        if old_parent_ids:
+            for ids in __chunks__(sub_tree_ids):
+                connection.execute(
+                    table.delete()
+                    .where(table.c.ancestor_id.in_(old_parent_ids))
+                    .where(table.c.descendant_id.in_(ids))
+                )
+
+        new_parents = []
+        if task.parent is not None:
+            new_parents = connection.execute(
+                select([table.c.ancestor_id, table.c.depth])
+                .where(table.c.descendant_id == task.parent.id)
+            ).fetchall()
+        if new_parents:
+            connection.execute(
+                table.insert(),
+                [{'ancestor_id': ancestor_id,
+                  'descendant_id': descendant_id,
+                  'depth': ancestor_depth + descendant_depth + 1}
+                 for ancestor_id, ancestor_depth in new_parents
+                 for descendant_id, descendant_depth in sub_tree]
+            )
+
+
+# *****************************************************************************
+# TimeLog and Task changes update the cached schedule info of the Projects
+# *****************************************************************************
+def __changed_ids__(obj, relation, column):
+    """Returns the current and the previous ids of the given many-to-one
+    relation of the given instance without loading any attribute
+
+    :param obj: A flushed instance
+    :param str relation: The name of the relationship attribute, not a
+      synonym of it, as synonyms do not have a history
+    :param str column: The name of the foreign key attribute
+    """
+    from sqlalchemy import inspect
+    state = inspect(obj)
+    ids = set([state.dict.get(column)])
+    ids.update(state.attrs[column].history.deleted or ())
+    ids.update(
+        related.id
+        for related in state.attrs[relation].history.deleted or ()
+        if related is not None
+    )
+    ids.discard(None)
+    return ids
+
+
+@event.listens_for(Session, 'after_flush')
+def update_project_schedule_info(session, flush_context):
+    """Refreshes the ``schedule_seconds`` and ``total_logged_seconds`` cache
+    columns of the projects of the created, updated and deleted TimeLogs and
+    Tasks.
+
+    :param session: The flushed session
+    :param flush_context: not used
+    """
+    from sqlalchemy import inspect, select
+
+    time_log_attrs = ['task', 'task_id', '_start', '_end', '_duration']
+    task_attrs = ['schedule_timing', 'schedule_unit', 'schedule_model',
+                  'parent', 'parent_id', '_project', 'project_id']
+
+    def is_changed(obj, attr_names):
+        """returns True if one of the given attributes are changed"""
+        attrs = inspect(obj).attrs
+        return any(attrs[name].history.has_changes() for name in attr_names)
+
+    task_ids = set()
+    project_ids = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, TimeLog):
+            task_ids.update(__changed_ids__(obj, 'task', 'task_id'))
+        elif isinstance(obj, Task):
+            project_ids.update(__changed_ids__(obj, '_project', 'project_id'))
+
+    for obj in session.dirty:
+        if isinstance(obj, TimeLog) and is_changed(obj, time_log_attrs):
+            task_ids.update(__changed_ids__(obj, 'task', 'task_id'))
+        elif isinstance(obj, Task) and is_changed(obj, task_attrs):
+            project_ids.update(__changed_ids__(obj, '_project', 'project_id'))
+
+    if not task_ids and not project_ids:
+        return
+
+    table = Task.__table__
+    connection = session.connection()
+    for ids in __chunks__(sorted(task_ids)):
+        project_ids.update(
+            row[0] for row in connection.execute(
+                select([table.c.project_id]).where(table.c.id.in_(ids))
+                .distinct()
+            )
+        )
+
+    ProgressRollup(session).update_projects(project_ids)
@@ -16,6 +16,7 @@
 # You should have received a copy of the Lesser GNU General Public License
 # along with Stalker.  If not, see <http://www.gnu.org/licenses/>
 
+import jinja2
 from sqlalchemy import Column, Integer, ForeignKey, Text
 from sqlalchemy.orm import validates
 from stalker.models.entity import Entity
@@ -27,6 +28,33 @@ import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging_level)
 
+# the compiled jinja2 templates by their source
+__compiled_templates__ = {}
+
+# the cache is cleared when it has more templates than this
+COMPILED_TEMPLATE_CACHE_SIZE = 1000
+
+
+def compile_template(source):
+    """returns the compiled jinja2.Template of the given template source.
+
+    The templates are compiled once per process and cached by their source,
+    so editing the path or filename of a :class:`.FilenameTemplate` will
+    simply compile the new source.
+
+    :param str source: The jinja2 template source.
+    """
+    try:
+        return __compiled_templates__[source]
+    except KeyError:
+        pass
+
+    if len(__compiled_templates__) >= COMPILED_TEMPLATE_CACHE_SIZE:
+        __compiled_templates__.clear()
+
+    template = __compiled_templates__[source] = jinja2.Template(source)
+    return template
+
 
 class FilenameTemplate(Entity, TargetEntityTypeMixin):
     """Holds templates for filename and path conventions.
@@ -152,6 +180,18 @@ class FilenameTemplate(Entity, TargetEntityTypeMixin):
 
         return filename_in
 
+    def render_path(self, **kwargs):
+        """renders the path template with the given template variables by
+        using the compiled template cache
+        """
+        return compile_template(self.path).render(**kwargs)
+
+    def render_filename(self, **kwargs):
+        """renders the filename template with the given template variables
+        by using the compiled template cache
+        """
+        return compile_template(self.filename).render(**kwargs)
+
     def __eq__(self, other):
         """checks the equality of the given object to this one
         """
@@ -22,7 +22,7 @@ from sqlalchemy.exc import UnboundExecutionError
 from sqlalchemy.orm import synonym, relationship
 from sqlalchemy.orm.mapper import validates
 from sqlalchemy import Column, Integer, String, Text
-from sqlalchemy.schema import ForeignKey, Table
+from sqlalchemy.schema import ForeignKey, Sequence, Table
 from sqlalchemy.types import Enum
 
 from stalker.db.declarative import Base
@@ -129,8 +129,21 @@ class Ticket(Entity, StatusMixin):
     The :attr:`.Ticket.name` is automatically generated by using the
     ``stalker.config.Config.ticket_label`` attribute and
     :attr:`.Ticket.ticket_number`\ . So if defaults are used the first ticket
-    name will be "Ticket#1" and the second "Ticket#2" and so on. For every
-    project the number will restart from 1.
+    name will be "Ticket#1" and the second "Ticket#2" and so on. If the
+    ``stalker.config.Config.ticket_numbers_per_project`` is True, the number
+    will restart from 1 for every project. The ``number`` column of the
+    ``Tickets`` table is unique in the whole studio, so the
+    ``"Tickets_number_key"`` unique constraint should be replaced with a
+    unique constraint on the ``project_id`` and ``number`` columns before
+    enabling it.
+
+    The numbers are reserved atomically from a database sequence on
+    PostgreSQL and from the ``Ticket_Counters`` table on the other databases,
+    so Tickets created at the same time get different numbers. A reserved
+    number is not given back if the transaction is rolled back, so there can
+    be gaps between the ticket numbers. Use :meth:`.Ticket.reserve_numbers`
+    to reserve the numbers of many Tickets at once and pass them with the
+    ``number`` argument.
 
     Use the :meth:`.Ticket.resolve`, :meth:`.Ticket.reassign`,
     :meth:`.Ticket.accept`, :meth:`.Ticket.reopen` methods to change the status
@@ -239,9 +252,11 @@ class Ticket(Entity, StatusMixin):
     )
 
     def __init__(self, project=None, links=None, priority='TRIVIAL',
-                 summary=None, **kwargs):
+                 summary=None, number=None, **kwargs):
         # just force auto name generation
-        self._number = self._generate_ticket_number()
+        if number is None:
+            number = self._generate_ticket_number(project)
+        self._number = number
         kwargs['name'] = defaults.ticket_label + ' #%i' % self.number
 
         super(Ticket, self).__init__(**kwargs)
@@ -293,13 +308,46 @@ class Ticket(Entity, StatusMixin):
 
         return max_ticket.number if max_ticket is not None else 0
 
-    def _generate_ticket_number(self):
+    @classmethod
+    def reserve_numbers(cls, count, project=None):
+        """Reserves and returns the given number of ticket numbers.
+
+        Use it to reserve the numbers of many Tickets with one query::
+
+          numbers = Ticket.reserve_numbers(len(rows), project=project)
+          for row, number in zip(rows, numbers):
+              Ticket(project=project, number=number, **row)
+
+        :param int count: The number of ticket numbers to reserve.
+        :param project: The :class:`.Project` of the Tickets. It is only used
+          if ``defaults.ticket_numbers_per_project`` is True.
+        :returns: A list of ints.
+        """
+        from stalker.db.session import DBSession
+        try:
+            connection = DBSession.connection()
+        except UnboundExecutionError:
+            connection = None
+
+        project_id = None
+        if defaults.ticket_numbers_per_project:
+            project_id = getattr(project, 'id', None)
+            if project_id is None:
+                # the project is not in the database yet
+                connection = None
+
+        if connection is None:
+            max_number = cls._maximum_number()
+            return list(range(max_number + 1, max_number + count + 1))
+
+        return reserve_ticket_numbers(connection, count, project_id)
+
+    def _generate_ticket_number(self, project=None):
         """auto generates a number for the ticket
 
         :return: integer
         """
-        # TODO: try to make it atomic
-        return self._maximum_number() + 1
+        return self.reserve_numbers(1, project)[0]
 
     @validates('related_tickets')
     def _validate_related_tickets(self, key, related_ticket):
@@ -510,6 +558,95 @@ class TicketLog(SimpleEntity):
         self.action = action
 
 
+# TICKET_COUNTERS
+Ticket_Counters = Table(
+    'Ticket_Counters', Base.metadata,
+    Column('project_id', Integer, primary_key=True, autoincrement=False),
+    Column('next_number', Integer, nullable=False, default=1)
+)
+
+#: the project_id of the Ticket_Counters row of the studio wide numbers
+GLOBAL_TICKET_COUNTER = 0
+
+#: the sequence of the studio wide ticket numbers on PostgreSQL
+Ticket_Number_Seq = Sequence('Ticket_Number_Seq', metadata=Base.metadata)
+
+
+def __create_ticket_counter__(connection, project_id):
+    """creates the Ticket_Counters row of the given project (or the studio
+    wide row) from the Tickets that are already in the database, does
+    nothing if the row is created meanwhile by another transaction
+    """
+    from sqlalchemy import func, select
+    tickets = Ticket.__table__
+    next_number = select([func.coalesce(func.max(tickets.c.number), 0) + 1])
+    if project_id != GLOBAL_TICKET_COUNTER:
+        next_number = next_number.where(tickets.c.project_id == project_id)
+    values = {
+        'project_id': project_id,
+        'next_number': next_number.as_scalar()
+    }
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        connection.execute(
+            insert(Ticket_Counters).values(**values).on_conflict_do_nothing()
+        )
+    else:
+        # the other transactions are already waiting for the write lock
+        connection.execute(Ticket_Counters.insert().values(**values))
+
+
+def reserve_ticket_numbers(connection, count=1, project_id=None):
+    """reserves and returns the given number of ticket numbers.
+
+    The studio wide numbers are read from the ``Ticket_Number_Seq`` sequence
+    on PostgreSQL. The per project numbers on PostgreSQL are reserved with a
+    single ``UPDATE ... RETURNING`` from the Ticket_Counters table. On the
+    other databases the ``UPDATE`` of the Ticket_Counters row locks the
+    database for writing until the end of the transaction and the new value
+    is read afterwards. The counter row is created from the existing Tickets
+    if it doesn't exist yet.
+
+    :param connection: The connection of the current transaction.
+    :param int count: The number of ticket numbers to reserve.
+    :param int project_id: The id of the :class:`.Project` for per project
+      numbers, None for the studio wide numbers.
+    :returns: A list of ints.
+    """
+    from sqlalchemy import func, select
+    is_postgresql = connection.dialect.name == 'postgresql'
+    if project_id is None:
+        if is_postgresql:
+            return [
+                row[0] for row in connection.execute(
+                    select([Ticket_Number_Seq.next_value()])
+                    .select_from(func.generate_series(1, count))
+                )
+            ]
+        project_id = GLOBAL_TICKET_COUNTER
+
+    condition = Ticket_Counters.c.project_id == project_id
+    update = Ticket_Counters.update().where(condition)\
+        .values(next_number=Ticket_Counters.c.next_number + count)
+
+    for i in range(2):
+        next_number = None
+        if is_postgresql:
+            row = connection.execute(
+                update.returning(Ticket_Counters.c.next_number)
+            ).fetchone()
+            if row is not None:
+                next_number = row[0]
+        elif connection.execute(update).rowcount:
+            next_number = connection.execute(
+                select([Ticket_Counters.c.next_number]).where(condition)
+            ).scalar()
+
+        if next_number is not None:
+            return list(range(next_number - count, next_number))
+        __create_ticket_counter__(connection, project_id)
+
+
 # A secondary Table for Ticket to Ticket relations
 Ticket_Related_Tickets = Table(
     'Ticket_Related_Tickets', Base.metadata,
@@ -19,11 +19,11 @@
 import os
 
 import re
-import jinja2
 
-from sqlalchemy import Table, Column, Integer, ForeignKey, String, Boolean
+from sqlalchemy import (Table, Column, Integer, ForeignKey, String, Boolean,
+                        event)
 from sqlalchemy.exc import UnboundExecutionError
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy.orm import relationship, validates, Session
 
 from stalker.db.declarative import Base
 from stalker.models.link import Link
@@ -289,6 +289,50 @@ class Version(Link, DAGMixin):
     @validates("version_number")
     def _validate_version_number(self, key, version_number):
         """validates the given version_number value
+
+        The version numbers are reserved from the Version_Counters table of
+        the task and take, so two Versions created at the same time in
+        different sessions never get the same number. If there is no
+        database or the task is not in the database yet the number is found
+        by querying the latest version.
+        """
+        from stalker.db.session import DBSession
+        task_id = self.task.id if self.task is not None else None
+        connection = None
+        if task_id is not None:
+            try:
+                connection = DBSession.connection()
+            except UnboundExecutionError:
+                pass
+
+        if connection is None:
+            return self._validate_version_number_with_query(version_number)
+
+        if version_number is None and self.version_number is None:
+            # a new version
+            return reserve_version_number(
+                connection, task_id, self.take_name
+            )
+
+        next_number = lock_version_counter(
+            connection, task_id, self.take_name
+        )
+        max_version_number = next_number - 1
+        if version_number is None or version_number <= max_version_number:
+            if self.version_number is not None and \
+               self.version_number == max_version_number:
+                # it is the latest version, do not change the number
+                return self.version_number
+            version_number = next_number
+
+        set_next_version_number(
+            connection, task_id, self.take_name, version_number + 1
+        )
+        return version_number
+
+    def _validate_version_number_with_query(self, version_number):
+        """validates the given version_number value by querying the latest
+        version
         """
         # get the latest version
         # and do it with auto flush turned off,
@@ -410,15 +454,9 @@ class Version(Link, DAGMixin):
         # get a suitable FilenameTemplate
         structure = self.task.project.structure
 
-        from stalker import FilenameTemplate
-
         vers_template = None
         if structure:
-            for template in structure.templates:
-                assert isinstance(template, FilenameTemplate)
-                if template.target_entity_type == self.task.entity_type:
-                    vers_template = template
-                    break
+            vers_template = structure.get_template(self.task.entity_type)
 
         if not vers_template:
             raise RuntimeError(
@@ -433,8 +471,7 @@ class Version(Link, DAGMixin):
                 }
             )
 
-        temp_filename = \
-            jinja2.Template(vers_template.filename).render(**kwargs)
+        temp_filename = vers_template.render_filename(**kwargs)
 
         from stalker import __string_types__
         if not isinstance(temp_filename, __string_types__):
@@ -444,8 +481,7 @@ class Version(Link, DAGMixin):
             # unicode for python2
             temp_filename = temp_filename.encode('utf-8')
 
-        temp_path = \
-            jinja2.Template(vers_template.path).render(**kwargs)
+        temp_path = vers_template.render_path(**kwargs)
 
         if not isinstance(temp_path, __string_types__):
             # it is
@@ -464,10 +500,9 @@ class Version(Link, DAGMixin):
 
         :return: str
         """
+        from stalker.models.repository import repository_path_resolver
         return os.path.normpath(
-            os.path.expandvars(
-                self.full_path
-            )
+            repository_path_resolver.expand(self.full_path)
         ).replace('\\', '/')
 
     @property
@@ -478,10 +513,9 @@ class Version(Link, DAGMixin):
 
         :return: str
         """
+        from stalker.models.repository import repository_path_resolver
         return os.path.normpath(
-            os.path.expandvars(
-                self.path
-            )
+            repository_path_resolver.expand(self.path)
         ).replace('\\', '/')
 
     def is_latest_published_version(self):
@@ -496,8 +530,25 @@ class Version(Link, DAGMixin):
     def latest_published_version(self):
         """Returns the last published version.
 
+        The id of the last published version is stored in the
+        Version_Counters table of the task and take, so it is a primary key
+        lookup.
+
         :return: :class:`.Version`
         """
+        from stalker.db.session import DBSession
+        if self.task.id is not None:
+            # the session is auto flushed, so the Version_Counters are up to
+            # date
+            counter = DBSession.query(Version_Counters.c.latest_published_id)\
+                .filter(Version_Counters.c.task_id == self.task.id)\
+                .filter(Version_Counters.c.take_name == self.take_name)\
+                .first()
+            if counter is not None:
+                if counter[0] is None:
+                    return None
+                return Version.query.get(counter[0])
+
         return Version.query\
             .filter_by(task=self.task)\
             .filter_by(take_name=self.take_name)\
@@ -597,3 +648,211 @@ Version_Outputs = Table(
     Column("version_id", Integer, ForeignKey("Versions.id"), primary_key=True),
     Column("link_id", Integer, ForeignKey("Links.id"), primary_key=True)
 )
+
+
+# VERSION_COUNTERS
+Version_Counters = Table(
+    "Version_Counters", Base.metadata,
+    Column("task_id", Integer, ForeignKey("Tasks.id", ondelete="CASCADE"),
+           primary_key=True),
+    Column("take_name", String(256), primary_key=True),
+    Column("next_number", Integer, nullable=False, default=1),
+    Column("latest_published_id", Integer,
+           ForeignKey("Versions.id", ondelete="SET NULL"), nullable=True)
+)
+
+
+def __counter_condition__(task_id, take_name):
+    """returns the where clause of the Version_Counters row of the given task
+    and take
+    """
+    from sqlalchemy import and_
+    return and_(Version_Counters.c.task_id == task_id,
+                Version_Counters.c.take_name == take_name)
+
+
+def __latest_published_id_query__(task_id, take_name):
+    """returns the query of the id of the published Version with the highest
+    version number of the given task and take
+    """
+    from sqlalchemy import select
+    versions = Version.__table__
+    return select([versions.c.id])\
+        .where(versions.c.task_id == task_id)\
+        .where(versions.c.take_name == take_name)\
+        .where(versions.c.is_published.is_(True))\
+        .order_by(versions.c.version_number.desc())\
+        .limit(1)
+
+
+def __create_version_counter__(connection, task_id, take_name):
+    """creates the Version_Counters row of the given task and take from the
+    Versions that are already in the database, does nothing if the row is
+    created meanwhile by another transaction
+    """
+    from sqlalchemy import func, select
+    versions = Version.__table__
+    next_number = select([func.coalesce(func.max(versions.c.version_number),
+                                        0) + 1])\
+        .where(versions.c.task_id == task_id)\
+        .where(versions.c.take_name == take_name)\
+        .as_scalar()
+    values = {
+        'task_id': task_id,
+        'take_name': take_name,
+        'next_number': next_number,
+        'latest_published_id':
+            __latest_published_id_query__(task_id, take_name).as_scalar()
+    }
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        connection.execute(
+            insert(Version_Counters).values(**values)
+            .on_conflict_do_nothing()
+        )
+    else:
+        # the other transactions are already waiting for the write lock
+        connection.execute(Version_Counters.insert().values(**values))
+
+
+def reserve_version_number(connection, task_id, take_name):
+    """reserves and returns the next version number of the given task and
+    take.
+
+    It is a single ``UPDATE ... RETURNING`` on PostgreSQL. On the other
+    databases the ``UPDATE`` locks the database for writing until the end of
+    the transaction and the new value is read afterwards. The counter is
+    created from the existing Versions if it doesn't exist yet.
+
+    :param connection: The connection of the current transaction.
+    :param int task_id: The id of the :class:`.Task`.
+    :param str take_name: The take name.
+    :returns int: The reserved version number.
+    """
+    condition = __counter_condition__(task_id, take_name)
+    update = Version_Counters.update().where(condition)\
+        .values(next_number=Version_Counters.c.next_number + 1)
+
+    for i in range(2):
+        if connection.dialect.name == 'postgresql':
+            row = connection.execute(
+                update.returning(Version_Counters.c.next_number)
+            ).fetchone()
+            if row is not None:
+                return row[0] - 1
+        else:
+            if connection.execute(update).rowcount:
+                from sqlalchemy import select
+                return connection.execute(
+                    select([Version_Counters.c.next_number]).where(condition)
+                ).scalar() - 1
+        __create_version_counter__(connection, task_id, take_name)
+
+
+def lock_version_counter(connection, task_id, take_name):
+    """locks the Version_Counters row of the given task and take until the
+    end of the transaction and returns its next_number, creates it if it
+    doesn't exist yet
+
+    :param connection: The connection of the current transaction.
+    :param int task_id: The id of the :class:`.Task`.
+    :param str take_name: The take name.
+    :returns int: The next version number.
+    """
+    from sqlalchemy import select
+    condition = __counter_condition__(task_id, take_name)
+    query = select([Version_Counters.c.next_number]).where(condition)
+    if connection.dialect.name == 'postgresql':
+        query = query.with_for_update()
+    else:
+        # acquire the write lock
+        connection.execute(
+            Version_Counters.update().where(condition)
+            .values(next_number=Version_Counters.c.next_number)
+        )
+
+    next_number = connection.execute(query).scalar()
+    if next_number is None:
+        __create_version_counter__(connection, task_id, take_name)
+        next_number = connection.execute(query).scalar()
+    return next_number
+
+
+def set_next_version_number(connection, task_id, take_name, next_number):
+    """sets the next_number of the Version_Counters row of the given task and
+    take if it is lower than the given value, use it after
+    :func:`.lock_version_counter`.
+    """
+    from sqlalchemy import case
+    connection.execute(
+        Version_Counters.update()
+        .where(__counter_condition__(task_id, take_name))
+        .values(next_number=case(
+            [(Version_Counters.c.next_number < next_number, next_number)],
+            else_=Version_Counters.c.next_number
+        ))
+    )
+
+
+# *****************************************************************************
+# Version changes update the latest published version of the Version_Counters
+# *****************************************************************************
+@event.listens_for(Session, 'after_flush')
+def update_version_counters(session, flush_context):
+    """Updates the ``latest_published_id`` of the Version_Counters rows of
+    the created, published, unpublished and deleted Versions and creates the
+    missing rows.
+
+    :param session: The flushed session
+    :param flush_context: not used
+    """
+    from sqlalchemy import inspect
+
+    attr_names = ['is_published', 'version_number', 'take_name', 'task',
+                  'task_id']
+
+    counters = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Version):
+            counters.add((obj.task_id, obj.take_name))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Version):
+            continue
+        attrs = inspect(obj).attrs
+        if not any(attrs[name].history.has_changes() for name in attr_names):
+            continue
+        task_ids = set([obj.task_id])
+        task_ids.update(attrs['task_id'].history.deleted or ())
+        task_ids.update(
+            task.id for task in attrs['task'].history.deleted or ()
+            if task is not None
+        )
+        take_names = set([obj.take_name])
+        take_names.update(attrs['take_name'].history.deleted or ())
+        for task_id in task_ids:
+            for take_name in take_names:
+                counters.add((task_id, take_name))
+
+    # the counters of the deleted tasks are deleted with them
+    from stalker.models.task import Task
+    deleted_task_ids = set(
+        obj.id for obj in session.deleted if isinstance(obj, Task)
+    )
+    deleted_task_ids.add(None)
+
+    connection = session.connection()
+    for task_id, take_name in counters:
+        if task_id in deleted_task_ids:
+            continue
+        result = connection.execute(
+            Version_Counters.update()
+            .where(__counter_condition__(task_id, take_name))
+            .values(
+                latest_published_id=__latest_published_id_query__(
+                    task_id, take_name
+                ).as_scalar()
+            )
+        )
+        if not result.rowcount:
+            __create_version_counter__(connection, task_id, take_name)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+import json
+import os
+import tempfile
+import unittest
+
+from stalker import db
+from stalker.db import DBSession
+from stalker.benchmarks import StudioGenerator, run_scenarios, main
+from stalker.benchmarks.scenarios import scenarios
+
+
+class StudioGeneratorTester(unittest.TestCase):
+    """tests the stalker.benchmarks.generator.StudioGenerator class
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+        db.init()
+
+    def tearDown(self):
+        """clean up the test
+        """
+        DBSession.remove()
+
+    def test_generate_is_working_properly(self):
+        """testing if the generate() method generates the requested amount of
+        data
+        """
+        generator = StudioGenerator(
+            projects=2, depth=2, children=3, users=4, dependency_density=1.0,
+            time_logs=2, versions=2
+        )
+        generator.generate()
+
+        self.assertEqual(
+            generator.counts,
+            {
+                'users': 4,
+                'projects': 2,
+                'tasks': 24,
+                'leaf_tasks': 18,
+                'time_logs': 4,
+                'versions': 36,
+            }
+        )
+
+        # only the first leaf task of each project has no dependency
+        for project in generator.projects:
+            leaf_tasks = [task for task in project.tasks if task.is_leaf]
+            self.assertEqual(
+                1, len([task for task in leaf_tasks if not task.depends])
+            )
+
+    def test_generate_is_deterministic(self):
+        """testing if the same seed generates the same data
+        """
+        def generate():
+            db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+            db.init()
+            generator = StudioGenerator(seed=5, depth=2, children=4)
+            generator.generate()
+            return [
+                (task.id, task.schedule_timing, task.schedule_unit,
+                 [r.id for r in task.resources],
+                 sorted(t.id for t in task.depends))
+                for task in generator.tasks
+            ]
+
+        data1 = generate()
+        DBSession.remove()
+        data2 = generate()
+        self.assertEqual(data1, data2)
+
+
+class BenchmarkRunnerTester(unittest.TestCase):
+    """tests the stalker.benchmarks.runner module
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+        db.init()
+        self.generator = StudioGenerator(depth=2, children=3, users=3)
+        self.generator.generate()
+
+    def tearDown(self):
+        """clean up the test
+        """
+        DBSession.remove()
+
+    def test_run_scenarios_is_working_properly(self):
+        """testing if the run_scenarios() function runs all the scenarios
+        """
+        results = run_scenarios(self.generator, repeat=2)
+        self.assertEqual(
+            sorted(results.keys()),
+            sorted(name for name, _ in scenarios)
+        )
+        for name in results:
+            self.assertEqual(len(results[name]['times']), 2)
+            self.assertLessEqual(results[name]['min'], results[name]['mean'])
+            self.assertLessEqual(results[name]['mean'], results[name]['max'])
+
+    def test_run_scenarios_names_argument_is_working_properly(self):
+        """testing if only the given scenarios are run
+        """
+        results = run_scenarios(self.generator, names=['list_scheduler'])
+        self.assertEqual(list(results.keys()), ['list_scheduler'])
+
+    def test_run_scenarios_names_argument_is_not_a_scenario_name(self):
+        """testing if a ValueError will be raised if the names argument has an
+        unknown scenario name
+        """
+        with self.assertRaises(ValueError) as cm:
+            run_scenarios(self.generator, names=['not a scenario'])
+
+        self.assertEqual(
+            str(cm.exception),
+            'There is no benchmark scenario called "not a scenario", please '
+            'use one of %s' % [name for name, _ in scenarios]
+        )
+
+    def test_scenarios_are_rolled_back(self):
+        """testing if the changes of the scenarios are rolled back
+        """
+        from stalker import Task, Version
+        num_of_versions = Version.query.count()
+        run_scenarios(self.generator)
+        self.assertEqual(num_of_versions, Version.query.count())
+        self.assertEqual(
+            0, Task.query.filter(Task.computed_start != None).count()
+        )
+
+    def test_main_is_writing_the_results_to_a_json_file(self):
+        """testing if main() writes the results to the given file
+        """
+        output = tempfile.mktemp(suffix='.json')
+        self.addCleanup(
+            lambda: os.path.exists(output) and os.remove(output)
+        )
+        main([
+            '--depth', '2', '--children', '2', '--users', '2',
+            '--scenario', 'tjp_file_content', '--scenario', 'list_scheduler',
+            '-o', output
+        ])
+
+        with open(output) as f:
+            results = json.load(f)
+
+        self.assertEqual(results['dialect'], 'sqlite')
+        self.assertEqual(results['parameters']['depth'], 2)
+        self.assertEqual(results['counts']['tasks'], 6)
+        self.assertEqual(
+            sorted(results['scenarios'].keys()),
+            ['list_scheduler', 'tjp_file_content']
+        )
@@ -1020,7 +1020,7 @@ class DatabaseTester(unittest.TestCase):
         sql_query = 'select version_num from "alembic_version"'
         version_num = \
             db.DBSession.connection().execute(sql_query).fetchone()[0]
-        self.assertEqual('0063f547dc2e', version_num)
+        self.assertEqual('e5b9c3a1f8d6', version_num)
 
     def test_initialization_of_alembic_version_table_multiple_times(self):
         """testing if the db.create_alembic_table() will handle initializing
@@ -1040,7 +1040,7 @@ class DatabaseTester(unittest.TestCase):
         sql_query = 'select version_num from "alembic_version"'
         version_num = \
             db.DBSession.connection().execute(sql_query).fetchone()[0]
-        self.assertEqual('0063f547dc2e', version_num)
+        self.assertEqual('e5b9c3a1f8d6', version_num)
 
         db.DBSession.remove()
         db.setup(db_config)
@@ -1134,7 +1134,12 @@ class DatabaseTester(unittest.TestCase):
         db.DBSession.remove()
 
         # reconnect
-        db.setup(db_config)
+        from stalker import defaults
+        defaults.export_repo_env_vars = True
+        try:
+            db.setup(db_config)
+        finally:
+            defaults.export_repo_env_vars = False
 
         all_repos = Repository.query.all()
 
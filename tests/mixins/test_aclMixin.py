@@ -98,3 +98,47 @@ class ACLMixinTester(unittest.TestCase):
             self.test_instance.__acl__,
             [('Allow', 'TestClassForACL:Test', 'Create_Something')]
         )
+
+    def test_acl_property_is_cached(self):
+        """testing if the __acl__ property returns the same list if nothing is
+        changed
+        """
+        self.assertIs(self.test_instance.__acl__, self.test_instance.__acl__)
+
+    def test_acl_property_is_updated_when_the_permissions_change(self):
+        """testing if the __acl__ property is updated when a permission is
+        added or removed
+        """
+        self.assertEqual(
+            self.test_instance.__acl__,
+            [('Allow', 'TestClassForACL:Test', 'Create_Something')]
+        )
+        test_perm2 = Permission(
+            access='Deny',
+            action='Read',
+            class_name='Something'
+        )
+        self.test_instance.permissions.append(test_perm2)
+        self.assertEqual(
+            self.test_instance.__acl__,
+            [('Allow', 'TestClassForACL:Test', 'Create_Something'),
+             ('Deny', 'TestClassForACL:Test', 'Read_Something')]
+        )
+        self.test_instance.permissions.remove(self.test_perm1)
+        self.assertEqual(
+            self.test_instance.__acl__,
+            [('Deny', 'TestClassForACL:Test', 'Read_Something')]
+        )
+
+    def test_acl_property_is_updated_when_the_name_changes(self):
+        """testing if the __acl__ property is updated when the name is changed
+        """
+        self.assertEqual(
+            self.test_instance.__acl__,
+            [('Allow', 'TestClassForACL:Test', 'Create_Something')]
+        )
+        self.test_instance.name = 'Test2'
+        self.assertEqual(
+            self.test_instance.__acl__,
+            [('Allow', 'TestClassForACL:Test2', 'Create_Something')]
+        )
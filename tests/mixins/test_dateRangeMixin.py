@@ -630,3 +630,45 @@ class DateRangeMixinTester(unittest.TestCase):
             new_foo_obj.computed_total_seconds,
             8 * 60 * 60
         )
+
+    def test_round_time_is_working_properly(self):
+        """testing if the round_time method is rounding the given datetime to
+        the closest multiple of the defaults.timing_resolution
+        """
+        defaults.timing_resolution = datetime.timedelta(minutes=10)
+        test_values = [
+            [datetime.datetime(2013, 3, 22, 15, 14),
+             datetime.datetime(2013, 3, 22, 15, 10)],
+            [datetime.datetime(2013, 3, 22, 15, 15),
+             datetime.datetime(2013, 3, 22, 15, 20)],
+            [datetime.datetime(2013, 3, 22, 15, 20),
+             datetime.datetime(2013, 3, 22, 15, 20)],
+            [datetime.datetime(2013, 3, 22, 15, 20, 4, 999999),
+             datetime.datetime(2013, 3, 22, 15, 20)],
+            [datetime.datetime(2013, 12, 31, 23, 55),
+             datetime.datetime(2014, 1, 1, 0, 0)],
+        ]
+        for dt, expected in test_values:
+            self.assertEqual(expected, DateRangeMixin.round_time(dt))
+
+        defaults.timing_resolution = datetime.timedelta(hours=1)
+        self.assertEqual(
+            datetime.datetime(2013, 3, 22, 15, 0),
+            DateRangeMixin.round_time(datetime.datetime(2013, 3, 22, 15, 15))
+        )
+
+    def test_round_times_is_working_properly(self):
+        """testing if the round_times method is rounding all the given
+        datetimes in order
+        """
+        defaults.timing_resolution = datetime.timedelta(minutes=30)
+        self.assertEqual(
+            [datetime.datetime(2013, 3, 22, 15, 30),
+             datetime.datetime(2013, 3, 22, 15, 0),
+             datetime.datetime(2013, 3, 23, 0, 0)],
+            DateRangeMixin.round_times([
+                datetime.datetime(2013, 3, 22, 15, 15),
+                datetime.datetime(2013, 3, 22, 15, 14, 59),
+                datetime.datetime(2013, 3, 22, 23, 45)
+            ])
+        )
@@ -471,6 +471,48 @@ class ScheduleMixinTestCase(unittest.TestCase):
                 self.test_obj.schedule_seconds
             )
 
+    def test_to_seconds_many_is_working_properly(self):
+        """testing if the to_seconds_many method returns the same values with
+        the to_seconds method
+        """
+        defaults.daily_working_hours = 9
+        defaults.weekly_working_days = 5
+        defaults.yearly_working_days = 52.1428 * 5
+
+        timings = [1, 2, 1, 3, 1]
+        units = ['d', 'w', 'd', 'h', None]
+        models = ['effort', 'length', 'duration', 'duration', 'effort']
+        self.assertEqual(
+            [32400, 324000, 86400, 10800, None],
+            self.test_obj.to_seconds_many(timings, units, models)
+        )
+
+    def test_time_unit_table_is_rebuilt_when_working_hours_change(self):
+        """testing if the time_unit_table is rebuilt only when the working
+        hours in the defaults are changed
+        """
+        from stalker.models.mixins import time_unit_table
+        defaults.daily_working_hours = 9
+        defaults.weekly_working_days = 5
+        defaults.yearly_working_days = 52.1428 * 5
+        self.assertEqual(32400, self.test_obj.to_seconds(1, 'd', 'effort'))
+        version = time_unit_table.version
+
+        # setting the same values doesn't rebuild the table
+        defaults.daily_working_hours = 9
+        self.assertEqual(32400, self.test_obj.to_seconds(1, 'd', 'effort'))
+        self.assertEqual(version, time_unit_table.version)
+
+        defaults.daily_working_hours = 10
+        self.assertEqual(36000, self.test_obj.to_seconds(1, 'd', 'effort'))
+        self.assertEqual(
+            (1, 'd'), self.test_obj.least_meaningful_time_unit(36000)
+        )
+        self.assertEqual(version + 1, time_unit_table.version)
+
+        defaults.daily_working_hours = 9
+        self.assertEqual(32400, self.test_obj.to_seconds(1, 'd', 'effort'))
+
     # def test_schedule_timing_and_schedule_unit_are_converted_to_the_least_meaningful_unit(self):
     #     """testing if the schedule_unit is converted to the least meaningful
     #     unit automatically
@@ -245,3 +245,25 @@ class FilenameTemplateTester(unittest.TestCase):
         self.assertTrue(ft1 != ft2)
         self.assertTrue(ft2 != ft3)
         self.assertTrue(ft3 != ft4)
+
+    def test_render_path_and_render_filename(self):
+        """testing if the render_path() and render_filename() methods are
+        rendering the current path and filename templates
+        """
+        self.filename_template.path = 'Assets/{{asset}}'
+        self.filename_template.filename = '{{asset}}_v{{version}}'
+        self.assertEqual(
+            'Assets/Tree',
+            self.filename_template.render_path(asset='Tree')
+        )
+        self.assertEqual(
+            'Tree_v1',
+            self.filename_template.render_filename(asset='Tree', version=1)
+        )
+
+        # the edited templates are used
+        self.filename_template.path = 'Props/{{asset}}'
+        self.assertEqual(
+            'Props/Tree',
+            self.filename_template.render_path(asset='Tree')
+        )
@@ -59,3 +59,203 @@ class MakePluralTestCase(unittest.TestCase):
         for t, e in test_words:
             r = make_plural(t)
             self.assertEqual(r, e)
+
+
+class Node(object):
+    """a simple node class to test stalker.models.walk_hierarchy()
+    """
+
+    def __init__(self, name, children=None):
+        self.name = name
+        self.children = children or []
+
+
+class WalkHierarchyTestCase(unittest.TestCase):
+    """tests stalker.models.walk_hierarchy() function
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        #     n1
+        #    /  \
+        #   n2   n3
+        #  /  \    \
+        # n4   n5   n6
+        self.n4 = Node('n4')
+        self.n5 = Node('n5')
+        self.n6 = Node('n6')
+        self.n2 = Node('n2', [self.n4, self.n5])
+        self.n3 = Node('n3', [self.n6])
+        self.n1 = Node('n1', [self.n2, self.n3])
+
+    def test_walk_hierarchy_in_DFS_mode(self):
+        """testing if stalker.models.walk_hierarchy() is walking in depth
+        first order
+        """
+        from stalker.models import walk_hierarchy
+        self.assertEqual(
+            [n.name for n in walk_hierarchy(self.n1, 'children')],
+            ['n1', 'n2', 'n4', 'n5', 'n3', 'n6']
+        )
+
+    def test_walk_hierarchy_in_BFS_mode(self):
+        """testing if stalker.models.walk_hierarchy() is walking in breadth
+        first order
+        """
+        from stalker.models import walk_hierarchy
+        self.assertEqual(
+            [n.name for n in walk_hierarchy(self.n1, 'children', method=1)],
+            ['n1', 'n2', 'n3', 'n4', 'n5', 'n6']
+        )
+
+    def test_walk_hierarchy_yields_each_entity_once(self):
+        """testing if stalker.models.walk_hierarchy() is yielding the entities
+        that can be reached from more than one path only once
+        """
+        from stalker.models import walk_hierarchy
+        self.n3.children.append(self.n4)
+        self.assertEqual(
+            [n.name for n in walk_hierarchy(self.n1, 'children')],
+            ['n1', 'n2', 'n4', 'n5', 'n3', 'n6']
+        )
+        self.assertEqual(
+            [n.name for n in walk_hierarchy(self.n1, 'children', method=1)],
+            ['n1', 'n2', 'n3', 'n4', 'n5', 'n6']
+        )
+
+    def test_walk_hierarchy_is_cycle_safe(self):
+        """testing if stalker.models.walk_hierarchy() is not falling in to an
+        infinite loop with cyclic graphs
+        """
+        from stalker.models import walk_hierarchy
+        self.n6.children.append(self.n1)
+        self.assertEqual(
+            [n.name for n in walk_hierarchy(self.n1, 'children')],
+            ['n1', 'n2', 'n4', 'n5', 'n3', 'n6']
+        )
+        self.assertEqual(
+            [n.name for n in walk_hierarchy(self.n1, 'children', method=1)],
+            ['n1', 'n2', 'n3', 'n4', 'n5', 'n6']
+        )
+
+    def test_check_circular_dependency_is_working_with_cycles(self):
+        """testing if stalker.models.check_circular_dependency() is raising a
+        CircularDependencyError for cyclic graphs and not falling in to an
+        infinite loop
+        """
+        from stalker.exceptions import CircularDependencyError
+        from stalker.models import check_circular_dependency
+        self.n6.children.append(self.n3)
+        other = Node('other')
+        # should not raise
+        check_circular_dependency(self.n1, other, 'children')
+        with self.assertRaises(CircularDependencyError):
+            check_circular_dependency(self.n1, self.n6, 'children')
+
+
+class WalkHierarchyPrefetchTestCase(unittest.TestCase):
+    """tests the prefetching of the persistent entities in
+    stalker.models.walk_hierarchy() function
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        from stalker import (db, Repository, Status, StatusList, Project,
+                             Task)
+        from stalker.db import DBSession
+
+        db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+        db.init()
+
+        status_list = StatusList(
+            name='Project Status List',
+            statuses=[Status(name='Status 1', code='STS1')],
+            target_entity_type='Project'
+        )
+        project = Project(
+            name='Test Project',
+            code='TP',
+            repository=Repository(name='Test Repository'),
+            status_list=status_list,
+        )
+        DBSession.add(project)
+
+        # 3 root tasks with 3 children with 3 children
+        self.root = Task(name='Root', project=project)
+        parents = [self.root]
+        for level in range(3):
+            children = []
+            for parent in parents:
+                for i in range(3):
+                    children.append(Task(name='Task %s' % i, parent=parent))
+            parents = children
+        DBSession.add(self.root)
+        DBSession.commit()
+        self.root_id = self.root.id
+
+        self.query_count = 0
+
+    def tearDown(self):
+        """clean up the test
+        """
+        from stalker.db import DBSession
+        DBSession.remove()
+
+    def count_queries(self):
+        """starts counting the executed queries in self.query_count
+        """
+        from sqlalchemy import event
+        from stalker.db import DBSession
+        engine = DBSession.connection().engine
+
+        def before_cursor_execute(*args):
+            self.query_count += 1
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        self.addCleanup(
+            event.remove, engine, 'before_cursor_execute',
+            before_cursor_execute
+        )
+
+    def test_walk_hierarchy_is_loading_levels_together_in_BFS_mode(self):
+        """testing if stalker.models.walk_hierarchy() is loading the children
+        of each level with one query in BFS mode
+        """
+        from stalker import Task
+        from stalker.db import DBSession
+        from stalker.models import walk_hierarchy
+
+        DBSession.expunge_all()
+        root = Task.query.get(self.root_id)
+
+        self.count_queries()
+        tasks = list(walk_hierarchy(root, 'children', method=1))
+        self.assertEqual(len(tasks), 1 + 3 + 9 + 27)
+        # the root children is lazy loaded, then 1 query for each level
+        self.assertEqual(self.query_count, 1 + 3)
+
+    def test_walk_hierarchy_is_loading_siblings_together_in_DFS_mode(self):
+        """testing if stalker.models.walk_hierarchy() is loading the children
+        of the siblings with one query in DFS mode
+        """
+        from stalker import Task
+        from stalker.db import DBSession
+        from stalker.models import walk_hierarchy
+
+        DBSession.expunge_all()
+        root = Task.query.get(self.root_id)
+
+        self.count_queries()
+        tasks = list(walk_hierarchy(root, 'children'))
+        self.assertEqual(len(tasks), 1 + 3 + 9 + 27)
+        # the root children is lazy loaded, then the children of the
+        # pending tasks are loaded level by level
+        self.assertEqual(self.query_count, 1 + 3)
+        self.assertEqual(
+            [task.name for task in tasks[:5]],
+            ['Root', 'Task 0', 'Task 0', 'Task 0', 'Task 1']
+        )
+        self.assertTrue(any(child is tasks[2] for child in tasks[1].children))
+        self.assertTrue(any(child is tasks[3] for child in tasks[2].children))
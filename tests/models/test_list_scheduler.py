@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import datetime
+import unittest
+
+from stalker.db import DBSession
+from stalker import (db, User, Repository, Status, StatusList, Project, Task,
+                     TimeLog, Vacation, ListScheduler, Studio)
+from stalker.models.task import TaskDependency
+
+
+class ListSchedulerTester(unittest.TestCase):
+    """tests the stalker.models.scheduler.ListScheduler class
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """setup tests in class level
+        """
+        cls.config = {
+            'sqlalchemy.url': 'sqlite:///:memory:',
+            'sqlalchemy.echo': False
+        }
+
+    def setUp(self):
+        """set up the test
+        """
+        db.setup(self.config)
+        db.init()
+
+        # create resources
+        self.test_user1 = User(
+            login='user1',
+            name='User1',
+            email='user1@users.com',
+            password='1234',
+        )
+        DBSession.add(self.test_user1)
+
+        self.test_user2 = User(
+            login='user2',
+            name='User2',
+            email='user2@users.com',
+            password='1234',
+        )
+        DBSession.add(self.test_user2)
+
+        self.test_user3 = User(
+            login='user3',
+            name='User3',
+            email='user3@users.com',
+            password='1234',
+        )
+        DBSession.add(self.test_user3)
+
+        # repository
+        self.test_repo = Repository(
+            name='Test Repository',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(self.test_repo)
+
+        # status lists
+        self.test_proj_status_list = StatusList(
+            name='Project Status List',
+            statuses=[Status(name='Status 1', code='STS1')],
+            target_entity_type='Project'
+        )
+        DBSession.add(self.test_proj_status_list)
+
+        self.test_proj1 = Project(
+            name='Test Project 1',
+            code='TP1',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+            start=datetime.datetime(2013, 4, 4),
+            end=datetime.datetime(2013, 5, 4)
+        )
+        DBSession.add(self.test_proj1)
+
+        self.test_task1 = Task(
+            name='Task1',
+            project=self.test_proj1,
+            resources=[self.test_user1, self.test_user2],
+            schedule_model='effort',
+            schedule_timing=50,
+            schedule_unit='h',
+        )
+        DBSession.add(self.test_task1)
+
+        self.test_task2 = Task(
+            name='Task2',
+            project=self.test_proj1,
+            resources=[self.test_user1, self.test_user2],
+            depends=[self.test_task1],
+            schedule_model='effort',
+            schedule_timing=60,
+            schedule_unit='h',
+        )
+        DBSession.add(self.test_task2)
+
+        # 2013-04-16 is a Tuesday
+        self.test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 16, 0, 0)
+        )
+        self.test_studio.start = datetime.datetime(2013, 4, 16, 0, 0)
+        self.test_studio.end = datetime.datetime(2013, 4, 30, 0, 0)
+        self.test_studio.daily_working_hours = 9
+        DBSession.add(self.test_studio)
+        DBSession.commit()
+
+    def tearDown(self):
+        """clean up the test
+        """
+        DBSession.remove()
+
+    def schedule(self, **kwargs):
+        """schedules the test studio with a ListScheduler
+        """
+        scheduler = ListScheduler(studio=self.test_studio, **kwargs)
+        scheduler.schedule()
+        DBSession.commit()
+        return scheduler
+
+    def test_compute_resources_argument_is_skipped(self):
+        """testing if the compute_resources attribute will be False if the
+        compute_resources argument is skipped
+        """
+        scheduler = ListScheduler()
+        self.assertFalse(scheduler.compute_resources)
+
+    def test_chunk_size_argument_is_skipped(self):
+        """testing if the chunk_size attribute will be 500 if the chunk_size
+        argument is skipped
+        """
+        scheduler = ListScheduler()
+        self.assertEqual(scheduler.chunk_size, 500)
+
+    def test_projects_argument_is_skipped(self):
+        """testing if the projects attribute will be an empty list if the
+        projects argument is skipped
+        """
+        scheduler = ListScheduler()
+        self.assertEqual(scheduler.projects, [])
+
+    def test_projects_argument_is_not_a_list(self):
+        """testing if a TypeError will be raised if the projects argument is
+        not a list
+        """
+        with self.assertRaises(TypeError) as cm:
+            ListScheduler(projects='not a list of projects')
+
+        self.assertEqual(
+            str(cm.exception),
+            'ListScheduler.projects should be a list of '
+            'stalker.models.project.Project instances, not str'
+        )
+
+    def test_schedule_will_raise_a_TypeError_if_studio_is_None(self):
+        """testing if a TypeError will be raised if the studio attribute is
+        None
+        """
+        scheduler = ListScheduler()
+        with self.assertRaises(TypeError) as cm:
+            scheduler.schedule()
+
+        self.assertEqual(
+            str(cm.exception),
+            'ListScheduler.studio should be an instance of '
+            'stalker.models.studio.Studio, not NoneType'
+        )
+
+    def test_tasks_are_correctly_scheduled(self):
+        """testing if the tasks are correctly scheduled
+        """
+        self.schedule(compute_resources=True)
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0),
+            self.test_proj1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 24, 10, 0),
+            self.test_proj1.computed_end
+        )
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0),
+            self.test_task1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 18, 16, 0),
+            self.test_task1.computed_end
+        )
+        self.assertEqual(
+            sorted([self.test_user1, self.test_user2], key=lambda x: x.name),
+            sorted(self.test_task1.computed_resources, key=lambda x: x.name)
+        )
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 18, 16, 0),
+            self.test_task2.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 24, 10, 0),
+            self.test_task2.computed_end
+        )
+
+    def test_tasks_are_correctly_scheduled_when_compute_resources_is_False(self):
+        """testing if the computed_resources are not updated when the
+        compute_resources is False
+        """
+        self.schedule(compute_resources=False)
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 18, 16, 0),
+            self.test_task1.computed_end
+        )
+        self.assertEqual(
+            sorted([self.test_user1, self.test_user2], key=lambda x: x.name),
+            sorted(self.test_task1.computed_resources, key=lambda x: x.name)
+        )
+
+    def test_alternative_resources_are_used(self):
+        """testing if the alternative resources are used when the resources
+        are not available
+        """
+        self.test_task2.alternative_resources = [self.test_user3]
+        self.test_task3 = Task(
+            name='Task3',
+            project=self.test_proj1,
+            resources=[self.test_user1],
+            alternative_resources=[self.test_user3],
+            schedule_model='effort',
+            schedule_timing=9,
+            schedule_unit='h',
+            priority=1000
+        )
+        DBSession.add(self.test_task3)
+        DBSession.commit()
+
+        self.schedule(compute_resources=True)
+
+        # Task3 has the highest priority, it is using the user1
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 18, 0),
+            self.test_task3.computed_end
+        )
+        self.assertEqual([self.test_user1], self.test_task3.computed_resources)
+
+        # Task1 can only use user2 on the first day
+        self.assertEqual(
+            datetime.datetime(2013, 4, 19, 12, 0),
+            self.test_task1.computed_end
+        )
+
+    def test_length_and_duration_tasks_are_correctly_scheduled(self):
+        """testing if the length and duration tasks are correctly scheduled
+        """
+        self.test_task1.schedule_model = 'length'
+        self.test_task1.schedule_timing = 2
+        self.test_task1.schedule_unit = 'd'
+
+        self.test_task2.schedule_model = 'duration'
+        self.test_task2.schedule_timing = 3
+        self.test_task2.schedule_unit = 'd'
+        DBSession.commit()
+
+        self.schedule()
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0),
+            self.test_task1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 17, 18, 0),
+            self.test_task1.computed_end
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 17, 18, 0),
+            self.test_task2.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 20, 18, 0),
+            self.test_task2.computed_end
+        )
+
+    def test_dependency_target_and_gap_is_considered(self):
+        """testing if the dependency target and the gap values are considered
+        """
+        self.test_task2.resources = [self.test_user3]
+        dependency = TaskDependency.query\
+            .filter_by(task=self.test_task2).first()
+        dependency.dependency_target = 'onstart'
+        dependency.gap_timing = 2
+        dependency.gap_unit = 'h'
+        dependency.gap_model = 'length'
+        DBSession.commit()
+
+        self.schedule()
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 11, 0),
+            self.test_task2.computed_start
+        )
+
+    def test_vacations_are_considered(self):
+        """testing if the studio and user vacations are considered
+        """
+        DBSession.add_all([
+            Vacation(
+                start=datetime.datetime(2013, 4, 16, 0, 0),
+                end=datetime.datetime(2013, 4, 17, 0, 0)
+            ),
+            Vacation(
+                user=self.test_user2,
+                start=datetime.datetime(2013, 4, 17, 0, 0),
+                end=datetime.datetime(2013, 4, 18, 0, 0)
+            )
+        ])
+        DBSession.commit()
+
+        self.schedule()
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 17, 9, 0),
+            self.test_task1.computed_start
+        )
+        # 9h on 17th, 18h on 18th and 19th
+        self.assertEqual(
+            datetime.datetime(2013, 4, 22, 12, 0),
+            self.test_task1.computed_end
+        )
+
+    def test_efficiency_is_considered(self):
+        """testing if the efficiency of the users are considered
+        """
+        self.test_user2.efficiency = 0.5
+        DBSession.commit()
+
+        self.schedule()
+
+        # 13.5h per day
+        self.assertEqual(
+            datetime.datetime(2013, 4, 19, 16, 0),
+            self.test_task1.computed_end
+        )
+
+    def test_time_logs_are_considered(self):
+        """testing if the time logs are counted towards the effort of the
+        tasks and the time logs of the resources are considered
+        """
+        DBSession.add(TimeLog(
+            task=self.test_task1,
+            resource=self.test_user1,
+            start=datetime.datetime(2013, 4, 15, 9, 0),
+            end=datetime.datetime(2013, 4, 15, 18, 0)
+        ))
+        DBSession.commit()
+
+        self.schedule()
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 15, 9, 0),
+            self.test_task1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 18, 12, 0),
+            self.test_task1.computed_end
+        )
+
+    def test_priority_is_considered(self):
+        """testing if the tasks with higher priority are scheduled first
+        """
+        self.test_task2.depends = []
+        self.test_task2.priority = 800
+        DBSession.commit()
+
+        self.schedule()
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0),
+            self.test_task2.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 19, 12, 0),
+            self.test_task2.computed_end
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 19, 12, 0),
+            self.test_task1.computed_start
+        )
+
+    def test_container_tasks_are_correctly_scheduled(self):
+        """testing if the container tasks and the dependencies to container
+        tasks are correctly scheduled
+        """
+        parent_task = Task(name='Parent Task', project=self.test_proj1)
+        self.test_task1.parent = parent_task
+        self.test_task2.depends = []
+        self.test_task2.parent = parent_task
+
+        self.test_task3 = Task(
+            name='Task3',
+            project=self.test_proj1,
+            resources=[self.test_user3],
+            depends=[parent_task],
+            schedule_timing=1,
+            schedule_unit='h',
+        )
+        DBSession.add(self.test_task3)
+        DBSession.commit()
+
+        self.schedule()
+
+        self.assertEqual(
+            self.test_task1.computed_start,
+            parent_task.computed_start
+        )
+        self.assertEqual(
+            self.test_task2.computed_end,
+            parent_task.computed_end
+        )
+        self.assertEqual(
+            parent_task.computed_end,
+            self.test_task3.computed_start
+        )
+        self.assertEqual(
+            self.test_task3.computed_end,
+            self.test_proj1.computed_end
+        )
+
+    def test_projects_argument_is_considered(self):
+        """testing if only the given projects are scheduled
+        """
+        test_proj2 = Project(
+            name='Test Project 2',
+            code='TP2',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+        )
+        test_task3 = Task(
+            name='Task3',
+            project=test_proj2,
+            resources=[self.test_user3],
+            schedule_timing=1,
+            schedule_unit='h',
+        )
+        DBSession.add(test_task3)
+        DBSession.commit()
+
+        self.schedule(projects=[test_proj2])
+
+        self.assertIsNone(self.test_task1.computed_start)
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0),
+            test_task3.computed_start
+        )
+
+    def test_cancel_is_working_properly(self):
+        """testing if the cancel() method will stop the schedule
+        """
+        scheduler = ListScheduler(studio=self.test_studio)
+        book = scheduler._book
+
+        def cancelling_book(*args):
+            scheduler.cancel()
+            return book(*args)
+
+        scheduler._book = cancelling_book
+
+        with self.assertRaises(RuntimeError) as cm:
+            scheduler.schedule()
+
+        self.assertEqual(str(cm.exception), 'Scheduling is cancelled')
+
+    def test_cancel_does_nothing_if_no_schedule_is_running(self):
+        """testing if the cancel() method will not cancel the next schedule
+        if there is no running schedule
+        """
+        scheduler = ListScheduler(studio=self.test_studio)
+        scheduler.cancel()
+        self.assertFalse(scheduler._is_cancelled)
+
+        scheduler.schedule()
+        DBSession.commit()
+        self.assertIsNotNone(self.test_task1.computed_start)
+
+    def test_copy_is_working_properly(self):
+        """testing if the copy() method will return a new scheduler with the
+        same settings
+        """
+        scheduler = ListScheduler(
+            studio=self.test_studio,
+            compute_resources=True,
+            projects=[self.test_proj1],
+            chunk_size=10
+        )
+        scheduler._is_running = True
+        scheduler.cancel()
+        scheduler_copy = scheduler.copy()
+
+        self.assertIsNot(scheduler_copy, scheduler)
+        self.assertEqual(scheduler_copy.studio, self.test_studio)
+        self.assertTrue(scheduler_copy.compute_resources)
+        self.assertEqual(scheduler_copy.chunk_size, 10)
+        self.assertEqual(scheduler_copy.projects, [self.test_proj1])
+        self.assertIsNot(scheduler_copy.projects, scheduler.projects)
+        self.assertFalse(scheduler_copy._is_cancelled)
+        self.assertFalse(scheduler_copy._is_running)
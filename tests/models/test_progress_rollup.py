@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import datetime
+import unittest
+
+from stalker.db import DBSession
+from stalker import (db, defaults, Repository, Status, StatusList, Project,
+                     Task, TimeLog, User)
+from stalker.models.task import ProgressRollup
+
+
+class ProgressRollupTester(unittest.TestCase):
+    """tests the stalker.models.task.ProgressRollup class and the cached
+    schedule info of Projects
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """setup tests in class level
+        """
+        cls.config = {
+            'sqlalchemy.url': 'sqlite:///:memory:',
+            'sqlalchemy.echo': False
+        }
+
+    def setUp(self):
+        """set up the test
+        """
+        db.setup(self.config)
+        db.init()
+
+        self.test_user1 = User(
+            name='User1',
+            login='user1',
+            email='user1@users.com',
+            password='1234'
+        )
+        DBSession.add(self.test_user1)
+
+        self.test_repo = Repository(name='Test Repository')
+        DBSession.add(self.test_repo)
+
+        self.test_proj_status_list = StatusList(
+            name='Project Status List',
+            statuses=[Status(name='Status 1', code='STS1')],
+            target_entity_type='Project'
+        )
+        DBSession.add(self.test_proj_status_list)
+
+        self.test_project1 = Project(
+            name='Test Project 1',
+            code='TP1',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+        )
+        self.test_project2 = Project(
+            name='Test Project 2',
+            code='TP2',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+        )
+        DBSession.add_all([self.test_project1, self.test_project2])
+
+        # Project1
+        #   Task1
+        #     Task2
+        #       Task3 (2 days)
+        #       Task4 (4 hours)
+        #   Task5 (1 week, duration)
+        # Project2
+        #   Task6 (10 hours)
+        self.test_task1 = Task(name='Task1', project=self.test_project1)
+        self.test_task2 = Task(name='Task2', parent=self.test_task1)
+        self.test_task3 = Task(
+            name='Task3',
+            parent=self.test_task2,
+            resources=[self.test_user1],
+            schedule_timing=2,
+            schedule_unit='d'
+        )
+        self.test_task4 = Task(
+            name='Task4',
+            parent=self.test_task2,
+            resources=[self.test_user1],
+            schedule_timing=4,
+            schedule_unit='h'
+        )
+        self.test_task5 = Task(
+            name='Task5',
+            project=self.test_project1,
+            resources=[self.test_user1],
+            schedule_timing=1,
+            schedule_unit='w',
+            schedule_model='duration'
+        )
+        self.test_task6 = Task(
+            name='Task6',
+            project=self.test_project2,
+            resources=[self.test_user1],
+            schedule_timing=10,
+            schedule_unit='h'
+        )
+        DBSession.add_all([
+            self.test_task1, self.test_task2, self.test_task3,
+            self.test_task4, self.test_task5, self.test_task6
+        ])
+        DBSession.commit()
+
+        self.start = datetime.datetime(2016, 4, 18, 10, 0)
+
+        self.day = defaults.daily_working_hours * 3600
+        self.project1_schedule_seconds = 2 * self.day + 4 * 3600 + 604800
+
+    def tearDown(self):
+        """clean up the test
+        """
+        DBSession.remove()
+
+    def create_time_log(self, task, start, end):
+        """creates a TimeLog for the given task starting and ending the given
+        hours after self.start
+        """
+        time_log = TimeLog(
+            task=task,
+            resource=self.test_user1,
+            start=self.start + datetime.timedelta(hours=start),
+            end=self.start + datetime.timedelta(hours=end)
+        )
+        DBSession.add(time_log)
+        return time_log
+
+    def test_refresh_is_computing_the_task_and_project_values(self):
+        """testing if ProgressRollup.refresh() is computing the
+        schedule_seconds and total_logged_seconds of all the tasks of the
+        given projects and the projects itself
+        """
+        self.create_time_log(self.test_task3, 0, 2)
+        self.create_time_log(self.test_task4, 2, 5)
+        self.create_time_log(self.test_task5, 5, 6)
+        self.create_time_log(self.test_task6, 6, 10)
+        DBSession.commit()
+
+        # break the cached values
+        DBSession.connection().execute(
+            Task.__table__.update().values(
+                schedule_seconds=None, total_logged_seconds=None
+            )
+        )
+        DBSession.connection().execute(
+            Project.__table__.update().values(
+                schedule_seconds=None, total_logged_seconds=None
+            )
+        )
+        DBSession.expire_all()
+
+        ProgressRollup().refresh(projects=[self.test_project1])
+
+        self.assertEqual(self.test_task3._total_logged_seconds, 2 * 3600)
+        self.assertEqual(self.test_task2._total_logged_seconds, 5 * 3600)
+        self.assertEqual(self.test_task1._total_logged_seconds, 5 * 3600)
+        self.assertEqual(self.test_task5._total_logged_seconds, 3600)
+        self.assertEqual(self.test_task3._schedule_seconds, 2 * self.day)
+        self.assertEqual(
+            self.test_task1._schedule_seconds, 2 * self.day + 4 * 3600
+        )
+        self.assertEqual(self.test_task5._schedule_seconds, 604800)
+
+        self.assertEqual(self.test_project1._total_logged_seconds, 6 * 3600)
+        self.assertEqual(
+            self.test_project1._schedule_seconds,
+            self.project1_schedule_seconds
+        )
+
+        # the other projects are not touched
+        self.assertIsNone(self.test_task6._total_logged_seconds)
+        self.assertIsNone(self.test_project2._total_logged_seconds)
+
+        # the values are stored in the database
+        self.assertFalse(DBSession.dirty)
+        DBSession.commit()
+        self.assertEqual(self.test_task1._total_logged_seconds, 5 * 3600)
+        self.assertEqual(self.test_project1._total_logged_seconds, 6 * 3600)
+
+        # and they are equal to the values calculated by the ORM
+        self.test_task1.update_schedule_info()
+        self.assertEqual(self.test_task1.total_logged_seconds, 5 * 3600)
+        self.assertEqual(
+            self.test_task1.schedule_seconds, 2 * self.day + 4 * 3600
+        )
+
+    def test_refresh_with_tasks_is_refreshing_the_parents(self):
+        """testing if ProgressRollup.refresh() is only refreshing the given
+        tasks, their parents and projects when tasks are given
+        """
+        self.create_time_log(self.test_task3, 0, 2)
+        self.create_time_log(self.test_task6, 2, 3)
+        DBSession.commit()
+
+        DBSession.connection().execute(
+            Task.__table__.update().values(total_logged_seconds=0)
+        )
+        DBSession.expire_all()
+
+        ProgressRollup().refresh(tasks=[self.test_task3])
+
+        self.assertEqual(self.test_task3._total_logged_seconds, 2 * 3600)
+        self.assertEqual(self.test_task2._total_logged_seconds, 2 * 3600)
+        self.assertEqual(self.test_task1._total_logged_seconds, 2 * 3600)
+        self.assertEqual(self.test_project1._total_logged_seconds, 2 * 3600)
+
+        # not a parent of the given tasks
+        self.assertEqual(self.test_task6._total_logged_seconds, 0)
+
+    def test_project_values_are_updated_when_time_logs_are_changed(self):
+        """testing if the Project.total_logged_seconds is updated when
+        TimeLogs are created, updated and deleted
+        """
+        self.assertEqual(self.test_project1.total_logged_seconds, 0)
+
+        time_log1 = self.create_time_log(self.test_task3, 0, 2)
+        # not flushed yet
+        self.assertEqual(self.test_project1.total_logged_seconds, 2 * 3600)
+
+        time_log2 = self.create_time_log(self.test_task5, 2, 3)
+        DBSession.commit()
+        self.assertEqual(self.test_project1.total_logged_seconds, 3 * 3600)
+        self.assertEqual(self.test_project2.total_logged_seconds, 0)
+
+        time_log1.end = self.start + datetime.timedelta(hours=1)
+        DBSession.commit()
+        self.assertEqual(self.test_project1.total_logged_seconds, 2 * 3600)
+
+        # move the TimeLog to another project
+        time_log2.task = self.test_task6
+        DBSession.commit()
+        self.assertEqual(self.test_project1.total_logged_seconds, 3600)
+        self.assertEqual(self.test_project2.total_logged_seconds, 3600)
+
+        DBSession.delete(time_log1)
+        DBSession.commit()
+        self.assertEqual(self.test_project1.total_logged_seconds, 0)
+
+    def test_project_values_are_updated_when_tasks_are_changed(self):
+        """testing if the Project.schedule_seconds is updated when Tasks are
+        created, updated and deleted
+        """
+        self.assertEqual(
+            self.test_project1.schedule_seconds,
+            self.project1_schedule_seconds
+        )
+
+        self.test_task5.schedule_timing = 2
+        DBSession.commit()
+        self.project1_schedule_seconds += 604800
+        self.assertEqual(
+            self.test_project1.schedule_seconds,
+            self.project1_schedule_seconds
+        )
+
+        new_task = Task(
+            name='Task7',
+            parent=self.test_task2,
+            resources=[self.test_user1],
+            schedule_timing=1,
+            schedule_unit='h'
+        )
+        DBSession.add(new_task)
+        DBSession.commit()
+        self.project1_schedule_seconds += 3600
+        self.assertEqual(
+            self.test_project1.schedule_seconds,
+            self.project1_schedule_seconds
+        )
+
+        DBSession.delete(self.test_task5)
+        DBSession.commit()
+        self.project1_schedule_seconds -= 2 * 604800
+        self.assertEqual(
+            self.test_project1.schedule_seconds,
+            self.project1_schedule_seconds
+        )
+
+    def test_project_values_are_not_queried_again(self):
+        """testing if the cached project values are returned without any
+        query when the session has no changes
+        """
+        from sqlalchemy import event
+
+        self.assertEqual(self.test_project1.total_logged_seconds, 0)
+        DBSession.commit()
+        self.test_project1.name
+
+        statements = []
+
+        def count(*args):
+            statements.append(args)
+
+        engine = DBSession.connection().engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            self.test_project1.total_logged_seconds
+            self.test_project1.schedule_seconds
+            self.test_project1.percent_complete
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        self.assertEqual(statements, [])
+
+    def test_project_values_are_not_flushing_the_session(self):
+        """testing if reading the Project.total_logged_seconds and
+        Project.schedule_seconds is not flushing the session even if it has
+        pending changes
+        """
+        from sqlalchemy import event
+
+        flushes = []
+
+        def count(*args):
+            flushes.append(args)
+
+        event.listen(DBSession, 'before_flush', count)
+        try:
+            with DBSession.no_autoflush:
+                self.create_time_log(self.test_task3, 0, 2)
+                self.test_task5.schedule_timing = 2
+                self.assertEqual(
+                    self.test_project1.total_logged_seconds, 2 * 3600
+                )
+                self.assertEqual(
+                    self.test_project1.schedule_seconds,
+                    self.project1_schedule_seconds + 604800
+                )
+        finally:
+            event.remove(DBSession, 'before_flush', count)
+        self.assertEqual(flushes, [])
+
+        # the values are computed in the database after the flush
+        DBSession.commit()
+        self.assertEqual(self.test_project1.total_logged_seconds, 2 * 3600)
+        self.assertEqual(
+            self.test_project1.schedule_seconds,
+            self.project1_schedule_seconds + 604800
+        )
+
+    def test_logged_seconds_of_unsupported_dialects(self):
+        """testing if the total TimeLog seconds are computed from the start
+        and end values of the TimeLogs for the dialects that have no SQL
+        expression for them
+        """
+        class GenericProgressRollup(ProgressRollup):
+            @classmethod
+            def _logged_seconds(cls, connection, table):
+                return None
+
+        self.create_time_log(self.test_task3, 0, 2)
+        self.create_time_log(self.test_task4, 2, 3)
+        self.create_time_log(self.test_task6, 3, 4)
+        DBSession.commit()
+
+        DBSession.connection().execute(
+            Task.__table__.update().values(total_logged_seconds=0)
+        )
+        DBSession.connection().execute(
+            Project.__table__.update().values(total_logged_seconds=0)
+        )
+        DBSession.expire_all()
+
+        rollup = GenericProgressRollup(DBSession)
+        rollup.update_tasks([
+            self.test_task1.id, self.test_task2.id, self.test_task3.id
+        ])
+        rollup.update_projects([self.test_project1.id, self.test_project2.id])
+        self.assertEqual(self.test_task3._total_logged_seconds, 2 * 3600)
+        self.assertEqual(self.test_task2._total_logged_seconds, 3 * 3600)
+        self.assertEqual(self.test_task1._total_logged_seconds, 3 * 3600)
+        self.assertEqual(self.test_project1._total_logged_seconds, 3 * 3600)
+        self.assertEqual(self.test_project2._total_logged_seconds, 3600)
+
+    def test_project_percent_complete(self):
+        """testing if the Project.percent_complete is using the cached
+        values
+        """
+        self.create_time_log(self.test_task6, 0, 5)
+        self.assertEqual(self.test_project2.percent_complete, 50)
+
+    def test_project_values_of_a_transient_project(self):
+        """testing if the values of a project that is not in a session are 0
+        """
+        new_project = Project(
+            name='New Project',
+            code='NP',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+        )
+        self.assertEqual(new_project.total_logged_seconds, 0)
+        self.assertEqual(new_project.schedule_seconds, 0)
+
+    def test_bulk_methods_are_updating_the_project_values(self):
+        """testing if the Task.bulk_create() and TimeLog.bulk_import() are
+        updating the project values
+        """
+        self.assertEqual(self.test_project2.total_logged_seconds, 0)
+        self.assertEqual(self.test_project2.schedule_seconds, 36000)
+
+        Task.bulk_create([{
+            'name': 'Task7', 'project': self.test_project2,
+            'resources': [self.test_user1], 'schedule_timing': 2,
+            'schedule_unit': 'h'
+        }])
+        self.assertEqual(self.test_project2.schedule_seconds, 12 * 3600)
+
+        TimeLog.bulk_import([{
+            'task': self.test_task6, 'resource': self.test_user1,
+            'start': self.start, 'end': self.start + datetime.timedelta(hours=3)
+        }])
+        self.assertEqual(self.test_project2.total_logged_seconds, 3 * 3600)
@@ -1064,6 +1064,77 @@ class RepositoryTester(unittest.TestCase):
             new_repo1
         )
 
+    def test_find_repo_returns_the_repository_with_the_longest_path(self):
+        """testing if the find_repo class method returns the repository with
+        the longest matching path if the path is in more than one repository
+        """
+        from stalker import db
+        db.setup()
+
+        new_repo1 = Repository(
+            name='New Repository',
+            linux_path='/mnt/M/Projects/Commercials',
+            osx_path='/Volumes/M/Projects/Commercials',
+            windows_path='M:/Projects/Commercials'
+        )
+        db.DBSession.add_all([self.test_repo, new_repo1])
+        db.DBSession.commit()
+
+        self.assertEqual(
+            Repository.find_repo('/mnt/M/Projects/Commercials/a/file.ma'),
+            new_repo1
+        )
+        self.assertEqual(
+            Repository.find_repo('/mnt/M/Projects/Commercials_2/file.ma'),
+            self.test_repo
+        )
+        self.assertIsNone(Repository.find_repo('/mnt/M/Projects'))
+        self.assertIsNone(Repository.find_repo('/mnt/T/Projects/file.ma'))
+
+    def test_find_repo_is_updated_when_the_repository_paths_change(self):
+        """testing if the find_repo class method finds the repository with
+        its new path after the path is changed
+        """
+        from stalker import db
+        db.setup()
+
+        db.DBSession.add(self.test_repo)
+        db.DBSession.commit()
+
+        test_path = '/mnt/T/Projects/some/path/to/a/file.ma'
+        self.assertIsNone(Repository.find_repo(test_path))
+
+        self.test_repo.linux_path = '/mnt/T/Projects'
+        db.DBSession.commit()
+        self.assertEqual(Repository.find_repo(test_path), self.test_repo)
+
+    def test_find_repos_is_working_properly(self):
+        """testing if the find_repos class method returns the repositories of
+        the given paths in the same order
+        """
+        from stalker import db
+        db.setup()
+
+        new_repo1 = Repository(
+            name='New Repository',
+            linux_path='/mnt/T/Projects',
+            osx_path='/Volumes/T/Projects',
+            windows_path='T:/Projects'
+        )
+        db.DBSession.add_all([self.test_repo, new_repo1])
+        db.DBSession.commit()
+
+        self.assertEqual(
+            Repository.find_repos([
+                'T:/Projects/some/file.ma',
+                '/Volumes/M/Projects/some/file.ma',
+                '/not/in/a/repo/file.ma',
+                '$REPO%s/some/file.ma' % new_repo1.id,
+            ]),
+            [new_repo1, self.test_repo, None, new_repo1]
+        )
+        self.assertEqual(Repository.find_repos([]), [])
+
     def test_env_var_property_is_working_properly(self):
         """testing if the env_var property is working properly
         """
@@ -1088,11 +1159,18 @@ class RepositoryDBTester(unittest.TestCase):
         """
         self.patcher = PlatformPatcher()
 
+        # the environment variables are only created if it is enabled
+        from stalker import defaults
+        defaults.export_repo_env_vars = True
+
     def tearDown(self):
         """clean the test down
         """
         self.patcher.restore()
 
+        from stalker import defaults
+        defaults.export_repo_env_vars = False
+
     def test_creating_and_committing_a_new_repository_instance_will_create_env_var(self):
         """testing if an environment variable will be created when a new
         repository is created
@@ -1310,3 +1388,103 @@ class RepositoryDBTester(unittest.TestCase):
             os.environ[defaults.repo_env_var_template % {'id': repo.id}],
             repo.linux_path
         )
+
+    def test_env_var_is_not_created_if_export_repo_env_vars_is_False(self):
+        """testing if no environment variable is created for a new repository
+        if the defaults.export_repo_env_vars is False
+        """
+        from stalker import db, defaults
+        defaults.export_repo_env_vars = False
+        db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+
+        repo = Repository(
+            name='Test Repo',
+            linux_path='/mnt/T',
+            osx_path='/Volumes/T',
+            windows_path='T:/'
+        )
+        db.DBSession.add(repo)
+        db.DBSession.commit()
+
+        import os
+        os.environ.pop(repo.env_var, None)
+        repo.linux_path = '/mnt/S'
+        repo.windows_path = 'S:/'
+        repo.osx_path = '/Volumes/S'
+        db.DBSession.commit()
+        self.assertFalse(repo.env_var in os.environ)
+
+    def test_repository_path_resolver_expands_the_repo_env_vars(self):
+        """testing if the repository_path_resolver expands the repository
+        environment variables without the environment variables
+        """
+        from stalker import db, defaults
+        from stalker.models.repository import repository_path_resolver
+        defaults.export_repo_env_vars = False
+        db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+        self.patcher.patch('Linux')
+
+        repo1 = Repository(
+            name='Test Repo 1',
+            linux_path='/mnt/T',
+            osx_path='/Volumes/T',
+            windows_path='T:/'
+        )
+        repo2 = Repository(
+            name='Test Repo 2',
+            linux_path='/mnt/S',
+            osx_path='/Volumes/S',
+            windows_path='S:/'
+        )
+        db.DBSession.add_all([repo1, repo2])
+        db.DBSession.commit()
+
+        import os
+        os.environ.pop(repo1.env_var, None)
+        os.environ.pop(repo2.env_var, None)
+
+        self.assertEqual(
+            repository_path_resolver.expand(
+                '$%s/a/b.ma ${%s}/c.ma $%s0/d.ma' %
+                (repo1.env_var, repo2.env_var, repo2.env_var)
+            ),
+            '/mnt/T//a/b.ma /mnt/S//c.ma $%s0/d.ma' % repo2.env_var
+        )
+
+        # path changes are reflected immediately
+        repo1.linux_path = '/mnt/U'
+        self.assertEqual(
+            repository_path_resolver.expand('$%s/a.ma' % repo1.env_var),
+            '/mnt/U//a.ma'
+        )
+
+        # and for the current os
+        self.patcher.patch('Windows')
+        self.assertEqual(
+            repository_path_resolver.get_path(repo1.id),
+            'T:/'
+        )
+        self.assertFalse(repo1.env_var in os.environ)
+
+    def test_create_repo_vars_exports_the_repo_env_vars(self):
+        """testing if the db.create_repo_vars() creates the environment
+        variables of all the repositories
+        """
+        from stalker import db, defaults
+        defaults.export_repo_env_vars = False
+        db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+        self.patcher.patch('Linux')
+
+        repo = Repository(
+            name='Test Repo',
+            linux_path='/mnt/T',
+            osx_path='/Volumes/T',
+            windows_path='T:/'
+        )
+        db.DBSession.add(repo)
+        db.DBSession.commit()
+
+        import os
+        os.environ.pop(repo.env_var, None)
+        db.create_repo_vars()
+        self.assertEqual(os.environ[repo.env_var], '/mnt/T/')
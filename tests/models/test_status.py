@@ -115,3 +115,127 @@ class StatusTest(unittest.TestCase):
         self.assertFalse(a_status != self.kwargs["code"])
         self.assertFalse(a_status != self.kwargs["code"].lower())
         self.assertFalse(a_status != self.kwargs["code"].upper())
+
+
+class StatusRegistryTestCase(unittest.TestCase):
+    """tests the stalker.models.status.StatusRegistry class
+    """
+
+    def setUp(self):
+        """setup the test
+        """
+        from stalker import db
+        db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+        db.init()
+
+    def tearDown(self):
+        """clean up the test
+        """
+        from stalker.db.session import DBSession
+        DBSession.remove()
+
+    def test_get_status_is_working_properly(self):
+        """testing if the get_status() method will return the Status with the
+        given code
+        """
+        from stalker.models.status import status_registry
+        wfd = Status.query.filter_by(code='WFD').first()
+        self.assertEqual(status_registry.get_status('WFD'), wfd)
+
+    def test_get_status_returns_None_for_unknown_codes(self):
+        """testing if the get_status() method will return None for unknown
+        status codes
+        """
+        from stalker.models.status import status_registry
+        self.assertIsNone(status_registry.get_status('UNKNOWN'))
+
+    def test_get_statuses_is_working_properly(self):
+        """testing if the get_statuses() method will return the Statuses in
+        the given code order
+        """
+        from stalker.models.status import status_registry
+        wip = Status.query.filter_by(code='WIP').first()
+        cmpl = Status.query.filter_by(code='CMPL').first()
+        self.assertEqual(
+            status_registry.get_statuses('CMPL', 'WIP', 'UNKNOWN'),
+            [cmpl, wip, None]
+        )
+
+    def test_get_status_list_is_working_properly(self):
+        """testing if the get_status_list() method will return the StatusList
+        of the given class or class name
+        """
+        from stalker import StatusList, Task
+        from stalker.models.status import status_registry
+        task_status_list = \
+            StatusList.query.filter_by(target_entity_type='Task').first()
+        self.assertEqual(
+            status_registry.get_status_list('Task'),
+            task_status_list
+        )
+        self.assertEqual(
+            status_registry.get_status_list(Task),
+            task_status_list
+        )
+
+    def test_lookups_are_cached(self):
+        """testing if the Statuses are queried only once per session
+        """
+        from sqlalchemy import event
+        from stalker.db.session import DBSession
+        from stalker.models.status import status_registry
+        status_registry.get_status('WFD')
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = DBSession.connection().engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            status_registry.get_statuses('WFD', 'RTS', 'WIP', 'CMPL')
+            status_registry.get_status('OH')
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+
+        self.assertEqual(statements, [])
+
+    def test_cache_is_invalidated_when_a_status_is_inserted(self):
+        """testing if a newly inserted Status will be returned by the registry
+        """
+        from stalker.db.session import DBSession
+        from stalker.models.status import status_registry
+        self.assertIsNone(status_registry.get_status('NEWST'))
+
+        new_status = Status(name='New Status', code='NEWST')
+        DBSession.add(new_status)
+        DBSession.commit()
+
+        self.assertEqual(status_registry.get_status('NEWST'), new_status)
+
+    def test_cache_is_invalidated_when_a_status_is_updated(self):
+        """testing if the registry will return the Status with its updated
+        code
+        """
+        from stalker.db.session import DBSession
+        from stalker.models.status import status_registry
+        oh = status_registry.get_status('OH')
+        oh.code = 'HOLD'
+        DBSession.commit()
+
+        self.assertIsNone(status_registry.get_status('OH'))
+        self.assertEqual(status_registry.get_status('HOLD'), oh)
+
+    def test_new_sessions_get_their_own_instances(self):
+        """testing if the registry will return instances bound to the current
+        session after the session is removed
+        """
+        from sqlalchemy.orm import object_session
+        from stalker.db.session import DBSession
+        from stalker.models.status import status_registry
+        wfd1 = status_registry.get_status('WFD')
+        DBSession.remove()
+        wfd2 = status_registry.get_status('WFD')
+        self.assertIs(object_session(wfd2), DBSession())
+        self.assertEqual(wfd1.id, wfd2.id)
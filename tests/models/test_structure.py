@@ -238,6 +238,43 @@ class StructureTester(unittest.TestCase):
         self.assertTrue(self.test_structure != new_structure3)
         self.assertTrue(self.test_structure != new_structure4)
 
+    def test_get_template_is_working_properly(self):
+        """testing if the get_template() method returns the first template
+        with the given target_entity_type and None if there is no such
+        template
+        """
+        self.assertEqual(
+            self.shot_template, self.test_structure.get_template('Shot')
+        )
+        self.assertIsNone(self.test_structure.get_template('Task'))
+
+        # a second template for Shots is not returned
+        new_shot_template = FilenameTemplate(
+            name="Test Shot Template 2",
+            target_entity_type="Shot",
+            type=self.shot_template.type
+        )
+        self.test_structure.templates.append(new_shot_template)
+        self.assertEqual(
+            self.shot_template, self.test_structure.get_template('Shot')
+        )
+
+    def test_get_template_is_updated_when_templates_change(self):
+        """testing if the get_template() method is using the current
+        templates after the templates attribute is changed
+        """
+        self.assertEqual(
+            self.asset_template, self.test_structure.get_template('Asset')
+        )
+        self.test_structure.templates.remove(self.asset_template)
+        self.assertIsNone(self.test_structure.get_template('Asset'))
+
+        self.test_structure.templates = [self.asset_template]
+        self.assertEqual(
+            self.asset_template, self.test_structure.get_template('Asset')
+        )
+        self.assertIsNone(self.test_structure.get_template('Shot'))
+
     def test_plural_class_name(self):
         """testing the plural name of Structure class
         """
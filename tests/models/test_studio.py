@@ -2007,6 +2007,176 @@ project Studio_{{studio.id}} "Studio_{{studio.id}}" 2013-04-15 - 2013-06-30 {
         self.assertEqual(studio.timing_resolution, new_res)
 
 
+class SchedulingJobTester(unittest.TestCase):
+    """tests the stalker.models.studio.SchedulingJob class
+    """
+
+    def setUp(self):
+        """setup the test
+        """
+        # the job uses its own session in another thread, so use a database
+        # file instead of an in memory database
+        import tempfile
+        self.temp_db_path = tempfile.mktemp(suffix='.db')
+        db.setup({'sqlalchemy.url': 'sqlite:///%s' % self.temp_db_path})
+        db.init()
+
+        self.test_user1 = User(
+            name='User 1',
+            login='user1',
+            email='user1@users.com',
+            password='password'
+        )
+        self.test_studio = Studio(
+            name='Test Studio',
+            now=datetime.datetime(2013, 4, 15, 22, 56)
+        )
+        DBSession.add_all([self.test_user1, self.test_studio])
+        DBSession.commit()
+
+    def tearDown(self):
+        """clean up the test
+        """
+        import os
+        DBSession.remove()
+        if os.path.exists(self.temp_db_path):
+            os.remove(self.temp_db_path)
+
+    def test_schedule_async_will_not_work_without_a_scheduler(self):
+        """testing if a RuntimeError will be raised when the scheduler
+        attribute is not set to a Scheduler instance
+        """
+        self.assertRaises(RuntimeError, self.test_studio.schedule_async)
+
+    def test_schedule_async_returns_a_scheduling_job(self):
+        """testing if the schedule_async() method will return a SchedulingJob
+        instance
+        """
+        from stalker import SchedulingJob
+        self.test_studio.scheduler = DummyScheduler()
+        job = self.test_studio.schedule_async()
+        self.assertIsInstance(job, SchedulingJob)
+        self.assertEqual(job.wait(10), SchedulingJob.COMPLETED)
+
+    def test_schedule_async_will_commit_the_schedule_info_in_database(self):
+        """testing if the job will store the schedule info in the database
+        in its own session
+        """
+        from stalker import SchedulingJob
+        self.test_studio.scheduler = DummyScheduler()
+        job = self.test_studio.schedule_async(scheduled_by=self.test_user1)
+        self.assertEqual(job.wait(10), SchedulingJob.COMPLETED)
+        self.assertIsNotNone(job.started_at)
+        self.assertIsNotNone(job.finished_at)
+
+        DBSession.expire_all()
+        self.assertFalse(self.test_studio.is_scheduling)
+        self.assertIsNotNone(self.test_studio.last_scheduled_at)
+        self.assertEqual(self.test_studio.last_scheduled_by, self.test_user1)
+
+    def test_studio_is_scheduling_while_the_job_is_running(self):
+        """testing if the Studio.is_scheduling attribute will be True while
+        the job is running
+        """
+        import threading
+        from stalker import SchedulingJob
+        started = threading.Event()
+        finish = threading.Event()
+
+        def callback():
+            started.set()
+            finish.wait(10)
+
+        self.test_studio.scheduler = DummyScheduler(callback=callback)
+        job = self.test_studio.schedule_async(scheduled_by=self.test_user1)
+        self.assertTrue(started.wait(10))
+        self.assertEqual(job.status(), SchedulingJob.RUNNING)
+
+        DBSession.expire_all()
+        self.assertTrue(self.test_studio.is_scheduling)
+        self.assertEqual(self.test_studio.is_scheduling_by, self.test_user1)
+        DBSession.rollback()
+
+        finish.set()
+        self.assertEqual(job.wait(10), SchedulingJob.COMPLETED)
+
+    def test_failed_job(self):
+        """testing if the job status will be 'failed' and the error will be
+        stored when the scheduler raises an error
+        """
+        from stalker import SchedulingJob
+
+        def callback():
+            raise RuntimeError('tj3 error')
+
+        self.test_studio.scheduler = DummyScheduler(callback=callback)
+        job = self.test_studio.schedule_async()
+        self.assertEqual(job.wait(10), SchedulingJob.FAILED)
+        self.assertEqual(str(job.error), 'tj3 error')
+
+        DBSession.expire_all()
+        self.assertFalse(self.test_studio.is_scheduling)
+        self.assertEqual(self.test_studio.last_schedule_message, 'tj3 error')
+
+    def test_cancel_is_working_properly(self):
+        """testing if the cancel() method will cancel the job and discard the
+        results of the scheduler
+        """
+        import threading
+        from stalker import SchedulingJob
+        started = threading.Event()
+        finish = threading.Event()
+
+        def callback():
+            started.set()
+            finish.wait(10)
+
+        self.test_studio.scheduler = DummyScheduler(callback=callback)
+        job = self.test_studio.schedule_async(scheduled_by=self.test_user1)
+        self.assertTrue(started.wait(10))
+
+        self.assertTrue(job.cancel())
+        finish.set()
+        self.assertEqual(job.wait(10), SchedulingJob.CANCELLED)
+
+        DBSession.expire_all()
+        self.assertFalse(self.test_studio.is_scheduling)
+        self.assertIsNone(self.test_studio.last_scheduled_by)
+
+        # can not cancel a finished job
+        self.assertFalse(job.cancel())
+
+    def test_cancel_before_the_job_is_started(self):
+        """testing if the job will be cancelled without running the scheduler
+        if it is cancelled before it is started
+        """
+        from stalker import SchedulingJob
+        calls = []
+        self.test_studio.scheduler = \
+            DummyScheduler(callback=lambda: calls.append(1))
+        job = SchedulingJob(self.test_studio)
+        self.assertEqual(job.status(), SchedulingJob.PENDING)
+
+        self.assertTrue(job.cancel())
+        job.start()
+        self.assertEqual(job.wait(10), SchedulingJob.CANCELLED)
+        self.assertEqual(calls, [])
+
+    def test_job_is_using_a_copy_of_the_studio_scheduler(self):
+        """testing if the job will use a copy of the Studio.scheduler and the
+        Studio.scheduler will not be changed by the job
+        """
+        from stalker import SchedulingJob
+        scheduler = DummyScheduler()
+        self.test_studio.scheduler = scheduler
+        job = self.test_studio.schedule_async()
+        self.assertEqual(job.wait(10), SchedulingJob.COMPLETED)
+
+        self.assertIsNot(job.scheduler, scheduler)
+        self.assertIs(self.test_studio.scheduler, scheduler)
+        self.assertIsNone(scheduler.studio)
+        self.assertEqual(scheduler.projects, [])
+
 @unittest.skip
 def csv_to_test_converter():
     """convert tjp output csv to test case
@@ -273,53 +273,25 @@ project Studio_564 "Studio_564" 2013-04-16 - 2013-06-30 {
 }
         }
 
-        # tasks
-        
-            
-task Project_{{proj.id}} "Project_{{proj.id}}" {
-        
-task Task_{{task1.id}} "Task_{{task1.id}}" {
-
-    
-            
-            
-            effort 50.0h
-            allocate User_{{user1.id}} {
-                    alternative
-                    User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated
-                    persistent
-                }, User_{{user2.id}} {
-                    alternative
-                    User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated
-                    persistent
-                }            
-}        
-task Task_{{task2.id}} "Task_{{task2.id}}" {
-
-    
-            depends Project_{{proj.id}}.Task_{{task1.id}} {onend}        
-            
-            effort 60.0h
-            allocate User_{{user1.id}} {
-                    alternative
-                    User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated
-                    persistent
-                }, User_{{user2.id}} {
-                    alternative
-                    User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated
-                    persistent
-                }            
-}}
-        
+# tasks
+task Project_{{proj1.id}} "Project_{{proj1.id}}" {
+  task Task_{{task1.id}} "Task_{{task1.id}}" {
+    effort 50.0h
+    allocate User_{{user1.id}} { alternative User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated persistent }, User_{{user2.id}} { alternative User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated persistent }
+  }
+  task Task_{{task2.id}} "Task_{{task2.id}}" {
+    depends Project_{{proj1.id}}.Task_{{task1.id}} {onend}
+    effort 60.0h
+    allocate User_{{user1.id}} { alternative User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated persistent }, User_{{user2.id}} { alternative User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated persistent }
+  }
+}
 
-        # reports
-        taskreport breakdown "{{csv_path}}"{
-            formats csv
-            timeformat "%Y-%m-%d-%H:%M"
-            columns id, start, end
-        }
-        
-""")
+# reports
+taskreport breakdown "{{csv_path}}"{
+    formats csv
+    timeformat "%Y-%m-%d-%H:%M"
+    columns id, start, end
+}""")
         expected_tjp_content = expected_tjp_template.render(
             {
                 'stalker': stalker,
@@ -331,7 +303,7 @@ task Task_{{task2.id}} "Task_{{task2.id}}" {
                 'user4': self.test_user4,
                 'user5': self.test_user5,
                 'user6': self.test_user6,
-                'proj': self.test_proj1,
+                'proj1': self.test_proj1,
                 'task1': self.test_task1,
                 'task2': self.test_task2,
             }
@@ -343,6 +315,218 @@ task Task_{{task2.id}} "Task_{{task2.id}}" {
         tjp_sched._clean_up()
         self.assertEqual(tjp_content, expected_tjp_content)
 
+    def test_tjp_file_content_contains_dependency_gaps_and_constraints(self):
+        """testing if the tjp file content contains the dependency gaps and
+        the schedule constraints of the tasks
+        """
+        self.test_task1.schedule_constraint = 3  # constrain both
+        self.test_task1.start = datetime.datetime(2013, 5, 1, 10, 0)
+        self.test_task1.end = datetime.datetime(2013, 5, 3, 18, 0)
+        dependency = self.test_task2.task_depends_to[0]
+        dependency.gap_timing = 2
+        dependency.gap_unit = 'd'
+        dependency.gap_model = 'duration'
+        DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler()
+        test_studio = Studio(
+            name='Test Studio',
+            timing_resolution=datetime.timedelta(minutes=30)
+        )
+        test_studio.start = datetime.datetime(2013, 4, 16, 0, 7)
+        test_studio.end = datetime.datetime(2013, 6, 30, 0, 0)
+        test_studio.now = datetime.datetime(2013, 4, 16, 0, 0)
+        tjp_sched.studio = test_studio
+
+        tjp_sched._create_tjp_file()
+        tjp_sched._create_tjp_file_content()
+        tjp_content = tjp_sched.tjp_content
+        tjp_sched._clean_up()
+
+        self.assertIn(
+            '    depends Project_%s.Task_%s {onend gapduration 2.0d}' % (
+                self.test_proj1.id, self.test_task1.id
+            ),
+            tjp_content
+        )
+        self.assertIn(
+            '  task Task_%s "Task_%s" {\n'
+            '    start 2013-05-01-10:00\n'
+            '    end 2013-05-03-18:00\n'
+            '    effort 50.0h\n' % (self.test_task1.id, self.test_task1.id),
+            tjp_content
+        )
+
+    def test_tjp_file_content_only_contains_active_projects(self):
+        """testing if only the active projects are exported to the tjp file
+        if the projects attribute is empty
+        """
+        self.test_proj1.active = False
+        DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler()
+        test_studio = Studio(
+            name='Test Studio',
+            timing_resolution=datetime.timedelta(minutes=30)
+        )
+        test_studio.start = datetime.datetime(2013, 4, 16, 0, 7)
+        test_studio.end = datetime.datetime(2013, 6, 30, 0, 0)
+        test_studio.now = datetime.datetime(2013, 4, 16, 0, 0)
+        tjp_sched.studio = test_studio
+
+        tjp_sched._create_tjp_file()
+        tjp_sched._create_tjp_file_content()
+        tjp_content = tjp_sched.tjp_content
+        tjp_sched._clean_up()
+
+        self.assertNotIn(
+            'task Project_%s "Project_%s"' % (
+                self.test_proj1.id, self.test_proj1.id
+            ),
+            tjp_content
+        )
+
+    def test_query_tasks_is_working_properly(self):
+        """testing if the _query_tasks() method will return the scheduling
+        data of the tasks of the given project
+        """
+        from stalker import TimeLog
+        self.test_task1.parent = Task(
+            name='Parent Task',
+            project=self.test_proj1,
+            status_list=self.test_task_status_list
+        )
+        DBSession.add(self.test_task1.parent)
+        DBSession.commit()
+
+        tlog = TimeLog(
+            task=self.test_task1,
+            resource=self.test_user1,
+            start=datetime.datetime(2013, 4, 18, 10, 0),
+            end=datetime.datetime(2013, 4, 18, 14, 0)
+        )
+        DBSession.add(tlog)
+        self.test_task1.schedule_constraint = 1  # constrain start
+        dependency = self.test_task2.task_depends_to[0]
+        dependency.gap_timing = 2
+        dependency.gap_unit = 'd'
+        dependency.gap_model = 'duration'
+        DBSession.commit()
+
+        resource_ids = sorted([self.test_user1.id, self.test_user2.id])
+        alternative_resource_ids = sorted([
+            self.test_user3.id, self.test_user4.id, self.test_user5.id
+        ])
+        parent = self.test_task1.parent
+        self.assertEqual(
+            sorted(
+                TaskJugglerScheduler._query_tasks(
+                    DBSession.connection(), self.test_proj1.id
+                ),
+                key=lambda x: x[0]
+            ),
+            sorted([
+                (parent.id, 500, 1.0, 'h', 'effort', 'minallocated', True,
+                 0, parent.start, parent.end, 0, None, None, [], [], False),
+                (self.test_task1.id, 500, 50.0, 'h', 'effort', 'minallocated',
+                 True, 1, self.test_task1.start, self.test_task1.end, 1,
+                 resource_ids, alternative_resource_ids,
+                 [('User_%s' % self.test_user1.id, '2013-04-18-10:00:00',
+                   '2013-04-18-14:00:00')], [], True),
+                (self.test_task2.id, 500, 60.0, 'h', 'effort', 'minallocated',
+                 True, 0, self.test_task2.start, self.test_task2.end, 0,
+                 resource_ids, alternative_resource_ids, [],
+                 [('Project_%s.Task_%s.Task_%s' % (
+                     self.test_proj1.id, parent.id, self.test_task1.id
+                 ), 'onend', 2.0, 'd', 'duration')], True),
+            ], key=lambda x: x[0])
+        )
+
+    def test_query_tasks_is_using_a_fixed_number_of_queries(self):
+        """testing if the _query_tasks() method will use the same number of
+        queries regardless of the number of tasks
+        """
+        from sqlalchemy import event
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        connection = DBSession.connection()
+        event.listen(connection.engine, 'before_cursor_execute', count)
+        try:
+            list(TaskJugglerScheduler._query_tasks(
+                connection, self.test_proj1.id
+            ))
+            statement_count = len(statements)
+
+            for i in range(10):
+                DBSession.add(
+                    Task(
+                        name='Extra Task %s' % i,
+                        project=self.test_proj1,
+                        depends=[self.test_task2],
+                        resources=[self.test_user1],
+                        status_list=self.test_task_status_list
+                    )
+                )
+            DBSession.commit()
+
+            del statements[:]
+            list(TaskJugglerScheduler._query_tasks(
+                DBSession.connection(), self.test_proj1.id
+            ))
+        finally:
+            event.remove(connection.engine, 'before_cursor_execute', count)
+
+        self.assertEqual(len(statements), statement_count)
+
+    def test_keep_tjp_content_argument_is_skipped(self):
+        """testing if the keep_tjp_content attribute will be False if the
+        keep_tjp_content argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertFalse(tjp_sched.keep_tjp_content)
+
+    def test_tjp_content_is_not_kept_by_default(self):
+        """testing if the tjp file content is streamed to the tjp file and not
+        stored in the tjp_content attribute by default
+        """
+        tjp_sched = TaskJugglerScheduler(studio=Studio(name='Test Studio'))
+        tjp_sched.projects = [self.test_proj1]
+
+        tjp_sched._create_tjp_file()
+        tjp_sched._fill_tjp_file()
+
+        with open(tjp_sched.tjp_file_full_path) as f:
+            tjp_file_content = f.read()
+        tjp_sched._clean_up()
+
+        self.assertTrue('Project_%s' % self.test_proj1.id in tjp_file_content)
+        self.assertEqual(tjp_sched.tjp_content, '')
+
+    def test_tjp_content_is_kept_if_keep_tjp_content_is_True(self):
+        """testing if the tjp file content is stored in the tjp_content
+        attribute if the keep_tjp_content attribute is True
+        """
+        tjp_sched = TaskJugglerScheduler(
+            studio=Studio(name='Test Studio'),
+            keep_tjp_content=True
+        )
+        tjp_sched.projects = [self.test_proj1]
+
+        tjp_sched._create_tjp_file()
+        tjp_sched._fill_tjp_file()
+
+        with open(tjp_sched.tjp_file_full_path) as f:
+            tjp_file_content = f.read()
+
+        tjp_sched._create_tjp_file_content()
+        tjp_sched._clean_up()
+
+        self.assertEqual(tjp_sched.tjp_content, tjp_file_content)
+
     def test_schedule_will_not_work_when_the_studio_attribute_is_None(self):
         """testing if a TypeError will be raised when the studio attribute is
         None
@@ -699,6 +883,556 @@ task Task_{{task2.id}} "Task_{{task2.id}}" {
 
         self.assertEqual(tjp.projects, [dp1, dp2])
 
+    def test_incremental_argument_is_skipped(self):
+        """testing if the incremental attribute will be False if the
+        incremental argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertFalse(tjp_sched.incremental)
+
+    def test_incremental_argument_is_working_properly(self):
+        """testing if the incremental argument value is passed to the
+        incremental attribute
+        """
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        self.assertTrue(tjp_sched.incremental)
+
+    def test_find_components_is_working_properly(self):
+        """testing if the _find_components() method will group the projects
+        sharing the same keys in to the same component
+        """
+        self.assertEqual(
+            TaskJugglerScheduler._find_components(
+                [1, 2, 3, 4, 5],
+                [
+                    (1, ('User', 10)),
+                    (3, ('User', 10)),
+                    (4, ('User', 11)),
+                    (5, ('Project', 4)),
+                    (6, ('User', 10)),  # not in the project list
+                ]
+            ),
+            [[1, 3], [2], [4, 5]]
+        )
+
+    def test_get_changed_project_ids_is_working_properly(self):
+        """testing if the _get_changed_project_ids() method will return only
+        the projects in the components those are changed since the last
+        stored fingerprints
+        """
+        # a project sharing resources with test_proj1
+        dp1 = Project(
+            name='Dummy Project 1',
+            code='DP1',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dp1,
+            schedule_timing=4,
+            schedule_unit='h',
+            resources=[self.test_user1]
+        )
+
+        # a project with its own resource
+        dp2 = Project(
+            name='Dummy Project 2',
+            code='DP2',
+            repository=self.test_repo
+        )
+        dt2 = Task(
+            name='Dummy Task 2',
+            project=dp2,
+            schedule_timing=4,
+            schedule_unit='h',
+            resources=[self.test_user6]
+        )
+        DBSession.add_all([dp1, dt1, dp2, dt2])
+        DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        connection = DBSession.connection()
+
+        # everything is changed for the first time
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        self.assertEqual(
+            sorted(project_ids),
+            sorted([self.test_proj1.id, dp1.id, dp2.id])
+        )
+        tjp_sched._store_fingerprints(connection, fingerprints)
+
+        # nothing is changed
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        self.assertEqual(project_ids, [])
+        self.assertEqual(fingerprints, {})
+
+        # change the bid of one task
+        dt1.schedule_timing = 8
+        DBSession.commit()
+
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(DBSession.connection())
+        self.assertEqual(
+            sorted(project_ids),
+            sorted([self.test_proj1.id, dp1.id])
+        )
+        self.assertEqual(
+            sorted(fingerprints.keys()),
+            sorted([self.test_proj1.id, dp1.id])
+        )
+
+    def test_get_changed_project_ids_when_only_studio_now_is_changed(self):
+        """testing if the _get_changed_project_ids() method will return all
+        the projects if only the Studio.now value is changed
+        """
+        test_studio = Studio(name='Test Studio',
+                             now=datetime.datetime(2013, 4, 16, 0, 0))
+        test_studio.start = datetime.datetime(2013, 4, 16, 0, 0)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0)
+        DBSession.add(test_studio)
+        DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        tjp_sched.studio = test_studio
+        connection = DBSession.connection()
+
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        self.assertEqual(project_ids, [self.test_proj1.id])
+        tjp_sched._store_fingerprints(connection, fingerprints)
+
+        test_studio.now = datetime.datetime(2013, 4, 17, 0, 0)
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        self.assertEqual(project_ids, [self.test_proj1.id])
+
+    def test_get_changed_project_ids_when_compute_resources_is_changed(self):
+        """testing if the _get_changed_project_ids() method will return all
+        the projects if only the compute_resources value is changed
+        """
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        connection = DBSession.connection()
+
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        tjp_sched._store_fingerprints(connection, fingerprints)
+
+        tjp_sched.compute_resources = True
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        self.assertEqual(project_ids, [self.test_proj1.id])
+
+    def test_get_changed_project_ids_when_schedule_constraint_is_changed(self):
+        """testing if the _get_changed_project_ids() method will consider the
+        start and end values of the tasks only if they are constrained
+        """
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        connection = DBSession.connection()
+
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        tjp_sched._store_fingerprints(connection, fingerprints)
+
+        # the start value is updated by the scheduler
+        self.test_task1.start = datetime.datetime(2013, 5, 1, 10, 0)
+        DBSession.commit()
+        connection = DBSession.connection()
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        self.assertEqual(project_ids, [])
+
+        # constrain the start
+        self.test_task1.schedule_constraint = 1
+        DBSession.commit()
+        connection = DBSession.connection()
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        self.assertEqual(project_ids, [self.test_proj1.id])
+        tjp_sched._store_fingerprints(connection, fingerprints)
+
+        # and change the constrained start
+        self.test_task1.start = datetime.datetime(2013, 5, 2, 10, 0)
+        DBSession.commit()
+        connection = DBSession.connection()
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        self.assertEqual(project_ids, [self.test_proj1.id])
+
+    def test_schedule_is_skipped_if_nothing_is_changed(self):
+        """testing if the schedule() method will not run TaskJuggler if the
+        incremental attribute is True and nothing is changed since the last
+        schedule
+        """
+        tjp_sched = TaskJugglerScheduler(incremental=True)
+        test_studio = Studio(name='Test Studio',
+                             now=datetime.datetime(2013, 4, 16, 0, 0))
+        test_studio.start = datetime.datetime(2013, 4, 16, 0, 0)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0)
+        test_studio.daily_working_hours = 9
+        DBSession.add(test_studio)
+        DBSession.commit()
+        tjp_sched.studio = test_studio
+
+        connection = DBSession.connection()
+        project_ids, fingerprints = \
+            tjp_sched._get_changed_project_ids(connection)
+        tjp_sched._store_fingerprints(connection, fingerprints)
+
+        self.assertEqual(tjp_sched.schedule(), '')
+        self.assertIsNone(tjp_sched.tjp_file_full_path)
+
+    def test_max_workers_argument_is_skipped(self):
+        """testing if the max_workers attribute will be 1 if the max_workers
+        argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertEqual(tjp_sched.max_workers, 1)
+
+    def test_max_workers_argument_is_working_properly(self):
+        """testing if the max_workers argument value is passed to the
+        max_workers attribute
+        """
+        tjp_sched = TaskJugglerScheduler(max_workers=4)
+        self.assertEqual(tjp_sched.max_workers, 4)
+
+    def test_get_components_is_working_properly(self):
+        """testing if the _get_components() method will group the projects
+        sharing resources or depending to each other in to the same component
+        """
+        from stalker import TimeLog
+
+        # shares a resource with test_proj1 through a TimeLog
+        dp1 = Project(
+            name='Dummy Project 1',
+            code='DP1',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dp1,
+            schedule_timing=4,
+            schedule_unit='h',
+            resources=[self.test_user6]
+        )
+        tlog = TimeLog(
+            task=dt1,
+            resource=self.test_user1,
+            start=datetime.datetime(2013, 4, 18, 10, 0),
+            end=datetime.datetime(2013, 4, 18, 14, 0)
+        )
+
+        # independent project
+        dp2 = Project(
+            name='Dummy Project 2',
+            code='DP2',
+            repository=self.test_repo
+        )
+        new_user = User(
+            login='user7',
+            name='User7',
+            email='user7@users.com',
+            password='1234'
+        )
+        dt2 = Task(
+            name='Dummy Task 2',
+            project=dp2,
+            schedule_timing=4,
+            schedule_unit='h',
+            resources=[new_user]
+        )
+
+        # depends to dp2
+        dp3 = Project(
+            name='Dummy Project 3',
+            code='DP3',
+            repository=self.test_repo
+        )
+        dt3 = Task(
+            name='Dummy Task 3',
+            project=dp3,
+            schedule_timing=4,
+            schedule_unit='h',
+            depends=[dt2]
+        )
+        DBSession.add_all([dp1, dt1, tlog, dp2, new_user, dt2, dp3, dt3])
+        DBSession.commit()
+
+        self.assertEqual(
+            TaskJugglerScheduler._get_components(
+                DBSession.connection(),
+                [self.test_proj1.id, dp1.id, dp2.id, dp3.id]
+            ),
+            sorted([
+                sorted([self.test_proj1.id, dp1.id]),
+                sorted([dp2.id, dp3.id])
+            ])
+        )
+
+    def test_tasks_are_correctly_scheduled_when_max_workers_is_bigger_than_1(self):
+        """testing if the tasks of independent projects are correctly
+        scheduled with separate tj3 processes when the max_workers is bigger
+        than 1
+        """
+        new_user = User(
+            login='user7',
+            name='User7',
+            email='user7@users.com',
+            password='1234'
+        )
+        dummy_project = Project(
+            name='Dummy Project',
+            code='DP',
+            repository=self.test_repo
+        )
+        dt1 = Task(
+            name='Dummy Task 1',
+            project=dummy_project,
+            schedule_timing=4,
+            schedule_unit='h',
+            resources=[new_user]
+        )
+        db.DBSession.add_all([new_user, dummy_project, dt1])
+        db.DBSession.commit()
+
+        tjp_sched = TaskJugglerScheduler(max_workers=2)
+        test_studio = Studio(name='Test Studio',
+                             now=datetime.datetime(2013, 4, 16, 0, 0))
+        test_studio.start = datetime.datetime(2013, 4, 16, 0, 0)
+        test_studio.end = datetime.datetime(2013, 4, 30, 0, 0)
+        test_studio.daily_working_hours = 9
+        DBSession.add(test_studio)
+
+        tjp_sched.studio = test_studio
+        tjp_sched.schedule()
+        db.DBSession.commit()
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0),
+            self.test_task1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 18, 16, 0),
+            self.test_task1.computed_end
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 24, 10, 0),
+            self.test_task2.computed_end
+        )
+
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 9, 0),
+            dt1.computed_start
+        )
+        self.assertEqual(
+            datetime.datetime(2013, 4, 16, 13, 0),
+            dt1.computed_end
+        )
+
+    def test_stderr_callback_attribute_is_None_by_default(self):
+        """testing if the stderr_callback attribute is None by default
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertIsNone(tjp_sched.stderr_callback)
+
+    def test_cancel_will_terminate_the_running_tj3_processes(self):
+        """testing if the cancel() method will terminate the running tj3
+        processes
+        """
+        import subprocess
+        import sys
+        process = subprocess.Popen(
+            [sys.executable, '-c', 'import time; time.sleep(30)']
+        )
+        tjp_sched = TaskJugglerScheduler()
+        tjp_sched._is_running = True
+        tjp_sched._processes.append(process)
+        tjp_sched.cancel()
+        process.wait()
+        self.assertIsNotNone(process.returncode)
+        self.assertTrue(tjp_sched._is_cancelled)
+
+    def test_cancel_does_nothing_if_no_schedule_is_running(self):
+        """testing if the cancel() method will not cancel the next schedule
+        if there is no running schedule
+        """
+        import subprocess
+        import sys
+        process = subprocess.Popen(
+            [sys.executable, '-c', 'import time; time.sleep(1)']
+        )
+        tjp_sched = TaskJugglerScheduler()
+        tjp_sched._processes.append(process)
+        tjp_sched.cancel()
+        self.assertFalse(tjp_sched._is_cancelled)
+        process.wait()
+        self.assertEqual(process.returncode, 0)
+
+    def test_copy_is_working_properly(self):
+        """testing if the copy() method will return a new scheduler with the
+        same settings without the state of the running schedule
+        """
+        tjp_sched = TaskJugglerScheduler(
+            compute_resources=True,
+            projects=[self.test_proj1],
+            incremental=True,
+            max_workers=2
+        )
+        tjp_sched.stderr_callback = len
+        tjp_sched._is_running = True
+        tjp_sched.cancel()
+        tjp_sched._processes.append('a process')
+
+        tjp_sched_copy = tjp_sched.copy()
+        self.assertIsNot(tjp_sched_copy, tjp_sched)
+        self.assertTrue(tjp_sched_copy.compute_resources)
+        self.assertTrue(tjp_sched_copy.incremental)
+        self.assertEqual(tjp_sched_copy.max_workers, 2)
+        self.assertEqual(tjp_sched_copy.stderr_callback, len)
+        self.assertEqual(tjp_sched_copy.projects, [self.test_proj1])
+        self.assertIsNot(tjp_sched_copy.projects, tjp_sched.projects)
+        self.assertEqual(tjp_sched_copy._processes, [])
+        self.assertFalse(tjp_sched_copy._is_cancelled)
+        self.assertFalse(tjp_sched_copy._is_running)
+
+    def test_chunk_size_argument_is_skipped(self):
+        """testing if the chunk_size attribute will be 500 if the chunk_size
+        argument is skipped
+        """
+        tjp_sched = TaskJugglerScheduler()
+        self.assertEqual(tjp_sched.chunk_size, 500)
+
+    def test_chunk_size_argument_is_working_properly(self):
+        """testing if the chunk_size argument value is passed to the
+        chunk_size attribute
+        """
+        tjp_sched = TaskJugglerScheduler(chunk_size=10)
+        self.assertEqual(tjp_sched.chunk_size, 10)
+
+    def _write_csv_file(self, tjp_sched, lines):
+        """writes the given lines as the csv file of the given scheduler
+        """
+        tjp_sched._create_tjp_file()
+        with open(tjp_sched.csv_file_full_path, 'w') as f:
+            f.write('"Id";"Start";"End";"Resources"\n')
+            for line in lines:
+                f.write('%s\n' % line)
+
+    def test_parse_csv_file_is_working_properly(self):
+        """testing if the _parse_csv_file() method will update the Task and
+        Project dates and computed resources
+        """
+        tjp_sched = TaskJugglerScheduler(compute_resources=True, chunk_size=2)
+        self._write_csv_file(tjp_sched, [
+            'Project_%s;2013-04-16-09:00;2013-04-24-10:00;' %
+            self.test_proj1.id,
+            'Project_%s.Task_%s;2013-04-16-09:00;2013-04-18-16:00;'
+            'User1 (User_%s), User2 (User_%s)' % (
+                self.test_proj1.id, self.test_task1.id,
+                self.test_user1.id, self.test_user2.id
+            ),
+            'Project_%s.Task_%s;2013-04-18-16:00;2013-04-24-10:00;'
+            'User3 (User_%s)' % (
+                self.test_proj1.id, self.test_task2.id, self.test_user3.id
+            ),
+        ])
+        tjp_sched._parse_csv_file()
+        tjp_sched._clean_up()
+        DBSession.commit()
+
+        self.assertEqual(
+            self.test_proj1.computed_start,
+            datetime.datetime(2013, 4, 16, 9, 0)
+        )
+        self.assertEqual(
+            self.test_proj1.computed_end,
+            datetime.datetime(2013, 4, 24, 10, 0)
+        )
+        self.assertEqual(
+            self.test_task1.computed_start,
+            datetime.datetime(2013, 4, 16, 9, 0)
+        )
+        self.assertEqual(
+            self.test_task1.computed_end,
+            datetime.datetime(2013, 4, 18, 16, 0)
+        )
+        self.assertEqual(
+            self.test_task1.start,
+            datetime.datetime(2013, 4, 16, 9, 0)
+        )
+        self.assertEqual(
+            self.test_task2.computed_start,
+            datetime.datetime(2013, 4, 18, 16, 0)
+        )
+        self.assertEqual(
+            sorted(self.test_task1.computed_resources, key=lambda x: x.id),
+            [self.test_user1, self.test_user2]
+        )
+        self.assertEqual(
+            self.test_task2.computed_resources,
+            [self.test_user3]
+        )
+
+    def test_parse_csv_file_will_only_update_the_changed_rows(self):
+        """testing if the _parse_csv_file() method will only update the rows
+        those are changed
+        """
+        from sqlalchemy import event
+
+        lines = [
+            'Project_%s;2013-04-16-09:00;2013-04-24-10:00;' %
+            self.test_proj1.id,
+            'Project_%s.Task_%s;2013-04-16-09:00;2013-04-18-16:00;'
+            'User1 (User_%s)' % (
+                self.test_proj1.id, self.test_task1.id, self.test_user1.id
+            ),
+            'Project_%s.Task_%s;2013-04-18-16:00;2013-04-24-10:00;'
+            'User1 (User_%s)' % (
+                self.test_proj1.id, self.test_task2.id, self.test_user1.id
+            ),
+        ]
+        tjp_sched = TaskJugglerScheduler(compute_resources=True)
+        self._write_csv_file(tjp_sched, lines)
+        tjp_sched._parse_csv_file()
+        tjp_sched._clean_up()
+        DBSession.commit()
+
+        # change only task2
+        lines[2] = \
+            'Project_%s.Task_%s;2013-04-18-16:00;2013-04-25-10:00;' \
+            'User2 (User_%s)' % (
+                self.test_proj1.id, self.test_task2.id, self.test_user2.id
+            )
+        self._write_csv_file(tjp_sched, lines)
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if not statement.startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        connection = DBSession.connection()
+        event.listen(connection.engine, 'before_cursor_execute', count)
+        try:
+            tjp_sched._parse_csv_file()
+        finally:
+            event.remove(connection.engine, 'before_cursor_execute', count)
+        tjp_sched._clean_up()
+        DBSession.commit()
+
+        # one update for the Tasks table, one delete and one insert for
+        # Task_Computed_Resources
+        self.assertEqual(len(statements), 3)
+        self.assertTrue(statements[0][0].startswith('UPDATE "Tasks"'))
+
+        self.assertEqual(
+            self.test_task2.computed_end,
+            datetime.datetime(2013, 4, 25, 10, 0)
+        )
+        self.assertEqual(self.test_task1.computed_resources, [self.test_user1])
+        self.assertEqual(self.test_task2.computed_resources, [self.test_user2])
+
 
 class TaskJugglerScheduler_PostgreSQL_Tester(TaskJugglerSchedulerTester):
     """tests the stalker.models.scheduler.TaskJugglerScheduler class with
@@ -741,110 +1475,31 @@ class TaskJugglerScheduler_PostgreSQL_Tester(TaskJugglerSchedulerTester):
         except ProgrammingError:
             DBSession.rollback()
 
-    def test_tjp_file_content_is_correct(self):
-        """testing if the tjp file content is correct
+    def test_query_tasks_postgresql_and_query_tasks_are_returning_the_same_data(self):
+        """testing if the _query_tasks_postgresql() and _query_tasks() methods
+        are returning the same data
         """
-        tjp_sched = TaskJugglerScheduler()
-        test_studio = Studio(
-            name='Test Studio',
-            timing_resolution=datetime.timedelta(minutes=30)
-        )
-        test_studio.daily_working_hours = 9
-
-        test_studio.id = 564
-        test_studio.start = datetime.datetime(2013, 4, 16, 0, 7)
-        test_studio.end = datetime.datetime(2013, 6, 30, 0, 0)
-        test_studio.now = datetime.datetime(2013, 4, 16, 0, 0)
-        tjp_sched.studio = test_studio
-
-        tjp_sched._create_tjp_file()
-        tjp_sched._create_tjp_file_content()
-
-        import jinja2
-
-        expected_tjp_template = jinja2.Template(
-            """# Generated By Stalker v{{stalker.__version__}}
-        
-project Studio_564 "Studio_564" 2013-04-16 - 2013-06-30 {
-    timingresolution 30min
-    now 2013-04-16-00:00
-    dailyworkinghours 9
-    weekstartsmonday
-    workinghours mon 09:00 - 18:00
-    workinghours tue 09:00 - 18:00
-    workinghours wed 09:00 - 18:00
-    workinghours thu 09:00 - 18:00
-    workinghours fri 09:00 - 18:00
-    workinghours sat off
-    workinghours sun off
-    timeformat "%Y-%m-%d"
-    scenario plan "Plan"
-    trackingscenario plan
-}
-
-        # resources
-        resource resources "Resources" {
-            resource User_3 "User_3" {
-    efficiency 1.0
-}
-            resource User_{{user1.id}} "User_{{user1.id}}" {
-    efficiency 1.0
-}
-            resource User_{{user2.id}} "User_{{user2.id}}" {
-    efficiency 1.0
-}
-            resource User_{{user3.id}} "User_{{user3.id}}" {
-    efficiency 1.0
-}
-            resource User_{{user4.id}} "User_{{user4.id}}" {
-    efficiency 1.0
-}
-            resource User_{{user5.id}} "User_{{user5.id}}" {
-    efficiency 1.0
-}
-            resource User_{{user6.id}} "User_{{user6.id}}" {
-    efficiency 1.0
-}
-        }
-
-# tasks
-task Project_{{proj1.id}} "Project_{{proj1.id}}" {
-  task Task_{{task1.id}} "Task_{{task1.id}}" {
-    effort 50.0h
-    allocate User_{{user1.id}} { alternative User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated persistent }, User_{{user2.id}} { alternative User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated persistent }
-  }
-  task Task_{{task2.id}} "Task_{{task2.id}}" {
-    depends Project_{{proj1.id}}.Task_{{task1.id}} {onend}
-    effort 60.0h
-    allocate User_{{user1.id}} { alternative User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated persistent }, User_{{user2.id}} { alternative User_{{user3.id}}, User_{{user4.id}}, User_{{user5.id}} select minallocated persistent }
-  }
-}
-
-# reports
-taskreport breakdown "{{csv_path}}"{
-    formats csv
-    timeformat "%Y-%m-%d-%H:%M"
-    columns id, start, end
-}""")
-        expected_tjp_content = expected_tjp_template.render(
-            {
-                'stalker': stalker,
-                'studio': test_studio,
-                'csv_path': tjp_sched.temp_file_name,
-                'user1': self.test_user1,
-                'user2': self.test_user2,
-                'user3': self.test_user3,
-                'user4': self.test_user4,
-                'user5': self.test_user5,
-                'user6': self.test_user6,
-                'proj1': self.test_proj1,
-                'task1': self.test_task1,
-                'task2': self.test_task2,
-            }
+        def normalize(data):
+            result = []
+            for r in data:
+                r = list(r)
+                # PostgreSQL array_agg() doesn't guarantee the order
+                r[11] = sorted(r[11] or [])
+                r[12] = sorted(r[12] or [])
+                r[13] = sorted([tuple(tlog) for tlog in r[13]])
+                result.append(r)
+            return result
+
+        connection = DBSession.connection()
+        self.assertEqual(
+            normalize(
+                TaskJugglerScheduler._query_tasks_postgresql(
+                    connection, self.test_proj1.id
+                )
+            ),
+            normalize(
+                TaskJugglerScheduler._query_tasks(
+                    connection, self.test_proj1.id
+                )
+            )
         )
-
-        self.maxDiff = None
-        tjp_content = tjp_sched.tjp_content
-        # print tjp_content
-        tjp_sched._clean_up()
-        self.assertEqual(tjp_content, expected_tjp_content)
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import datetime
+import unittest
+
+from sqlalchemy import select
+
+from stalker.db import DBSession
+from stalker import (db, Asset, Repository, Status, StatusList, Project, Task,
+                     TimeLog, Type, User)
+from stalker.models.task import Task_Closure, TaskBatch
+
+
+class TaskBatchTester(unittest.TestCase):
+    """tests the stalker.models.task.TaskBatch class and the
+    Task.bulk_create() method
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """setup tests in class level
+        """
+        cls.config = {
+            'sqlalchemy.url': 'sqlite:///:memory:',
+            'sqlalchemy.echo': False
+        }
+
+    def setUp(self):
+        """set up the test
+        """
+        db.setup(self.config)
+        db.init()
+
+        self.test_user1 = User(
+            name='User1',
+            login='user1',
+            email='user1@users.com',
+            password='1234'
+        )
+        self.test_user2 = User(
+            name='User2',
+            login='user2',
+            email='user2@users.com',
+            password='1234'
+        )
+        DBSession.add_all([self.test_user1, self.test_user2])
+
+        self.test_repo = Repository(
+            name='Test Repository',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(self.test_repo)
+
+        self.test_proj_status_list = StatusList(
+            name='Project Status List',
+            statuses=[Status(name='Status 1', code='STS1')],
+            target_entity_type='Project'
+        )
+        DBSession.add(self.test_proj_status_list)
+
+        self.test_project = Project(
+            name='Test Project',
+            code='TP',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+        )
+        DBSession.add(self.test_project)
+
+        # Task1
+        #   Task2
+        #   Task3
+        self.test_task1 = Task(name='Task1', project=self.test_project)
+        self.test_task2 = Task(
+            name='Task2',
+            parent=self.test_task1,
+            schedule_timing=5,
+            schedule_unit='h'
+        )
+        self.test_task3 = Task(
+            name='Task3',
+            parent=self.test_task1,
+            resources=[self.test_user1],
+            schedule_timing=7,
+            schedule_unit='h'
+        )
+        DBSession.add_all([self.test_task1, self.test_task2, self.test_task3])
+        DBSession.commit()
+
+        self.rts = Status.query.filter_by(code='RTS').first()
+        self.wip = Status.query.filter_by(code='WIP').first()
+
+    def tearDown(self):
+        """clean up the test
+        """
+        DBSession.remove()
+
+    def closure(self, task):
+        """returns the (ancestor id, depth) pairs of the given task
+        """
+        return sorted(
+            tuple(row) for row in DBSession.connection().execute(
+                select([Task_Closure.c.ancestor_id, Task_Closure.c.depth])
+                .where(Task_Closure.c.descendant_id == task.id)
+            )
+        )
+
+    def test_bulk_create_is_creating_the_tasks(self):
+        """testing if Task.bulk_create() is creating the tasks with the given
+        values in the given order
+        """
+        start = datetime.datetime(2016, 4, 18, 10, 0)
+        tasks = Task.bulk_create([
+            {'name': 'New Task 1',
+             'description': 'a description',
+             'resources': [self.test_user1],
+             'alternative_resources': [self.test_user2],
+             'watchers': [self.test_user2],
+             'responsible': [self.test_user1],
+             'start': start,
+             'schedule_timing': 2,
+             'schedule_unit': 'd',
+             'priority': 800,
+             'created_by': self.test_user2},
+            {'name': 'New Task 2', 'is_milestone': True,
+             'resources': [self.test_user1]},
+        ], project=self.test_project)
+        DBSession.commit()
+        DBSession.expire_all()
+
+        self.assertEqual(['New Task 1', 'New Task 2'],
+                         [task.name for task in tasks])
+        task1, task2 = tasks
+        self.assertEqual(task1.project, self.test_project)
+        self.assertIsNone(task1.parent)
+        self.assertEqual(task1.description, 'a description')
+        self.assertEqual(task1.resources, [self.test_user1])
+        self.assertEqual(task1.computed_resources, [self.test_user1])
+        self.assertEqual(task1.alternative_resources, [self.test_user2])
+        self.assertEqual(task1.watchers, [self.test_user2])
+        self.assertEqual(task1.responsible, [self.test_user1])
+        self.assertEqual(task1.created_by, self.test_user2)
+        self.assertEqual(task1.updated_by, self.test_user2)
+        self.assertEqual(task1.start, start)
+        self.assertEqual(task1.end, start + datetime.timedelta(days=2))
+        self.assertEqual(task1.schedule_timing, 2)
+        self.assertEqual(task1.schedule_unit, 'd')
+        self.assertEqual(task1.bid_timing, 2)
+        self.assertEqual(task1.bid_unit, 'd')
+        self.assertEqual(task1.schedule_model, 'effort')
+        self.assertEqual(task1.priority, 800)
+        self.assertEqual(task1.status, self.rts)
+        self.assertEqual(task1.status_list.target_entity_type, 'Task')
+        self.assertEqual(task1.entity_type, 'Task')
+        self.assertEqual(task1.nice_name, 'New_Task_1')
+        self.assertEqual(self.closure(task1), [(task1.id, 0)])
+
+        self.assertTrue(task2.is_milestone)
+        self.assertEqual(task2.resources, [])
+
+    def test_new_tasks_are_rolled_up_in_to_new_parents(self):
+        """testing if the schedule_seconds and dates of the new parent tasks
+        are calculated from their new children
+        """
+        parent = {'name': 'Shot'}
+        tasks = Task.bulk_create([
+            parent,
+            {'name': 'Anim', 'parent': parent, 'schedule_timing': 2,
+             'schedule_unit': 'd', 'resources': [self.test_user1]},
+            {'name': 'Comp', 'parent': parent, 'schedule_timing': 3,
+             'schedule_unit': 'h',
+             'start': datetime.datetime(2016, 4, 25, 10, 0)},
+        ], project=self.test_project)
+        DBSession.commit()
+        DBSession.expire_all()
+
+        shot, anim, comp = tasks
+        self.assertIs(anim.parent, shot)
+        self.assertIs(comp.parent, shot)
+        self.assertEqual(
+            shot._schedule_seconds,
+            anim.schedule_seconds + comp.schedule_seconds
+        )
+        self.assertEqual(shot._total_logged_seconds, 0)
+        self.assertEqual(shot.start, min(anim.start, comp.start))
+        self.assertEqual(shot.end, max(anim.end, comp.end))
+        self.assertEqual(shot.status, self.rts)
+        self.assertEqual(
+            self.closure(anim), sorted([(anim.id, 0), (shot.id, 1)])
+        )
+
+    def test_existing_parents_are_updated_once(self):
+        """testing if the schedule info, dates and statuses of the existing
+        parents and their parents are updated
+        """
+        time_log = TimeLog(
+            task=self.test_task3,
+            resource=self.test_user1,
+            start=datetime.datetime(2016, 4, 18, 10, 0),
+            end=datetime.datetime(2016, 4, 18, 12, 0)
+        )
+        DBSession.add(time_log)
+        DBSession.commit()
+        self.assertEqual(self.test_task3.status, self.wip)
+        self.assertEqual(self.test_task1.status, self.wip)
+
+        tasks = Task.bulk_create([
+            {'name': 'Child 1', 'parent': self.test_task2,
+             'schedule_timing': 1, 'schedule_unit': 'd'},
+            {'name': 'Child 2', 'parent': self.test_task3,
+             'schedule_timing': 2, 'schedule_unit': 'h'},
+        ])
+        DBSession.commit()
+
+        child1, child2 = tasks
+        self.assertEqual(child1.project, self.test_project)
+        self.assertEqual(self.test_task2.children, [child1])
+        self.assertEqual(self.test_task3.children, [child2])
+
+        # task3 was a leaf with a time log, now it is a container
+        self.assertEqual(self.test_task3.resources, [])
+        self.assertEqual(self.test_task3.schedule_seconds, 7200)
+        self.assertEqual(self.test_task3.total_logged_seconds, 0)
+        self.assertEqual(self.test_task3.start, child2.start)
+        self.assertEqual(self.test_task3.end, child2.end)
+        self.assertEqual(self.test_task3.status, self.rts)
+
+        # the root is updated with the deltas
+        schedule_seconds = self.test_task1.schedule_seconds
+        total_logged_seconds = self.test_task1.total_logged_seconds
+        self.assertEqual(self.test_task1.status, self.rts)
+        DBSession.expire_all()
+        self.test_task1.update_schedule_info()
+        self.assertEqual(
+            schedule_seconds, self.test_task1._schedule_seconds
+        )
+        self.assertEqual(
+            total_logged_seconds, self.test_task1._total_logged_seconds
+        )
+        self.assertEqual(
+            self.closure(child2),
+            sorted([(child2.id, 0), (self.test_task3.id, 1),
+                    (self.test_task1.id, 2)])
+        )
+
+    def test_existing_container_parent_is_expanded(self):
+        """testing if an existing container parent keeps its schedule info
+        and gets the new children added
+        """
+        old_schedule_seconds = self.test_task1.schedule_seconds
+        child = Task.bulk_create([
+            {'name': 'Child', 'parent': self.test_task1,
+             'schedule_timing': 3, 'schedule_unit': 'd',
+             'start': datetime.datetime(2030, 1, 1, 10, 0)},
+        ])[0]
+        DBSession.commit()
+
+        self.assertEqual(
+            self.test_task1.schedule_seconds,
+            old_schedule_seconds + child.schedule_seconds
+        )
+        self.assertEqual(self.test_task1.end, child.end)
+        self.assertEqual(len(self.test_task1.children), 3)
+
+    def test_parent_project_is_used(self):
+        """testing if the project of the parent is used and a RuntimeWarning
+        is raised if the given project is different
+        """
+        import warnings
+        other_project = Project(
+            name='Other Project',
+            code='OP',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+        )
+        DBSession.add(other_project)
+
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            task = Task.bulk_create(
+                [{'name': 'Child', 'parent': self.test_task2}],
+                project=other_project
+            )[0]
+        self.assertEqual(task.project, self.test_project)
+        self.assertTrue(
+            any(issubclass(warning.category, RuntimeWarning)
+                for warning in w)
+        )
+
+    def test_project_is_none(self):
+        """testing if a TypeError will be raised for the tasks without a
+        project and a parent
+        """
+        with self.assertRaises(TypeError) as cm:
+            Task.bulk_create([{'name': 'Orphan'}])
+
+        self.assertTrue(
+            str(cm.exception).startswith(
+                'Task.project should be an instance of '
+                'stalker.models.project.Project, not NoneType'
+            )
+        )
+
+    def test_values_are_validated_with_the_task_validators(self):
+        """testing if the given values are validated with the Task validators
+        while they are added
+        """
+        batch = TaskBatch(project=self.test_project)
+        with self.assertRaises(TypeError) as cm:
+            batch.add(name='Task', priority='high')
+        self.assertEqual(
+            str(cm.exception),
+            'Task.priority should be an integer value between 0 and 1000, '
+            'not str'
+        )
+
+        with self.assertRaises(ValueError) as cm:
+            batch.add(name='Task', schedule_unit='century')
+        self.assertEqual(
+            str(cm.exception),
+            "Task.schedule_unit should be a string value one of "
+            "['min', 'h', 'd', 'w', 'm', 'y'] showing the unit of the "
+            "schedule timing of this Task, not str"
+        )
+
+        with self.assertRaises(TypeError) as cm:
+            batch.add(name='Task', resources=['not a user'])
+        self.assertEqual(
+            str(cm.exception),
+            'Task.resources should be a list of stalker.models.auth.User '
+            'instances, not str'
+        )
+
+        with self.assertRaises(ValueError) as cm:
+            batch.add(name='   ')
+        self.assertEqual(
+            str(cm.exception), 'Task.name can not be an empty string'
+        )
+        self.assertEqual(batch.specs, [])
+
+    def test_unknown_arguments(self):
+        """testing if a TypeError will be raised for the unknown arguments
+        """
+        batch = TaskBatch(project=self.test_project)
+        with self.assertRaises(TypeError) as cm:
+            batch.add(name='Task', depends=[self.test_task2])
+        self.assertEqual(
+            str(cm.exception),
+            'TaskBatch.add() got unexpected arguments: depends'
+        )
+
+    def test_parent_is_not_a_task(self):
+        """testing if a TypeError will be raised if the parent is not a Task
+        or a task of the batch
+        """
+        batch = TaskBatch(project=self.test_project)
+        with self.assertRaises(TypeError) as cm:
+            batch.add(name='Task', parent={'name': 'Not In Batch'})
+        self.assertEqual(
+            str(cm.exception),
+            'TaskBatch.parent should be an instance of '
+            'stalker.models.task.Task or a task added to this TaskBatch '
+            'before, not dict'
+        )
+
+    def test_context_manager(self):
+        """testing if the tasks are created when the with block exits and not
+        created if there is an error
+        """
+        with TaskBatch(project=self.test_project) as batch:
+            shot = batch.add(name='Shot', type=Type(
+                name='Shot Task', code='ST', target_entity_type='Task'
+            ))
+            batch.add(name='Anim', parent=shot)
+        self.assertEqual(['Shot', 'Anim'], [t.name for t in batch.tasks])
+        self.assertEqual(batch.tasks[0].type.name, 'Shot Task')
+        self.assertIs(batch.tasks[1].parent, batch.tasks[0])
+
+        try:
+            with TaskBatch(project=self.test_project) as batch:
+                batch.add(name='Never Created')
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        self.assertEqual(batch.tasks, [])
+        self.assertEqual(
+            Task.query.filter_by(name='Never Created').count(), 0
+        )
+
+    def test_bulk_create_with_a_derived_class(self):
+        """testing if a NotImplementedError will be raised for the classes
+        derived from Task
+        """
+        with self.assertRaises(NotImplementedError) as cm:
+            Asset.bulk_create([{'name': 'Asset'}], project=self.test_project)
+        self.assertEqual(
+            str(cm.exception),
+            'Asset.bulk_create() is not implemented, only plain Tasks can be '
+            'created in bulk'
+        )
+
+    def test_many_tasks(self):
+        """testing if many tasks are created with chunked inserts
+        """
+        specs = []
+        for i in range(30):
+            shot = {'name': 'SH%03i' % i, 'parent': self.test_task2}
+            specs.append(shot)
+            for department in ['Anim', 'Light', 'Comp']:
+                specs.append({
+                    'name': department,
+                    'parent': shot,
+                    'resources': [self.test_user1],
+                    'schedule_timing': 1,
+                    'schedule_unit': 'd'
+                })
+
+        batch = TaskBatch(project=self.test_project)
+        batch.chunk_size = 7
+        handles = {}
+        for spec in specs:
+            kwargs = dict(spec)
+            if isinstance(kwargs['parent'], dict):
+                kwargs['parent'] = handles[id(kwargs['parent'])]
+            handles[id(spec)] = batch.add(**kwargs)
+        tasks = batch.create()
+        DBSession.commit()
+
+        self.assertEqual(len(tasks), 120)
+        self.assertEqual(len(self.test_task2.children), 30)
+        self.assertEqual(
+            self.test_task2.schedule_seconds,
+            90 * tasks[1].schedule_seconds
+        )
+        self.assertEqual(len(self.test_task1.descendants()), 122)
@@ -0,0 +1,531 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import unittest
+
+from sqlalchemy import event
+
+from stalker.db import DBSession
+from stalker import (db, Repository, Status, StatusList, Project, Task)
+from stalker.models.task import Task_Closure
+
+
+class TaskClosureTester(unittest.TestCase):
+    """tests the Task_Closure table and the Task hierarchy queries that are
+    using it
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """setup tests in class level
+        """
+        cls.config = {
+            'sqlalchemy.url': 'sqlite:///:memory:',
+            'sqlalchemy.echo': False
+        }
+
+    def setUp(self):
+        """set up the test
+        """
+        db.setup(self.config)
+        db.init()
+
+        self.test_repo = Repository(
+            name='Test Repository',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(self.test_repo)
+
+        self.test_proj_status_list = StatusList(
+            name='Project Status List',
+            statuses=[Status(name='Status 1', code='STS1')],
+            target_entity_type='Project'
+        )
+        DBSession.add(self.test_proj_status_list)
+
+        self.test_project = Project(
+            name='Test Project',
+            code='TP',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+        )
+        DBSession.add(self.test_project)
+
+        # Task1
+        #   Task2
+        #     Task3
+        #       Task4
+        #     Task5
+        # Task6
+        self.test_task1 = Task(name='Task1', project=self.test_project)
+        self.test_task2 = Task(name='Task2', parent=self.test_task1)
+        self.test_task3 = Task(name='Task3', parent=self.test_task2)
+        self.test_task4 = Task(name='Task4', parent=self.test_task3)
+        self.test_task5 = Task(name='Task5', parent=self.test_task2)
+        self.test_task6 = Task(name='Task6', project=self.test_project)
+        DBSession.add_all([
+            self.test_task1, self.test_task2, self.test_task3,
+            self.test_task4, self.test_task5, self.test_task6
+        ])
+        DBSession.commit()
+
+        self.query_count = 0
+
+    def tearDown(self):
+        """clean up the test
+        """
+        DBSession.remove()
+
+    def closure(self):
+        """returns the Task_Closure table content as a set of (ancestor name,
+        descendant name, depth) tuples
+        """
+        names = dict(DBSession.query(Task.id, Task.name).all())
+        return set(
+            (names[ancestor_id], names[descendant_id], depth)
+            for ancestor_id, descendant_id, depth in
+            DBSession.connection().execute(Task_Closure.select())
+        )
+
+    def count_queries(self):
+        """starts counting the executed queries in self.query_count
+        """
+        engine = DBSession.connection().engine
+
+        def before_cursor_execute(*args):
+            self.query_count += 1
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        self.addCleanup(
+            event.remove, engine, 'before_cursor_execute',
+            before_cursor_execute
+        )
+
+    def test_closure_is_filled_for_new_tasks(self):
+        """testing if the Task_Closure table is filled for newly created
+        tasks
+        """
+        self.assertEqual(
+            self.closure(),
+            set([
+                ('Task1', 'Task1', 0),
+                ('Task1', 'Task2', 1),
+                ('Task1', 'Task3', 2),
+                ('Task1', 'Task4', 3),
+                ('Task1', 'Task5', 2),
+                ('Task2', 'Task2', 0),
+                ('Task2', 'Task3', 1),
+                ('Task2', 'Task4', 2),
+                ('Task2', 'Task5', 1),
+                ('Task3', 'Task3', 0),
+                ('Task3', 'Task4', 1),
+                ('Task4', 'Task4', 0),
+                ('Task5', 'Task5', 0),
+                ('Task6', 'Task6', 0),
+            ])
+        )
+
+    def test_closure_is_filled_for_new_tasks_under_existing_tasks(self):
+        """testing if the Task_Closure table is filled for new tasks that are
+        created under already existing tasks
+        """
+        task7 = Task(name='Task7', parent=self.test_task4)
+        task8 = Task(name='Task8', parent=task7)
+        DBSession.add_all([task7, task8])
+        DBSession.commit()
+
+        closure = self.closure()
+        self.assertTrue(
+            set([
+                ('Task1', 'Task7', 4),
+                ('Task2', 'Task7', 3),
+                ('Task3', 'Task7', 2),
+                ('Task4', 'Task7', 1),
+                ('Task7', 'Task7', 0),
+                ('Task1', 'Task8', 5),
+                ('Task4', 'Task8', 2),
+                ('Task7', 'Task8', 1),
+                ('Task8', 'Task8', 0),
+            ]).issubset(closure)
+        )
+        self.assertEqual(len(closure), 14 + 11)
+
+    def test_closure_is_updated_when_a_task_is_moved(self):
+        """testing if the Task_Closure table is updated for the whole sub tree
+        of a task that is moved under another task
+        """
+        self.test_task3.parent = self.test_task6
+        DBSession.commit()
+
+        self.assertEqual(
+            self.closure(),
+            set([
+                ('Task1', 'Task1', 0),
+                ('Task1', 'Task2', 1),
+                ('Task1', 'Task5', 2),
+                ('Task2', 'Task2', 0),
+                ('Task2', 'Task5', 1),
+                ('Task3', 'Task3', 0),
+                ('Task3', 'Task4', 1),
+                ('Task4', 'Task4', 0),
+                ('Task5', 'Task5', 0),
+                ('Task6', 'Task6', 0),
+                ('Task6', 'Task3', 1),
+                ('Task6', 'Task4', 2),
+            ])
+        )
+
+    def test_closure_is_updated_when_a_task_becomes_a_root_task(self):
+        """testing if the Task_Closure table is updated when the parent of a
+        task is set to None
+        """
+        self.test_task2.parent = None
+        DBSession.commit()
+
+        closure = self.closure()
+        self.assertNotIn(('Task1', 'Task2', 1), closure)
+        self.assertNotIn(('Task1', 'Task4', 3), closure)
+        self.assertIn(('Task2', 'Task4', 2), closure)
+        self.assertEqual(len(closure), 10)
+
+    def test_closure_is_updated_when_a_task_is_deleted(self):
+        """testing if the rows of the deleted tasks are deleted from the
+        Task_Closure table
+        """
+        DBSession.delete(self.test_task3)
+        DBSession.commit()
+
+        closure = self.closure()
+        self.assertEqual(
+            closure,
+            set([
+                ('Task1', 'Task1', 0),
+                ('Task1', 'Task2', 1),
+                ('Task1', 'Task5', 2),
+                ('Task2', 'Task2', 0),
+                ('Task2', 'Task5', 1),
+                ('Task5', 'Task5', 0),
+                ('Task6', 'Task6', 0),
+            ])
+        )
+
+    def test_parents_is_using_one_query(self):
+        """testing if the parents attribute is retrieved with one query when
+        the parents are not loaded yet
+        """
+        task4_id = self.test_task4.id
+        DBSession.expunge_all()
+        task4 = Task.query.get(task4_id)
+
+        self.count_queries()
+        parents = task4.parents
+        self.assertEqual(
+            [task.name for task in parents],
+            ['Task1', 'Task2', 'Task3']
+        )
+        self.assertEqual(self.query_count, 1)
+
+    def test_parents_is_using_the_loaded_parents(self):
+        """testing if the parents attribute is not querying the database when
+        the parents are already loaded
+        """
+        # load the parents
+        self.assertEqual(
+            self.test_task4.parents,
+            [self.test_task1, self.test_task2, self.test_task3]
+        )
+        self.count_queries()
+        self.assertEqual(
+            self.test_task4.parents,
+            [self.test_task1, self.test_task2, self.test_task3]
+        )
+        self.assertEqual(self.query_count, 0)
+
+    def test_parents_is_working_properly_with_unflushed_changes(self):
+        """testing if the parents attribute is returning the unflushed parent
+        changes
+        """
+        task4_id = self.test_task4.id
+        DBSession.expunge_all()
+        task4 = Task.query.get(task4_id)
+        task6 = Task.query.filter_by(name='Task6').first()
+        task3 = Task.query.filter_by(name='Task3').first()
+
+        with DBSession.no_autoflush:
+            task3.parent = task6
+            self.assertEqual(task4.parents, [task6, task3])
+
+    def test_hierarchy_index_is_not_usable_with_unflushed_parent_changes(self):
+        """testing if the Task_Closure table is not used when there are
+        unflushed parent changes in the session and it is used again after
+        the session is flushed or rolled back
+        """
+        self.assertTrue(self.test_task4._hierarchy_index_is_usable())
+
+        with DBSession.no_autoflush:
+            self.test_task3.parent = self.test_task6
+            self.assertFalse(self.test_task4._hierarchy_index_is_usable())
+
+        DBSession.flush()
+        self.assertTrue(self.test_task4._hierarchy_index_is_usable())
+        self.assertEqual(
+            self.test_task4.parents,
+            [self.test_task6, self.test_task3]
+        )
+
+        with DBSession.no_autoflush:
+            self.test_task3.parent = self.test_task1
+            self.assertFalse(self.test_task4._hierarchy_index_is_usable())
+
+        DBSession.rollback()
+        self.assertTrue(self.test_task4._hierarchy_index_is_usable())
+
+    def test_parent_changes_of_detached_tasks_are_tracked(self):
+        """testing if the parent changes of a detached task are considered
+        when the task is attached to a session again
+        """
+        task3 = self.test_task3
+        DBSession.expunge(task3)
+        task3.parent_id = self.test_task6.id
+        DBSession.add(task3)
+        self.assertFalse(self.test_task4._hierarchy_index_is_usable())
+
+        DBSession.commit()
+        DBSession.expunge_all()
+        task4 = Task.query.filter_by(name='Task4').first()
+        self.assertEqual(
+            [task.name for task in task4.parents],
+            ['Task6', 'Task3']
+        )
+
+    def test_parents_is_working_properly_for_new_tasks(self):
+        """testing if the parents attribute is working properly for tasks that
+        are not flushed yet
+        """
+        task7 = Task(name='Task7', parent=self.test_task4)
+        self.assertEqual(
+            task7.parents,
+            [self.test_task1, self.test_task2, self.test_task3,
+             self.test_task4]
+        )
+
+    def test_ancestors_is_the_same_with_parents(self):
+        """testing if the ancestors() method is returning the same value with
+        the parents attribute
+        """
+        task4_id = self.test_task4.id
+        DBSession.expunge_all()
+        task4 = Task.query.get(task4_id)
+        self.assertEqual(task4.ancestors(), task4.parents)
+
+    def test_depth_is_working_properly(self):
+        """testing if the depth attribute is returning the number of parents
+        """
+        self.assertEqual(self.test_task1.depth, 0)
+        self.assertEqual(self.test_task5.depth, 2)
+
+        task4_id = self.test_task4.id
+        DBSession.expunge_all()
+        task4 = Task.query.get(task4_id)
+
+        self.count_queries()
+        self.assertEqual(task4.depth, 3)
+        self.assertEqual(self.query_count, 1)
+
+    def test_level_is_working_properly(self):
+        """testing if the level attribute is still one more than the number
+        of parents
+        """
+        self.assertEqual(self.test_task1.level, 1)
+        self.assertEqual(self.test_task4.level, 4)
+
+    def test_tjp_abs_id_is_working_properly(self):
+        """testing if the tjp_abs_id attribute is working properly
+        """
+        self.assertEqual(
+            self.test_task4.tjp_abs_id,
+            'Project_%s.Task_%s.Task_%s.Task_%s.Task_%s' % (
+                self.test_project.id, self.test_task1.id, self.test_task2.id,
+                self.test_task3.id, self.test_task4.id
+            )
+        )
+
+    def test_descendants_is_working_properly(self):
+        """testing if the descendants() method is returning all the children
+        and grand children in breadth first order
+        """
+        self.assertEqual(
+            self.test_task1.descendants(),
+            [self.test_task2, self.test_task3, self.test_task5,
+             self.test_task4]
+        )
+        self.assertEqual(self.test_task4.descendants(), [])
+
+    def test_descendants_is_working_properly_for_new_tasks(self):
+        """testing if the descendants() method is working properly for tasks
+        that are not flushed yet
+        """
+        task7 = Task(name='Task7', project=self.test_project)
+        task8 = Task(name='Task8', parent=task7)
+        task9 = Task(name='Task9', parent=task8)
+        self.assertEqual(task7.descendants(), [task8, task9])
+
+    def test_descendants_query_can_be_filtered(self):
+        """testing if the descendants_query() method returns a query that can
+        be further filtered
+        """
+        self.assertEqual(
+            self.test_task2.descendants_query()
+            .filter(Task.name != 'Task3').order_by(Task.name).all(),
+            [self.test_task4, self.test_task5]
+        )
+
+    def test_ancestors_query_is_working_properly(self):
+        """testing if the ancestors_query() method is working properly
+        """
+        self.assertEqual(
+            self.test_task4.ancestors_query().order_by(Task.name).all(),
+            [self.test_task1, self.test_task2, self.test_task3]
+        )
+
+    def test_circular_dependency_is_checked_in_db_for_depends(self):
+        """testing if a CircularDependencyError is raised for persisted tasks
+        without loading the whole dependency graph in to the session
+        """
+        from stalker.exceptions import CircularDependencyError
+        # Task4 -> Task5 -> Task6
+        self.test_task5.depends = [self.test_task6]
+        self.test_task4.depends = [self.test_task5]
+        DBSession.commit()
+        task4_id = self.test_task4.id
+        task6_id = self.test_task6.id
+        DBSession.expunge_all()
+
+        task6 = Task.query.get(task6_id)
+        task4 = Task.query.get(task4_id)
+        with self.assertRaises(CircularDependencyError) as cm:
+            task6.depends.append(task4)
+
+        self.assertEqual(
+            cm.exception.value,
+            '<Task4 (Task)> (Task) and <Task6 (Task)> (Task) creates a '
+            'circular dependency in their "depends" attribute'
+        )
+        # Task5 is not loaded
+        self.assertEqual(
+            sorted(t.name for t in DBSession.identity_map.values()
+                   if isinstance(t, Task)),
+            ['Task4', 'Task6']
+        )
+
+    def test_circular_dependency_is_checked_in_db_for_children(self):
+        """testing if a CircularDependencyError is raised for a persisted task
+        that is depending to one of its parents
+        """
+        from stalker.exceptions import CircularDependencyError
+        task1_id = self.test_task1.id
+        task4_id = self.test_task4.id
+        DBSession.expunge_all()
+
+        task1 = Task.query.get(task1_id)
+        task4 = Task.query.get(task4_id)
+        with self.assertRaises(CircularDependencyError) as cm:
+            task4.depends = [task1]
+
+        self.assertEqual(
+            cm.exception.value,
+            '<Task1 (Task)> (Task) and <Task4 (Task)> (Task) creates a '
+            'circular dependency in their "children" attribute'
+        )
+
+    def test_circular_dependency_is_checked_in_db_for_parents(self):
+        """testing if a CircularDependencyError is raised for a persisted task
+        depending to a task that depends to one of its parents
+        """
+        from stalker.exceptions import CircularDependencyError
+        self.test_task6.depends = [self.test_task2]
+        DBSession.commit()
+        task4_id = self.test_task4.id
+        task6_id = self.test_task6.id
+        DBSession.expunge_all()
+
+        task4 = Task.query.get(task4_id)
+        task6 = Task.query.get(task6_id)
+        with self.assertRaises(CircularDependencyError) as cm:
+            task4.depends = [task6]
+
+        self.assertEqual(
+            cm.exception.value,
+            'One of the parents of <Task4 (Task)> is depending to '
+            '<Task6 (Task)>'
+        )
+
+    def test_valid_dependency_of_persisted_tasks(self):
+        """testing if a valid dependency can be created between persisted
+        tasks
+        """
+        self.test_task6.depends = [self.test_task5]
+        DBSession.commit()
+        self.test_task5.depends = [self.test_task4]
+        DBSession.commit()
+        self.assertEqual(self.test_task5.depends, [self.test_task4])
+
+    def test_circular_dependency_is_checked_in_db_for_parent(self):
+        """testing if a CircularDependencyError is raised when the parent of a
+        persisted task is set to one of its children or dependencies
+        """
+        from stalker.exceptions import CircularDependencyError
+        self.test_task6.depends = [self.test_task5]
+        DBSession.commit()
+        task2_id = self.test_task2.id
+        task4_id = self.test_task4.id
+        task5_id = self.test_task5.id
+        task6_id = self.test_task6.id
+        DBSession.expunge_all()
+
+        task2 = Task.query.get(task2_id)
+        task4 = Task.query.get(task4_id)
+        with self.assertRaises(CircularDependencyError) as cm:
+            task2.parent = task4
+        self.assertEqual(
+            cm.exception.value,
+            '<Task2 (Task)> (Task) and <Task4 (Task)> (Task) creates a '
+            'circular dependency in their "children" attribute'
+        )
+
+        task5 = Task.query.get(task5_id)
+        task6 = Task.query.get(task6_id)
+        with self.assertRaises(CircularDependencyError) as cm:
+            task6.parent = task5
+        self.assertEqual(
+            cm.exception.value,
+            '<Task6 (Task)> (Task) and <Task5 (Task)> (Task) creates a '
+            'circular dependency in their "depends" attribute'
+        )
+
+    def test_circular_dependency_is_checked_with_unflushed_changes(self):
+        """testing if the circular dependency checks are considering the
+        unflushed dependencies
+        """
+        from stalker.exceptions import CircularDependencyError
+        with DBSession.no_autoflush:
+            self.test_task5.depends = [self.test_task6]
+            with self.assertRaises(CircularDependencyError):
+                self.test_task6.depends = [self.test_task5]
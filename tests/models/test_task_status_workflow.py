@@ -329,10 +329,10 @@ class TaskStatusWorkflowTestCase(unittest.TestCase):
         """
         # this test should not be placed here
         visited_tasks = []
+        # every task should be visited only once
         expected_result = [
             self.test_task9, self.test_task6, self.test_task4, self.test_task5,
-            self.test_task8, self.test_task3, self.test_task4, self.test_task8,
-            self.test_task3
+            self.test_task8, self.test_task3
         ]
 
         # setup dependencies
@@ -2192,6 +2192,33 @@ class TaskStatusWorkflowTestCase(unittest.TestCase):
         self.test_task8.stop()
         self.assertEqual(self.test_task9.status, self.status_rts)
 
+    def test_stop_in_WIP_leaf_task_updates_only_direct_dependent_tasks(self):
+        """testing if only the direct dependent tasks are updated when the
+        stop action is used in a WIP leaf task
+        """
+        dt = datetime.datetime
+        td = datetime.timedelta
+        now = dt.now()
+
+        self.test_task9.status = self.status_rts
+        self.test_task8.status = self.status_rts
+
+        self.test_task9.depends = [self.test_task8]
+        self.test_task3.depends = [self.test_task9]
+        self.test_task3.status = self.status_rts
+
+        TimeLog(
+            task=self.test_task8,
+            resource=self.test_task8.resources[0],
+            start=now,
+            end=now + td(hours=1)
+        )
+        self.test_task8.status = self.status_wip
+        self.test_task8.stop()
+        self.assertEqual(self.test_task9.status, self.status_rts)
+        # the dependent of the dependent task is not evaluated
+        self.assertEqual(self.test_task3.status, self.status_rts)
+
     # WIP: Dependency Status: DREV -> WIP
     def test_stop_in_WIP_leaf_task_status_from_DREV_to_HREV(self):
         """testing if the dependent task status updated from DREV to HREV when
@@ -3618,3 +3645,101 @@ class TaskStatusWorkflowTestCase(unittest.TestCase):
             self.status_rts,
             self.test_task5.status
         )
+
+    def test_status_propagator_tasks_argument_is_not_a_list_of_tasks(self):
+        """testing if a TypeError will be raised when the tasks argument is
+        not a list of Task instances
+        """
+        from stalker.models.task import StatusPropagator
+        with self.assertRaises(TypeError) as cm:
+            StatusPropagator(['not a task'])
+
+        self.assertEqual(
+            str(cm.exception),
+            'StatusPropagator.tasks should only contain '
+            'stalker.models.task.Task instances, not str'
+        )
+
+    def test_status_propagator_tasks_are_added_only_once(self):
+        """testing if the same task will be added to the StatusPropagator only
+        once
+        """
+        from stalker.models.task import StatusPropagator
+        propagator = StatusPropagator([self.test_task3, self.test_task3])
+        propagator.add(self.test_task3)
+        self.assertEqual(propagator.tasks, [self.test_task3])
+
+    def test_status_propagator_affected_tasks_is_topologically_sorted(self):
+        """testing if the StatusPropagator.affected_tasks() will return the
+        parents and the dependent tasks of the dirty tasks in topological
+        order
+        """
+        from stalker.models.task import StatusPropagator
+        DBSession.add_all(self.data_created)
+        DBSession.commit()
+
+        propagator = StatusPropagator([self.test_task3])
+        affected_tasks = propagator.affected_tasks()
+        self.assertEqual(
+            sorted(affected_tasks, key=lambda x: x.name),
+            sorted([self.test_task1, self.test_task3, self.test_task4,
+                    self.test_task5], key=lambda x: x.name)
+        )
+
+        index = affected_tasks.index
+        self.assertEqual(index(self.test_task3), 0)
+        self.assertTrue(index(self.test_task4) < index(self.test_task5))
+        self.assertTrue(index(self.test_task5) < index(self.test_task1))
+
+    def test_status_propagator_updates_dependent_and_parent_statuses(self):
+        """testing if the StatusPropagator.propagate() will update the
+        statuses of the dependent tasks and the parents
+        """
+        from stalker.models.task import StatusPropagator
+        DBSession.add_all(self.data_created)
+        DBSession.commit()
+
+        self.assertEqual(self.test_task4.status, self.status_wfd)
+        self.assertEqual(self.test_task5.status, self.status_wfd)
+
+        self.test_task3.status = self.status_cmpl
+        StatusPropagator([self.test_task3]).propagate()
+
+        self.assertEqual(self.test_task3.status, self.status_cmpl)
+        self.assertEqual(self.test_task4.status, self.status_rts)
+        self.assertEqual(self.test_task5.status, self.status_wfd)
+        self.assertEqual(self.test_task6.status, self.status_rts)
+        self.assertEqual(self.test_task1.status, self.status_rts)
+
+    def test_status_propagator_updates_parent_statuses_of_leaf_tasks(self):
+        """testing if the StatusPropagator.propagate() will update the
+        statuses of all the parents of the given task
+        """
+        from stalker.models.task import StatusPropagator
+        DBSession.add_all(self.data_created)
+        DBSession.commit()
+
+        self.test_task9.status = self.status_cmpl
+        StatusPropagator([self.test_task9]).propagate()
+
+        self.assertEqual(self.test_asset1.status, self.status_cmpl)
+        self.assertEqual(self.test_task7.status, self.status_cmpl)
+        self.assertEqual(self.test_task2.status, self.status_wip)
+
+    def test_status_propagator_cascade_dependents_is_false(self):
+        """testing if the StatusPropagator.affected_tasks() will only return
+        the direct dependent tasks of the dirty tasks (along with the parents)
+        if the cascade_dependents argument is False
+        """
+        from stalker.models.task import StatusPropagator
+        DBSession.add_all(self.data_created)
+        DBSession.commit()
+
+        propagator = \
+            StatusPropagator([self.test_task3], cascade_dependents=False)
+        affected_tasks = propagator.affected_tasks()
+        self.assertEqual(
+            sorted(affected_tasks, key=lambda x: x.name),
+            sorted([self.test_task1, self.test_task3, self.test_task4],
+                   key=lambda x: x.name)
+        )
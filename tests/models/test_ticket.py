@@ -295,6 +295,94 @@ class TicketTester(unittest.TestCase):
         self.assertEqual(ticket1.number, 2)
         self.assertEqual(ticket2.number, 3)
 
+    def test_number_attribute_is_unique_for_tickets_in_the_same_session(self):
+        """testing if the Tickets created without flushing the session in
+        between get different numbers
+        """
+        ticket1 = Ticket(**self.kwargs)
+        ticket2 = Ticket(**self.kwargs)
+        self.assertEqual(ticket1.number, 2)
+        self.assertEqual(ticket2.number, 3)
+
+    def test_number_argument_is_working_properly(self):
+        """testing if the number argument value is used instead of
+        generating a new number
+        """
+        self.kwargs['number'] = 42
+        new_ticket = Ticket(**self.kwargs)
+        self.assertEqual(new_ticket.number, 42)
+        self.assertEqual(new_ticket.name, 'Ticket #42')
+
+    def test_number_attribute_is_unique_in_the_studio(self):
+        """testing if the database is not accepting two Tickets with the same
+        number even if they are in different projects
+        """
+        from sqlalchemy.exc import IntegrityError
+        proj2 = Project(
+            name='Test Project 2',
+            code='TP2',
+            repository=self.test_repo,
+            status_list=self.test_project_status_list
+        )
+        DBSession.add(proj2)
+        DBSession.commit()
+
+        self.kwargs['project'] = proj2
+        self.kwargs['number'] = self.test_ticket.number
+        DBSession.add(Ticket(**self.kwargs))
+        self.assertRaises(IntegrityError, DBSession.commit)
+
+    def test_reserve_numbers_is_working_properly(self):
+        """testing if the Ticket.reserve_numbers() method returns consecutive
+        numbers and the next ticket gets the following number
+        """
+        self.assertEqual([2, 3, 4], Ticket.reserve_numbers(3))
+        new_ticket = Ticket(**self.kwargs)
+        self.assertEqual(new_ticket.number, 5)
+
+    def test_number_attribute_is_created_per_project_if_configured(self):
+        """testing if the number attribute restarts from 1 for every project
+        if the ticket_numbers_per_project is set to True
+        """
+        proj2 = Project(
+            name='Test Project 2',
+            code='TP2',
+            repository=self.test_repo,
+            status_list=self.test_project_status_list
+        )
+        DBSession.add(proj2)
+        DBSession.commit()
+
+        # the numbers should be unique per project in the database
+        from alembic.migration import MigrationContext
+        from alembic.operations import Operations
+        op = Operations(MigrationContext.configure(DBSession.connection()))
+        with op.batch_alter_table(
+                'Tickets',
+                naming_convention={
+                    'uq': '%(table_name)s_%(column_0_name)s_key'
+                }) as batch_op:
+            batch_op.drop_constraint('Tickets_number_key', type_='unique')
+            batch_op.create_unique_constraint(
+                'Tickets_project_id_number_key', ['project_id', 'number']
+            )
+
+        defaults.ticket_numbers_per_project = True
+        try:
+            p1_t2 = Ticket(project=self.test_project)
+            p2_t1 = Ticket(project=proj2)
+            p2_t2 = Ticket(project=proj2)
+            p1_t3 = Ticket(project=self.test_project)
+            DBSession.add_all([p1_t2, p2_t1, p2_t2, p1_t3])
+            DBSession.commit()
+            self.assertEqual(
+                [2, 1, 2, 3],
+                [t.number for t in [p1_t2, p2_t1, p2_t2, p1_t3]]
+            )
+            self.assertEqual([3, 4], Ticket.reserve_numbers(2, proj2))
+        finally:
+            defaults.ticket_numbers_per_project = False
+
     def test_links_argument_accepts_anything_derived_from_SimpleEntity(self):
         """testing if links accepting anything derived from SimpleEntity
         """
@@ -890,3 +890,99 @@ class TimeLogDBTestCase(unittest.TestCase):
             datetime.datetime(2014, 3, 16, 10, 0)
         )
 
+
+    def test_OverbookedError_with_a_flushed_time_log(self):
+        """testing if a OverBookedError will be raised when the resource is
+        already booked with a TimeLog in the database, without loading the
+        time_logs of the resource
+        """
+        from sqlalchemy import inspect
+        from stalker.db.session import DBSession
+
+        tlog1 = TimeLog(**self.kwargs)
+        DBSession.add(tlog1)
+        DBSession.commit()
+
+        resource_state = inspect(self.test_resource1)
+        self.assertNotIn('time_logs', resource_state.dict)
+
+        # the new TimeLog is covering the existing one
+        self.kwargs['name'] = 'test time_log 2'
+        self.kwargs['start'] = \
+            self.kwargs['start'] - datetime.timedelta(hours=1)
+        self.kwargs['duration'] = datetime.timedelta(12)
+        with self.assertRaises(OverBookedError) as cm:
+            TimeLog(**self.kwargs)
+
+        self.assertTrue(
+            cm.exception.value.endswith('and %s' % tlog1)
+        )
+        self.assertNotIn('time_logs', resource_state.dict)
+
+    def test_OverbookedError_with_touching_flushed_time_logs(self):
+        """testing if no OverBookedError will be raised when the TimeLog in
+        the database is ending when the new one starts
+        """
+        from stalker.db.session import DBSession
+
+        tlog1 = TimeLog(**self.kwargs)
+        DBSession.add(tlog1)
+        DBSession.commit()
+
+        self.kwargs['name'] = 'test time_log 2'
+        self.kwargs['start'] = self.kwargs['start'] + self.kwargs['duration']
+        tlog2 = TimeLog(**self.kwargs)
+        DBSession.add(tlog2)
+        DBSession.commit()
+
+        self.assertEqual(
+            sorted(self.test_resource1.time_logs, key=lambda x: x.start),
+            [tlog1, tlog2]
+        )
+
+    def test_OverbookedError_with_changed_time_logs_in_the_session(self):
+        """testing if the not flushed changes of the TimeLogs in the session
+        are considered while checking the overbooking
+        """
+        from stalker.db.session import DBSession
+
+        tlog1 = TimeLog(**self.kwargs)
+        DBSession.add(tlog1)
+        DBSession.commit()
+
+        # move the existing TimeLog without flushing
+        start = self.kwargs['start']
+        tlog1.start = start + datetime.timedelta(30)
+        self.assertIn(tlog1, DBSession.dirty)
+
+        # the old range is free now
+        self.kwargs['name'] = 'test time_log 2'
+        tlog2 = TimeLog(**self.kwargs)
+        DBSession.add(tlog2)
+
+        # but the new range is not
+        self.kwargs['name'] = 'test time_log 3'
+        self.kwargs['start'] = start + datetime.timedelta(31)
+        self.kwargs['duration'] = datetime.timedelta(hours=1)
+        with self.assertRaises(OverBookedError) as cm:
+            TimeLog(**self.kwargs)
+
+        self.assertTrue(
+            cm.exception.value.endswith('and %s' % tlog1)
+        )
+
+    def test_OverbookedError_with_deleted_time_logs_in_the_session(self):
+        """testing if the deleted TimeLogs in the session are not considered
+        while checking the overbooking
+        """
+        from stalker.db.session import DBSession
+
+        tlog1 = TimeLog(**self.kwargs)
+        DBSession.add(tlog1)
+        DBSession.commit()
+
+        DBSession.delete(tlog1)
+
+        self.kwargs['name'] = 'test time_log 2'
+        # no warning
+        TimeLog(**self.kwargs)
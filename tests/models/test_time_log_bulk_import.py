@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import datetime
+import unittest
+
+from stalker.db import DBSession
+from stalker import (db, Repository, Status, StatusList, Project, Task,
+                     TimeLog, User)
+from stalker.exceptions import (OverBookedError, StatusError,
+                                DependencyViolationError)
+
+
+class TimeLogBulkImportTester(unittest.TestCase):
+    """tests the TimeLog.bulk_import() method
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """setup tests in class level
+        """
+        cls.config = {
+            'sqlalchemy.url': 'sqlite:///:memory:',
+            'sqlalchemy.echo': False
+        }
+
+    def setUp(self):
+        """set up the test
+        """
+        db.setup(self.config)
+        db.init()
+
+        self.test_user1 = User(
+            name='User1',
+            login='user1',
+            email='user1@users.com',
+            password='1234'
+        )
+        self.test_user2 = User(
+            name='User2',
+            login='user2',
+            email='user2@users.com',
+            password='1234'
+        )
+        DBSession.add_all([self.test_user1, self.test_user2])
+
+        self.test_repo = Repository(name='Test Repository')
+        DBSession.add(self.test_repo)
+
+        self.test_proj_status_list = StatusList(
+            name='Project Status List',
+            statuses=[Status(name='Status 1', code='STS1')],
+            target_entity_type='Project'
+        )
+        DBSession.add(self.test_proj_status_list)
+
+        self.test_project = Project(
+            name='Test Project',
+            code='TP',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+        )
+        DBSession.add(self.test_project)
+
+        # Task1
+        #   Task2
+        #     Task3
+        #     Task4
+        # Task5
+        self.test_task1 = Task(name='Task1', project=self.test_project)
+        self.test_task2 = Task(name='Task2', parent=self.test_task1)
+        self.test_task3 = Task(
+            name='Task3',
+            parent=self.test_task2,
+            resources=[self.test_user1],
+            schedule_timing=10,
+            schedule_unit='d'
+        )
+        self.test_task4 = Task(
+            name='Task4',
+            parent=self.test_task2,
+            resources=[self.test_user2],
+            schedule_timing=10,
+            schedule_unit='d'
+        )
+        self.test_task5 = Task(
+            name='Task5',
+            project=self.test_project,
+            resources=[self.test_user1],
+            schedule_timing=10,
+            schedule_unit='d'
+        )
+        DBSession.add_all([
+            self.test_task1, self.test_task2, self.test_task3,
+            self.test_task4, self.test_task5
+        ])
+        DBSession.commit()
+
+        self.rts = Status.query.filter_by(code='RTS').first()
+        self.wip = Status.query.filter_by(code='WIP').first()
+        self.cmpl = Status.query.filter_by(code='CMPL').first()
+
+        self.start = datetime.datetime(2016, 4, 18, 10, 0)
+
+    def tearDown(self):
+        """clean up the test
+        """
+        DBSession.remove()
+
+    def hours(self, start, end):
+        """returns a (start, end) tuple by adding the given hours to
+        self.start
+        """
+        return {
+            'start': self.start + datetime.timedelta(hours=start),
+            'end': self.start + datetime.timedelta(hours=end)
+        }
+
+    def row(self, task, resource, start, end):
+        """returns a bulk_import row
+        """
+        row = {'task': task, 'resource': resource}
+        row.update(self.hours(start, end))
+        return row
+
+    def test_bulk_import_is_creating_the_time_logs(self):
+        """testing if TimeLog.bulk_import() is creating the TimeLogs in the
+        given order
+        """
+        time_logs = TimeLog.bulk_import([
+            self.row(self.test_task3, self.test_user1, 0, 2),
+            self.row(self.test_task4, self.test_user2, 0, 3),
+            self.row(self.test_task5, self.test_user1, 2, 4),
+            self.row(self.test_task3, self.test_user1, 24, 26),
+        ])
+        DBSession.commit()
+
+        self.assertEqual(len(time_logs), 4)
+        self.assertIs(time_logs[0].task, self.test_task3)
+        self.assertIs(time_logs[0].resource, self.test_user1)
+        self.assertEqual(time_logs[0].start, self.start)
+        self.assertEqual(
+            time_logs[0].end, self.start + datetime.timedelta(hours=2)
+        )
+        self.assertTrue(time_logs[0].name.startswith('TimeLog_'))
+        self.assertEqual(time_logs[1].task, self.test_task4)
+        self.assertEqual(time_logs[3].task, self.test_task3)
+
+        self.assertEqual(
+            sorted(self.test_task3.time_logs, key=lambda x: x.start),
+            [time_logs[0], time_logs[3]]
+        )
+        self.assertEqual(len(self.test_user1.time_logs), 3)
+
+    def test_task_statuses_and_logged_seconds_are_updated(self):
+        """testing if the task statuses and the total_logged_seconds of the
+        parents are updated
+        """
+        TimeLog.bulk_import([
+            self.row(self.test_task3, self.test_user1, 0, 2),
+            self.row(self.test_task3, self.test_user1, 3, 4),
+            self.row(self.test_task4, self.test_user2, 0, 3),
+        ])
+        DBSession.commit()
+
+        self.assertEqual(self.test_task3.status, self.wip)
+        self.assertEqual(self.test_task4.status, self.wip)
+        self.assertEqual(self.test_task2.status, self.wip)
+        self.assertEqual(self.test_task1.status, self.wip)
+        self.assertEqual(self.test_task5.status, self.rts)
+
+        self.assertEqual(self.test_task3.total_logged_seconds, 3 * 3600)
+        self.assertEqual(self.test_task2.total_logged_seconds, 6 * 3600)
+        self.assertEqual(self.test_task1.total_logged_seconds, 6 * 3600)
+
+        # compare with the recalculated values
+        DBSession.expire_all()
+        self.test_task1.update_schedule_info()
+        self.assertEqual(self.test_task1.total_logged_seconds, 6 * 3600)
+
+    def test_overbooking_in_the_imported_rows(self):
+        """testing if an OverBookedError will be raised for overlapping rows
+        and nothing is inserted
+        """
+        with self.assertRaises(OverBookedError):
+            TimeLog.bulk_import([
+                self.row(self.test_task3, self.test_user1, 0, 2),
+                self.row(self.test_task4, self.test_user2, 0, 2),
+                self.row(self.test_task5, self.test_user1, 1, 3),
+            ])
+        DBSession.rollback()
+        self.assertEqual(TimeLog.query.count(), 0)
+
+    def test_overbooking_with_the_existing_time_logs(self):
+        """testing if an OverBookedError will be raised for the rows
+        overlapping with the existing TimeLogs
+        """
+        DBSession.add(
+            TimeLog(task=self.test_task5, resource=self.test_user1,
+                    **self.hours(0, 4))
+        )
+        DBSession.commit()
+
+        # the existing TimeLog is covering the new one
+        with self.assertRaises(OverBookedError) as cm:
+            TimeLog.bulk_import([
+                self.row(self.test_task3, self.test_user1, 1, 2)
+            ])
+        self.assertTrue(
+            cm.exception.value.startswith(
+                "The resource <User1 ('user1') (User)> is overly booked with "
+                '<TimeLog (id: '
+            )
+        )
+        DBSession.rollback()
+
+        # the new TimeLog is covering the existing one
+        with self.assertRaises(OverBookedError):
+            TimeLog.bulk_import([
+                self.row(self.test_task3, self.test_user1, -1, 5)
+            ])
+        DBSession.rollback()
+
+        # the same start
+        with self.assertRaises(OverBookedError):
+            TimeLog.bulk_import([
+                self.row(self.test_task3, self.test_user1, 0, 1)
+            ])
+        DBSession.rollback()
+
+    def test_touching_time_logs_are_not_overbooking(self):
+        """testing if the TimeLogs that are ending when the other starts are
+        not considered as overbooking
+        """
+        DBSession.add(
+            TimeLog(task=self.test_task5, resource=self.test_user1,
+                    **self.hours(2, 4))
+        )
+        DBSession.commit()
+
+        time_logs = TimeLog.bulk_import([
+            self.row(self.test_task3, self.test_user1, 0, 2),
+            self.row(self.test_task3, self.test_user1, 4, 5),
+            self.row(self.test_task3, self.test_user1, 5, 6),
+            # other resources are not affecting each other
+            self.row(self.test_task4, self.test_user2, 0, 6),
+        ])
+        self.assertEqual(len(time_logs), 4)
+
+    def test_container_task(self):
+        """testing if a ValueError will be raised for container tasks
+        """
+        with self.assertRaises(ValueError) as cm:
+            TimeLog.bulk_import([
+                self.row(self.test_task2, self.test_user1, 0, 2)
+            ])
+        self.assertEqual(
+            str(cm.exception),
+            'Task2 (id: %s) is a container task, and it is not allowed to '
+            'create TimeLogs for a container task' % self.test_task2.id
+        )
+
+    def test_task_status(self):
+        """testing if a StatusError will be raised for CMPL tasks
+        """
+        self.test_task5.status = self.cmpl
+        with self.assertRaises(StatusError) as cm:
+            TimeLog.bulk_import([
+                self.row(self.test_task5, self.test_user1, 0, 2)
+            ])
+        self.assertEqual(
+            cm.exception.value,
+            'Task5 is a CMPL task, and it is not allowed to create TimeLogs '
+            'for a CMPL task, please supply a RTS, WIP, HREV or DREV task!'
+        )
+
+    def test_dependency_violation(self):
+        """testing if a DependencyViolationError will be raised if the
+        earliest TimeLog of a task is starting before its dependency
+        """
+        self.test_task5.depends = [self.test_task3]
+        self.test_task3.status = self.cmpl
+        self.test_task5.status = self.rts
+        DBSession.commit()
+
+        with self.assertRaises(DependencyViolationError) as cm:
+            TimeLog.bulk_import([
+                {'task': self.test_task5, 'resource': self.test_user1,
+                 'start': self.test_task3.end, 'duration':
+                 datetime.timedelta(hours=1)},
+                {'task': self.test_task5, 'resource': self.test_user1,
+                 'end': self.test_task3.end, 'duration':
+                 datetime.timedelta(hours=1)},
+            ])
+        self.assertEqual(
+            cm.exception.value,
+            'It is not possible to create a TimeLog before %s, which '
+            'violates the dependency relation of "Task5" to "Task3"' %
+            self.test_task3.end
+        )
+
+    def test_resource_is_not_a_user(self):
+        """testing if a TypeError will be raised if the resource is not a User
+        """
+        with self.assertRaises(TypeError) as cm:
+            TimeLog.bulk_import([
+                self.row(self.test_task3, 'not a user', 0, 2)
+            ])
+        self.assertEqual(
+            str(cm.exception),
+            'TimeLog.resource should be a stalker.models.auth.User instance '
+            'not str'
+        )
@@ -1685,3 +1685,92 @@ class UserTest(unittest.TestCase):
         self.assertNotEqual(self.test_user.rate, test_value)
         self.test_user.rate = test_value
         self.assertEqual(self.test_user.rate, test_value)
+
+    def get_permission(self, access, action, class_name):
+        """returns the Permission created by db.init()
+        """
+        from stalker import Permission
+        return Permission.query\
+            .filter(Permission.access == access)\
+            .filter(Permission.action == action)\
+            .filter(Permission.class_name == class_name)\
+            .first()
+
+    def test_effective_permissions_is_the_union_of_the_user_and_groups(self):
+        """testing if the effective_permissions attribute is the union of the
+        permissions of the user and the groups of the user
+        """
+        self.test_user.permissions.append(
+            self.get_permission('Allow', 'Create', 'Project')
+        )
+        self.test_group1.permissions.append(
+            self.get_permission('Allow', 'Read', 'Project')
+        )
+        self.test_group3.permissions.append(
+            self.get_permission('Allow', 'Delete', 'Project')
+        )
+        db.DBSession.commit()
+
+        self.assertEqual(
+            self.test_user.effective_permissions,
+            frozenset([('Create', 'Project'), ('Read', 'Project')])
+        )
+
+    def test_effective_permissions_deny_overrides_allow(self):
+        """testing if a Deny permission of the user or a group of the user
+        overrides an Allow permission
+        """
+        self.test_user.permissions.append(
+            self.get_permission('Allow', 'Create', 'Project')
+        )
+        self.test_group1.permissions.append(
+            self.get_permission('Allow', 'Read', 'Project')
+        )
+        self.test_group2.permissions.append(
+            self.get_permission('Deny', 'Create', 'Project')
+        )
+        self.test_user.permissions.append(
+            self.get_permission('Deny', 'Read', 'Project')
+        )
+        self.assertEqual(self.test_user.effective_permissions, frozenset())
+
+    def test_can_is_working_properly(self):
+        """testing if the can() method is working properly and is updated
+        when the permissions or the groups are changed
+        """
+        self.assertFalse(self.test_user.can('Read', 'Project'))
+
+        # group permission
+        self.test_group3.permissions.append(
+            self.get_permission('Allow', 'Read', 'Project')
+        )
+        self.assertFalse(self.test_user.can('Read', 'Project'))
+
+        # join the group
+        self.test_user.groups.append(self.test_group3)
+        self.assertTrue(self.test_user.can('Read', 'Project'))
+        self.assertFalse(self.test_user.can('Create', 'Project'))
+
+        # deny it
+        deny = self.get_permission('Deny', 'Read', 'Project')
+        self.test_group1.permissions.append(deny)
+        self.assertFalse(self.test_user.can('Read', 'Project'))
+
+        # remove the deny
+        self.test_group1.permissions.remove(deny)
+        self.assertTrue(self.test_user.can('Read', 'Project'))
+
+        # leave the group
+        self.test_group3.users.remove(self.test_user)
+        self.assertFalse(self.test_user.can('Read', 'Project'))
+
+    def test_can_is_updated_after_a_rollback(self):
+        """testing if the can() method returns the committed value after the
+        session is rolled back
+        """
+        self.test_user.permissions.append(
+            self.get_permission('Allow', 'Read', 'Project')
+        )
+        self.assertTrue(self.test_user.can('Read', 'Project'))
+        db.DBSession.rollback()
+        self.assertFalse(self.test_user.can('Read', 'Project'))
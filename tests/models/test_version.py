@@ -1504,7 +1504,8 @@ class VersionTester(unittest.TestCase):
         v3.inputs = [v1]
         v2.inputs = [v1]
 
-        expected_result = [v5, v4, v3, v1, v2, v1]
+        # each version is visited only once
+        expected_result = [v5, v4, v3, v1, v2]
         visited_versions = []
         for v in v5.walk_inputs():
             visited_versions.append(v)
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+# Stalker a Production Asset Management System
+# Copyright (C) 2009-2016 Erkan Ozgur Yilmaz
+#
+# This file is part of Stalker.
+#
+# Stalker is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License.
+#
+# Stalker is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# Lesser GNU General Public License for more details.
+#
+# You should have received a copy of the Lesser GNU General Public License
+# along with Stalker.  If not, see <http://www.gnu.org/licenses/>
+
+import unittest
+
+from sqlalchemy import select
+
+from stalker.db import DBSession
+from stalker import (db, Repository, Status, StatusList, Project, Task,
+                     Version)
+from stalker.models.version import (Version_Counters, reserve_version_number,
+                                    lock_version_counter,
+                                    set_next_version_number)
+
+
+class VersionCountersTester(unittest.TestCase):
+    """tests the Version_Counters table and the version numbering functions
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """setup tests in class level
+        """
+        cls.config = {
+            'sqlalchemy.url': 'sqlite:///:memory:',
+            'sqlalchemy.echo': False
+        }
+
+    def setUp(self):
+        """set up the test
+        """
+        db.setup(self.config)
+        db.init()
+
+        self.test_repo = Repository(name='Test Repository')
+        DBSession.add(self.test_repo)
+
+        self.test_proj_status_list = StatusList(
+            name='Project Status List',
+            statuses=[Status(name='Status 1', code='STS1')],
+            target_entity_type='Project'
+        )
+        DBSession.add(self.test_proj_status_list)
+
+        self.test_project = Project(
+            name='Test Project',
+            code='TP',
+            repository=self.test_repo,
+            status_list=self.test_proj_status_list,
+        )
+        DBSession.add(self.test_project)
+
+        self.test_task1 = Task(name='Task1', project=self.test_project)
+        self.test_task2 = Task(name='Task2', project=self.test_project)
+        DBSession.add_all([self.test_task1, self.test_task2])
+        DBSession.commit()
+
+    def tearDown(self):
+        """clean up the test
+        """
+        DBSession.remove()
+
+    def get_counter(self, task, take_name='Main'):
+        """returns the next_number and latest_published_id of the counter of
+        the given task and take
+        """
+        return DBSession.connection().execute(
+            select([Version_Counters.c.next_number,
+                    Version_Counters.c.latest_published_id])
+            .where(Version_Counters.c.task_id == task.id)
+            .where(Version_Counters.c.take_name == take_name)
+        ).fetchone()
+
+    def test_version_numbers_of_unflushed_versions_are_consecutive(self):
+        """testing if the Versions created without flushing the session in
+        between get consecutive version numbers
+        """
+        v1 = Version(task=self.test_task1)
+        v2 = Version(task=self.test_task1)
+        v3 = Version(task=self.test_task1)
+        v4 = Version(task=self.test_task1, take_name='Other')
+        v5 = Version(task=self.test_task2)
+        self.assertEqual(
+            [1, 2, 3, 1, 1],
+            [v.version_number for v in [v1, v2, v3, v4, v5]]
+        )
+        DBSession.add_all([v1, v2, v3, v4, v5])
+        DBSession.commit()
+
+        self.assertEqual(4, self.get_counter(self.test_task1)[0])
+        self.assertEqual(2, self.get_counter(self.test_task1, 'Other')[0])
+        self.assertEqual(2, self.get_counter(self.test_task2)[0])
+
+    def test_reserve_version_number_returns_consecutive_numbers(self):
+        """testing if the reserve_version_number() function returns
+        consecutive numbers
+        """
+        connection = DBSession.connection()
+        self.assertEqual(
+            [1, 2, 3],
+            [reserve_version_number(connection, self.test_task1.id, 'Main')
+             for i in range(3)]
+        )
+        self.assertEqual(4, self.get_counter(self.test_task1)[0])
+
+    def test_reserve_version_number_creates_the_counter_from_versions(self):
+        """testing if the reserve_version_number() function creates the
+        missing counter from the version numbers in the database
+        """
+        v1 = Version(task=self.test_task1)
+        v2 = Version(task=self.test_task1)
+        v2.is_published = True
+        DBSession.add_all([v1, v2])
+        DBSession.commit()
+
+        # remove the counter
+        DBSession.connection().execute(Version_Counters.delete())
+        self.assertIsNone(self.get_counter(self.test_task1))
+
+        connection = DBSession.connection()
+        self.assertEqual(
+            3, reserve_version_number(connection, self.test_task1.id, 'Main')
+        )
+        self.assertEqual((4, v2.id), tuple(self.get_counter(self.test_task1)))
+
+    def test_lock_version_counter_returns_the_next_number(self):
+        """testing if the lock_version_counter() function returns the next
+        number without changing it
+        """
+        v1 = Version(task=self.test_task1)
+        DBSession.add(v1)
+        DBSession.commit()
+
+        connection = DBSession.connection()
+        self.assertEqual(
+            2, lock_version_counter(connection, self.test_task1.id, 'Main')
+        )
+        self.assertEqual(2, self.get_counter(self.test_task1)[0])
+
+    def test_lock_version_counter_creates_the_missing_counter(self):
+        """testing if the lock_version_counter() function creates the missing
+        counter
+        """
+        connection = DBSession.connection()
+        self.assertIsNone(self.get_counter(self.test_task1, 'New'))
+        self.assertEqual(
+            1, lock_version_counter(connection, self.test_task1.id, 'New')
+        )
+        self.assertEqual(1, self.get_counter(self.test_task1, 'New')[0])
+
+    def test_set_next_version_number_only_increases_the_number(self):
+        """testing if the set_next_version_number() function does not
+        decrease the next number
+        """
+        connection = DBSession.connection()
+        lock_version_counter(connection, self.test_task1.id, 'Main')
+
+        set_next_version_number(connection, self.test_task1.id, 'Main', 10)
+        self.assertEqual(10, self.get_counter(self.test_task1)[0])
+
+        set_next_version_number(connection, self.test_task1.id, 'Main', 5)
+        self.assertEqual(10, self.get_counter(self.test_task1)[0])
+
+    def test_a_higher_version_number_updates_the_counter(self):
+        """testing if setting the version_number to a higher value updates
+        the counter and a lower value is replaced with the next number unless
+        it is the latest version
+        """
+        v1 = Version(task=self.test_task1)
+        v1.version_number = 10
+        self.assertEqual(10, v1.version_number)
+        self.assertEqual(11, self.get_counter(self.test_task1)[0])
+
+        v2 = Version(task=self.test_task1)
+        self.assertEqual(11, v2.version_number)
+
+        # the latest version keeps its number
+        v2.version_number = 3
+        self.assertEqual(11, v2.version_number)
+
+        v1.version_number = 3
+        self.assertEqual(12, v1.version_number)
+        self.assertEqual(13, self.get_counter(self.test_task1)[0])
+
+    def test_latest_published_version_is_read_from_the_counter(self):
+        """testing if the latest_published_version is stored in the counter
+        and updated when the versions are published, unpublished and deleted
+        """
+        v1 = Version(task=self.test_task1)
+        v2 = Version(task=self.test_task1)
+        v3 = Version(task=self.test_task1)
+        DBSession.add_all([v1, v2, v3])
+        DBSession.commit()
+        self.assertIsNone(self.get_counter(self.test_task1)[1])
+        self.assertIsNone(v3.latest_published_version)
+
+        v1.is_published = True
+        v2.is_published = True
+        DBSession.commit()
+        self.assertEqual(v2.id, self.get_counter(self.test_task1)[1])
+        self.assertEqual(v2, v3.latest_published_version)
+
+        v2.is_published = False
+        # the session is flushed before reading the counter
+        self.assertEqual(v1, v3.latest_published_version)
+        self.assertEqual(v1.id, self.get_counter(self.test_task1)[1])
+
+        v3.is_published = True
+        DBSession.commit()
+        self.assertEqual(v3, v1.latest_published_version)
+
+        DBSession.delete(v3)
+        DBSession.commit()
+        self.assertEqual(v1, v2.latest_published_version)
+        self.assertEqual(v1.id, self.get_counter(self.test_task1)[1])
+
+    def test_latest_published_version_of_an_unflushed_task(self):
+        """testing if the latest_published_version returns None for a Version
+        of a Task which is not in the database yet
+        """
+        new_task = Task(name='Task3', project=self.test_project)
+        v1 = Version(task=new_task)
+        with DBSession.no_autoflush:
+            self.assertIsNone(v1.latest_published_version)